@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+
+
+import numpy as np
+
+
+from src.utils.mock_data import get_mock_data
+from src.convert_params.data_preprocessor import init_tohlcv
+from src.convert_params.param_key_utils import (
+    create_list_dict_float_1d_empty,
+    append_item,
+)
+from src.convert_params.param_template_manager import (
+    create_indicator_params_matrix,
+    create_backtest_params_matrix,
+)
+from src.indicators.indicator_layout import ipi, iid, indicator_all_fields
+from src.indicators.indicator_cache import (
+    collect_indicator_cache_index,
+    calc_indicator_cache,
+)
+from src.indicators.atr import calc_atr
+from src.backtest.atr_cache import collect_atr_cache_index, calc_atr_cache
+from src.backtest.backtest_enums import bpi
+
+
+np_int = numba_config["np"]["int"]
+
+
+def get_backtest_params():
+    backtest_params = create_backtest_params_matrix(5, True)
+    backtest_params[:, bpi.atr_period.value] = [14, 14, 20, 20, 30]
+    backtest_params[1, bpi.atr_sl_enable.value] = 1
+    backtest_params[2, bpi.slippage_atr.value] = 0.1
+    backtest_params[3, bpi.atr_tsl_enable.value] = 1
+    return backtest_params
+
+
+def test_collect_atr_cache_index():
+    backtest_params = get_backtest_params()
+
+    # 只算绩效时没有开启 ATR 离场和 ATR 滑点的参数组合不需要 ATR
+    atr_index, atr_periods = collect_atr_cache_index(backtest_params, False)
+    assert np.all(atr_index == [-1, 0, 1, 1, -1])
+    assert np.all(atr_periods == [14, 20])
+
+    atr_index, atr_periods = collect_atr_cache_index(backtest_params, True)
+    assert np.all(atr_index == [0, 0, 1, 1, 2])
+    assert np.all(atr_periods == [14, 20, 30])
+
+
+def test_calc_atr_cache_reuses_indicator_cache():
+    ohlcv = init_tohlcv(get_mock_data(500, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+
+    i_params_mtf = create_indicator_params_matrix(1, 1, True)
+    i_params_mtf[0, 0, ipi.atr_enable_0.value] = 1
+    i_params_mtf[0, 0, ipi.atr_period_0.value] = 20
+    _, unique_params = collect_indicator_cache_index(i_params_mtf)
+    indicator_cache = calc_indicator_cache(
+        ohlcv_mtf, unique_params, indicator_all_fields
+    )
+
+    atr_periods = np.array([14, 20], dtype=np_int)
+    atr_cache = calc_atr_cache(
+        ohlcv_mtf,
+        atr_periods,
+        unique_params[iid.atr.value],
+        indicator_cache[iid.atr.value],
+    )
+
+    assert atr_cache.shape == (2, 500)
+    for k, period in enumerate(atr_periods):
+        np.testing.assert_array_equal(
+            atr_cache[k], calc_atr(ohlcv["high"], ohlcv["low"], ohlcv["close"], period)
+        )
+
+    # 周期相同的 atr 直接取自指标缓存, 不重新计算
+    indicator_cache[iid.atr.value][0, 0] *= 2
+    atr_cache = calc_atr_cache(
+        ohlcv_mtf,
+        atr_periods,
+        unique_params[iid.atr.value],
+        indicator_cache[iid.atr.value],
+    )
+    np.testing.assert_array_equal(atr_cache[1], indicator_cache[iid.atr.value][0, 0])
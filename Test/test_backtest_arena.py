@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.convert_params.param_key_utils import (
+    convert_nb_list_to_py_list,
+    get_nb_dict_keys_as_py_dict,
+)
+from src.convert_output.converter import convert_backtest_arena_to_polars
+from src.parallel import run_parallel_matrix, run_parallel_arena
+from src.backtest.calculate_performance import convert_performance_to_matrix
+from src.backtest.backtest_enums import boi, backtest_output_keys
+
+
+def get_params():
+    return get_mock_params(
+        3, backtest_values={"psar_enable": [0, 1, 1], "pct_tsl_enable": [1, 0, 1]}
+    )
+
+
+def test_run_parallel_arena_same_as_dict_output():
+    params = get_params()
+    result = run_parallel_matrix(*params)
+    backtest_arena, performance = run_parallel_arena(*params[:5])
+
+    assert backtest_arena.shape == (3, len(boi), 1000)
+    np.testing.assert_allclose(performance, convert_performance_to_matrix(result[3]))
+
+    for i, b_output in enumerate(convert_nb_list_to_py_list(result[2])):
+        b_output = get_nb_dict_keys_as_py_dict(b_output)
+        assert list(b_output.keys()) == list(backtest_output_keys)
+        for c, k in enumerate(backtest_output_keys):
+            np.testing.assert_array_equal(backtest_arena[i, c], b_output[k], err_msg=k)
+
+
+def test_convert_backtest_arena_to_polars():
+    backtest_arena, _ = run_parallel_arena(*get_params()[:5])
+    df = convert_backtest_arena_to_polars(backtest_arena, 1)
+
+    assert df.columns == list(backtest_output_keys)
+    np.testing.assert_array_equal(
+        df["equity"].to_numpy(), backtest_arena[1, boi.equity.value]
+    )
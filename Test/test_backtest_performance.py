@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import run_parallel_matrix, run_parallel_performance
+from src.parallel_chunked import convert_performance_to_matrix
+from src.signals.calculate_signal import SignalId
+from src.backtest.backtest_enums import bpi, performance_keys
+
+
+backtest_variants = [
+    {},
+    {"pct_sl_enable": 1, "pct_tp_enable": 1, "pct_tsl_enable": 1},
+    {"atr_sl_enable": 1, "atr_tsl_enable": 1, "slippage_atr": 0.1},
+    {"psar_enable": 1, "close_for_reversal": 0, "commission_fixed": 1.0},
+    {"position_size": 0.5, "commission_pct": 0.001, "slippage_pct": 0.001},
+]
+
+
+def get_params(select_id, period_list):
+    params = get_mock_params(
+        len(backtest_variants),
+        SignalId[select_id].value,
+        period_list,
+        [2000, 500],
+    )
+    backtest_params = params[4]
+    for i, variant in enumerate(backtest_variants):
+        for k, v in variant.items():
+            backtest_params[i, bpi[k].value] = v
+    return params
+
+
+def test_run_parallel_performance_same_as_full():
+    for select_id, period_list in (
+        ("signal_2_id", ["15m"]),
+        ("signal_3_id", ["15m", "1h"]),
+    ):
+        params = get_params(select_id, period_list)
+
+        expected = convert_performance_to_matrix(run_parallel_matrix(*params)[3])
+        performance = run_parallel_performance(*params[:5])
+
+        assert performance.shape == (len(backtest_variants), len(performance_keys))
+        assert not np.any(np.isnan(performance[:, 0]))
+        np.testing.assert_allclose(performance, expected, rtol=1e-9, err_msg=select_id)
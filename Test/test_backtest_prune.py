@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import (
+    run_parallel_matrix,
+    run_parallel_performance,
+    run_parallel_arena,
+)
+from src.backtest.calculate_performance import convert_performance_to_matrix
+from src.backtest.prune_utils import should_prune
+from src.signals.calculate_signal import SignalId
+from src.backtest.backtest_enums import bpi, boi, pfi
+
+
+def get_params():
+    params = get_mock_params(4, SignalId.signal_2_id.value, ["15m"], [2000])
+    backtest_params = params[4]
+    # 0: 不终止, 1: 回撤终止, 2: 净值终止, 3: 交易次数不足终止
+    backtest_params[1, bpi.prune_max_drawdown.value] = 1e-6
+    backtest_params[2, bpi.prune_min_equity.value] = 1e12
+    backtest_params[3, bpi.prune_min_trades.value] = 1e6
+    backtest_params[3, bpi.prune_min_trades_bar.value] = 100
+    return params
+
+
+def test_prune_sentinel_row():
+    params = get_params()
+    full = convert_performance_to_matrix(run_parallel_matrix(*params)[3])
+    fused = run_parallel_performance(*params[:5])
+    backtest_arena, arena_performance = run_parallel_arena(*params[:5])
+
+    for performance in (full, fused, arena_performance):
+        assert performance[0, pfi.pruned_bar.value] == 0
+        assert not np.isnan(performance[0, pfi.sharpe_ratio.value])
+
+        pruned_bar = performance[1:, pfi.pruned_bar.value]
+        assert np.all(pruned_bar > 0)
+        assert pruned_bar[1] == 1
+        assert pruned_bar[2] == 100
+        assert np.all(np.isnan(performance[1:, pfi.sharpe_ratio.value]))
+
+    np.testing.assert_array_equal(
+        full[:, pfi.pruned_bar.value], fused[:, pfi.pruned_bar.value]
+    )
+
+    # 终止之后的K线不再回测
+    bar = int(arena_performance[3, pfi.pruned_bar.value])
+    assert np.all(backtest_arena[3, boi.position.value, bar + 1 :] == 0)
+    assert np.all(np.isnan(backtest_arena[3, boi.equity.value, bar + 1 :]))
+
+
+def test_should_prune_min_trades_after_rule_bar():
+    prune_params_tuple = (0.0, 0.0, 5.0, 100.0)
+    assert not should_prune(99, 0.0, 1.0, 0, prune_params_tuple)
+    assert should_prune(100, 0.0, 1.0, 0, prune_params_tuple)
+    # 第一次检查已经在规则K线之后, 同样终止
+    assert should_prune(150, 0.0, 1.0, 0, prune_params_tuple)
+    assert not should_prune(150, 0.0, 1.0, 5, prune_params_tuple)
@@ -0,0 +1,158 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+
+
+import numpy as np
+
+
+from src.utils.mock_data import get_mock_data
+from src.indicators.sma import calc_sma, calc_sma_batch
+from src.indicators.ema import calc_ema, calc_ema_batch
+from src.indicators.rsi import calc_rma, calc_rsi, calc_rsi_batch
+from src.indicators.psar import calc_psar, calc_psar_batch
+
+
+np_int = numba_config["np"]["int"]
+np_float = numba_config["np"]["float"]
+
+
+def get_close(data_count=3000):
+    return np.ascontiguousarray(get_mock_data(data_count, "15m")[:, 4], dtype=np_float)
+
+
+def get_high_low_close(data_count=3000):
+    data = get_mock_data(data_count, "15m")
+    return tuple(np.ascontiguousarray(data[:, c], dtype=np_float) for c in (2, 3, 4))
+
+
+def calc_sma_convolve(close, period):
+    """
+    按定义逐个窗口求平均, 作为参照。
+    """
+    result = np.full(len(close), np.nan)
+    if period <= 1 or len(close) < period:
+        return result
+    result[period - 1 :] = np.convolve(close, np.ones(period) / period, mode="valid")
+    return result
+
+
+def test_calc_sma():
+    close = get_close()
+    for period in (2, 3, 14, 50, 400, 3000, 3001, 1, 0):
+        np.testing.assert_allclose(
+            calc_sma(close, period),
+            calc_sma_convolve(close, period),
+            rtol=1e-12,
+            equal_nan=True,
+        )
+
+    # NaN 只影响包含它的窗口
+    close[100] = np.nan
+    sma = calc_sma(close, 10)
+    assert np.all(np.isnan(sma[100:110]))
+    np.testing.assert_allclose(sma[110:], calc_sma_convolve(close[101:], 10)[9:])
+    np.testing.assert_allclose(sma[9:100], calc_sma_convolve(close[:100], 10)[9:])
+
+
+def test_calc_sma_batch():
+    close = get_close()
+    close[500] = np.nan
+    periods = np.array([14, 2, 400, 1, 50, 5000, 14], dtype=np_int)
+
+    sma_batch = calc_sma_batch(close, periods)
+
+    assert sma_batch.shape == (len(periods), len(close))
+    for k, period in enumerate(periods):
+        np.testing.assert_array_equal(sma_batch[k], calc_sma(close, period))
+
+
+def test_calc_ema_batch():
+    close = get_close(10000)
+    periods = np.array([14, 2, 400, 1, 50, 9999, 10000, 14, 4096], dtype=np_int)
+
+    ema_batch = calc_ema_batch(close, periods)
+
+    assert ema_batch.shape == (len(periods), len(close))
+    for k, period in enumerate(periods):
+        np.testing.assert_array_equal(ema_batch[k], calc_ema(close, period))
+
+
+def calc_rsi_reference(close, length):
+    """
+    先求 diffs 再分别对上涨和下跌做 calc_rma, 作为参照。
+    """
+    n = len(close)
+    result = np.full(n, np.nan)
+    if n < length:
+        return result
+    diffs = np.full(n, np.nan)
+    diffs[1:] = close[1:] - close[:-1]
+    ups = np.ascontiguousarray(np.where(diffs > 0, diffs, 0.0)[1:], dtype=np_float)
+    downs = np.ascontiguousarray(
+        np.where(diffs < 0, np.abs(diffs), 0.0)[1:], dtype=np_float
+    )
+    avg_up = calc_rma(ups, length)
+    avg_down = calc_rma(downs, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = np.where(avg_down != 0, avg_up / avg_down, np.nan)
+    result[length:] = (100 - (100 / (1 + rs)))[length - 1 :]
+    return result
+
+
+def test_calc_rsi():
+    close = get_close()
+    close[700] = np.nan
+    for length in (14, 2, 1, 50, 2999, 3000, 3001):
+        np.testing.assert_array_equal(
+            calc_rsi(close, length), calc_rsi_reference(close, length)
+        )
+
+
+def test_calc_rsi_batch():
+    close = get_close(10000)
+    close[5000] = np.nan
+    lengths = np.array([14, 2, 400, 1, 50, 9999, 10000, 14, 4096, 0], dtype=np_int)
+
+    rsi_batch = calc_rsi_batch(close, lengths)
+
+    assert rsi_batch.shape == (len(lengths), len(close))
+    for k, length in enumerate(lengths):
+        np.testing.assert_array_equal(rsi_batch[k], calc_rsi(close, length))
+
+
+def test_calc_psar_batch():
+    high, low, close = get_high_low_close()
+    af0 = np.array([0.02, 0.01, 0.02, 0.05, 0.02], dtype=np_float)
+    af_step = np.array([0.02, 0.01, 0.03, 0.05, 0.02], dtype=np_float)
+    max_af = np.array([0.2, 0.1, 0.2, 0.5, 0.3], dtype=np_float)
+
+    psar_batch = calc_psar_batch(high, low, close, af0, af_step, max_af)
+
+    assert psar_batch.shape == (len(af0), 4, len(close))
+    for k in range(len(af0)):
+        np.testing.assert_array_equal(
+            psar_batch[k], calc_psar(high, low, close, af0[k], af_step[k], max_af[k]).T
+        )
+
+    # 初始 PSAR 为 NaN 时与 calc_psar 一样只保留前两根K线的 af
+    close[0] = np.nan
+    psar_batch = calc_psar_batch(high, low, close, af0, af_step, max_af)
+    for k in range(len(af0)):
+        np.testing.assert_array_equal(
+            psar_batch[k], calc_psar(high, low, close, af0[k], af_step[k], max_af[k]).T
+        )
+
+    # 数据少于2根时保持 NaN
+    assert np.all(
+        np.isnan(calc_psar_batch(high[:1], low[:1], close[:1], af0, af_step, max_af))
+    )
@@ -0,0 +1,283 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+
+
+import numpy as np
+from numba.core import types
+from numba.typed import Dict
+
+
+from src.utils.mock_data import get_mock_data
+from src.convert_params.data_preprocessor import init_tohlcv
+from src.convert_params.param_key_utils import (
+    create_list_dict_float_1d_empty,
+    append_item,
+)
+from src.convert_params.param_template_manager import create_indicator_params_matrix
+from src.indicators.calculate_indicators import calc_indicators
+from src.indicators.indicator_layout import (
+    ipi,
+    iid,
+    ioi,
+    indicator_all_fields,
+    indicator_output_keys,
+    indicator_slot_offsets,
+    indicator_slot_output_offsets,
+)
+from src.convert_params.param_template import get_indicator_need_keys
+from src.indicators.indicator_cache import (
+    PSAR_BATCH_WIDTH,
+    CLOSE_BATCH_WIDTH,
+    collect_indicator_cache_index,
+    calc_indicator_cache,
+    fill_indicator_output,
+    get_indicator_output,
+    get_batch_width,
+)
+from src.parallel_schedule import schedule_bin_count
+from src.indicators.sma import calc_sma
+from src.indicators.ema import calc_ema
+from src.indicators.rsi import calc_rsi
+from src.indicators.bbands import calc_bbands
+from src.indicators.psar import calc_psar
+from src.signals.calculate_signal import SignalId, get_signal_need_fields
+from src.backtest.backtest_enums import bpi
+
+
+nb_float = numba_config["nb"]["float"]
+np_float = numba_config["np"]["float"]
+
+
+def get_indicator_params(params_count=6):
+    i_params_mtf = create_indicator_params_matrix(params_count, 1, True)
+    i_params_mtf[:, 0, ipi.sma_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.sma_period_0.value] = [10, 20, 10, 20, 10, 20]
+    i_params_mtf[:, 0, ipi.sma_enable_1.value] = 1
+    i_params_mtf[:, 0, ipi.sma_period_1.value] = 10
+    i_params_mtf[:, 0, ipi.bbands_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.bbands_std_mult_0.value] = [2, 2, 2, 2, 2.5, 2.5]
+    i_params_mtf[:, 0, ipi.psar_enable_0.value] = 1
+    return i_params_mtf
+
+
+def test_collect_indicator_cache_index():
+    i_params_mtf = get_indicator_params()
+    cache_index, unique_params = collect_indicator_cache_index(i_params_mtf)
+
+    assert cache_index.shape[:2] == (6, 1)
+    # sma 的三个槽位共用一个 block, period 10 和 20 各计算一次
+    assert len(unique_params[iid.sma.value]) == 2
+    assert len(unique_params[iid.bbands.value]) == 2
+    assert len(unique_params[iid.psar.value]) == 1
+    assert np.all(cache_index[:, 0, 0] == [0, 1, 0, 1, 0, 1])
+    assert np.all(cache_index[:, 0, 1] == 0)
+
+
+def test_indicator_cache_same_as_calc_indicators():
+    ohlcv = init_tohlcv(get_mock_data(500, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+    i_params_mtf = get_indicator_params()
+
+    cache_index, unique_params = collect_indicator_cache_index(i_params_mtf)
+    indicator_cache = calc_indicator_cache(
+        ohlcv_mtf, unique_params, indicator_all_fields
+    )
+
+    for i in range(i_params_mtf.shape[0]):
+        expected = Dict.empty(key_type=types.unicode_type, value_type=nb_float[:])
+        cached = Dict.empty(key_type=types.unicode_type, value_type=nb_float[:])
+        calc_indicators(ohlcv, i_params_mtf[i, 0], expected)
+        fill_indicator_output(ohlcv, 0, cache_index[i, 0], indicator_cache, cached)
+
+        assert set(expected.keys()) == set(cached.keys())
+        for k in expected.keys():
+            np.testing.assert_array_equal(expected[k], cached[k], err_msg=k)
+
+
+def test_get_indicator_output_same_as_fill_indicator_output():
+    ohlcv = init_tohlcv(get_mock_data(500, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+    i_params_mtf = get_indicator_params()
+
+    cache_index, unique_params = collect_indicator_cache_index(i_params_mtf)
+    indicator_cache = calc_indicator_cache(
+        ohlcv_mtf, unique_params, indicator_all_fields
+    )
+
+    for i in range(i_params_mtf.shape[0]):
+        cached = Dict.empty(key_type=types.unicode_type, value_type=nb_float[:])
+        fill_indicator_output(ohlcv, 0, cache_index[i, 0], indicator_cache, cached)
+
+        for indicator_id, slot, field, key in [
+            (iid.sma.value, 0, 0, "sma_0"),
+            (iid.sma.value, 1, 0, "sma_1"),
+            (iid.bbands.value, 0, 2, "bbands_lower_0"),
+            (iid.psar.value, 0, 3, "psar_reversal_0"),
+        ]:
+            np.testing.assert_array_equal(
+                get_indicator_output(
+                    indicator_cache, cache_index[i], 0, 0, indicator_id, slot, field
+                ),
+                cached[key],
+                err_msg=key,
+            )
+
+        # 未开启的槽位返回 NaN 数组
+        disabled = get_indicator_output(
+            indicator_cache, cache_index[i], 0, 0, iid.sma.value, 2, 0
+        )
+        assert len(disabled) == 500 and np.all(np.isnan(disabled))
+
+
+def test_indicator_output_registry():
+    # 输出编号即 indicator_output_keys 中的位置, 同一槽位的输出字段连续排列
+    assert indicator_output_keys[ioi.sma_1.value] == "sma_1"
+    o = indicator_slot_output_offsets[indicator_slot_offsets[iid.psar.value]]
+    assert indicator_output_keys[o : o + 4] == (
+        "psar_long_0",
+        "psar_short_0",
+        "psar_af_0",
+        "psar_reversal_0",
+    )
+
+    need_keys = get_indicator_need_keys(get_indicator_params()[0])
+    assert list(need_keys[0]) == [
+        "sma_0",
+        "sma_1",
+        "bbands_upper_0",
+        "bbands_middle_0",
+        "bbands_lower_0",
+        "psar_long_0",
+        "psar_short_0",
+        "psar_af_0",
+        "psar_reversal_0",
+    ]
+
+
+def test_bbands_shared_mean_std_and_need_fields():
+    ohlcv = init_tohlcv(get_mock_data(500, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+    i_params_mtf = get_indicator_params()
+    i_params_mtf[:, 0, ipi.bbands_period_0.value] = [14, 14, 20, 20, 14, 600]
+    i_params_mtf[:, 0, ipi.bbands_std_mult_0.value] = [1, 2, 2, 3.5, 5, 2]
+
+    # signal_3 只用到 bbands 的 upper/middle/lower
+    backtest_params = np.zeros((2, len(bpi)), dtype=np_float)
+    backtest_params[:, bpi.signal_select.value] = SignalId.signal_3_id.value
+    need_fields = get_signal_need_fields(backtest_params)
+    assert need_fields[iid.bbands.value].tolist() == [True, True, True, False, False]
+    assert np.all(need_fields[iid.sma.value])
+
+    backtest_params[1, bpi.signal_select.value] = SignalId.signal_1_id.value
+    assert np.all(get_signal_need_fields(backtest_params))
+
+    cache_index, unique_params = collect_indicator_cache_index(i_params_mtf)
+    full_cache = calc_indicator_cache(ohlcv_mtf, unique_params, indicator_all_fields)
+    need_cache = calc_indicator_cache(ohlcv_mtf, unique_params, need_fields)
+
+    close = ohlcv["close"]
+    for u, (period, std_mult) in enumerate(unique_params[iid.bbands.value][:, :2]):
+        expected = calc_bbands(close, int(period), std_mult).T
+        np.testing.assert_array_equal(full_cache[iid.bbands.value][u], expected)
+        np.testing.assert_array_equal(need_cache[iid.bbands.value][u, :3], expected[:3])
+        assert np.all(np.isnan(need_cache[iid.bbands.value][u, 3:]))
+
+    np.testing.assert_array_equal(need_cache[iid.sma.value], full_cache[iid.sma.value])
+
+
+def test_psar_batch_in_indicator_cache():
+    ohlcv = init_tohlcv(get_mock_data(500, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+
+    # 唯一参数数量不是 PSAR_BATCH_WIDTH 的整数倍, 最后一批不满
+    params_count = PSAR_BATCH_WIDTH * 2 + 3
+    i_params_mtf = create_indicator_params_matrix(params_count, 1, True)
+    i_params_mtf[:, 0, ipi.psar_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.psar_af0_0.value] = np.linspace(0.01, 0.05, params_count)
+    i_params_mtf[:, 0, ipi.psar_max_af_0.value] = np.repeat([0.1, 0.2], 10)[
+        :params_count
+    ]
+
+    _, unique_params = collect_indicator_cache_index(i_params_mtf)
+    indicator_cache = calc_indicator_cache(
+        ohlcv_mtf, unique_params, indicator_all_fields
+    )
+
+    assert len(unique_params[iid.psar.value]) == params_count
+    for u, (af0, af_step, max_af) in enumerate(unique_params[iid.psar.value]):
+        expected = calc_psar(
+            ohlcv["high"], ohlcv["low"], ohlcv["close"], af0, af_step, max_af
+        ).T
+        np.testing.assert_array_equal(indicator_cache[iid.psar.value][u], expected)
+
+
+def test_psar_batch_width():
+    def get_psar_unique_params(params_count):
+        i_params_mtf = create_indicator_params_matrix(params_count, 1, True)
+        i_params_mtf[:, 0, ipi.psar_enable_0.value] = 1
+        i_params_mtf[:, 0, ipi.psar_af0_0.value] = np.linspace(0.01, 0.05, params_count)
+        return collect_indicator_cache_index(i_params_mtf)[1]
+
+    def get_psar_batch_width(unique_params):
+        return get_batch_width(unique_params, iid.psar.value, PSAR_BATCH_WIDTH)
+
+    # 唯一参数不多于线程数时每个唯一参数单独一个任务
+    assert get_psar_batch_width(get_psar_unique_params(schedule_bin_count)) == 1
+    # 唯一参数很多时合并, 但每批不超过 PSAR_BATCH_WIDTH
+    params_count = schedule_bin_count * PSAR_BATCH_WIDTH * 2
+    assert (
+        get_psar_batch_width(get_psar_unique_params(params_count)) == PSAR_BATCH_WIDTH
+    )
+
+
+def test_close_batch_in_indicator_cache():
+    ohlcv = init_tohlcv(get_mock_data(5000, "15m"))
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    append_item(ohlcv_mtf, ohlcv)
+
+    # 唯一周期足够多时 sma/ema/rsi 分批计算, 最后一批不满
+    params_count = schedule_bin_count * CLOSE_BATCH_WIDTH + 3
+    periods = np.arange(2, params_count + 2)
+    i_params_mtf = create_indicator_params_matrix(params_count, 1, True)
+    i_params_mtf[:, 0, ipi.sma_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.sma_period_0.value] = periods
+    i_params_mtf[:, 0, ipi.ema_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.ema_period_0.value] = periods
+    i_params_mtf[:, 0, ipi.rsi_enable_0.value] = 1
+    i_params_mtf[:, 0, ipi.rsi_period_0.value] = periods
+
+    _, unique_params = collect_indicator_cache_index(i_params_mtf)
+    for indicator_id in (iid.sma.value, iid.ema.value, iid.rsi.value):
+        assert (
+            get_batch_width(unique_params, indicator_id, CLOSE_BATCH_WIDTH)
+            == CLOSE_BATCH_WIDTH
+        )
+    indicator_cache = calc_indicator_cache(
+        ohlcv_mtf, unique_params, indicator_all_fields
+    )
+
+    close = ohlcv["close"]
+    for indicator_id, calc in (
+        (iid.sma.value, calc_sma),
+        (iid.ema.value, calc_ema),
+        (iid.rsi.value, calc_rsi),
+    ):
+        assert len(unique_params[indicator_id]) == params_count
+        for u, period in enumerate(unique_params[indicator_id][:, 0]):
+            np.testing.assert_array_equal(
+                indicator_cache[indicator_id][u, 0], calc(close, int(period))
+            )
@@ -0,0 +1,140 @@
+import sys
+import json
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src import parallel_checkpoint
+from src.parallel_chunked import run_parallel_chunked, iter_parallel_chunks
+from src.parallel_checkpoint import (
+    MANIFEST_NAME,
+    run_parallel_checkpointed,
+    get_sweep_fingerprint,
+)
+from src.backtest.backtest_enums import bpi, performance_keys
+
+
+def get_params(params_count=7):
+    return get_mock_params(
+        params_count,
+        is_only_performance=True,
+        backtest_values={
+            "pct_sl_enable": 1,
+            "pct_sl": np.linspace(0.005, 0.05, params_count),
+        },
+    )
+
+
+def count_chunks(monkeypatch):
+    """
+    记录 run_parallel_checkpointed 实际计算的块。
+    """
+    computed = []
+
+    def _iter_parallel_chunks(*args, **kwargs):
+        for start, stop, performance in iter_parallel_chunks(*args, **kwargs):
+            computed.append(stop - start)
+            yield start, stop, performance
+
+    monkeypatch.setattr(
+        parallel_checkpoint, "iter_parallel_chunks", _iter_parallel_chunks
+    )
+    return computed
+
+
+def test_checkpoint_resume(tmp_path, monkeypatch):
+    params = get_params()
+    expected = run_parallel_chunked(*params, chunk_size=3)
+    computed = count_chunks(monkeypatch)
+
+    table = run_parallel_checkpointed(*params, chunk_size=3, checkpoint_dir=tmp_path)
+    assert computed == [3, 3, 1]
+    assert table.equals(expected)
+
+    (checkpoint_path,) = tmp_path.iterdir()
+    manifest_path = checkpoint_path / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["chunks"] == [[0, 3], [3, 6], [6, 7]]
+    assert manifest["performance_keys"] == list(performance_keys)
+
+    # 全部完成后重新运行不再计算
+    computed.clear()
+    table = run_parallel_checkpointed(*params, chunk_size=3, checkpoint_dir=tmp_path)
+    assert computed == []
+    assert table.equals(expected)
+
+    # 模拟中断: manifest 只记录了第一块, 之后的区间按新的 chunk_size 重新计算
+    manifest["chunks"] = manifest["chunks"][:1]
+    manifest_path.write_text(json.dumps(manifest))
+    table = run_parallel_checkpointed(*params, chunk_size=2, checkpoint_dir=tmp_path)
+    assert computed == [2, 2]
+    assert table.equals(expected)
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["chunks"] == [[0, 3], [3, 5], [5, 7]]
+
+
+def test_checkpoint_fingerprint(tmp_path, monkeypatch):
+    params = get_params(4)
+    fingerprint = get_sweep_fingerprint(params[0], params[1], params[3], params[4])
+    assert fingerprint == get_sweep_fingerprint(
+        params[0], params[1], params[3].copy(), params[4].copy()
+    )
+
+    computed = count_chunks(monkeypatch)
+    run_parallel_checkpointed(*params, chunk_size=2, checkpoint_dir=tmp_path)
+    assert computed == [2, 2]
+
+    # 参数变化后指纹不同, 不复用之前的结果
+    params[4][:, bpi.pct_sl.value] *= 2
+    assert fingerprint != get_sweep_fingerprint(
+        params[0], params[1], params[3], params[4]
+    )
+    computed.clear()
+    table = run_parallel_checkpointed(*params, chunk_size=2, checkpoint_dir=tmp_path)
+    assert computed == [2, 2]
+    assert len(list(tmp_path.iterdir())) == 2
+    assert table.equals(run_parallel_chunked(*params, chunk_size=2))
+
+
+def test_checkpoint_fingerprint_settings(monkeypatch):
+    params = get_params(4)
+    fingerprint = get_sweep_fingerprint(params[0], params[1], params[3], params[4])
+    # is_only_performance 和精度设置都会改变指纹
+    assert fingerprint != get_sweep_fingerprint(
+        params[0], params[1], params[3], params[4], is_only_performance=False
+    )
+    monkeypatch.setitem(numba_config, "enable_mixed", not numba_config["enable_mixed"])
+    assert fingerprint != get_sweep_fingerprint(
+        params[0], params[1], params[3], params[4]
+    )
+    monkeypatch.setitem(numba_config, "enable64", not numba_config["enable64"])
+    assert fingerprint != get_sweep_fingerprint(
+        params[0], params[1], params[3], params[4]
+    )
+
+
+def test_checkpoint_chunk_dtype(tmp_path, monkeypatch):
+    params = get_params(4)
+    run_parallel_checkpointed(*params, chunk_size=2, checkpoint_dir=tmp_path)
+    (checkpoint_path,) = tmp_path.iterdir()
+
+    # dtype 与当前累加器精度不同的块视为未完成, 重新计算
+    chunk_path = checkpoint_path / "chunk_0_2.npy"
+    np.save(chunk_path, np.load(chunk_path).astype(np.float32))
+    computed = count_chunks(monkeypatch)
+    table = run_parallel_checkpointed(*params, chunk_size=2, checkpoint_dir=tmp_path)
+    assert computed == [2]
+    assert table.equals(run_parallel_chunked(*params, chunk_size=2))
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import run_parallel_matrix
+from src.parallel_chunked import (
+    run_parallel_chunked,
+    convert_performance_to_matrix,
+    get_chunk_size,
+)
+from src.backtest.backtest_enums import performance_keys
+
+
+def get_params(params_count=5):
+    return get_mock_params(
+        params_count,
+        is_only_performance=True,
+        backtest_values={
+            "pct_sl_enable": 1,
+            "pct_sl": np.linspace(0.005, 0.05, params_count),
+        },
+    )
+
+
+def test_run_parallel_chunked_same_as_full():
+    params = get_params()
+    expected = convert_performance_to_matrix(run_parallel_matrix(*params)[3])
+
+    table = run_parallel_chunked(*params, chunk_size=2)
+
+    assert table.columns == ["params_index", *performance_keys]
+    assert np.all(table["params_index"].to_numpy() == np.arange(5))
+    np.testing.assert_allclose(table.select(performance_keys).to_numpy(), expected)
+
+
+def test_get_chunk_size():
+    params = get_params(1)
+    ohlcv_mtf = params[0]
+
+    assert get_chunk_size(ohlcv_mtf, True) == 0
+    assert get_chunk_size(ohlcv_mtf, True, chunk_size=7) == 7
+    assert get_chunk_size(ohlcv_mtf, True, memory_budget_mb=1e-6) == 1
+
+    only_performance = get_chunk_size(ohlcv_mtf, True, memory_budget_mb=64)
+    full_output = get_chunk_size(ohlcv_mtf, False, memory_budget_mb=64)
+    assert only_performance > full_output > 1
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.convert_params.param_grid import (
+    collect_optim_dims,
+    get_grid_size,
+    get_spec_values,
+)
+from src.parallel import run_parallel_performance
+from src.parallel_evolution import (
+    run_parallel_evolution,
+    create_params_from_points,
+    get_dim_column_name,
+)
+from src.signals.calculate_signal import SignalId, signal_dict
+from src.backtest.backtest_enums import performance_keys
+
+
+def test_run_parallel_evolution():
+    params = get_mock_params(1)
+    dims = collect_optim_dims(
+        signal_dict[SignalId.signal_3_id.value]["indicator_params"]
+    )
+
+    df = run_parallel_evolution(
+        *params[:5], dims, population_size=16, generations=5, seed=3
+    )
+    columns = [get_dim_column_name(m, k) for m, k, _ in dims]
+    points = df.select(columns).to_numpy()
+
+    # 缓存保证每个个体只回测一次
+    assert len(np.unique(points, axis=0)) == df.height
+    assert df.height <= 16 * 5 < get_grid_size(dims)
+    assert df["generation"].min() == 0
+
+    for d, (_, _, spec) in enumerate(dims):
+        assert np.isin(points[:, d], get_spec_values(spec)).all()
+
+    sharpe = df["sharpe_ratio"].to_numpy()
+    assert sharpe[0] == np.nanmax(sharpe)
+
+    # 表中的绩效与直接回测相同
+    expected = run_parallel_performance(
+        *params[:3], *create_params_from_points(params[3], params[4], dims, points[:4])
+    )
+    np.testing.assert_array_equal(df.select(performance_keys).to_numpy()[:4], expected)
@@ -0,0 +1,169 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params, get_mock_ohlcv_list
+
+
+import numpy as np
+
+
+from src.utils.mock_data import get_mock_data
+from src.parallel import run_parallel_performance
+from src.parallel_live import LiveBacktest
+from src.indicators.sma import calc_sma, sma_update
+from src.indicators.ema import calc_ema, ema_update
+from src.indicators.rsi import calc_rsi, rsi_update
+from src.indicators.atr import calc_atr, atr_update
+from src.indicators.bbands import calc_bbands, bbands_update
+from src.indicators.psar import calc_psar, psar_step
+from src.backtest.backtest_enums import bpi
+from src.convert_params.param_template_manager import create_indicator_params_matrix
+from src.indicators.indicator_layout import ipi, iid
+from src.indicators.indicator_cache import collect_indicator_cache_index
+from src.indicators.indicator_state import (
+    price_ring_keys,
+    get_price_ring_capacity,
+    init_indicator_state,
+    push_price_ring,
+    update_indicator_state,
+)
+
+np_int = numba_config["np"]["int"]
+np_acc = numba_config["np"]["acc"]
+
+
+def test_indicator_update():
+    data = get_mock_data(300, "15m")
+    high, low, close = data[:, 2], data[:, 3], data[:, 4]
+    n = len(close)
+    period = 14
+
+    sma = np.full(n, np.nan)
+    ema = np.full(n, np.nan)
+    rsi = np.full(n, np.nan)
+    atr = np.full(n, np.nan)
+    bbands = np.full((n, 5), np.nan)
+    psar = np.full((n, 4), np.nan)
+
+    ema_state = (np.nan, 0.0)
+    rsi_state = (np.nan, 0.0, np.nan, 0.0)
+    atr_state = (np.nan, 0.0)
+    psar_state = (0.0, 0.0, 0.0, 0.0)
+    cumsum = np.cumsum(close)
+    cumsum_sq = np.cumsum(close**2)
+    for i in range(n):
+        window_sum = cumsum[i] - (cumsum[i - period] if i >= period else 0.0)
+        window_sq_sum = cumsum_sq[i] - (cumsum_sq[i - period] if i >= period else 0.0)
+        prev = max(i - 1, 0)
+
+        sma[i] = sma_update(window_sum, i, period)
+        ema[i], seed = ema_update(*ema_state, close[i], i, period)
+        ema_state = (ema[i], seed)
+        rsi[i], *rsi_state = rsi_update(*rsi_state, close[i], close[prev], i, period)
+        atr[i], seed = atr_update(*atr_state, high[i], low[i], close[prev], i, period)
+        atr_state = (atr[i], seed)
+        bbands[i] = bbands_update(window_sum, window_sq_sum, close[i], i, period, 2.0)
+        psar_state, psar[i] = psar_step(
+            psar_state,
+            high[i],
+            low[i],
+            high[prev],
+            low[prev],
+            close[prev],
+            i,
+            0.02,
+            0.02,
+            0.2,
+        )
+
+    # 递推的指标与完整计算完全一致, 窗口和只有浮点误差
+    np.testing.assert_allclose(sma, calc_sma(close, period), rtol=1e-12)
+    np.testing.assert_array_equal(ema, calc_ema(close, period))
+    np.testing.assert_array_equal(rsi, calc_rsi(close, period))
+    np.testing.assert_array_equal(atr, calc_atr(high, low, close, period))
+    np.testing.assert_allclose(
+        bbands, calc_bbands(close, period, 2.0), rtol=1e-9, atol=1e-9
+    )
+    np.testing.assert_array_equal(psar, calc_psar(high, low, close, 0.02, 0.02, 0.2))
+
+
+def test_live_backtest():
+    ohlcv_mtf_np_list = get_mock_ohlcv_list([1200, 300])
+    params = get_mock_params(6, ohlcv_mtf_np_list=ohlcv_mtf_np_list, param_mode="sobol")
+    backtest_params = params[4]
+    backtest_params[1, bpi.pct_tsl_enable.value] = 1
+    backtest_params[2, bpi.atr_sl_enable.value] = 1
+    backtest_params[3, bpi.psar_enable.value] = 1
+    backtest_params[4, bpi.prune_max_drawdown.value] = 0.001
+
+    base, high_tf = ohlcv_mtf_np_list
+    history_count = 1000
+    live = LiveBacktest(params[3], backtest_params)
+    live.append_history([base[:history_count], high_tf])
+
+    # 之后逐根追加, 高周期K线按时间映射, 重复的高周期K线会被忽略
+    mapping = np.searchsorted(high_tf[:, 0], base[:, 0], side="right") - 1
+    for i in range(history_count, len(base)):
+        live.append_bar(np.stack((base[i, :6], high_tf[mapping[i], :6])))
+    assert live.bar_count == len(base)
+
+    expected = run_parallel_performance(*params[:5])
+    np.testing.assert_allclose(
+        live.get_performance(), expected, rtol=1e-9, equal_nan=True
+    )
+    assert live.get_performance_table().height == len(backtest_params)
+
+
+def test_live_window_sums_long_series():
+    # 价格水平较高的长序列, 累积和之差的误差会随长度增长, 定期重新求和的窗口和不会
+    data = get_mock_data(20000, "15m")
+    data[:, 1:5] += 1e5
+    close = data[:, 4]
+
+    i_params_mtf = create_indicator_params_matrix(1, 1, True)
+    i_params_mtf[0, 0, ipi.sma_enable_0.value] = 1
+    i_params_mtf[0, 0, ipi.sma_period_0.value] = 30
+    i_params_mtf[0, 0, ipi.bbands_enable_0.value] = 1
+    i_params_mtf[0, 0, ipi.bbands_period_0.value] = 20
+    i_params_mtf[0, 0, ipi.bbands_std_mult_0.value] = 2.0
+    _, unique_params = collect_indicator_cache_index(i_params_mtf)
+
+    indicator_state, indicator_values = init_indicator_state(unique_params)
+    capacity = get_price_ring_capacity(unique_params, 1)
+    price_ring = np.full((1, capacity, len(price_ring_keys)), np.nan, dtype=np_acc)
+    bar_counts = np.zeros(1, dtype=np_int)
+    updated = np.ones(1, dtype=np.bool_)
+
+    sma = np.full(len(close), np.nan)
+    bbands = np.full((len(close), 5), np.nan)
+    for i in range(len(close)):
+        push_price_ring(price_ring, bar_counts, 0, data[i, :6])
+        update_indicator_state(
+            price_ring,
+            bar_counts,
+            updated,
+            unique_params,
+            indicator_state,
+            indicator_values,
+        )
+        sma[i] = indicator_values[iid.sma.value][0, 0]
+        bbands[i] = indicator_values[iid.bbands.value][0]
+
+    np.testing.assert_allclose(sma, calc_sma(close, 30), rtol=1e-12)
+    expected = calc_bbands(close, 20, 2.0)
+    np.testing.assert_allclose(bbands[:, 1], expected[:, 1], rtol=1e-12)
+
+    # 标准差与逐个窗口直接计算的结果只差平方和公式本身的舍入误差, 不随序列长度增长
+    # (calc_variance 的累积和之差在这个价格水平下已经失去精度, 不作为参考)
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+    std = (bbands[19:, 0] - bbands[19:, 1]) / 2.0
+    np.testing.assert_allclose(std, windows.std(axis=1), atol=1e-3)
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.convert_params.param_key_utils import (
+    convert_nb_list_to_py_list,
+    get_nb_dict_keys_as_py_dict,
+)
+from src.parallel import run_parallel, run_parallel_matrix
+from src.backtest.backtest_enums import bpi
+
+
+np_float = numba_config["np"]["float"]
+
+
+def get_params(use_params_matrix, params_count=3):
+    return get_mock_params(params_count, use_params_matrix=use_params_matrix)
+
+
+def get_performance(result):
+    return [
+        get_nb_dict_keys_as_py_dict(i) for i in convert_nb_list_to_py_list(result[3])
+    ]
+
+
+def test_params_matrix_layout():
+    params_list = get_params(False)
+    params_matrix = get_params(True)
+
+    backtest_params = params_matrix[4]
+    indicator_params_mtf = params_matrix[3]
+    assert backtest_params.shape == (3, len(bpi))
+    assert indicator_params_mtf.shape[:2] == (3, 2)
+
+    assert np.all(backtest_params[:, bpi.signal_select.value] == 3)
+    assert np.all(
+        backtest_params[:, bpi.init_money.value] == params_list[4][0]["init_money"]
+    )
+
+
+def test_run_parallel_matrix_same_as_dict():
+    result_list = run_parallel(*get_params(False))
+    result_matrix = run_parallel_matrix(*get_params(True))
+
+    performance_list = get_performance(result_list)
+    performance_matrix = get_performance(result_matrix)
+
+    assert len(performance_list) == len(performance_matrix) == 3
+    for a, b in zip(performance_list, performance_matrix):
+        assert a.keys() == b.keys()
+        for k in a:
+            np.testing.assert_allclose(a[k], b[k], err_msg=k)
@@ -0,0 +1,151 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import run_parallel_matrix
+from src.parallel_monte_carlo import (
+    collect_trade_returns,
+    run_monte_carlo,
+    run_monte_carlo_kernel,
+    MonteCarloMode,
+    mci,
+)
+from src.backtest.calculate_performance import convert_performance_to_matrix
+from src.backtest.backtest_enums import bpi, pfi
+
+
+def get_result(params_count=4):
+    params = get_mock_params(
+        params_count,
+        data_count_list=[2000, 500],
+        is_only_performance=False,
+        backtest_values={
+            "pct_sl_enable": 1,
+            "pct_sl": np.linspace(0.005, 0.05, params_count),
+        },
+    )
+    return params, run_parallel_matrix(*params)
+
+
+def test_collect_trade_returns():
+    params, result = get_result()
+    performance = convert_performance_to_matrix(result[3])
+    trade_returns, trade_offsets, bar_counts = collect_trade_returns(result[2])
+
+    assert trade_offsets[0] == 0 and trade_offsets[-1] == len(trade_returns)
+    assert np.all(bar_counts == 2000)
+    for i in range(len(trade_offsets) - 1):
+        profits = trade_returns[trade_offsets[i] : trade_offsets[i + 1]]
+        assert len(profits) > 0
+        np.testing.assert_allclose(
+            np.mean(profits > 0), performance[i, pfi.win_rate.value]
+        )
+
+
+def test_monte_carlo_kernel():
+    trade_returns = np.array([0.1, -0.05, 0.02, -0.1, 0.03, 0.2, -0.02])
+    trade_offsets = np.array([0, 4, 4, 7])
+    init_money = np.full(3, 100.0)
+    sharpe_scale = np.ones(3)
+
+    shuffle = run_monte_carlo_kernel(
+        trade_returns,
+        trade_offsets,
+        init_money,
+        sharpe_scale,
+        64,
+        MonteCarloMode.shuffle.value,
+        7,
+    )
+    # 打乱顺序不改变最终净值和夏普, 最大回撤不小于0
+    for i, (start, stop) in enumerate([(0, 4), (4, 7)]):
+        r = trade_returns[start:stop]
+        row = shuffle[0 if i == 0 else 2]
+        np.testing.assert_allclose(
+            row[:, mci.final_equity.value], 100.0 * np.prod(1.0 + r)
+        )
+        np.testing.assert_allclose(
+            row[:, mci.sharpe_ratio.value], np.mean(r) / np.std(r)
+        )
+        assert np.all(row[:, mci.max_drawdown.value] >= 0)
+    # 没有交易的参数组合为 NaN
+    assert np.all(np.isnan(shuffle[1]))
+
+    bootstrap = run_monte_carlo_kernel(
+        trade_returns,
+        trade_offsets,
+        init_money,
+        sharpe_scale,
+        256,
+        MonteCarloMode.bootstrap.value,
+        7,
+    )
+    # 有放回抽样的最终净值有不同的取值, 相同的种子结果相同
+    assert len(np.unique(bootstrap[0, :, mci.final_equity.value])) > 1
+    np.testing.assert_array_equal(
+        bootstrap,
+        run_monte_carlo_kernel(
+            trade_returns,
+            trade_offsets,
+            init_money,
+            sharpe_scale,
+            256,
+            MonteCarloMode.bootstrap.value,
+            7,
+        ),
+    )
+
+
+def test_run_monte_carlo():
+    params, result = get_result()
+    init_money = params[4][:, bpi.init_money.value]
+
+    table = run_monte_carlo(
+        params[4],
+        result[2],
+        resample_count=100,
+        mode="shuffle",
+        quantiles=(0.05, 0.5, 0.95),
+        params_index=np.array([3, 1, 0, 2]),
+    )
+
+    assert table["params_index"].to_list() == [3, 1, 0, 2]
+    assert table.columns[:5] == [
+        "params_index",
+        "trade_count",
+        "final_equity_q5",
+        "final_equity_q50",
+        "final_equity_q95",
+    ]
+    # 打乱顺序时最终净值就是按原顺序复利的结果
+    trade_returns, trade_offsets, _ = collect_trade_returns(result[2])
+    expected = np.array(
+        [
+            np.prod(1.0 + trade_returns[trade_offsets[i] : trade_offsets[i + 1]])
+            for i in range(4)
+        ]
+    )
+    np.testing.assert_allclose(
+        table["final_equity_q5"].to_numpy(), init_money * expected
+    )
+    np.testing.assert_allclose(
+        table["final_equity_q95"].to_numpy(), init_money * expected
+    )
+    assert np.all(table["trade_count"].to_numpy() == np.diff(trade_offsets))
+    assert np.all(
+        table["max_drawdown_q5"].to_numpy() <= table["max_drawdown_q95"].to_numpy()
+    )
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params, get_mock_ohlcv_list
+
+
+import numpy as np
+
+
+from src.utils.constants import get_numba_dtypes
+from src.parallel import run_parallel_performance
+from src.parallel_precision import (
+    precision_report_keys,
+    compare_performance,
+    run_precision_report,
+)
+from src.signals.calculate_signal import SignalId
+from src.backtest.backtest_enums import pfi, performance_keys
+
+
+def test_get_numba_dtypes_mixed():
+    dtypes = get_numba_dtypes(False, True)
+    assert dtypes["np"]["float"] == np.float32
+    assert dtypes["np"]["acc"] == np.float64
+
+    dtypes = get_numba_dtypes(False)
+    assert dtypes["np"]["acc"] == np.float32
+    dtypes = get_numba_dtypes(True)
+    assert dtypes["np"]["acc"] == np.float64
+
+
+def test_compare_performance():
+    baseline = np.ones((3, len(performance_keys)))
+    performance = baseline.copy()
+    performance[0, pfi.total_profit_pct.value] = 1.5
+    performance[1, pfi.sharpe_ratio.value] = np.nan
+    performance[:, pfi.max_drawdown.value] = np.nan
+    baseline[:, pfi.max_drawdown.value] = np.nan
+
+    report = compare_performance(performance, baseline)
+    assert report.columns == list(precision_report_keys)
+    assert report["metric"].to_list() == list(performance_keys)
+
+    row = report.row(pfi.total_profit_pct.value, named=True)
+    assert row["max_abs_diff"] == 0.5
+    assert row["max_rel_diff"] == 0.5
+    assert row["exceed_count"] == 1
+    assert report["nan_mismatch"][pfi.sharpe_ratio.value] == 1
+    # 两边都是 NaN 视为一致
+    row = report.row(pfi.max_drawdown.value, named=True)
+    assert row["nan_mismatch"] == 0 and row["exceed_count"] == 0
+
+
+def test_run_precision_report():
+    period_list = ["15m"]
+    ohlcv_mtf_np_list = get_mock_ohlcv_list([2000], period_list)
+    params = get_mock_params(
+        8,
+        SignalId.signal_2_id.value,
+        period_list,
+        ohlcv_mtf_np_list=ohlcv_mtf_np_list,
+    )
+
+    report, performance_mixed, performance_64 = run_precision_report(
+        ohlcv_mtf_np_list, params[3], params[4]
+    )
+    assert report["metric"].to_list() == list(performance_keys)
+    assert performance_mixed.dtype == np.float64
+    assert performance_mixed.shape == performance_64.shape
+    assert report["nan_mismatch"].sum() == 0
+
+    # 全 64 位子进程与当前进程 (测试固定为 64 位) 的结果完全相同
+    np.testing.assert_array_equal(performance_64, run_parallel_performance(*params[:5]))
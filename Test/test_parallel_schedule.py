@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel_schedule import (
+    estimate_combo_costs,
+    get_cost_bins,
+    get_parallel_schedule,
+)
+from src.backtest.backtest_enums import bpi
+
+
+def test_get_cost_bins():
+    costs = np.array([1.0, 8.0, 3.0, 3.0, 5.0, 2.0])
+    schedule_order, bin_offsets = get_cost_bins(costs, 3)
+
+    assert len(bin_offsets) == 4
+    assert sorted(schedule_order.tolist()) == list(range(len(costs)))
+
+    loads = [
+        costs[schedule_order[bin_offsets[b] : bin_offsets[b + 1]]].sum()
+        for b in range(3)
+    ]
+    # LPT: 8 | 5 + 2 | 3 + 3 + 1
+    assert sorted(loads) == [7.0, 7.0, 8.0]
+
+    # 桶的数量不超过参数组合数量
+    schedule_order, bin_offsets = get_cost_bins(costs[:2], 8)
+    assert len(bin_offsets) == 3
+
+    schedule_order, bin_offsets = get_cost_bins(costs[:0], 8)
+    assert len(schedule_order) == 0 and bin_offsets.tolist() == [0, 0]
+
+
+def test_estimate_combo_costs():
+    params = get_mock_params(3)
+    ohlcv_mtf, indicator_params_mtf, backtest_params = params[0], params[3], params[4]
+    backtest_params[1, bpi.psar_enable.value] = 1
+    backtest_params[2, bpi.psar_enable.value] = 1
+    backtest_params[2, bpi.atr_tsl_enable.value] = 1
+
+    costs = estimate_combo_costs(ohlcv_mtf, indicator_params_mtf, backtest_params)
+    assert costs[0] < costs[1] < costs[2]
+
+    # ATR 在 prange 之前计算, 只有用到 ATR 的参数组合多出读取 ATR 的成本
+    backtest_params[0, bpi.slippage_atr.value] = 0.1
+    costs_atr = estimate_combo_costs(ohlcv_mtf, indicator_params_mtf, backtest_params)
+    assert costs_atr[0] > costs[0]
+    np.testing.assert_array_equal(costs_atr[1:], costs[1:])
+
+    schedule_order, bin_offsets = get_parallel_schedule(
+        ohlcv_mtf, indicator_params_mtf, backtest_params
+    )
+    assert sorted(schedule_order.tolist()) == [0, 1, 2]
+    assert bin_offsets[-1] == 3
@@ -0,0 +1,170 @@
+import http.client
+import sys
+import threading
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params, get_mock_ohlcv_list
+
+
+import httpx
+import numpy as np
+import pytest
+
+
+from src.parallel import run_parallel_performance
+import src.parallel_shard as parallel_shard
+from src.parallel_shard import (
+    run_parallel_sharded,
+    run_shards,
+    create_shard_server,
+    create_shard_workers,
+    HttpShardWorker,
+    SHARD_TOKEN_HEADER,
+)
+from src.backtest.backtest_enums import performance_keys
+
+
+ohlcv_mtf_np_list = get_mock_ohlcv_list()
+
+
+def get_params(params_count=7):
+    return get_mock_params(
+        params_count,
+        ohlcv_mtf_np_list=ohlcv_mtf_np_list,
+        backtest_values={
+            "psar_enable": np.arange(params_count) % 2,
+            "pct_sl": 0.01 * np.arange(params_count),
+            "pct_sl_enable": 1,
+        },
+    )
+
+
+def test_run_parallel_sharded_local_workers():
+    params = get_params()
+    expected = run_parallel_performance(*params[:5])
+
+    df = run_parallel_sharded(
+        ohlcv_mtf_np_list, params[3], params[4], shard_size=3, workers=2
+    )
+    assert df["params_index"].to_list() == list(range(7))
+    np.testing.assert_array_equal(df.select(performance_keys).to_numpy(), expected)
+
+
+def test_run_shards_http_worker():
+    params = get_params()
+    expected = run_parallel_performance(*params[:5])
+
+    server = create_shard_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        worker = HttpShardWorker(url, ohlcv_mtf_np_list)
+        performance = run_shards([worker], params[3], params[4], shard_size=2)
+        worker.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    np.testing.assert_array_equal(performance, expected)
+
+
+def test_shard_server_token():
+    # 监听非回环地址时必须设置 token
+    with pytest.raises(AssertionError):
+        create_shard_server("0.0.0.0", 0)
+
+    server = create_shard_server("127.0.0.1", 0, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with pytest.raises(httpx.HTTPStatusError):
+            HttpShardWorker(url, ohlcv_mtf_np_list, token="wrong")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_parallel_sharded_reuses_workers():
+    params = get_params()
+    expected = run_parallel_performance(*params[:5])
+
+    server = create_shard_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        shard_workers = [HttpShardWorker(url, ohlcv_mtf_np_list)]
+        # 传入的 worker 由调用方管理, 多次调用之间保持可用
+        for _ in range(2):
+            df = run_parallel_sharded(
+                ohlcv_mtf_np_list,
+                params[3],
+                params[4],
+                shard_size=3,
+                shard_workers=shard_workers,
+            )
+            np.testing.assert_array_equal(
+                df.select(performance_keys).to_numpy(), expected
+            )
+        assert not shard_workers[0].client.is_closed
+        shard_workers[0].close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_create_shard_workers_closes_started_workers(monkeypatch):
+    closed = []
+
+    class DummyWorker:
+        def __init__(self, *args):
+            pass
+
+        def close(self):
+            closed.append(self)
+
+    monkeypatch.setattr(parallel_shard, "LocalShardWorker", DummyWorker)
+    # 端口 1 上没有服务, HttpShardWorker 初始化时抛出异常
+    with pytest.raises(httpx.HTTPError):
+        create_shard_workers(
+            ohlcv_mtf_np_list, workers=2, hosts=["http://127.0.0.1:1"], timeout=5
+        )
+    assert len(closed) == 2
+
+
+def test_shard_server_bad_content_length():
+    server = create_shard_server("127.0.0.1", 0, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(headers):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        try:
+            conn.putrequest("POST", "/run")
+            for k, v in headers.items():
+                conn.putheader(k, v)
+            conn.endheaders()
+            return conn.getresponse().status
+        finally:
+            conn.close()
+
+    try:
+        # 先校验 token, 再解析 Content-Length
+        assert post({}) == 403
+        assert post({SHARD_TOKEN_HEADER: "secret"}) == 400
+        assert post({SHARD_TOKEN_HEADER: "secret", "Content-Length": "abc"}) == 400
+        assert post({SHARD_TOKEN_HEADER: "secret", "Content-Length": "-1"}) == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.utils.mock_data import get_mock_data
+from src.parallel import run_parallel_performance
+from src.parallel_symbols import run_parallel_symbols_table
+from src.runner.data import DataLoader
+from src.backtest.backtest_enums import performance_keys
+
+
+def get_symbol_params(data_count_list, smooth_mode="", ohlcv_mtf_np_list=None):
+    return get_mock_params(
+        4,
+        data_count_list=data_count_list,
+        ohlcv_mtf_np_list=ohlcv_mtf_np_list,
+        smooth_mode=smooth_mode,
+        backtest_values={"psar_enable": [0, 1, 0, 1], "pct_tsl_enable": [0, 0, 1, 1]},
+    )
+
+
+def test_run_parallel_symbols_same_as_single_symbol():
+    symbol_list = ["AAA", "BBB", "CCC"]
+    symbol_params = [
+        get_symbol_params([1000, 250]),
+        get_symbol_params([1600, 400]),
+        get_symbol_params([1200, 300], smooth_mode="ha"),
+    ]
+    indicator_params_mtf, backtest_params = symbol_params[0][3:5]
+
+    df = run_parallel_symbols_table(
+        symbol_list,
+        [p[0] for p in symbol_params],
+        [p[1] for p in symbol_params],
+        [p[2] for p in symbol_params],
+        indicator_params_mtf,
+        backtest_params,
+    )
+    assert df.columns == ["symbol", "params_index", *performance_keys]
+    assert df.height == len(symbol_list) * 4
+
+    for symbol, params in zip(symbol_list, symbol_params):
+        expected = run_parallel_performance(
+            *params[:3], indicator_params_mtf, backtest_params
+        )
+        result = df.filter(df["symbol"] == symbol)
+        assert result["params_index"].to_list() == [0, 1, 2, 3]
+        np.testing.assert_array_equal(
+            result.select(performance_keys).to_numpy(), expected, err_msg=symbol
+        )
+
+
+def test_data_loader_symbols_differ():
+    def load_symbol_data(symbol_list):
+        loader = DataLoader()
+        loader.get_mock_data = get_mock_data
+        loader.symbol_list = symbol_list
+        loader.period_list = ["15m", "1h"]
+        loader.data_count_list = [1000, 250]
+        loader._load_data()
+        return loader.symbol_tohlcv_np_list
+
+    symbol_list = ["AAA", "BBB", "CCC"]
+    symbol_data = load_symbol_data(symbol_list)
+    # 每个品种的数据只由品种名决定, 与顺序无关
+    for data, _data in zip(symbol_data, load_symbol_data(symbol_list[::-1])[::-1]):
+        for ohlcv, _ohlcv in zip(data, _data):
+            np.testing.assert_array_equal(ohlcv, _ohlcv)
+
+    symbol_params = [
+        get_symbol_params([1000, 250], ohlcv_mtf_np_list=data) for data in symbol_data
+    ]
+    indicator_params_mtf, backtest_params = symbol_params[0][3:5]
+    df = run_parallel_symbols_table(
+        symbol_list,
+        [p[0] for p in symbol_params],
+        [p[1] for p in symbol_params],
+        [p[2] for p in symbol_params],
+        indicator_params_mtf,
+        backtest_params,
+    )
+
+    performance = [
+        df.filter(df["symbol"] == symbol).select(performance_keys).to_numpy()
+        for symbol in symbol_list
+    ]
+    for a in range(len(symbol_list)):
+        for b in range(a + 1, len(symbol_list)):
+            assert not np.array_equal(performance[a], performance[b], equal_nan=True)
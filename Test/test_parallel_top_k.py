@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import run_parallel_performance
+from src.parallel_top_k import TopKHeap, run_parallel_top_k
+from src.backtest.backtest_enums import pfi
+
+
+def test_top_k_heap():
+    performance = np.full((6, len(pfi)), np.nan)
+    performance[:, pfi.sharpe_ratio.value] = [1.0, 3.0, np.nan, 2.0, 3.0, 0.5]
+    performance[:, pfi.max_drawdown.value] = [0.3, 0.1, 0.2, 0.4, 0.5, 0.05]
+
+    sharpe = TopKHeap("sharpe_ratio", 3)
+    drawdown = TopKHeap("max_drawdown", 2)
+    # 分两块推入, 结果与一次推入相同
+    for start in (0, 3):
+        sharpe.push_chunk(start, performance[start : start + 3])
+        drawdown.push_chunk(start, performance[start : start + 3])
+
+    assert sharpe.get_index().tolist() == [1, 4, 3]
+    assert drawdown.get_index().tolist() == [5, 1]
+
+
+def test_run_parallel_top_k():
+    params_count = 8
+    params = get_mock_params(
+        params_count,
+        is_only_performance=True,
+        backtest_values={
+            "pct_sl_enable": 1,
+            "pct_sl": np.linspace(0.002, 0.05, params_count),
+        },
+    )
+
+    performance = run_parallel_performance(*params[:5])
+    expected = np.argsort(-performance[:, pfi.sharpe_ratio.value], kind="stable")[:3]
+
+    top_k_index, top_params, top_result, top_k_table = run_parallel_top_k(
+        *params, k=3, metrics=("sharpe_ratio", "total_profit_pct"), chunk_size=3
+    )
+
+    assert top_k_index["sharpe_ratio"].tolist() == expected.tolist()
+    winner_index = top_k_table["params_index"].to_numpy()
+    assert winner_index[:3].tolist() == expected.tolist()
+    assert len(winner_index) == len(set(winner_index)) <= 6
+
+    # 入选参数组合重新运行后有完整的逐K线输出
+    assert top_params[4].shape[0] == len(winner_index)
+    assert len(top_result[2]) == len(winner_index)
+    assert "equity" in top_result[2][0]
+    np.testing.assert_allclose(
+        top_k_table["sharpe_ratio"].to_numpy(),
+        performance[winner_index, pfi.sharpe_ratio.value],
+        rtol=1e-9,
+    )
@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params
+
+
+import numpy as np
+
+
+from src.parallel import (
+    run_parallel_matrix,
+    run_parallel_performance,
+    run_parallel_ranges,
+    run_parallel_range_equity,
+)
+from src.parallel_walk_forward import (
+    run_walk_forward,
+    create_walk_forward_ranges,
+    stitch_walk_forward_equity,
+)
+from src.backtest.backtest_enums import bpi, pfi, performance_keys
+
+
+def get_params(params_count):
+    return get_mock_params(params_count, data_count_list=[2000, 500], param_mode="grid")
+
+
+def test_run_parallel_ranges():
+    params = get_params(6)
+    data_count = len(params[0][0]["close"])
+
+    # 完整区间与 run_parallel_performance 相同
+    ranges = np.array([[0, data_count], [500, 1200]], dtype=np.int64)
+    performance = run_parallel_ranges(*params[:5], ranges)
+    expected = run_parallel_performance(*params[:5])
+    np.testing.assert_allclose(performance[0], expected, rtol=1e-9, equal_nan=True)
+
+    # 区间净值从 init_money 开始, 区间外为 NaN
+    i_params = params[3][[0, 1]]
+    b_params = params[4][[0, 1]]
+    range_performance, equity = run_parallel_range_equity(
+        *params[:3], i_params, b_params, ranges
+    )
+    np.testing.assert_allclose(range_performance, performance[[0, 1], [0, 1]])
+    b_output = run_parallel_matrix(*params[:5], False)[2]
+    np.testing.assert_allclose(equity[0], b_output[0]["equity"])
+    assert np.isnan(equity[1, :500]).all() and np.isnan(equity[1, 1200:]).all()
+    assert equity[1, 500] == b_params[1, bpi.init_money.value]
+
+
+def test_run_walk_forward():
+    params = get_params(8)
+    data_count = len(params[0][0]["close"])
+    window, oos = 600, 300
+
+    windows_table, stitched = run_walk_forward(
+        *params[:5], window=window, oos=oos, metric="sharpe_ratio"
+    )
+    is_ranges, oos_ranges = create_walk_forward_ranges(data_count, window, oos)
+    assert windows_table.height == len(is_ranges) == 5
+    assert oos_ranges[-1, 1] == data_count
+
+    # 样本内按 sharpe 选出的参数组合
+    is_performance = run_parallel_ranges(*params[:5], is_ranges)
+    sharpe = is_performance[:, :, pfi.sharpe_ratio.value]
+    best_index = windows_table["params_index"].to_numpy()
+    np.testing.assert_array_equal(
+        best_index, np.argmax(np.where(np.isnan(sharpe), -np.inf, sharpe), axis=1)
+    )
+
+    # 样本外绩效与单独回测相同
+    oos_performance, equity = run_parallel_range_equity(
+        *params[:3], params[3][best_index], params[4][best_index], oos_ranges
+    )
+    np.testing.assert_allclose(
+        windows_table.select(performance_keys).to_numpy(),
+        oos_performance,
+        equal_nan=True,
+    )
+
+    # 拼接后的净值只覆盖样本外窗口, 每个窗口的收益率不变
+    assert np.isnan(stitched[:window]).all()
+    assert not np.isnan(stitched[window:]).any()
+    for w, (start, stop) in enumerate(oos_ranges):
+        np.testing.assert_allclose(
+            stitched[start:stop] / stitched[start],
+            equity[w, start:stop] / equity[w, start],
+        )
+
+
+def test_range_equity_ignores_prune_rules():
+    params = get_params(2)
+    data_count = len(params[0][0]["close"])
+    ranges = np.array([[0, data_count], [500, 1200]], dtype=np.int64)
+
+    # 样本外回测需要完整净值, 任何回撤都会触发的提前终止规则不生效
+    b_params = params[4].copy()
+    b_params[:, bpi.prune_max_drawdown.value] = 1e-9
+    pruned = run_parallel_ranges(*params[:4], b_params, ranges)
+    assert not np.isnan(pruned[..., pfi.pruned_bar.value]).any()
+
+    expected_performance, expected_equity = run_parallel_range_equity(
+        *params[:5], ranges
+    )
+    performance, equity = run_parallel_range_equity(*params[:4], b_params, ranges)
+    np.testing.assert_array_equal(performance, expected_performance)
+    np.testing.assert_array_equal(equity, expected_equity)
+    assert not np.isnan(equity[1, 500:1200]).any()
+
+
+def test_stitch_walk_forward_equity_keeps_pruned_losses():
+    oos_ranges = np.array([[0, 4], [4, 8]], dtype=np.int64)
+    equity = np.full((2, 8), np.nan)
+    # 第一个窗口在第2根K线之后被提前终止, 之前已经亏损到 80
+    equity[0, :3] = [100.0, 90.0, 80.0]
+    equity[1, 4:] = [100.0, 110.0, 120.0, 110.0]
+
+    stitched = stitch_walk_forward_equity(equity, oos_ranges, 100.0)
+    np.testing.assert_allclose(stitched[:4], [100.0, 90.0, 80.0, 80.0])
+    np.testing.assert_allclose(stitched[4:], [80.0, 88.0, 96.0, 88.0])
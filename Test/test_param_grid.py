@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+root_path = next(
+    (p for p in Path(__file__).resolve().parents if (p / "pyproject.toml").is_file()),
+    None,
+)
+if root_path:
+    sys.path.insert(0, str(root_path))
+
+
+from Test.utils.over_constants import numba_config
+from Test.utils.params_factory import get_mock_params, get_mock_ohlcv_list
+
+
+import itertools
+import numpy as np
+
+
+from src.convert_params.param_grid import (
+    get_spec_values,
+    collect_optim_dims,
+    get_grid_size,
+    create_grid_points,
+    create_sample_points,
+)
+from src.signals.calculate_signal import SignalId, signal_dict
+from src.indicators.indicator_layout import ipi
+
+
+def test_get_spec_values():
+    np.testing.assert_array_equal(
+        get_spec_values([True, 2, 1, 3, 0.5, None]), [1, 1.5, 2, 2.5, 3]
+    )
+    np.testing.assert_array_equal(
+        get_spec_values([True, 14, 5, 12, 3, None]), [5, 8, 11]
+    )
+    np.testing.assert_allclose(
+        get_spec_values([True, 0.02, 0.01, 0.03, 0.01, None]), [0.01, 0.02, 0.03]
+    )
+
+
+def test_create_grid_points_same_as_product():
+    indicator_params = signal_dict[SignalId.signal_3_id.value]["indicator_params"]
+    dims = collect_optim_dims(indicator_params)
+    assert [(m, k) for m, k, _ in dims] == [
+        (0, "bbands_period_0"),
+        (0, "bbands_std_mult_0"),
+        (1, "sma_period_0"),
+        (1, "sma_period_1"),
+    ]
+
+    expected = np.array(
+        list(itertools.product(*[get_spec_values(spec) for _, _, spec in dims]))
+    )
+    assert get_grid_size(dims) == len(expected)
+    np.testing.assert_array_equal(create_grid_points(dims), expected)
+    np.testing.assert_array_equal(create_grid_points(dims, stride=7), expected[::7])
+
+    points = create_grid_points(dims, max_count=1000)
+    assert len(points) <= 1000
+    np.testing.assert_array_equal(points, expected[:: -(-len(expected) // 1000)][:1000])
+
+
+def test_init_params_grid_mode():
+    ohlcv_mtf_np_list = get_mock_ohlcv_list([200, 50])
+    dims = collect_optim_dims(
+        signal_dict[SignalId.signal_3_id.value]["indicator_params"]
+    )
+    expected = create_grid_points(dims, max_count=500)
+
+    for use_params_matrix in (True, False):
+        params = get_mock_params(
+            500,
+            ohlcv_mtf_np_list=ohlcv_mtf_np_list,
+            use_params_matrix=use_params_matrix,
+            param_mode="grid",
+        )
+        indicator_params_mtf, backtest_params = params[3], params[4]
+        assert len(backtest_params) == len(expected)
+
+        if use_params_matrix:
+            for d, (m, key, _) in enumerate(dims):
+                np.testing.assert_array_equal(
+                    indicator_params_mtf[:, m, ipi[key].value], expected[:, d]
+                )
+        else:
+            for i in (0, len(expected) // 2, len(expected) - 1):
+                for d, (m, key, _) in enumerate(dims):
+                    assert indicator_params_mtf[i][m][key] == expected[i, d]
+
+
+def test_create_sample_points():
+    dims = collect_optim_dims(
+        signal_dict[SignalId.signal_3_id.value]["indicator_params"]
+    )
+    values_list = [get_spec_values(spec) for _, _, spec in dims]
+
+    for method in ("sobol", "lhs"):
+        points = create_sample_points(dims, 3000, method, seed=1)
+        assert points.shape == (3000, len(dims))
+        assert len(np.unique(points, axis=0)) == len(points)
+        for d, values in enumerate(values_list):
+            assert np.isin(points[:, d], values).all()
+            # 低差异采样应当覆盖每一维的所有取值
+            assert len(np.unique(points[:, d])) == len(values)
+
+    # 网格不超过采样数量时返回完整网格
+    small_dims = dims[:2]
+    np.testing.assert_array_equal(
+        create_sample_points(small_dims, 10**6), create_grid_points(small_dims)
+    )
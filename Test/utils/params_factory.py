@@ -0,0 +1,50 @@
+from Test.utils.over_constants import numba_config
+
+
+from src.utils.mock_data import get_mock_data
+from src.convert_params.param_initializer import init_params
+from src.signals.calculate_signal import SignalId, signal_dict
+from src.backtest.backtest_enums import bpi
+
+
+def get_mock_ohlcv_list(data_count_list=(1000, 250), period_list=("15m", "1h")):
+    """
+    按周期生成多周期模拟数据, 作为 init_params 的 ohlcv_mtf_np_list。
+    """
+    return [get_mock_data(c, p) for c, p in zip(data_count_list, period_list)]
+
+
+def get_mock_params(
+    params_count,
+    select_id=SignalId.signal_3_id.value,
+    period_list=("15m", "1h"),
+    data_count_list=(1000, 250),
+    ohlcv_mtf_np_list=None,
+    backtest_values=None,
+    **kwargs,
+):
+    """
+    用模拟数据和预设回测参数调用 init_params, 默认 use_params_matrix=True。
+    ohlcv_mtf_np_list 为 None 时按 data_count_list 和 period_list 生成模拟数据。
+    backtest_values: {回测参数名: 标量或每个参数组合的值}, 写入回测参数矩阵的对应列。
+    其余关键字参数 (is_only_performance, smooth_mode, param_mode 等) 原样传给 init_params。
+    """
+    period_list = list(period_list)
+    if ohlcv_mtf_np_list is None:
+        ohlcv_mtf_np_list = get_mock_ohlcv_list(data_count_list, period_list)
+    kwargs.setdefault("use_params_matrix", True)
+
+    params = init_params(
+        params_count,
+        select_id,
+        signal_dict,
+        ohlcv_mtf_np_list=ohlcv_mtf_np_list,
+        period_list=period_list,
+        use_presets_backtest_params=True,
+        **kwargs,
+    )
+    if backtest_values:
+        backtest_params = params[4]
+        for k, v in backtest_values.items():
+            backtest_params[:, bpi[k].value] = v
+    return params
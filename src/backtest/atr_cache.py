@@ -0,0 +1,106 @@
+import numpy as np
+from numba import njit, prange
+from numba.typed import Dict
+
+from src.utils.constants import numba_config
+from src.utils.nb_check_keys import check_ohlcv_mtf
+
+from src.backtest.backtest_enums import bpi
+from src.indicators.atr import calc_atr
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+
+
+"""
+回测使用的 ATR 缓存。
+回测的 ATR 只取决于主周期数据和 atr_period, 在 prange 之前按唯一 atr_period 计算一次,
+各参数组合共享只读的结果。指标缓存中主周期已经有相同周期的 atr 时直接复制, 不再重新计算。
+只算绩效时, 没有开启 ATR 离场且 slippage_atr 为0的参数组合不需要 ATR, 不会进入缓存。
+"""
+
+
+@njit(cache=enable_cache, inline="always")
+def is_backtest_atr_needed(b_params):
+    """
+    ATR 只用于 ATR 止损止盈和基于 ATR 的滑点, 都没有开启时回测不需要 ATR。
+    """
+    return (
+        b_params[bpi.atr_sl_enable.value] > 0
+        or b_params[bpi.atr_tp_enable.value] > 0
+        or b_params[bpi.atr_tsl_enable.value] > 0
+        or b_params[bpi.slippage_atr.value] > 0
+    )
+
+
+@njit(cache=enable_cache)
+def collect_atr_cache_index(backtest_params, need_all):
+    """
+    返回 (atr_index, atr_periods):
+      atr_index: (params_count,), 每个参数组合在 atr_periods 中的编号, 不需要 ATR 为 -1
+      atr_periods: 唯一的 atr_period
+    need_all 为 True 时所有参数组合都需要 ATR (需要输出 atr_sl_arr 等回测数组时)。
+    """
+    params_count = backtest_params.shape[0]
+    atr_index = np.full(params_count, -1, dtype=nb_int)
+    seen = Dict.empty(key_type=nb_int, value_type=nb_int)
+    for i in range(params_count):
+        b_params = backtest_params[i]
+        period = b_params[bpi.atr_period.value]
+        if np.isnan(period):
+            continue
+        if not need_all and not is_backtest_atr_needed(b_params):
+            continue
+        key = nb_int(period)
+        if key not in seen:
+            seen[key] = nb_int(len(seen))
+        atr_index[i] = seen[key]
+
+    atr_periods = np.empty(len(seen), dtype=nb_int)
+    for period, u in seen.items():
+        atr_periods[u] = period
+    return atr_index, atr_periods
+
+
+@njit(parallel=True, cache=enable_cache)
+def calc_atr_cache(ohlcv_mtf, atr_periods, atr_unique_params, atr_indicator_cache):
+    """
+    返回 (len(atr_periods), K线数量) 的 ATR, 数据检查失败时K线数量为0。
+    atr_unique_params 和 atr_indicator_cache 是指标缓存中主周期 atr 的 block,
+    唯一参数的周期与 atr_period 相同时复制指标缓存, 否则用 calc_atr 计算。
+    """
+    data_count = len(ohlcv_mtf[0]["close"]) if check_ohlcv_mtf(ohlcv_mtf) else 0
+    atr_cache = np.empty((len(atr_periods), data_count), dtype=nb_float)
+    if data_count == 0:
+        return atr_cache
+
+    # 每个 atr_period 在指标缓存中的唯一编号, 没有为 -1
+    indicator_index = np.full(len(atr_periods), -1, dtype=nb_int)
+    if atr_indicator_cache.shape[2] == data_count:
+        for k in range(len(atr_periods)):
+            for u in range(len(atr_unique_params)):
+                if nb_int(atr_unique_params[u, 0]) == atr_periods[k]:
+                    indicator_index[k] = u
+                    break
+
+    ohlcv = ohlcv_mtf[0]
+    for k in prange(len(atr_periods)):
+        if indicator_index[k] >= 0:
+            atr_cache[k] = atr_indicator_cache[indicator_index[k], 0]
+        else:
+            atr_cache[k] = calc_atr(
+                ohlcv["high"], ohlcv["low"], ohlcv["close"], atr_periods[k]
+            )
+    return atr_cache
+
+
+@njit(cache=enable_cache, inline="always")
+def get_atr_row(atr_cache, atr_index, i):
+    """
+    第 i 个参数组合的 ATR, 不在缓存中时返回空数组, 由回测自行决定是否计算。
+    """
+    if atr_index[i] < 0 or atr_cache.shape[1] == 0:
+        return np.empty(0, dtype=nb_float)
+    return atr_cache[atr_index[i]]
@@ -57,3 +57,142 @@ def is_no_position(status_int):
         ps.EXIT_LONG.value,
         ps.EXIT_SHORT.value,
     )
+
+
+@njit(cache=enable_cache)
+def is_close_trade(status_int, last_status_int):
+    """
+    当前K线是否平掉了上一根K线的持仓(包括反手), 即完成了一笔交易。
+    """
+    if (
+        status_int == ps.EXIT_LONG.value or status_int == ps.REVERSE_TO_SHORT.value
+    ) and is_long_position(last_status_int):
+        return True
+    if (
+        status_int == ps.EXIT_SHORT.value or status_int == ps.REVERSE_TO_LONG.value
+    ) and is_short_position(last_status_int):
+        return True
+    return False
+
+
+# 回测参数矩阵的列名, 顺序与 get_backtest_params 中的字典键一致
+backtest_param_keys = (
+    "signal_select",
+    "init_money",
+    "close_for_reversal",
+    "pct_sl",
+    "pct_tp",
+    "pct_tsl",
+    "pct_sl_enable",
+    "pct_tp_enable",
+    "pct_tsl_enable",
+    "atr_period",
+    "atr_sl_multiplier",
+    "atr_tp_multiplier",
+    "atr_tsl_multiplier",
+    "atr_sl_enable",
+    "atr_tp_enable",
+    "atr_tsl_enable",
+    "psar_enable",
+    "psar_af0",
+    "psar_af_step",
+    "psar_max_af",
+    "commission_pct",
+    "commission_fixed",
+    "slippage_atr",
+    "slippage_pct",
+    "position_size",
+    "prune_max_drawdown",
+    "prune_min_equity",
+    "prune_min_trades",
+    "prune_min_trades_bar",
+    "annualization_factor",
+)
+
+# 列索引在编译期就是常量, numba中需要用 .value 取值
+BacktestParamIndex = IntEnum(
+    "BacktestParamIndex", [(k, c) for c, k in enumerate(backtest_param_keys)]
+)
+
+bpi = BacktestParamIndex
+
+
+# 绩效结果的列名, 顺序与 calc_performance 写入 p_output 的顺序一致
+performance_keys = (
+    "longest_no_position",
+    "win_rate",
+    "profit_loss_ratio",
+    "sharpe_ratio",
+    "calmar_ratio",
+    "sortino_ratio",
+    "total_profit_pct",
+    "max_balance",
+    "max_drawdown",
+    "pruned_bar",
+)
+
+PerformanceIndex = IntEnum(
+    "PerformanceIndex", [(k, c) for c, k in enumerate(performance_keys)]
+)
+
+pfi = PerformanceIndex
+
+
+# 信号输出 s_output 的字段名, 每个字段是一个布尔数组
+signal_output_keys = ("enter_long", "exit_long", "enter_short", "exit_short")
+
+
+# 回测输出的字段名, 顺序与 calc_backtest 写入 b_output 的顺序一致
+backtest_output_keys = (
+    "position",
+    "entry_price",
+    "exit_price",
+    "equity",
+    "balance",
+    "drawdown",
+    "pct_sl_arr",
+    "pct_tp_arr",
+    "pct_tsl_arr",
+    "atr_sl_arr",
+    "atr_tp_arr",
+    "atr_tsl_arr",
+    "psar_is_long_arr",
+    "psar_current_arr",
+    "psar_ep_arr",
+    "psar_af_arr",
+    "psar_reversal_arr",
+)
+
+# 回测输出缓冲区 (fields, bars) 的行索引
+BacktestOutputIndex = IntEnum(
+    "BacktestOutputIndex", [(k, c) for c, k in enumerate(backtest_output_keys)]
+)
+
+boi = BacktestOutputIndex
+
+
+# 逐K线更新的绩效累加器, 顺序即累加器元组中的位置, 计数也用浮点数保存
+running_performance_keys = (
+    "max_balance",
+    "max_drawdown",
+    "longest_no_position",
+    "current_no_position",
+    "total_trades",
+    "win_trades",
+    "win_sum",
+    "loss_trades",
+    "loss_sum",
+    "return_count",
+    "return_sum",
+    "return_mean",
+    "return_m2",
+    "downside_count",
+    "downside_sum",
+)
+
+RunningPerformanceIndex = IntEnum(
+    "RunningPerformanceIndex",
+    [(k, c) for c, k in enumerate(running_performance_keys)],
+)
+
+rpi = RunningPerformanceIndex
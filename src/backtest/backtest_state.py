@@ -0,0 +1,266 @@
+import numpy as np
+from numba import njit
+from enum import IntEnum
+
+from src.utils.constants import numba_config
+
+from src.backtest.backtest_enums import (
+    PositionStatus as ps,
+    bpi,
+    pfi,
+    rpi,
+    running_performance_keys,
+    signal_output_keys,
+)
+from src.backtest.prune_utils import get_prune_params_tuple, should_prune
+from src.backtest.calculate_backtest_performance import (
+    get_backtest_params_tuple,
+    get_cost_params_tuple,
+    init_exit_state,
+    step_backtest_bar,
+    init_running_performance,
+    update_running_performance,
+    set_running_performance,
+)
+from src.indicators.atr import atr_update
+from src.indicators.indicator_state import pri
+
+
+enable_cache = numba_config["enable_cache"]
+nb_float = numba_config["nb"]["float"]
+
+
+"""
+增量回测状态: 每个参数组合一行标量状态, 追加一根K线只推进一步。
+逐K线的步骤与 calc_backtest_performance_range 共用 step_backtest_bar 和
+update_running_performance, 所以从第0根K线开始逐根追加的绩效与完整回测一致。
+状态矩阵按累加器精度保存, 价格、ATR 和离场状态读出时转换成存储精度, 与完整回测相同。
+"""
+
+
+# 离场状态的字段, 顺序与 update_exit_targets_state 的状态元组一致
+exit_state_keys = (
+    "pct_sl",
+    "pct_tp",
+    "pct_tsl",
+    "atr_sl",
+    "atr_tp",
+    "atr_tsl",
+    "psar_is_long",
+    "psar_current",
+    "psar_ep",
+    "psar_af",
+    "psar_reversal",
+)
+
+# 回测状态矩阵 (params_count, BacktestStateIndex) 的列
+# enter_long 等是留给下一根K线的信号, atr 和 atr_seed 是回测使用的 ATR 的递推状态
+backtest_state_keys = (
+    "position",
+    "entry_price",
+    "balance",
+    "equity",
+    "max_equity",
+    "drawdown",
+    *exit_state_keys,
+    *signal_output_keys,
+    "atr",
+    "atr_seed",
+    "pruned_bar",
+    *running_performance_keys,
+)
+
+BacktestStateIndex = IntEnum(
+    "BacktestStateIndex", [(k, c) for c, k in enumerate(backtest_state_keys)]
+)
+
+bsi = BacktestStateIndex
+
+exit_state_col = bsi.pct_sl.value
+running_performance_col = bsi[running_performance_keys[0]].value
+
+
+def init_backtest_state(params_count):
+    return np.zeros(
+        (params_count, len(backtest_state_keys)), dtype=numba_config["np"]["acc"]
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def load_exit_state(state):
+    c = exit_state_col
+    return (
+        nb_float(state[c]),
+        nb_float(state[c + 1]),
+        nb_float(state[c + 2]),
+        nb_float(state[c + 3]),
+        nb_float(state[c + 4]),
+        nb_float(state[c + 5]),
+        nb_float(state[c + 6]),
+        nb_float(state[c + 7]),
+        nb_float(state[c + 8]),
+        nb_float(state[c + 9]),
+        nb_float(state[c + 10]),
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def load_running_performance(state):
+    c = running_performance_col
+    return (
+        state[c],
+        state[c + 1],
+        state[c + 2],
+        state[c + 3],
+        state[c + 4],
+        state[c + 5],
+        state[c + 6],
+        state[c + 7],
+        state[c + 8],
+        state[c + 9],
+        state[c + 10],
+        state[c + 11],
+        state[c + 12],
+        state[c + 13],
+        state[c + 14],
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def store_signals(state, signals):
+    state[bsi.enter_long.value] = signals[0]
+    state[bsi.exit_long.value] = signals[1]
+    state[bsi.enter_short.value] = signals[2]
+    state[bsi.exit_short.value] = signals[3]
+
+
+@njit(cache=enable_cache)
+def update_backtest_state(state, b_params, signals, bar_index, bar, last_bar):
+    """
+    把一个参数组合的回测状态推进到第 bar_index 根K线。
+    signals 是这根K线的 (enter_long, exit_long, enter_short, exit_short),
+    bar 和 last_bar 是主周期当前和上一根K线 (列索引见 PriceRingIndex)。
+    已经提前终止的参数组合不再更新。
+    """
+    if state[bsi.pruned_bar.value] > 0:
+        return
+
+    state[bsi.atr.value], state[bsi.atr_seed.value] = atr_update(
+        state[bsi.atr.value],
+        state[bsi.atr_seed.value],
+        nb_float(bar[pri.high.value]),
+        nb_float(bar[pri.low.value]),
+        nb_float(last_bar[pri.close.value] if bar_index > 0 else np.nan),
+        bar_index,
+        int(b_params[bpi.atr_period.value]),
+    )
+
+    if bar_index == 0:
+        init_money = b_params[bpi.init_money.value]
+        state[bsi.position.value] = ps.NO_POSITION.value
+        state[bsi.entry_price.value] = np.nan
+        state[bsi.balance.value] = init_money
+        state[bsi.equity.value] = init_money
+        state[bsi.max_equity.value] = init_money
+        state[bsi.drawdown.value] = 0.0
+        for k, v in enumerate(init_exit_state()):
+            state[exit_state_col + k] = v
+        for k, v in enumerate(init_running_performance(init_money, 0.0)):
+            state[running_performance_col + k] = v
+        store_signals(state, signals)
+        return
+
+    position = nb_float(state[bsi.position.value])
+    entry_price = nb_float(state[bsi.entry_price.value])
+    equity = state[bsi.equity.value]
+
+    (
+        new_position,
+        new_entry_price,
+        exit_price,
+        exit_state,
+        next_signals,
+        balance,
+        new_equity,
+        max_equity,
+        drawdown,
+    ) = step_backtest_bar(
+        position,
+        entry_price,
+        load_exit_state(state),
+        (
+            state[bsi.enter_long.value] != 0,
+            state[bsi.exit_long.value] != 0,
+            state[bsi.enter_short.value] != 0,
+            state[bsi.exit_short.value] != 0,
+        ),
+        state[bsi.balance.value],
+        equity,
+        state[bsi.max_equity.value],
+        signals,
+        nb_float(bar[pri.open.value]),
+        nb_float(last_bar[pri.high.value]),
+        nb_float(bar[pri.high.value]),
+        nb_float(last_bar[pri.low.value]),
+        nb_float(bar[pri.low.value]),
+        nb_float(last_bar[pri.close.value]),
+        nb_float(bar[pri.close.value]),
+        nb_float(state[bsi.atr.value]),
+        get_backtest_params_tuple(b_params),
+        get_cost_params_tuple(b_params),
+    )
+
+    acc = update_running_performance(
+        load_running_performance(state),
+        new_position,
+        position,
+        exit_price,
+        entry_price,
+        balance,
+        new_equity,
+        equity,
+        drawdown,
+    )
+
+    state[bsi.position.value] = new_position
+    state[bsi.entry_price.value] = new_entry_price
+    state[bsi.balance.value] = balance
+    state[bsi.equity.value] = new_equity
+    state[bsi.max_equity.value] = max_equity
+    state[bsi.drawdown.value] = drawdown
+    for k, v in enumerate(exit_state):
+        state[exit_state_col + k] = v
+    for k, v in enumerate(acc):
+        state[running_performance_col + k] = v
+    store_signals(state, next_signals)
+
+    if should_prune(
+        bar_index,
+        drawdown,
+        new_equity,
+        acc[rpi.total_trades.value],
+        get_prune_params_tuple(b_params),
+    ):
+        state[bsi.pruned_bar.value] = bar_index
+
+
+@njit(cache=enable_cache)
+def set_backtest_state_performance(state, b_params, bar_count, p_row):
+    """
+    把已追加 bar_count 根K线的回测状态汇总成绩效, 写入 p_row (列索引见 PerformanceIndex)。
+    没有K线时保持 NaN, 提前终止的参数组合与 calc_backtest_performance 一样写入哨兵绩效。
+    """
+    p_row[:] = np.nan
+    if bar_count == 0:
+        return
+    if state[bsi.pruned_bar.value] > 0:
+        p_row[pfi.pruned_bar.value] = state[bsi.pruned_bar.value]
+        return
+    set_running_performance(
+        p_row,
+        load_running_performance(state),
+        bar_count,
+        b_params[bpi.init_money.value],
+        state[bsi.equity.value],
+        b_params[bpi.annualization_factor.value],
+    )
@@ -5,79 +5,90 @@ from numba.core import types
 from numba.typed import List, Dict
 
 from src.utils.constants import numba_config
-from src.utils.nb_check_keys import check_data_for_backtest
+from src.utils.nb_check_keys import check_data_for_backtest, check_ohlcv_mtf
 
 from src.backtest.calculate_trade_logic import calc_trade_logic
-from src.backtest.calculate_balance import calc_balance
+from src.backtest.calculate_balance import calc_balance_state
+from src.backtest.backtest_enums import (
+    bpi,
+    boi,
+    backtest_output_keys,
+    signal_output_keys,
+    is_close_trade,
+)
+from src.backtest.prune_utils import get_prune_params_tuple, should_prune
 from backtest.calculate_exit_logic import calc_exit_logic
 
 from src.indicators.atr import calc_atr
 
-from src.parallel_signature import backtest_signature
+from src.parallel_signature import backtest_signature, backtest_arena_signature
 
 
 enable_cache = numba_config["enable_cache"]
 nb_float = numba_config["nb"]["float"]
+nb_int = numba_config["nb"]["int"]
 nb_bool = numba_config["nb"]["bool"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(cache=enable_cache)
 def get_s_output_need_keys():
     _l = List.empty_list(types.unicode_type)
-    for i in ("enter_long", "exit_long", "enter_short", "exit_short"):
+    for i in signal_output_keys:
         _l.append(i)
     return _l
 
 
 @njit(cache=enable_cache)
-def get_b_params_need_keys():
-    _l = List.empty_list(types.unicode_type)
-    for i in (
-        "init_money",
-        "close_for_reversal",
-        "pct_sl",
-        "pct_tp",
-        "pct_tsl",
-        "pct_sl_enable",
-        "pct_tp_enable",
-        "pct_tsl_enable",
-        "atr_period",
-        "atr_sl_multiplier",
-        "atr_tp_multiplier",
-        "atr_tsl_multiplier",
-        "atr_sl_enable",
-        "atr_tp_enable",
-        "atr_tsl_enable",
-        "psar_enable",
-        "psar_af0",
-        "psar_af_step",
-        "psar_max_af",
-        "commission_pct",
-        "commission_fixed",
-        "slippage_atr",
-        "slippage_pct",
-        "position_size",
-    ):
-        _l.append(i)
-    return _l
+def get_b_params_need_cols():
+    return (
+        bpi.init_money.value,
+        bpi.close_for_reversal.value,
+        bpi.pct_sl.value,
+        bpi.pct_tp.value,
+        bpi.pct_tsl.value,
+        bpi.pct_sl_enable.value,
+        bpi.pct_tp_enable.value,
+        bpi.pct_tsl_enable.value,
+        bpi.atr_period.value,
+        bpi.atr_sl_multiplier.value,
+        bpi.atr_tp_multiplier.value,
+        bpi.atr_tsl_multiplier.value,
+        bpi.atr_sl_enable.value,
+        bpi.atr_tp_enable.value,
+        bpi.atr_tsl_enable.value,
+        bpi.psar_enable.value,
+        bpi.psar_af0.value,
+        bpi.psar_af_step.value,
+        bpi.psar_max_af.value,
+        bpi.commission_pct.value,
+        bpi.commission_fixed.value,
+        bpi.slippage_atr.value,
+        bpi.slippage_pct.value,
+        bpi.position_size.value,
+    )
 
 
-@njit(backtest_signature, cache=enable_cache)
-def calc_backtest(ohlcv_mtf, b_params, s_output, b_output):
+@njit(backtest_arena_signature, cache=enable_cache)
+def calc_backtest_arena(ohlcv_mtf, b_params, s_output, b_arena, atr_arr):
     """
     backtest_output["position"] 代表仓位状态,0无仓位,1开多,2持多,3平多,4平空开多,-1开空,-2持空,-3平空,-4平多开空
     Bar-by-Bar模式,在触发信号的下一根k线的开盘价离场,为了简化不考虑k线内部实时离场的功能
     比如无论索引last_i是触发止盈,还是触发止损,还是同时触发止盈止损,都会在索引i的open价格离场,没有区别,这样设计是为了简化回测
     可以多头,可以空头,但是每次只持一仓
+    所有输出写入预先分配的 b_arena: (BacktestOutputIndex, bars), 不再逐个分配数组。
+    满足 prune_* 参数的提前终止规则时停止回测, 之后的K线保持无仓位和 NaN。
+    atr_arr 是共享的 ATR 缓存 (见 atr_cache), 长度不等于K线数量时按 atr_period 自行计算。
+    返回状态: -1 数据或参数检查失败, 0 完整回测, 大于0 为提前终止的K线索引。
     """
     if not check_data_for_backtest(
         ohlcv_mtf,
         get_s_output_need_keys(),
-        get_b_params_need_keys(),
+        get_b_params_need_cols(),
         s_output,
         b_params,
     ):
-        return
+        return nb_int(-1)
 
     ohlcv_a = ohlcv_mtf[0]
 
@@ -90,72 +101,86 @@ def calc_backtest(ohlcv_mtf, b_params, s_output, b_output):
 
     data_count = len(close_arr)
 
+    assert (
+        b_arena.shape[0] == len(backtest_output_keys) and b_arena.shape[1] == data_count
+    ), "回测输出缓冲区的形状需要为 (BacktestOutputIndex, bars)"
+
     enter_long_signal = s_output["enter_long"]
     exit_long_signal = s_output["exit_long"]
     enter_short_signal = s_output["enter_short"]
     exit_short_signal = s_output["exit_short"]
 
-    # 3. 初始化回测结果数组
-    position = np.full(data_count, 0, dtype=nb_float)
-    entry_price = np.full(data_count, np.nan, dtype=nb_float)
-    exit_price = np.full(data_count, np.nan, dtype=nb_float)
-    equity = np.full(data_count, np.nan, dtype=nb_float)
-    balance = np.full(data_count, np.nan, dtype=nb_float)
-    drawdown = np.full(data_count, np.nan, dtype=nb_float)
+    # 3. 初始化回测结果数组, 都是 b_arena 的行视图
+    b_arena[:] = np.nan
+    b_arena[boi.position.value] = 0
+    b_arena[boi.psar_is_long_arr.value] = 0.0
+
+    position = b_arena[boi.position.value]
+    entry_price = b_arena[boi.entry_price.value]
+    exit_price = b_arena[boi.exit_price.value]
+    equity = b_arena[boi.equity.value]
+    balance = b_arena[boi.balance.value]
+    drawdown = b_arena[boi.drawdown.value]
 
     # 4. 初始化临时变量和止损参数
-    init_money = b_params["init_money"]
-    max_balance = np.full(data_count, np.nan, dtype=nb_float)
+    init_money = b_params[bpi.init_money.value]
 
     # 计算 ATR 数组
-    atr_arr = calc_atr(high_arr, low_arr, close_arr, b_params["atr_period"])
-
-    # 临时数组用于存储止损价格和 PSAR 状态
-    pct_sl_arr = np.full(data_count, np.nan, dtype=nb_float)
-    pct_tp_arr = np.full(data_count, np.nan, dtype=nb_float)
-    pct_tsl_arr = np.full(data_count, np.nan, dtype=nb_float)
-    atr_sl_arr = np.full(data_count, np.nan, dtype=nb_float)
-    atr_tp_arr = np.full(data_count, np.nan, dtype=nb_float)
-    atr_tsl_arr = np.full(data_count, np.nan, dtype=nb_float)
-    psar_is_long_arr = np.full(data_count, 0.0, dtype=nb_float)
-    psar_current_arr = np.full(data_count, np.nan, dtype=nb_float)
-    psar_ep_arr = np.full(data_count, np.nan, dtype=nb_float)
-    psar_af_arr = np.full(data_count, np.nan, dtype=nb_float)
-    psar_reversal_arr = np.full(data_count, np.nan, dtype=nb_float)
+    if len(atr_arr) != data_count:
+        atr_arr = calc_atr(high_arr, low_arr, close_arr, b_params[bpi.atr_period.value])
+
+    # 存储止损价格和 PSAR 状态
+    pct_sl_arr = b_arena[boi.pct_sl_arr.value]
+    pct_tp_arr = b_arena[boi.pct_tp_arr.value]
+    pct_tsl_arr = b_arena[boi.pct_tsl_arr.value]
+    atr_sl_arr = b_arena[boi.atr_sl_arr.value]
+    atr_tp_arr = b_arena[boi.atr_tp_arr.value]
+    atr_tsl_arr = b_arena[boi.atr_tsl_arr.value]
+    psar_is_long_arr = b_arena[boi.psar_is_long_arr.value]
+    psar_current_arr = b_arena[boi.psar_current_arr.value]
+    psar_ep_arr = b_arena[boi.psar_ep_arr.value]
+    psar_af_arr = b_arena[boi.psar_af_arr.value]
+    psar_reversal_arr = b_arena[boi.psar_reversal_arr.value]
 
     # 初始化第一天数据
     balance[0] = init_money
     equity[0] = init_money
-    max_balance[0] = init_money
     drawdown[0] = 0.0
+    # 资金、净值和最大净值按累加器精度用标量递推, 数组只保存每根K线的结果
+    last_balance = nb_acc(init_money)
+    last_equity = nb_acc(init_money)
+    max_equity = nb_acc(init_money)
 
     # numba传参有奇怪的优化问题,这里必须打包成元组,提高性能
     backtest_params_tuple = (
-        b_params["close_for_reversal"],  # 用close触发止损,还是high和low
-        b_params["pct_sl_enable"],  # 是否开启百分比止损
-        b_params["pct_tp_enable"],  # 是否开启百分比止盈
-        b_params["pct_tsl_enable"],  # 是否开启百分比跟踪止损
-        b_params["pct_sl"],  # 百分比止损倍率，例如0.02代表2%
-        b_params["pct_tp"],  # 百分比止盈倍率，例如0.05代表5%
-        b_params["pct_tsl"],  # 百分比跟踪止损倍率
-        b_params["atr_sl_enable"],  # 是否开启ATR止损
-        b_params["atr_tp_enable"],  # 是否开启ATR止盈
-        b_params["atr_tsl_enable"],  # 是否开启ATR跟踪止损
-        b_params["atr_sl_multiplier"],  # ATR止损倍数，例如3代表3倍ATR
-        b_params["atr_tp_multiplier"],  # ATR止盈倍数
-        b_params["atr_tsl_multiplier"],  # ATR跟踪止损倍数
-        b_params["psar_enable"],  # 是否开启PSAR止损
-        b_params["psar_af0"],  # PSAR的加速因子初始值
-        b_params["psar_af_step"],  # PSAR的加速因子步长
-        b_params["psar_max_af"],  # PSAR的最大加速因子
+        b_params[bpi.close_for_reversal.value],  # 用close触发止损,还是high和low
+        b_params[bpi.pct_sl_enable.value],  # 是否开启百分比止损
+        b_params[bpi.pct_tp_enable.value],  # 是否开启百分比止盈
+        b_params[bpi.pct_tsl_enable.value],  # 是否开启百分比跟踪止损
+        b_params[bpi.pct_sl.value],  # 百分比止损倍率，例如0.02代表2%
+        b_params[bpi.pct_tp.value],  # 百分比止盈倍率，例如0.05代表5%
+        b_params[bpi.pct_tsl.value],  # 百分比跟踪止损倍率
+        b_params[bpi.atr_sl_enable.value],  # 是否开启ATR止损
+        b_params[bpi.atr_tp_enable.value],  # 是否开启ATR止盈
+        b_params[bpi.atr_tsl_enable.value],  # 是否开启ATR跟踪止损
+        b_params[bpi.atr_sl_multiplier.value],  # ATR止损倍数，例如3代表3倍ATR
+        b_params[bpi.atr_tp_multiplier.value],  # ATR止盈倍数
+        b_params[bpi.atr_tsl_multiplier.value],  # ATR跟踪止损倍数
+        b_params[bpi.psar_enable.value],  # 是否开启PSAR止损
+        b_params[bpi.psar_af0.value],  # PSAR的加速因子初始值
+        b_params[bpi.psar_af_step.value],  # PSAR的加速因子步长
+        b_params[bpi.psar_max_af.value],  # PSAR的最大加速因子
     )
 
-    commission_pct = b_params["commission_pct"]  # 基于百分比的手续费
-    commission_fixed = b_params["commission_fixed"]  # 固定金额的手续费
-    slippage_atr = b_params["slippage_atr"]  # 基于ATR的滑点倍数，用于计算滑点
-    slippage_pct = b_params["slippage_pct"]  # 基于百分比的滑点，用于计算滑点
+    commission_pct = b_params[bpi.commission_pct.value]  # 基于百分比的手续费
+    commission_fixed = b_params[bpi.commission_fixed.value]  # 固定金额的手续费
+    slippage_atr = b_params[bpi.slippage_atr.value]  # 基于ATR的滑点倍数，用于计算滑点
+    slippage_pct = b_params[bpi.slippage_pct.value]  # 基于百分比的滑点，用于计算滑点
     # 仓位大小：如果为0-1之间的小数，表示资金百分比；如果为大于等于1的整数(类型依然是小数)，则表示杠杆倍数
-    position_size = b_params["position_size"]
+    position_size = b_params[bpi.position_size.value]
+
+    prune_params_tuple = get_prune_params_tuple(b_params)
+    trade_count = 0
 
     # 5. 主循环
     for i in range(1, data_count):
@@ -210,43 +235,59 @@ def calc_backtest(ohlcv_mtf, b_params, s_output, b_output):
         )
 
         # 资金、净值、回撤计算
-        calc_balance(
-            i,
-            last_i,
-            open_arr,
-            close_arr,
-            position,
-            entry_price,
-            exit_price,
-            equity,
-            balance,
-            drawdown,
-            max_balance,
-            atr_arr,
+        last_balance, last_equity, max_equity, drawdown[i] = calc_balance_state(
+            position[i],
+            position[last_i],
+            entry_price[i],
+            entry_price[last_i],
+            exit_price[i],
+            close_arr[i],
+            last_balance,
+            last_equity,
+            max_equity,
+            atr_arr[i],
             commission_pct,
             commission_fixed,
             slippage_atr,
             slippage_pct,
             position_size,
         )
+        balance[i] = last_balance
+        equity[i] = last_equity
+
+        if is_close_trade(position[i], position[last_i]):
+            trade_count += 1
+        if should_prune(i, drawdown[i], last_equity, trade_count, prune_params_tuple):
+            return nb_int(i)
+
+    return nb_int(0)
+
+
+@njit(cache=enable_cache)
+def set_backtest_output_views(b_arena, b_output):
+    """
+    把回测输出缓冲区的每一行作为视图放入 b_output, 键名见 backtest_output_keys。
+    """
+    for c in range(len(backtest_output_keys)):
+        b_output[backtest_output_keys[c]] = b_arena[c]
 
-    # 将结果保存到 backtest_output 字典
-    b_output["position"] = position
-    b_output["entry_price"] = entry_price
-    b_output["exit_price"] = exit_price
-    b_output["equity"] = equity
-    b_output["balance"] = balance
-    b_output["drawdown"] = drawdown
-
-    # 将新的止损止盈和PSAR数组保存到 backtest_output
-    b_output["pct_sl_arr"] = pct_sl_arr
-    b_output["pct_tp_arr"] = pct_tp_arr
-    b_output["pct_tsl_arr"] = pct_tsl_arr
-    b_output["atr_sl_arr"] = atr_sl_arr
-    b_output["atr_tp_arr"] = atr_tp_arr
-    b_output["atr_tsl_arr"] = atr_tsl_arr
-    b_output["psar_is_long_arr"] = psar_is_long_arr
-    b_output["psar_current_arr"] = psar_current_arr
-    b_output["psar_ep_arr"] = psar_ep_arr
-    b_output["psar_af_arr"] = psar_af_arr
-    b_output["psar_reversal_arr"] = psar_reversal_arr
+
+@njit(backtest_signature, cache=enable_cache)
+def calc_backtest(ohlcv_mtf, b_params, s_output, b_output):
+    """
+    字典输出版本: 每个参数组合只分配一块 (BacktestOutputIndex, bars) 的缓冲区,
+    b_output 中的数组都是这块缓冲区的行视图。
+    返回状态与 calc_backtest_arena 相同。
+    """
+    if not check_ohlcv_mtf(ohlcv_mtf):
+        return nb_int(-1)
+
+    b_arena = np.empty(
+        (len(backtest_output_keys), len(ohlcv_mtf[0]["close"])), dtype=nb_float
+    )
+    status = calc_backtest_arena(
+        ohlcv_mtf, b_params, s_output, b_arena, np.empty(0, dtype=nb_float)
+    )
+    if status >= 0:
+        set_backtest_output_views(b_arena, b_output)
+    return status
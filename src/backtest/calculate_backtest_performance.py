@@ -0,0 +1,600 @@
+import numpy as np
+from numba import njit
+
+from src.utils.constants import numba_config
+from src.utils.nb_check_keys import (
+    check_data_for_backtest,
+    check_cols,
+    check_ohlcv_mtf,
+)
+
+from src.backtest.calculate_trade_logic import calc_trade_logic_state
+from src.backtest.calculate_balance import calc_balance_state
+from src.backtest.update_exit_targets_utils import update_exit_targets_state
+from src.backtest.should_trigger_exit_utils import should_trigger_exit
+from src.backtest.prune_utils import get_prune_params_tuple, should_prune
+from src.backtest.calculate_backtest import (
+    get_s_output_need_keys,
+    get_b_params_need_cols,
+)
+from src.backtest.backtest_enums import (
+    PositionStatus as ps,
+    bpi,
+    pfi,
+    is_long_position,
+    is_short_position,
+    is_no_position,
+    rpi,
+)
+
+from src.indicators.atr import calc_atr
+from src.backtest.atr_cache import is_backtest_atr_needed
+
+from src.parallel_signature import (
+    backtest_performance_signature,
+    backtest_performance_range_signature,
+)
+
+
+enable_cache = numba_config["enable_cache"]
+nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
+
+
+@njit(cache=enable_cache, inline="always")
+def get_backtest_params_tuple(b_params):
+    """
+    离场逻辑使用的参数元组, 顺序与 update_exit_targets_state 一致。
+    """
+    return (
+        b_params[bpi.close_for_reversal.value],
+        b_params[bpi.pct_sl_enable.value],
+        b_params[bpi.pct_tp_enable.value],
+        b_params[bpi.pct_tsl_enable.value],
+        b_params[bpi.pct_sl.value],
+        b_params[bpi.pct_tp.value],
+        b_params[bpi.pct_tsl.value],
+        b_params[bpi.atr_sl_enable.value],
+        b_params[bpi.atr_tp_enable.value],
+        b_params[bpi.atr_tsl_enable.value],
+        b_params[bpi.atr_sl_multiplier.value],
+        b_params[bpi.atr_tp_multiplier.value],
+        b_params[bpi.atr_tsl_multiplier.value],
+        b_params[bpi.psar_enable.value],
+        b_params[bpi.psar_af0.value],
+        b_params[bpi.psar_af_step.value],
+        b_params[bpi.psar_max_af.value],
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def get_cost_params_tuple(b_params):
+    """
+    (commission_pct, commission_fixed, slippage_atr, slippage_pct, position_size)
+    """
+    return (
+        b_params[bpi.commission_pct.value],
+        b_params[bpi.commission_fixed.value],
+        b_params[bpi.slippage_atr.value],
+        b_params[bpi.slippage_pct.value],
+        b_params[bpi.position_size.value],
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def init_exit_state():
+    """
+    第0根K线的离场状态, 字段见 update_exit_targets_state。
+    """
+    return (
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(0.0),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+        nb_float(np.nan),
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def step_backtest_bar(
+    position,
+    entry_price,
+    exit_state,
+    last_signals,
+    balance,
+    equity,
+    max_equity,
+    signals,
+    open_i,
+    high_last,
+    high_i,
+    low_last,
+    low_i,
+    close_last,
+    close_i,
+    atr_i,
+    backtest_params_tuple,
+    cost_params_tuple,
+):
+    """
+    回测一根K线: 按上一根K线留下的信号开平仓, 更新离场目标, 再结算资金。
+    last_signals 和 signals 都是 (enter_long, exit_long, enter_short, exit_short),
+    signals 是当前K线的原始信号, 叠加离场触发后作为 next_signals 留给下一根K线。
+    返回 (position, entry_price, exit_price, exit_state, next_signals,
+          balance, equity, max_equity, drawdown)
+    """
+    last_position = position
+    last_entry_price = entry_price
+    last_enter_long, last_exit_long, last_enter_short, last_exit_short = last_signals
+
+    position, entry_price, exit_price = calc_trade_logic_state(
+        last_position,
+        last_entry_price,
+        last_enter_long,
+        last_exit_long,
+        last_enter_short,
+        last_exit_short,
+        open_i,
+    )
+
+    exit_check_price, exit_state = update_exit_targets_state(
+        position,
+        exit_state,
+        open_i,
+        backtest_params_tuple,
+        high_last,
+        high_i,
+        low_last,
+        low_i,
+        close_i,
+        close_last,
+        atr_i,
+    )
+
+    # 离场信号只作用于下一根K线, 用标量保存, 不修改信号数组
+    enter_long, exit_long, enter_short, exit_short = signals
+    if is_long_position(position) and should_trigger_exit(
+        True,
+        exit_check_price,
+        exit_state[10],
+        backtest_params_tuple,
+        exit_state[0],
+        exit_state[1],
+        exit_state[2],
+        exit_state[3],
+        exit_state[4],
+        exit_state[5],
+    ):
+        exit_long = True
+        enter_long = False
+        exit_short = False
+    elif is_short_position(position) and should_trigger_exit(
+        False,
+        exit_check_price,
+        exit_state[10],
+        backtest_params_tuple,
+        exit_state[0],
+        exit_state[1],
+        exit_state[2],
+        exit_state[3],
+        exit_state[4],
+        exit_state[5],
+    ):
+        exit_short = True
+        enter_short = False
+        exit_long = False
+
+    commission_pct, commission_fixed, slippage_atr, slippage_pct, position_size = (
+        cost_params_tuple
+    )
+    balance, equity, max_equity, drawdown = calc_balance_state(
+        position,
+        last_position,
+        entry_price,
+        last_entry_price,
+        exit_price,
+        close_i,
+        balance,
+        equity,
+        max_equity,
+        atr_i,
+        commission_pct,
+        commission_fixed,
+        slippage_atr,
+        slippage_pct,
+        position_size,
+    )
+
+    return (
+        position,
+        entry_price,
+        exit_price,
+        exit_state,
+        (enter_long, exit_long, enter_short, exit_short),
+        balance,
+        equity,
+        max_equity,
+        drawdown,
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def init_running_performance(balance, drawdown):
+    """
+    第0根K线的绩效累加器, 字段见 running_performance_keys, 都按累加器精度保存。
+    """
+    return (
+        nb_acc(balance),
+        nb_acc(drawdown),
+        nb_acc(0.0),
+        nb_acc(1.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+        nb_acc(0.0),
+    )
+
+
+@njit(cache=enable_cache, inline="always")
+def update_running_performance(
+    acc,
+    position,
+    last_position,
+    exit_price,
+    last_entry_price,
+    balance,
+    equity,
+    last_equity,
+    drawdown,
+):
+    """
+    用一根K线的回测结果更新绩效累加器, 返回新的累加器。
+    收益率标准差用 Welford 单遍算法。
+    """
+    (
+        max_balance,
+        max_drawdown,
+        longest_no_pos,
+        current_no_pos,
+        total_trades,
+        win_trades,
+        win_sum,
+        loss_trades,
+        loss_sum,
+        return_count,
+        return_sum,
+        return_mean,
+        return_m2,
+        downside_count,
+        downside_sum,
+    ) = acc
+
+    if (
+        position == ps.EXIT_LONG.value or position == ps.REVERSE_TO_SHORT.value
+    ) and is_long_position(last_position):
+        profit_pct = (exit_price - last_entry_price) / last_entry_price
+        total_trades += 1
+    elif (
+        position == ps.EXIT_SHORT.value or position == ps.REVERSE_TO_LONG.value
+    ) and is_short_position(last_position):
+        profit_pct = (last_entry_price - exit_price) / last_entry_price
+        total_trades += 1
+    else:
+        profit_pct = 0.0
+    if profit_pct > 0:
+        win_trades += 1
+        win_sum += profit_pct
+    elif profit_pct < 0:
+        loss_trades += 1
+        loss_sum += profit_pct
+
+    if is_no_position(position):
+        current_no_pos += 1
+    else:
+        if current_no_pos > longest_no_pos:
+            longest_no_pos = current_no_pos
+        current_no_pos = 0
+
+    bar_return = (equity - last_equity) / last_equity
+    return_count += 1
+    return_sum += bar_return
+    delta = bar_return - return_mean
+    return_mean += delta / return_count
+    return_m2 += delta * (bar_return - return_mean)
+    if bar_return < 0.0:
+        downside_count += 1
+        downside_sum += bar_return**2
+
+    if balance > max_balance:
+        max_balance = balance
+    # 与 np.max 一致, 出现 NaN 后结果保持为 NaN
+    if not np.isnan(max_drawdown) and (np.isnan(drawdown) or drawdown > max_drawdown):
+        max_drawdown = drawdown
+
+    return (
+        max_balance,
+        max_drawdown,
+        longest_no_pos,
+        current_no_pos,
+        total_trades,
+        win_trades,
+        win_sum,
+        loss_trades,
+        loss_sum,
+        return_count,
+        return_sum,
+        return_mean,
+        return_m2,
+        downside_count,
+        downside_sum,
+    )
+
+
+@njit(cache=enable_cache)
+def set_running_performance(
+    p_row, acc, bar_count, init_money, equity, annualization_factor
+):
+    """
+    把绩效累加器汇总成绩效, 写入 p_row (列索引见 PerformanceIndex)。
+    bar_count 是参与回测的K线数量。
+    """
+    (
+        max_balance,
+        max_drawdown,
+        longest_no_pos,
+        current_no_pos,
+        total_trades,
+        win_trades,
+        win_sum,
+        loss_trades,
+        loss_sum,
+        return_count,
+        return_sum,
+        return_mean,
+        return_m2,
+        downside_count,
+        downside_sum,
+    ) = acc
+
+    if current_no_pos > longest_no_pos:
+        longest_no_pos = current_no_pos
+
+    win_rate = win_trades / total_trades if total_trades > 0 else 0.0
+
+    if win_trades > 0 and loss_trades > 0:
+        profit_loss_ratio = (win_sum / win_trades) / abs(loss_sum / loss_trades)
+    else:
+        profit_loss_ratio = 0.0
+
+    sharpe_ratio = 0.0
+    calmar_ratio = 0.0
+    sortino_ratio = 0.0
+    if bar_count >= 2 and annualization_factor > 0:
+        mean_return = return_sum / return_count
+        std_return = np.sqrt(return_m2 / return_count)
+        if std_return > 0:
+            sharpe_ratio = (mean_return * annualization_factor) / (
+                std_return * np.sqrt(annualization_factor)
+            )
+
+        if init_money != 0:
+            total_years = bar_count / annualization_factor
+            annual_return = (equity / init_money) ** (1 / total_years) - 1
+            if max_drawdown > 0:
+                calmar_ratio = annual_return / max_drawdown
+            else:
+                calmar_ratio = np.inf
+
+        if downside_count > 0:
+            downside_deviation = np.sqrt(downside_sum / downside_count)
+        else:
+            downside_deviation = 0.0
+        if downside_deviation > 0:
+            sortino_ratio = (mean_return * annualization_factor) / (
+                downside_deviation * np.sqrt(annualization_factor)
+            )
+        else:
+            sortino_ratio = np.inf if mean_return > 0 else 0.0
+
+    p_row[pfi.longest_no_position.value] = longest_no_pos
+    p_row[pfi.win_rate.value] = win_rate
+    p_row[pfi.profit_loss_ratio.value] = profit_loss_ratio
+    p_row[pfi.sharpe_ratio.value] = sharpe_ratio
+    p_row[pfi.calmar_ratio.value] = calmar_ratio
+    p_row[pfi.sortino_ratio.value] = sortino_ratio
+    p_row[pfi.total_profit_pct.value] = (equity / init_money) - 1.0
+    p_row[pfi.max_balance.value] = max_balance
+    p_row[pfi.max_drawdown.value] = max_drawdown
+    p_row[pfi.pruned_bar.value] = 0.0
+
+
+@njit(backtest_performance_range_signature, cache=enable_cache)
+def calc_backtest_performance_range(
+    ohlcv_mtf, b_params, s_output, p_row, bar_start, bar_stop, equity_out, atr_arr
+):
+    """
+    只计算绩效的融合回测, 用于参数优化。
+    逻辑与 calc_backtest + calc_performance 一致, 但逐K线只保留标量状态,
+    不分配任何逐K线的回测数组, 绩效直接写入 p_row (列索引见 PerformanceIndex)。
+    收益率标准差用 Welford 单遍算法, 与 np.std 只有浮点误差级别的差异。
+    不会修改 s_output 中的信号数组。
+    满足 prune_* 参数的提前终止规则时立即返回哨兵绩效 (NaN, pruned_bar 为终止的K线索引)。
+    只回测 [bar_start, bar_stop) 区间, 区间起点空仓, 资金为 init_money,
+    K线索引 (prune_min_trades_bar, pruned_bar) 都相对于 bar_start。
+    指标和信号都是因果的, 可以在完整序列上计算一次, 再按区间回测, 用于 walk-forward。
+    equity_out 长度不为0时, 把区间内的逐K线净值写入 equity_out[bar_start:bar_stop]。
+    逐K线的步骤 (step_backtest_bar, update_running_performance) 与增量回测共用。
+    atr_arr 是共享的 ATR 缓存 (见 atr_cache), 长度为0时需要 ATR 才按 atr_period 自行计算,
+    没有开启 ATR 离场且 slippage_atr 为0时 ATR 不影响绩效, 直接跳过。
+    """
+    if not check_data_for_backtest(
+        ohlcv_mtf,
+        get_s_output_need_keys(),
+        get_b_params_need_cols(),
+        s_output,
+        b_params,
+    ):
+        return
+
+    if not check_cols((bpi.annualization_factor.value,), b_params):
+        return
+
+    ohlcv_a = ohlcv_mtf[0]
+    open_arr = ohlcv_a["open"]
+    high_arr = ohlcv_a["high"]
+    low_arr = ohlcv_a["low"]
+    close_arr = ohlcv_a["close"]
+
+    data_count = len(close_arr)
+    assert 0 <= bar_start and bar_start < bar_stop and bar_stop <= data_count, (
+        "回测区间需要在数据范围内且不为空"
+    )
+    bar_count = bar_stop - bar_start
+    save_equity = len(equity_out) > 0
+
+    enter_long_signal = s_output["enter_long"]
+    exit_long_signal = s_output["exit_long"]
+    enter_short_signal = s_output["enter_short"]
+    exit_short_signal = s_output["exit_short"]
+
+    init_money = b_params[bpi.init_money.value]
+    annualization_factor = b_params[bpi.annualization_factor.value]
+
+    if len(atr_arr) != data_count:
+        if is_backtest_atr_needed(b_params):
+            atr_arr = calc_atr(
+                high_arr, low_arr, close_arr, b_params[bpi.atr_period.value]
+            )
+        else:
+            atr_arr = np.full(data_count, np.nan, dtype=nb_float)
+
+    backtest_params_tuple = get_backtest_params_tuple(b_params)
+    cost_params_tuple = get_cost_params_tuple(b_params)
+    prune_params_tuple = get_prune_params_tuple(b_params)
+
+    # ------------------ 第0根K线的状态 ------------------
+    # 资金、净值和回撤按累加器精度递推, 价格和离场状态保持存储精度
+    position = nb_float(ps.NO_POSITION.value)
+    entry_price = nb_float(np.nan)
+    balance = nb_acc(init_money)
+    equity = nb_acc(init_money)
+    max_equity = nb_acc(init_money)
+    drawdown = nb_acc(0.0)
+    exit_state = init_exit_state()
+    last_signals = (
+        enter_long_signal[bar_start],
+        exit_long_signal[bar_start],
+        enter_short_signal[bar_start],
+        exit_short_signal[bar_start],
+    )
+    if save_equity:
+        equity_out[bar_start] = equity
+
+    acc = init_running_performance(balance, drawdown)
+
+    for i in range(bar_start + 1, bar_stop):
+        last_i = i - 1
+        last_position = position
+        last_entry_price = entry_price
+        last_equity = equity
+
+        (
+            position,
+            entry_price,
+            exit_price,
+            exit_state,
+            last_signals,
+            balance,
+            equity,
+            max_equity,
+            drawdown,
+        ) = step_backtest_bar(
+            position,
+            entry_price,
+            exit_state,
+            last_signals,
+            balance,
+            equity,
+            max_equity,
+            (
+                enter_long_signal[i],
+                exit_long_signal[i],
+                enter_short_signal[i],
+                exit_short_signal[i],
+            ),
+            open_arr[i],
+            high_arr[last_i],
+            high_arr[i],
+            low_arr[last_i],
+            low_arr[i],
+            close_arr[last_i],
+            close_arr[i],
+            atr_arr[i],
+            backtest_params_tuple,
+            cost_params_tuple,
+        )
+
+        acc = update_running_performance(
+            acc,
+            position,
+            last_position,
+            exit_price,
+            last_entry_price,
+            balance,
+            equity,
+            last_equity,
+            drawdown,
+        )
+
+        if save_equity:
+            equity_out[i] = equity
+
+        if should_prune(
+            i - bar_start,
+            drawdown,
+            equity,
+            acc[rpi.total_trades.value],
+            prune_params_tuple,
+        ):
+            p_row[:] = np.nan
+            p_row[pfi.pruned_bar.value] = i - bar_start
+            return
+
+    set_running_performance(
+        p_row, acc, bar_count, init_money, equity, annualization_factor
+    )
+
+
+@njit(backtest_performance_signature, cache=enable_cache)
+def calc_backtest_performance(ohlcv_mtf, b_params, s_output, p_row, atr_arr):
+    """
+    在完整序列上只计算绩效, 见 calc_backtest_performance_range。
+    """
+    if not check_ohlcv_mtf(ohlcv_mtf):
+        return
+    data_count = len(ohlcv_mtf[0]["close"])
+    if data_count == 0:
+        return
+    calc_backtest_performance_range(
+        ohlcv_mtf,
+        b_params,
+        s_output,
+        p_row,
+        0,
+        data_count,
+        np.empty(0, dtype=nb_float),
+        atr_arr,
+    )
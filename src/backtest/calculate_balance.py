@@ -49,19 +49,17 @@ def _calculate_costs(
 
 
 @njit(cache=enable_cache)
-def calc_balance(
-    i,
-    last_i,
-    open_arr,
-    close_arr,
-    position,
-    entry_price,
-    exit_price,
-    equity,
-    balance,
-    drawdown,
-    max_equity,
-    atr_arr,
+def calc_balance_state(
+    position_i,
+    last_position,
+    entry_price_i,
+    last_entry_price,
+    exit_price_i,
+    close_i,
+    last_balance,
+    last_equity,
+    last_max_equity,
+    atr_i,
     commission_pct,
     commission_fixed,
     slippage_atr,
@@ -69,23 +67,23 @@ def calc_balance(
     position_size,
 ):
     """
-    计算平衡、净值和回撤。
+    资金计算的标量版本, 返回当前K线的 (余额, 净值, 最大净值, 回撤)。
     """
     # 1. 首先，账户余额和净值从上一根K线继承
-    balance[i] = balance[last_i]
-    equity[i] = equity[last_i]
+    balance = last_balance
+    equity = last_equity
 
     # 将名义本金的计算提取到函数最上方
-    nominal_capital = balance[last_i] * position_size
+    nominal_capital = last_balance * position_size
 
     if position_size <= 0:
-        return
+        return balance, equity, np.nan, np.nan
 
     # 2. 如果发生平仓/反手，更新 balance 和 equity
     if (
-        position[i] == ps.EXIT_LONG.value or position[i] == ps.REVERSE_TO_SHORT.value
-    ) and is_long_position(position[last_i]):
-        profit_pct = (exit_price[i] - entry_price[last_i]) / entry_price[last_i]
+        position_i == ps.EXIT_LONG.value or position_i == ps.REVERSE_TO_SHORT.value
+    ) and is_long_position(last_position):
+        profit_pct = (exit_price_i - last_entry_price) / last_entry_price
 
         # 调用辅助函数计算总成本
         total_cost = _calculate_costs(
@@ -94,18 +92,18 @@ def calc_balance(
             slippage_pct,
             commission_pct,
             commission_fixed,
-            atr_arr[i],
+            atr_i,
             position_size,
         )
 
         nominal_profit = nominal_capital * profit_pct
-        balance[i] = balance[last_i] + nominal_profit - total_cost
-        equity[i] = balance[i]
+        balance = last_balance + nominal_profit - total_cost
+        equity = balance
 
     elif (
-        position[i] == ps.EXIT_SHORT.value or position[i] == ps.REVERSE_TO_LONG.value
-    ) and is_short_position(position[last_i]):
-        profit_pct = (entry_price[last_i] - exit_price[i]) / entry_price[last_i]
+        position_i == ps.EXIT_SHORT.value or position_i == ps.REVERSE_TO_LONG.value
+    ) and is_short_position(last_position):
+        profit_pct = (last_entry_price - exit_price_i) / last_entry_price
 
         # 调用辅助函数计算总成本
         total_cost = _calculate_costs(
@@ -114,28 +112,72 @@ def calc_balance(
             slippage_pct,
             commission_pct,
             commission_fixed,
-            atr_arr[i],
+            atr_i,
             position_size,
         )
 
         nominal_profit = nominal_capital * profit_pct
-        balance[i] = balance[last_i] + nominal_profit - total_cost
-        equity[i] = balance[i]
+        balance = last_balance + nominal_profit - total_cost
+        equity = balance
 
     # 3. 持仓时，计算浮动盈亏并更新 equity
-    elif is_long_position(position[i]):
-        profit_pct = (close_arr[i] - entry_price[i]) / entry_price[i]
+    elif is_long_position(position_i):
+        profit_pct = (close_i - entry_price_i) / entry_price_i
         nominal_profit = nominal_capital * profit_pct
-        equity[i] = balance[last_i] + nominal_profit
+        equity = last_balance + nominal_profit
 
-    elif is_short_position(position[i]):
-        profit_pct = (entry_price[i] - close_arr[i]) / entry_price[i]
+    elif is_short_position(position_i):
+        profit_pct = (entry_price_i - close_i) / entry_price_i
         nominal_profit = nominal_capital * profit_pct
-        equity[i] = balance[last_i] + nominal_profit
+        equity = last_balance + nominal_profit
 
     # 4. 更新最大净值和回撤
-    max_equity[i] = max(max_equity[last_i], equity[i])
-    if max_equity[i] > 0:
-        drawdown[i] = (max_equity[i] - equity[i]) / max_equity[i]
+    max_equity = max(last_max_equity, equity)
+    if max_equity > 0:
+        drawdown = (max_equity - equity) / max_equity
     else:
-        drawdown[i] = 0.0
+        drawdown = 0.0
+
+    return balance, equity, max_equity, drawdown
+
+
+@njit(cache=enable_cache)
+def calc_balance(
+    i,
+    last_i,
+    open_arr,
+    close_arr,
+    position,
+    entry_price,
+    exit_price,
+    equity,
+    balance,
+    drawdown,
+    max_equity,
+    atr_arr,
+    commission_pct,
+    commission_fixed,
+    slippage_atr,
+    slippage_pct,
+    position_size,
+):
+    """
+    计算平衡、净值和回撤。
+    """
+    balance[i], equity[i], max_equity[i], drawdown[i] = calc_balance_state(
+        position[i],
+        position[last_i],
+        entry_price[i],
+        entry_price[last_i],
+        exit_price[i],
+        close_arr[i],
+        balance[last_i],
+        equity[last_i],
+        max_equity[last_i],
+        atr_arr[i],
+        commission_pct,
+        commission_fixed,
+        slippage_atr,
+        slippage_pct,
+        position_size,
+    )
@@ -10,6 +10,8 @@ from src.backtest.performance_utils import calc_sharpe, calc_calmar, calc_sortin
 
 from src.backtest.backtest_enums import (
     PositionStatus as ps,
+    bpi,
+    performance_keys,
     is_long_position,
     is_short_position,
     is_no_position,
@@ -23,14 +25,12 @@ from src.utils.nb_check_keys import (
 
 enable_cache = numba_config["enable_cache"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(cache=enable_cache)
-def get_b_params_need_keys():
-    _l = List.empty_list(types.unicode_type)
-    for i in ("annualization_factor",):
-        _l.append(i)
-    return _l
+def get_b_params_need_cols():
+    return (bpi.annualization_factor.value,)
 
 
 @njit(cache=enable_cache)
@@ -41,11 +41,52 @@ def get_b_output_need_keys():
     return _l
 
 
+@njit(cache=enable_cache, inline="always")
+def is_trade_exit(position, i):
+    """
+    第 i 根K线平掉了上一根K线的仓位 (平仓或反手)。返回 1 为平多, -1 为平空, 0 为没有平仓。
+    """
+    # 情况1: 平多或反手平多
+    if (
+        position[i] == ps.EXIT_LONG.value or position[i] == ps.REVERSE_TO_SHORT.value
+    ) and is_long_position(position[i - 1]):
+        return 1
+    # 情况2: 平空或反手平空
+    elif (
+        position[i] == ps.EXIT_SHORT.value or position[i] == ps.REVERSE_TO_LONG.value
+    ) and is_short_position(position[i - 1]):
+        return -1
+    return 0
+
+
+@njit(cache=enable_cache)
+def calc_trade_profits(position, entry_price, exit_price):
+    """
+    返回每笔平仓交易的百分比利润, 按平仓的K线顺序排列, 按累加器精度保存。
+    """
+    trade_count = 0
+    for i in range(1, len(position)):
+        if is_trade_exit(position, i) != 0:
+            trade_count += 1
+
+    profits = np.empty(trade_count, dtype=nb_acc)
+    t = 0
+    for i in range(1, len(position)):
+        side = is_trade_exit(position, i)
+        if side == 1:
+            profits[t] = (exit_price[i] - entry_price[i - 1]) / entry_price[i - 1]
+            t += 1
+        elif side == -1:
+            profits[t] = (entry_price[i - 1] - exit_price[i]) / entry_price[i - 1]
+            t += 1
+    return profits
+
+
 @njit(performance_signature, cache=enable_cache)
 def calc_performance(ohlcv_mtf, b_params, b_output, p_output):
     if not check_data_for_performance(
         ohlcv_mtf,
-        get_b_params_need_keys(),
+        get_b_params_need_cols(),
         get_b_output_need_keys(),
         b_params,
         b_output,
@@ -60,28 +101,8 @@ def calc_performance(ohlcv_mtf, b_params, b_output, p_output):
     drawdown = b_output["drawdown"]
 
     # ------------------ 计算胜率和盈亏比 ------------------
-    # 创建一个列表来存储每笔交易的百分比利润
-    profits = []
-
-    # 遍历position数组，找出所有平仓的K线
-    for i in range(1, len(position)):
-        # 情况1: 平多或反手平多
-        if (
-            position[i] == ps.EXIT_LONG.value
-            or position[i] == ps.REVERSE_TO_SHORT.value
-        ) and is_long_position(position[i - 1]):
-            profit_pct = (exit_price[i] - entry_price[i - 1]) / entry_price[i - 1]
-            profits.append(profit_pct)
-
-        # 情况2: 平空或反手平空
-        elif (
-            position[i] == ps.EXIT_SHORT.value
-            or position[i] == ps.REVERSE_TO_LONG.value
-        ) and is_short_position(position[i - 1]):
-            profit_pct = (entry_price[i - 1] - exit_price[i]) / entry_price[i - 1]
-            profits.append(profit_pct)
-
-    profits_arr = np.array(profits)
+    # 每笔交易的百分比利润
+    profits_arr = calc_trade_profits(position, entry_price, exit_price)
 
     # 胜率
     if len(profits_arr) > 0:
@@ -124,7 +145,7 @@ def calc_performance(ohlcv_mtf, b_params, b_output, p_output):
     # 定义年化因子，根据K线周期调整
     # 假设您的K线是5分钟，每年有252个交易日，每天8小时交易
     # annualization_factor = 252 * 8 * 12  # 12根5分钟K线/小时
-    annualization_factor = b_params["annualization_factor"]
+    annualization_factor = b_params[bpi.annualization_factor.value]
 
     # 计算夏普比率并保存
     sharpe_ratio = calc_sharpe(equity, annualization_factor)
@@ -134,10 +155,47 @@ def calc_performance(ohlcv_mtf, b_params, b_output, p_output):
     calmar_ratio = calc_calmar(equity, drawdown, annualization_factor)
     p_output["calmar_ratio"] = calmar_ratio
 
-    sortino_ratio = calc_sortino(equity, annualization_factor, nb_float(0.0))
+    sortino_ratio = calc_sortino(equity, annualization_factor, nb_acc(0.0))
     p_output["sortino_ratio"] = sortino_ratio
 
-    total_profit_pct = (equity[-1] / equity[0]) - 1.0
+    total_profit_pct = (nb_acc(equity[-1]) / equity[0]) - 1.0
     p_output["total_profit_pct"] = total_profit_pct
     p_output["max_balance"] = np.max(balance)
     p_output["max_drawdown"] = np.max(drawdown)
+    p_output["pruned_bar"] = 0.0
+
+
+@njit(cache=enable_cache)
+def set_pruned_performance(p_output, pruned_bar):
+    """
+    提前终止的参数组合只写入哨兵绩效: 所有绩效指标为 NaN, pruned_bar 为终止的K线索引。
+    NaN 不参与排名, 这些参数组合不会进入 top-k。
+    """
+    for k in performance_keys:
+        p_output[k] = np.nan
+    p_output["pruned_bar"] = nb_acc(pruned_bar)
+
+
+@njit(cache=enable_cache)
+def convert_performance_to_row(p_output, p_row):
+    """
+    把单个参数组合的 p_output 写入绩效行 (列索引见 PerformanceIndex), 缺失的不写入。
+    """
+    for c in range(len(performance_keys)):
+        k = performance_keys[c]
+        if k in p_output:
+            p_row[c] = p_output[k]
+
+
+@njit(cache=enable_cache)
+def convert_performance_to_matrix(performance_output):
+    """
+    把 performance_output 转换成 (params_count, PerformanceIndex) 的矩阵,
+    缺失的绩效指标为 NaN。
+    """
+    result = np.full(
+        (len(performance_output), len(performance_keys)), np.nan, dtype=nb_acc
+    )
+    for i in range(len(performance_output)):
+        convert_performance_to_row(performance_output[i], result[i])
+    return result
@@ -18,6 +18,57 @@ nb_float = numba_config["nb"]["float"]
 nb_bool = numba_config["nb"]["bool"]
 
 
+@njit(cache=enable_cache)
+def calc_trade_logic_state(
+    last_position,
+    last_entry_price,
+    enter_long,
+    exit_long,
+    enter_short,
+    exit_short,
+    target_price,
+):
+    """
+    交易逻辑的标量版本：根据前一根K线的仓位、进场价和信号，
+    返回当前K线的 (仓位状态, 进场价, 离场价)。
+    """
+    # 仓位状态继承
+    exit_price = np.nan
+    if is_long_position(last_position):
+        position = nb_float(ps.HOLD_LONG.value)
+        entry_price = last_entry_price
+    elif is_short_position(last_position):
+        position = nb_float(ps.HOLD_SHORT.value)
+        entry_price = last_entry_price
+    else:
+        position = nb_float(ps.NO_POSITION.value)
+        entry_price = np.nan
+
+    # 根据信号处理开平仓逻辑 (优先级：反手 > 平仓 > 开仓)
+    if enter_long and exit_short and is_short_position(last_position):
+        position = nb_float(ps.REVERSE_TO_LONG.value)  # 反手
+        entry_price = target_price
+        exit_price = target_price
+    elif enter_short and exit_long and is_long_position(last_position):
+        position = nb_float(ps.REVERSE_TO_SHORT.value)  # 反手
+        entry_price = target_price
+        exit_price = target_price
+    elif exit_long and is_long_position(last_position):
+        position = nb_float(ps.EXIT_LONG.value)  # 平仓
+        exit_price = target_price
+    elif exit_short and is_short_position(last_position):
+        position = nb_float(ps.EXIT_SHORT.value)  # 平仓
+        exit_price = target_price
+    elif enter_long and last_position == ps.NO_POSITION.value:
+        position = nb_float(ps.ENTER_LONG.value)  # 开多
+        entry_price = target_price
+    elif enter_short and last_position == ps.NO_POSITION.value:
+        position = nb_float(ps.ENTER_SHORT.value)  # 开空
+        entry_price = target_price
+
+    return position, entry_price, exit_price
+
+
 @njit(cache=enable_cache)
 def calc_trade_logic(
     i,
@@ -35,44 +86,12 @@ def calc_trade_logic(
     """
     last_i = i - 1
 
-    # 仓位状态继承
-    if is_long_position(position[last_i]):
-        position[i] = ps.HOLD_LONG.value
-        entry_price[i] = entry_price[last_i]
-    elif is_short_position(position[last_i]):
-        position[i] = ps.HOLD_SHORT.value
-        entry_price[i] = entry_price[last_i]
-    else:
-        position[i] = ps.NO_POSITION.value
-        entry_price[i] = np.nan
-        exit_price[i] = np.nan
-
-    # 根据信号处理开平仓逻辑 (优先级：反手 > 平仓 > 开仓)
-    if (
-        enter_long_signal[last_i]
-        and exit_short_signal[last_i]
-        and is_short_position(position[last_i])
-    ):
-        position[i] = ps.REVERSE_TO_LONG.value  # 反手
-        entry_price[i] = target_price
-        exit_price[i] = target_price
-    elif (
-        enter_short_signal[last_i]
-        and exit_long_signal[last_i]
-        and is_long_position(position[last_i])
-    ):
-        position[i] = ps.REVERSE_TO_SHORT.value  # 反手
-        entry_price[i] = target_price
-        exit_price[i] = target_price
-    elif exit_long_signal[last_i] and is_long_position(position[last_i]):
-        position[i] = ps.EXIT_LONG.value  # 平仓
-        exit_price[i] = target_price
-    elif exit_short_signal[last_i] and is_short_position(position[last_i]):
-        position[i] = ps.EXIT_SHORT.value  # 平仓
-        exit_price[i] = target_price
-    elif enter_long_signal[last_i] and position[last_i] == ps.NO_POSITION.value:
-        position[i] = ps.ENTER_LONG.value  # 开多
-        entry_price[i] = target_price
-    elif enter_short_signal[last_i] and position[last_i] == ps.NO_POSITION.value:
-        position[i] = ps.ENTER_SHORT.value  # 开空
-        entry_price[i] = target_price
+    position[i], entry_price[i], exit_price[i] = calc_trade_logic_state(
+        position[last_i],
+        entry_price[last_i],
+        enter_long_signal[last_i],
+        exit_long_signal[last_i],
+        enter_short_signal[last_i],
+        exit_short_signal[last_i],
+        target_price,
+    )
@@ -12,6 +12,18 @@ enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
 nb_bool = numba_config["nb"]["bool"]
+nb_acc = numba_config["nb"]["acc"]
+
+
+@njit(cache=enable_cache)
+def calc_returns(equity):
+    """
+    每根K线的收益率, 按累加器精度保存, 净值数组是存储精度时均值和标准差也不会失真。
+    """
+    returns = np.empty(len(equity) - 1, dtype=nb_acc)
+    for i in range(len(returns)):
+        returns[i] = (nb_acc(equity[i + 1]) - equity[i]) / equity[i]
+    return returns
 
 
 # 假设 performance_signature 是您定义的类型签名
@@ -20,8 +32,8 @@ def calc_sharpe(equity, annualization_factor):
     if len(equity) < 2 or annualization_factor <= 0:
         return 0.0
 
-    # 矢量化计算每根K线的收益率
-    returns = (equity[1:] - equity[:-1]) / equity[:-1]
+    # 计算每根K线的收益率
+    returns = calc_returns(equity)
 
     # 计算平均收益和标准差
     mean_return = np.mean(returns)
@@ -49,7 +61,7 @@ def calc_calmar(equity, drawdown, annualization_factor):
     # 1. 计算年化收益率
     total_years = total_bars / annualization_factor
     # 使用最后和最初的净值计算总收益
-    annual_return = (equity[-1] / equity[0]) ** (1 / total_years) - 1
+    annual_return = (nb_acc(equity[-1]) / equity[0]) ** (1 / total_years) - 1
 
     # 2. 计算最大回撤
     max_drawdown = np.max(drawdown)
@@ -70,7 +82,7 @@ def calc_sortino(equity, annualization_factor, min_acceptable_return):
         return 0.0
 
     # 1. 计算每根K线的收益率
-    returns = (equity[1:] - equity[:-1]) / equity[:-1]
+    returns = calc_returns(equity)
 
     # 2. 筛选出低于最小可接受收益率的“下行”收益
     downside_returns = returns[returns < min_acceptable_return]
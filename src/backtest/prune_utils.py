@@ -0,0 +1,67 @@
+from numba import njit
+
+from src.utils.constants import numba_config
+from src.backtest.backtest_enums import bpi
+
+
+enable_cache = numba_config["enable_cache"]
+nb_float = numba_config["nb"]["float"]
+
+
+@njit(cache=enable_cache)
+def get_prune_params_tuple(b_params):
+    """
+    提前终止规则的参数, 0 或 NaN 代表关闭该规则, 旧的参数不需要包含这些列。
+    """
+    return (
+        b_params[bpi.prune_max_drawdown.value],
+        b_params[bpi.prune_min_equity.value],
+        b_params[bpi.prune_min_trades.value],
+        b_params[bpi.prune_min_trades_bar.value],
+    )
+
+
+@njit(cache=enable_cache)
+def disable_prune_params(b_params):
+    """
+    关闭所有提前终止规则的参数行副本, 用于需要完整净值的回测 (例如 walk-forward 样本外)。
+    """
+    b_params = b_params.copy()
+    b_params[bpi.prune_max_drawdown.value] = 0.0
+    b_params[bpi.prune_min_equity.value] = 0.0
+    b_params[bpi.prune_min_trades.value] = 0.0
+    b_params[bpi.prune_min_trades_bar.value] = 0.0
+    return b_params
+
+
+@njit(cache=enable_cache)
+def should_prune(bar_offset, drawdown_i, equity_i, trade_count, prune_params_tuple):
+    """
+    在距回测起点第 bar_offset 根K线结算之后判断是否提前终止回测:
+      回撤超过 prune_max_drawdown
+      净值低于 prune_min_equity
+      距起点 prune_min_trades_bar 根K线及之后完成的交易次数少于 prune_min_trades
+    bar_offset 需要从回测区间的起点计算 (见 calc_backtest_performance_range),
+    不能是整段数据中的绝对索引。
+    交易次数只增不减, 用 >= 判断与只在第 prune_min_trades_bar 根检查一次的结果相同,
+    即使调用方没有逐根检查 (例如区间从规则K线之后开始) 也不会漏掉这条规则。
+    """
+    (
+        prune_max_drawdown,
+        prune_min_equity,
+        prune_min_trades,
+        prune_min_trades_bar,
+    ) = prune_params_tuple
+
+    if prune_max_drawdown > 0 and drawdown_i > prune_max_drawdown:
+        return True
+    if prune_min_equity > 0 and equity_i < prune_min_equity:
+        return True
+    if (
+        prune_min_trades > 0
+        and prune_min_trades_bar > 0
+        and bar_offset >= int(prune_min_trades_bar)
+        and trade_count < prune_min_trades
+    ):
+        return True
+    return False
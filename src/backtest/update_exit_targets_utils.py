@@ -5,7 +5,7 @@ from numba.core import types
 
 from src.utils.constants import numba_config
 from src.backtest.backtest_enums import PositionStatus as ps
-from src.indicators.psar import psar_init, psar_first_iteration, psar_update
+from src.indicators.psar import psar_first_advance, psar_advance
 
 from src.backtest.backtest_enums import is_long_position, is_short_position
 
@@ -16,30 +16,28 @@ nb_bool = numba_config["nb"]["bool"]
 
 
 @njit(cache=enable_cache)
-def update_exit_targets(
-    i,
-    last_i,
-    position,
+def update_exit_targets_state(
+    position_i,
+    last_state,
     target_price,
     backtest_params_tuple,
     #
-    high_arr,
-    low_arr,
-    close_arr,
-    atr_arr,
-    #
-    pct_sl_arr,
-    pct_tp_arr,
-    pct_tsl_arr,
-    atr_sl_arr,
-    atr_tp_arr,
-    atr_tsl_arr,
-    psar_is_long_arr,
-    psar_current_arr,
-    psar_ep_arr,
-    psar_af_arr,
-    psar_reversal_arr,
+    high_prev,
+    high_curr,
+    low_prev,
+    low_curr,
+    close_curr,
+    close_prev,
+    atr,
 ):
+    """
+    止损止盈和 PSAR 状态更新的标量版本。
+    PSAR 与 calc_psar_batch 共用同一个标量状态机 (psar_first_advance, psar_advance)。
+    last_state 和返回的 state 都是
+    (pct_sl, pct_tp, pct_tsl, atr_sl, atr_tp, atr_tsl,
+     psar_is_long, psar_current, psar_ep, psar_af, psar_reversal)
+    返回 (exit_check_price, state)
+    """
     (
         close_for_reversal,
         pct_sl_enable,
@@ -60,47 +58,58 @@ def update_exit_targets(
         psar_max_af,
     ) = backtest_params_tuple
 
-    high_prev = high_arr[last_i]
-    high_curr = high_arr[i]
-    low_prev = low_arr[last_i]
-    low_curr = low_arr[i]
-    close_prev = close_arr[last_i]
-    atr = atr_arr[i]
+    (
+        last_pct_sl,
+        last_pct_tp,
+        last_pct_tsl,
+        last_atr_sl,
+        last_atr_tp,
+        last_atr_tsl,
+        last_psar_is_long,
+        last_psar_current,
+        last_psar_ep,
+        last_psar_af,
+        _,
+    ) = last_state
+
     atr_sl = atr * atr_sl_multiplier
     atr_tp = atr * atr_tp_multiplier
     atr_tsl = atr * atr_tsl_multiplier
     exit_check_price = 0.0
 
+    # 无仓位时，清空状态
+    pct_sl_i = np.nan
+    pct_tp_i = np.nan
+    pct_tsl_i = np.nan
+    atr_sl_i = np.nan
+    atr_tp_i = np.nan
+    atr_tsl_i = np.nan
+    psar_is_long_i = 0.0
+    psar_current_i = np.nan
+    psar_ep_i = np.nan
+    psar_af_i = np.nan
+    psar_reversal_i = 0.0
+
     # 判断当前是否处于多头仓位或开多
-    if is_long_position(position[i]) and position[i] != ps.NO_POSITION.value:
+    if is_long_position(position_i) and position_i != ps.NO_POSITION.value:
         # 开仓或反手时，初始化价格
-        if (
-            position[i] == ps.ENTER_LONG.value
-            or position[i] == ps.REVERSE_TO_LONG.value
-        ):
-            pct_sl_arr[i] = target_price * (1 - pct_sl)
-            pct_tp_arr[i] = target_price * (1 + pct_tp)
-            pct_tsl_arr[i] = target_price * (1 - pct_tsl)
-            atr_sl_arr[i] = target_price - atr_sl
-            atr_tp_arr[i] = target_price + atr_tp
-            atr_tsl_arr[i] = target_price - atr_tsl
-            psar_is_long_arr[i], psar_current_arr[i], psar_ep_arr[i], psar_af_arr[i] = (
-                psar_init(
-                    high_prev, high_curr, low_prev, low_curr, close_prev, 1, psar_af0
-                )
-            )
+        if position_i == ps.ENTER_LONG.value or position_i == ps.REVERSE_TO_LONG.value:
+            pct_sl_i = target_price * (1 - pct_sl)
+            pct_tp_i = target_price * (1 + pct_tp)
+            pct_tsl_i = target_price * (1 - pct_tsl)
+            atr_sl_i = target_price - atr_sl
+            atr_tp_i = target_price + atr_tp
+            atr_tsl_i = target_price - atr_tsl
             # PSAR第一次迭代需要特殊处理
             (
-                (
-                    psar_is_long_arr[i],
-                    psar_current_arr[i],
-                    psar_ep_arr[i],
-                    psar_af_arr[i],
-                ),
+                psar_is_long_i,
+                psar_current_i,
+                psar_ep_i,
+                psar_af_i,
                 _,
                 _,
-                psar_reversal_arr[i],
-            ) = psar_first_iteration(
+                psar_reversal_i,
+            ) = psar_first_advance(
                 high_prev,
                 high_curr,
                 low_prev,
@@ -112,72 +121,60 @@ def update_exit_targets(
             )
 
         # 持仓时，更新跟踪止损和 PSAR
-        elif position[i] == ps.HOLD_LONG.value:
-            exit_check_price = close_arr[i] if close_for_reversal > 0 else low_arr[i]
-            pct_sl_arr[i] = pct_sl_arr[last_i]
-            pct_tp_arr[i] = pct_tp_arr[last_i]
-            pct_tsl_arr[i] = max(pct_tsl_arr[last_i], exit_check_price * (1 - pct_tsl))
-            atr_sl_arr[i] = atr_sl_arr[last_i]
-            atr_tp_arr[i] = atr_tp_arr[last_i]
-            atr_tsl_arr[i] = max(atr_tsl_arr[last_i], exit_check_price - atr_tsl)
+        elif position_i == ps.HOLD_LONG.value:
+            exit_check_price = close_curr if close_for_reversal > 0 else low_curr
+            pct_sl_i = last_pct_sl
+            pct_tp_i = last_pct_tp
+            pct_tsl_i = max(last_pct_tsl, exit_check_price * (1 - pct_tsl))
+            atr_sl_i = last_atr_sl
+            atr_tp_i = last_atr_tp
+            atr_tsl_i = max(last_atr_tsl, exit_check_price - atr_tsl)
 
             # 更新 PSAR
-            prev_state = (
-                psar_is_long_arr[last_i],
-                psar_current_arr[last_i],
-                psar_ep_arr[last_i],
-                psar_af_arr[last_i],
-            )
             (
-                (
-                    psar_is_long_arr[i],
-                    psar_current_arr[i],
-                    psar_ep_arr[i],
-                    psar_af_arr[i],
-                ),
+                psar_is_long_i,
+                psar_current_i,
+                psar_ep_i,
+                psar_af_i,
                 _,
                 _,
-                psar_reversal_arr[i],
-            ) = psar_update(
-                prev_state,
-                high_arr[i],
-                low_arr[i],
-                high_arr[last_i],
-                low_arr[last_i],
+                psar_reversal_i,
+            ) = psar_advance(
+                last_psar_is_long,
+                last_psar_current,
+                last_psar_ep,
+                last_psar_af,
+                high_curr,
+                low_curr,
+                high_prev,
+                low_prev,
                 psar_af_step,
                 psar_max_af,
             )
 
     # 判断当前是否处于空头仓位或开空
-    elif is_short_position(position[i]) and position[i] != ps.NO_POSITION.value:
+    elif is_short_position(position_i) and position_i != ps.NO_POSITION.value:
         # 开仓或反手时，初始化价格
         if (
-            position[i] == ps.ENTER_SHORT.value
-            or position[i] == ps.REVERSE_TO_SHORT.value
+            position_i == ps.ENTER_SHORT.value
+            or position_i == ps.REVERSE_TO_SHORT.value
         ):
-            pct_sl_arr[i] = target_price * (1 + pct_sl)
-            pct_tp_arr[i] = target_price * (1 - pct_tp)
-            pct_tsl_arr[i] = target_price * (1 + pct_tsl)
-            atr_sl_arr[i] = target_price + atr_sl
-            atr_tp_arr[i] = target_price - atr_tp
-            atr_tsl_arr[i] = target_price + atr_tsl
-            psar_is_long_arr[i], psar_current_arr[i], psar_ep_arr[i], psar_af_arr[i] = (
-                psar_init(
-                    high_prev, high_curr, low_prev, low_curr, close_prev, -1, psar_af0
-                )
-            )
+            pct_sl_i = target_price * (1 + pct_sl)
+            pct_tp_i = target_price * (1 - pct_tp)
+            pct_tsl_i = target_price * (1 + pct_tsl)
+            atr_sl_i = target_price + atr_sl
+            atr_tp_i = target_price - atr_tp
+            atr_tsl_i = target_price + atr_tsl
             # PSAR第一次迭代需要特殊处理
             (
-                (
-                    psar_is_long_arr[i],
-                    psar_current_arr[i],
-                    psar_ep_arr[i],
-                    psar_af_arr[i],
-                ),
+                psar_is_long_i,
+                psar_current_i,
+                psar_ep_i,
+                psar_af_i,
                 _,
                 _,
-                psar_reversal_arr[i],
-            ) = psar_first_iteration(
+                psar_reversal_i,
+            ) = psar_first_advance(
                 high_prev,
                 high_curr,
                 low_prev,
@@ -189,53 +186,118 @@ def update_exit_targets(
             )
 
         # 持仓时，更新跟踪止损和 PSAR
-        elif position[i] == ps.HOLD_SHORT.value:
-            exit_check_price = close_arr[i] if close_for_reversal > 0 else high_arr[i]
-            pct_sl_arr[i] = pct_sl_arr[last_i]
-            pct_tp_arr[i] = pct_tp_arr[last_i]
-            pct_tsl_arr[i] = min(pct_tsl_arr[last_i], exit_check_price * (1 + pct_tsl))
-            atr_sl_arr[i] = atr_sl_arr[last_i]
-            atr_tp_arr[i] = atr_tp_arr[last_i]
-            atr_tsl_arr[i] = min(atr_tsl_arr[last_i], exit_check_price + atr_tsl)
+        elif position_i == ps.HOLD_SHORT.value:
+            exit_check_price = close_curr if close_for_reversal > 0 else high_curr
+            pct_sl_i = last_pct_sl
+            pct_tp_i = last_pct_tp
+            pct_tsl_i = min(last_pct_tsl, exit_check_price * (1 + pct_tsl))
+            atr_sl_i = last_atr_sl
+            atr_tp_i = last_atr_tp
+            atr_tsl_i = min(last_atr_tsl, exit_check_price + atr_tsl)
 
             # 更新 PSAR
-            prev_state = (
-                psar_is_long_arr[last_i],
-                psar_current_arr[last_i],
-                psar_ep_arr[last_i],
-                psar_af_arr[last_i],
-            )
             (
-                (
-                    psar_is_long_arr[i],
-                    psar_current_arr[i],
-                    psar_ep_arr[i],
-                    psar_af_arr[i],
-                ),
+                psar_is_long_i,
+                psar_current_i,
+                psar_ep_i,
+                psar_af_i,
                 _,
                 _,
-                psar_reversal_arr[i],
-            ) = psar_update(
-                prev_state,
-                high_arr[i],
-                low_arr[i],
-                high_arr[last_i],
-                low_arr[last_i],
+                psar_reversal_i,
+            ) = psar_advance(
+                last_psar_is_long,
+                last_psar_current,
+                last_psar_ep,
+                last_psar_af,
+                high_curr,
+                low_curr,
+                high_prev,
+                low_prev,
                 psar_af_step,
                 psar_max_af,
             )
-    else:
-        # 无仓位时，清空数组
-        pct_sl_arr[i] = np.nan
-        pct_tp_arr[i] = np.nan
-        pct_tsl_arr[i] = np.nan
-        atr_sl_arr[i] = np.nan
-        atr_tp_arr[i] = np.nan
-        atr_tsl_arr[i] = np.nan
-        psar_reversal_arr[i] = 0.0
-        psar_is_long_arr[i] = 0.0
-        psar_current_arr[i] = np.nan
-        psar_ep_arr[i] = np.nan
-        psar_af_arr[i] = np.nan
+
+    state = (
+        pct_sl_i,
+        pct_tp_i,
+        pct_tsl_i,
+        atr_sl_i,
+        atr_tp_i,
+        atr_tsl_i,
+        psar_is_long_i,
+        psar_current_i,
+        psar_ep_i,
+        psar_af_i,
+        psar_reversal_i,
+    )
+    return exit_check_price, state
+
+
+@njit(cache=enable_cache)
+def update_exit_targets(
+    i,
+    last_i,
+    position,
+    target_price,
+    backtest_params_tuple,
+    #
+    high_arr,
+    low_arr,
+    close_arr,
+    atr_arr,
+    #
+    pct_sl_arr,
+    pct_tp_arr,
+    pct_tsl_arr,
+    atr_sl_arr,
+    atr_tp_arr,
+    atr_tsl_arr,
+    psar_is_long_arr,
+    psar_current_arr,
+    psar_ep_arr,
+    psar_af_arr,
+    psar_reversal_arr,
+):
+    last_state = (
+        pct_sl_arr[last_i],
+        pct_tp_arr[last_i],
+        pct_tsl_arr[last_i],
+        atr_sl_arr[last_i],
+        atr_tp_arr[last_i],
+        atr_tsl_arr[last_i],
+        psar_is_long_arr[last_i],
+        psar_current_arr[last_i],
+        psar_ep_arr[last_i],
+        psar_af_arr[last_i],
+        psar_reversal_arr[last_i],
+    )
+
+    exit_check_price, state = update_exit_targets_state(
+        position[i],
+        last_state,
+        target_price,
+        backtest_params_tuple,
+        high_arr[last_i],
+        high_arr[i],
+        low_arr[last_i],
+        low_arr[i],
+        close_arr[i],
+        close_arr[last_i],
+        atr_arr[i],
+    )
+
+    (
+        pct_sl_arr[i],
+        pct_tp_arr[i],
+        pct_tsl_arr[i],
+        atr_sl_arr[i],
+        atr_tp_arr[i],
+        atr_tsl_arr[i],
+        psar_is_long_arr[i],
+        psar_current_arr[i],
+        psar_ep_arr[i],
+        psar_af_arr[i],
+        psar_reversal_arr[i],
+    ) = state
 
     return exit_check_price
@@ -1,4 +1,5 @@
 import numpy as np
+import polars as pl
 from numba import njit
 from numba.typed import Dict, List
 from numba.core import types
@@ -21,6 +22,9 @@ from src.convert_params.param_key_utils import (
     get_nb_dict_keys_and_value_as_py_list,
 )
 
+from src.indicators.indicator_layout import indicator_param_keys
+from src.backtest.backtest_enums import backtest_param_keys, backtest_output_keys
+
 from src.utils.constants import numba_config
 
 
@@ -72,6 +76,27 @@ def merge_dict_wrapper(nb_dict_item):
     return {key: val for key, val in zip(keys, values.T)}
 
 
+def convert_params_matrix_to_py_dicts(params_matrix, keys):
+    """
+    把参数矩阵按列名还原成 Python 字典, 与字典列表的输出保持一致。
+    二维矩阵返回 list[dict], 三维矩阵(带mtf)返回 list[list[dict]]。
+    NaN 代表参数缺失, 不输出。
+    """
+    if params_matrix.ndim == 1:
+        return {key: val for key, val in zip(keys, params_matrix) if not np.isnan(val)}
+    return [convert_params_matrix_to_py_dicts(i, keys) for i in params_matrix]
+
+
+def convert_backtest_arena_to_polars(backtest_arena, num):
+    """
+    把回测输出缓冲区 (params, BacktestOutputIndex, bars) 中第 num 个参数组合转换成 polars DataFrame。
+    每个字段在K线维度上连续, polars 直接引用 numpy 内存, 不复制数据。
+    """
+    return pl.DataFrame(
+        {k: backtest_arena[num, c] for c, k in enumerate(backtest_output_keys)}
+    )
+
+
 def convert_nb_data_to_py_dicts(params_list, result_list, num):
     (
         ohlcv_mtf,
@@ -101,8 +126,19 @@ def convert_nb_data_to_py_dicts(params_list, result_list, num):
         "performance_output": performance_output,
     }
 
+    # 参数矩阵的列名
+    params_matrix_keys = {
+        "backtest_params": backtest_param_keys,
+        "indicator_params_mtf": indicator_param_keys,
+    }
+
     # 遍历字典，处理单层列表
     for key, value in data_to_process.items():
+        if isinstance(value, np.ndarray):
+            result[key] = convert_params_matrix_to_py_dicts(
+                value, params_matrix_keys[key]
+            )
+            continue
         result[key] = [merge_dict_wrapper(i) for i in convert_nb_list_to_py_list(value)]
 
     # 处理二维嵌套列表
@@ -112,6 +148,11 @@ def convert_nb_data_to_py_dicts(params_list, result_list, num):
     }
 
     for key, value in nested_data_to_process.items():
+        if isinstance(value, np.ndarray):
+            result[key] = convert_params_matrix_to_py_dicts(
+                value, params_matrix_keys[key]
+            )
+            continue
         result[key] = [
             [merge_dict_wrapper(m) for m in convert_nb_list_to_py_list(i)]
             for i in convert_nb_list_to_py_list(value)
@@ -9,6 +9,7 @@ from src.utils.constants import numba_config
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 nb_bool = numba_config["nb"]["bool"]
 
 
@@ -83,6 +84,8 @@ def ov_merge_dict_to_np_array(params_dict):
         nb_bool[:]: (convert_impl_array, nb_bool),
         nb_int: (convert_impl_scalar, nb_int),
         nb_float: (convert_impl_scalar, nb_float),
+        # 绩效字典按累加器精度保存, 64 位时与 nb_float 相同
+        nb_acc: (convert_impl_scalar, nb_acc),
         nb_bool: (convert_impl_scalar, nb_bool),
     }
 
@@ -26,7 +26,7 @@ get_backtest_params_signature = dict_float_type(nb_bool)
 # get_indicator_need_keys_signature = list_list_unicode_type(
 #     list_dict_float_type, list_dict_float_type
 # )
-get_indicator_need_keys_signature = list_list_unicode_type(list_dict_float_type)
+get_indicator_need_keys_signature = list_list_unicode_type(nb_float[:, :])
 
 
 create_indicator_params_list_signature = list_list_dict_float_type(
@@ -35,6 +35,18 @@ create_indicator_params_list_signature = list_list_dict_float_type(
 create_backtest_params_list_signature = list_dict_float_type(nb_int, nb_bool)
 
 
+indicator_params_to_row_signature = nb_float[:](dict_float_type)
+backtest_params_to_row_signature = nb_float[:](dict_float_type)
+
+convert_indicator_params_list_to_matrix_signature = nb_float[:, :, :](
+    list_list_dict_float_type
+)
+convert_backtest_params_list_to_matrix_signature = nb_float[:, :](list_dict_float_type)
+
+create_indicator_params_matrix_signature = nb_float[:, :, :](nb_int, nb_int, nb_bool)
+create_backtest_params_matrix_signature = nb_float[:, :](nb_int, nb_bool)
+
+
 create_params_dict_template_signature = Tuple(
     (
         dict_float_1d_type,
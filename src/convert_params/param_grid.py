@@ -0,0 +1,187 @@
+import numpy as np
+from typing import List, Dict
+
+
+"""
+根据 define_signal_*_params 中的优化规格生成参数组合。
+规格为 [enable_optim, default_value, min_value, max_value, step, current_value],
+只有 enable_optim 为 True 的参数参与优化, 其余参数保持默认值。
+所有参数组合直接生成 (points_count, dims_count) 的数组, 再按列写入参数容器。
+"""
+
+
+def get_spec_values(spec: list) -> np.ndarray:
+    """
+    [min_value, max_value] 内按 step 取值, 包含两端。
+    用 min + step * k 生成, 再四舍五入, 避免浮点累加误差。
+    """
+    assert len(spec) == 6, f"数组长度需要为6,实际为{len(spec)}"
+    _, _, min_value, max_value, step, _ = spec
+    assert step > 0, f"step需要大于0, 实际为{step}"
+    assert max_value >= min_value, f"max需要大于等于min, 实际为{min_value} {max_value}"
+
+    count = int(np.floor((max_value - min_value) / step + 1e-9)) + 1
+    return np.round(min_value + step * np.arange(count, dtype=np.float64), 10)
+
+
+def collect_optim_dims(indicator_params: List[List[Dict]]) -> list:
+    """
+    收集所有需要优化的参数维度, 顺序与 init_params 写入参数的顺序一致。
+    返回 [(mtf_idx, key, spec), ...], key 与参数容器中的键一致, 例如 sma_period_1。
+    """
+    dims = []
+    for mtf_idx, item in enumerate(indicator_params):
+        for ind_idx, i in enumerate(item):
+            for key, value in i.items():
+                if isinstance(value, list) and value[0]:
+                    dims.append((mtf_idx, f"{i['name']}_{key}_{ind_idx}", value))
+    return dims
+
+
+def get_grid_size(dims: list) -> int:
+    return int(np.prod([len(get_spec_values(spec)) for _, _, spec in dims]))
+
+
+def create_grid_points(dims: list, max_count: int = 0, stride: int = 0) -> np.ndarray:
+    """
+    枚举所有维度的笛卡尔积, 返回 (points_count, dims_count)。
+    stride 大于0时每隔 stride 个组合取一个;
+    否则 max_count 大于0且网格更大时自动选择 stride, 使组合数量不超过 max_count。
+    不在 Python 中逐个组合循环, 用 np.unravel_index 一次算出所有组合的下标。
+    """
+    values_list = [get_spec_values(spec) for _, _, spec in dims]
+    shape = tuple(len(v) for v in values_list)
+    total = int(np.prod(shape))
+
+    if stride <= 0:
+        stride = 1
+        if max_count > 0 and total > max_count:
+            stride = -(-total // max_count)
+
+    flat_index = np.arange(0, total, stride, dtype=np.int64)
+    if max_count > 0:
+        flat_index = flat_index[:max_count]
+
+    points = np.empty((len(flat_index), len(dims)), dtype=np.float64)
+    if len(dims) == 0:
+        # 没有需要优化的参数时网格只有一个默认参数组合
+        return points
+    for d, index in enumerate(np.unravel_index(flat_index, shape)):
+        points[:, d] = values_list[d][index]
+    return points
+
+
+# Sobol 序列的方向数 (Joe & Kuo, new-joe-kuo-6.21201), 第1维之后每一维为 (s, a, m_1..m_s)
+sobol_direction_params = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+)
+sobol_bits = 32
+sobol_max_dims = len(sobol_direction_params) + 1
+
+
+def get_sobol_directions(dims_count: int) -> np.ndarray:
+    """
+    返回 (dims_count, sobol_bits) 的方向数 v_k = m_k << (sobol_bits - k)。
+    """
+    assert dims_count <= sobol_max_dims, f"Sobol 最多支持{sobol_max_dims}维"
+    directions = np.zeros((dims_count, sobol_bits), dtype=np.uint64)
+    for k in range(sobol_bits):
+        directions[0, k] = 1 << (sobol_bits - 1 - k)
+
+    for d in range(1, dims_count):
+        s, a, m = sobol_direction_params[d - 1]
+        v = [0] * sobol_bits
+        for k in range(sobol_bits):
+            if k < s:
+                v[k] = m[k] << (sobol_bits - 1 - k)
+            else:
+                v[k] = v[k - s] ^ (v[k - s] >> s)
+                for j in range(1, s):
+                    if (a >> (s - 1 - j)) & 1:
+                        v[k] ^= v[k - j]
+        directions[d] = v
+    return directions
+
+
+def create_sobol_unit_points(start: int, count: int, dims_count: int) -> np.ndarray:
+    """
+    Sobol 序列的第 [start, start + count) 个点, 取值在 [0, 1)。
+    第 i 个点是 i 的格雷码中每个为1的位对应方向数的异或, 与逐点递推的结果相同。
+    """
+    directions = get_sobol_directions(dims_count)
+    index = np.arange(start, start + count, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+
+    x = np.zeros((count, dims_count), dtype=np.uint64)
+    for k in range(sobol_bits):
+        bit = ((gray >> np.uint64(k)) & np.uint64(1)).astype(bool)
+        x[bit] ^= directions[:, k]
+    return x / float(1 << sobol_bits)
+
+
+def create_lhs_unit_points(count: int, dims_count: int, rng) -> np.ndarray:
+    """
+    拉丁超立方采样: 每一维都把 [0, 1) 等分成 count 段, 每段恰好取一个点。
+    """
+    strata = np.argsort(rng.random((dims_count, count)), axis=1).T
+    return (strata + rng.random((count, dims_count))) / count
+
+
+def create_sample_points(
+    dims: list, count: int, method: str = "sobol", seed: int = 0
+) -> np.ndarray:
+    """
+    在优化规格的空间中采样 count 个低差异点, 返回 (points_count, dims_count)。
+    每一维把 [0, 1) 均分到该维的所有取值上, 所以采样点天然落在 step 上,
+    重复的参数组合只保留第一次出现的。去重后不足 count 个时继续采样补足,
+    网格本身不超过 count 个组合时直接返回完整网格。
+    """
+    assert method in ("sobol", "lhs"), f"未知的采样方法 {method}"
+    assert count > 0, f"采样数量需要大于0, 实际为{count}"
+
+    if get_grid_size(dims) <= count:
+        return create_grid_points(dims)
+
+    values_list = [get_spec_values(spec) for _, _, spec in dims]
+    shape = np.array([len(v) for v in values_list], dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    flat_index = np.zeros(0, dtype=np.int64)
+    drawn = 0
+    # 每轮补采样数量翻倍, 去重后的数量足够时停止
+    for _ in range(16):
+        draw_count = count if drawn == 0 else drawn
+        if method == "sobol":
+            unit_points = create_sobol_unit_points(drawn, draw_count, len(dims))
+        else:
+            unit_points = create_lhs_unit_points(draw_count, len(dims), rng)
+        drawn += draw_count
+
+        index = np.minimum((unit_points * shape).astype(np.int64), shape - 1)
+        flat_index = np.concatenate(
+            (flat_index, np.ravel_multi_index(tuple(index.T), tuple(shape)))
+        )
+        _, first = np.unique(flat_index, return_index=True)
+        if len(first) >= count:
+            break
+
+    flat_index = flat_index[np.sort(first)[:count]]
+
+    points = np.empty((len(flat_index), len(dims)), dtype=np.float64)
+    for d, index in enumerate(np.unravel_index(flat_index, tuple(shape))):
+        points[:, d] = values_list[d][index]
+    return points
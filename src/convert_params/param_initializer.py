@@ -3,11 +3,18 @@ from typing import List, Dict
 from numpy import ndarray
 
 from src.convert_params.annualization_calculator import get_annualization_factor
+from src.convert_params.param_grid import (
+    collect_optim_dims,
+    create_grid_points,
+    create_sample_points,
+)
 from src.convert_params.param_template_manager import (
     set_params_list_value,
     set_params_list_value_mtf,
     create_indicator_params_list,
     create_backtest_params_list,
+    create_indicator_params_matrix,
+    create_backtest_params_matrix,
 )
 from src.convert_params.data_preprocessor import (
     init_tohlcv,
@@ -24,6 +31,8 @@ from src.convert_params.param_key_utils import (
     append_item,
     get_length_from_list_or_dict,
 )
+from src.indicators.indicator_layout import IndicatorParamIndex
+from src.backtest.backtest_enums import BacktestParamIndex
 
 
 from src.utils.constants import numba_config
@@ -33,6 +42,53 @@ nb_float = numba_config["nb"]["float"]
 np_float = numba_config["np"]["float"]
 
 
+def set_backtest_params_value(key: str, backtest_params, arr: ndarray):
+    """
+    同时兼容字典列表和参数矩阵两种回测参数容器。
+    """
+    if isinstance(backtest_params, np.ndarray):
+        backtest_params[:, BacktestParamIndex[key].value] = arr
+    else:
+        set_params_list_value(key, backtest_params, arr)
+
+
+def set_indicator_params_value(mtf_idx: int, key: str, indicator_params_mtf, arr):
+    """
+    同时兼容嵌套字典列表和参数矩阵两种指标参数容器。
+    """
+    if isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf[:, mtf_idx, IndicatorParamIndex[key].value] = arr
+    else:
+        set_params_list_value_mtf(mtf_idx, key, indicator_params_mtf, arr)
+
+
+def init_data_mtf(ohlcv_mtf_np_list: List[ndarray[np.generic]], smooth_mode: str = ""):
+    """
+    把多周期的原始数据转换成 (ohlcv_mtf, ohlcv_smoothed_mtf, data_mapping)。
+    多品种模式下每个品种各调用一次, 参数只需要创建一份。
+    """
+    smooth_mode = "" if not smooth_mode else smooth_mode
+
+    ohlcv_mtf = create_list_dict_float_1d_empty()
+    for i in ohlcv_mtf_np_list:
+        append_item(ohlcv_mtf, init_tohlcv(i))
+
+    data_mapping = get_data_mapping_mtf(ohlcv_mtf)
+
+    ohlcv_smoothed_mtf = create_list_dict_float_1d_empty()
+    for i in ohlcv_mtf_np_list:
+        ohlcv_smoothed = init_tohlcv_smoothed(i, smooth_mode=smooth_mode)
+        if get_length_from_list_or_dict(ohlcv_smoothed) > 0:
+            append_item(ohlcv_smoothed_mtf, ohlcv_smoothed)
+
+    assert (get_length_from_list_or_dict(ohlcv_smoothed_mtf) == 0) or (
+        get_length_from_list_or_dict(ohlcv_smoothed_mtf)
+        == get_length_from_list_or_dict(ohlcv_mtf)
+    ), "需要ohlcv_smoothed_mtf长度等于0, 或者等于ohlcv_mtf长度"
+
+    return ohlcv_mtf, ohlcv_smoothed_mtf, data_mapping
+
+
 def init_params(
     params_count: int,
     signal_select_id: int,
@@ -43,18 +99,28 @@ def init_params(
     is_only_performance: bool = False,
     use_presets_indicator_params: bool = False,
     use_presets_backtest_params: bool = False,
+    use_params_matrix: bool = False,
+    param_mode: str = "",
+    grid_stride: int = 0,
+    sample_seed: int = 0,
 ):
     """
     三个mtf参数: ohlcv_mtf_np, indicator_params_list_mtf, mapping_mtf
     如果keys_mtf是(), 那么三个mtf参数都会被设为None
     如果keys_mtf是(""),三个mtf参数都正常,只不过indicator_params_list_mtf不会有任何enable,需要ohlcv_mtf_np数据
     如果keys_mtf是("sma")三个mtf参数都正常,indicator_params_list_mtf中的sma_enable会被打开, 需要ohlcv_mtf_np数据
+    use_params_matrix为True时, indicator_params_mtf和backtest_params返回参数矩阵而不是字典列表,
+    供 run_parallel_matrix 使用, 列索引见 IndicatorParamIndex 和 BacktestParamIndex
+    param_mode:
+      "": 所有参数组合都使用默认值
+      "grid": 枚举 enable_optim 参数的笛卡尔积, params_count 为组合数量上限(0代表完整网格),
+              grid_stride 大于0时每隔 grid_stride 个组合取一个, 实际组合数量以返回的参数为准
+      "sobol"/"lhs": 在 enable_optim 参数的空间中采样 params_count 个点, 对齐到 step 并去重,
+              lhs 使用 sample_seed 作为随机种子
     """
 
     # ---- 处理数据 ----
 
-    smooth_mode = "" if not smooth_mode else smooth_mode
-
     ohlcv_mtf_np_list = [i for i in ohlcv_mtf_np_list if i is not None]
 
     indicator_params = signal_dict[signal_select_id]["indicator_params"]
@@ -63,41 +129,49 @@ def init_params(
         f"mtf多时间周期数据不匹配 {len(ohlcv_mtf_np_list)} {len(indicator_params)}"
     )
 
-    ohlcv_mtf = create_list_dict_float_1d_empty()
-    for i in ohlcv_mtf_np_list:
-        append_item(ohlcv_mtf, init_tohlcv(i))
-
-    data_mapping = get_data_mapping_mtf(ohlcv_mtf)
-
-    ohlcv_smoothed_mtf = create_list_dict_float_1d_empty()
-    for i in ohlcv_mtf_np_list:
-        ohlcv_smoothed = init_tohlcv_smoothed(i, smooth_mode=smooth_mode)
-        if get_length_from_list_or_dict(ohlcv_smoothed) > 0:
-            append_item(ohlcv_smoothed_mtf, ohlcv_smoothed)
-
-    assert (get_length_from_list_or_dict(ohlcv_smoothed_mtf) == 0) or (
-        get_length_from_list_or_dict(ohlcv_smoothed_mtf)
-        == get_length_from_list_or_dict(ohlcv_mtf)
-    ), "需要ohlcv_smoothed_mtf长度等于0, 或者等于ohlcv_mtf长度"
+    ohlcv_mtf, ohlcv_smoothed_mtf, data_mapping = init_data_mtf(
+        ohlcv_mtf_np_list, smooth_mode
+    )
 
     # ---- 处理参数 ----
 
-    backtest_params = create_backtest_params_list(
-        params_count, use_presets_backtest_params=use_presets_backtest_params
-    )
-
-    set_params_list_value(
+    optim_points = None
+    if param_mode == "grid":
+        optim_dims = collect_optim_dims(indicator_params)
+        optim_points = create_grid_points(optim_dims, params_count, grid_stride)
+        params_count = len(optim_points)
+    elif param_mode in ("sobol", "lhs"):
+        optim_dims = collect_optim_dims(indicator_params)
+        optim_points = create_sample_points(
+            optim_dims, params_count, param_mode, sample_seed
+        )
+        params_count = len(optim_points)
+    else:
+        assert param_mode == "", f"未知的 param_mode {param_mode}"
+
+    if use_params_matrix:
+        backtest_params = create_backtest_params_matrix(
+            params_count, use_presets_backtest_params
+        )
+        indicator_params_mtf = create_indicator_params_matrix(
+            params_count, len(indicator_params), use_presets_indicator_params
+        )
+    else:
+        backtest_params = create_backtest_params_list(
+            params_count, use_presets_backtest_params=use_presets_backtest_params
+        )
+        indicator_params_mtf = create_indicator_params_list(
+            params_count,
+            len(indicator_params),
+            use_presets_indicator_params=use_presets_indicator_params,
+        )
+
+    set_backtest_params_value(
         "signal_select",
         backtest_params,
         np.full((params_count,), signal_select_id, dtype=np_float),
     )
 
-    indicator_params_mtf = create_indicator_params_list(
-        params_count,
-        len(indicator_params),
-        use_presets_indicator_params=use_presets_indicator_params,
-    )
-
     for mtf_idx, item in enumerate(indicator_params):
         for ind_idx, i in enumerate(item):
             for key, value in i.items():
@@ -112,10 +186,19 @@ def init_params(
 
                 _key = f"{i['name']}_{key}_{ind_idx}"
                 target_array = np.full((params_count,), _value, dtype=np_float)
-                set_params_list_value_mtf(
+                set_indicator_params_value(
                     mtf_idx, _key, indicator_params_mtf, target_array
                 )
 
+    if optim_points is not None:
+        for d, (mtf_idx, key, _) in enumerate(optim_dims):
+            set_indicator_params_value(
+                mtf_idx,
+                key,
+                indicator_params_mtf,
+                np.ascontiguousarray(optim_points[:, d], dtype=np_float),
+            )
+
     # ---- 年化因子 ----
 
     assert isinstance(period_list, list), (
@@ -126,7 +209,7 @@ def init_params(
     )
     assert len(period_list) > 0, f"period length must > 1, but got {len(period_list)}"
     annualization_factor = get_annualization_factor(period_list[0])
-    set_params_list_value(
+    set_backtest_params_value(
         "annualization_factor",
         backtest_params,
         np.full((params_count,), annualization_factor, dtype=np_float),
@@ -9,7 +9,18 @@ from src.convert_params.nb_params_signature import (
     get_indicator_need_keys_signature,
 )
 from src.parallel_signature import params_list_type
-from src.indicators.calculate_indicators import MaxIndicatorCount as mic
+from src.indicators.indicator_layout import (
+    indicator_param_keys,
+    indicator_param_default_values,
+    indicator_output_keys,
+    indicator_enable_cols,
+    indicator_param_strides,
+    indicator_slot_counts,
+    indicator_output_counts,
+    indicator_slot_offsets,
+    indicator_slot_output_offsets,
+    indicator_required_fields,
+)
 from src.utils.constants import numba_config
 
 enable_cache = numba_config["enable_cache"]
@@ -18,6 +29,9 @@ nb_float = numba_config["nb"]["float"]
 
 @njit(get_indicator_params_signature, cache=enable_cache)
 def get_indicator_params(use_presets_indicator_params):
+    """
+    键和默认值分别来自 indicator_param_keys 和 indicator_param_default_values。
+    """
     params = Dict.empty(
         key_type=types.unicode_type,
         value_type=nb_float,
@@ -25,80 +39,33 @@ def get_indicator_params(use_presets_indicator_params):
     if not use_presets_indicator_params:
         return params
 
-    for i in range(mic.sma.value):
-        params[f"sma_enable_{i}"] = nb_float(0)
-        params[f"sma_period_{i}"] = nb_float(14)
-
-    for i in range(mic.ema.value):
-        params[f"ema_enable_{i}"] = nb_float(0)
-        params[f"ema_period_{i}"] = nb_float(14)
-
-    for i in range(mic.bbands.value):
-        params[f"bbands_enable_{i}"] = nb_float(0)
-        params[f"bbands_period_{i}"] = nb_float(14)
-        params[f"bbands_std_mult_{i}"] = nb_float(2.0)
-
-    for i in range(mic.rsi.value):
-        params[f"rsi_enable_{i}"] = nb_float(0)
-        params[f"rsi_period_{i}"] = nb_float(14)
-
-    for i in range(mic.atr.value):
-        params[f"atr_enable_{i}"] = nb_float(0)
-        params[f"atr_period_{i}"] = nb_float(14)
-
-    for i in range(mic.psar.value):
-        params[f"psar_enable_{i}"] = nb_float(0)
-        params[f"psar_af0_{i}"] = nb_float(0.02)
-        params[f"psar_af_step_{i}"] = nb_float(0.02)
-        params[f"psar_max_af_{i}"] = nb_float(0.2)
+    for c in range(len(indicator_param_default_values)):
+        params[indicator_param_keys[c]] = nb_float(indicator_param_default_values[c])
 
     return params
 
 
 @njit(get_indicator_need_keys_signature, cache=enable_cache)
-def get_indicator_need_keys(value_list):
+def get_indicator_need_keys(i_params_mtf):
+    """
+    i_params_mtf 是 (mtf, IndicatorParamIndex) 的参数矩阵,
+    返回每个周期下已开启指标的输出键, 要求的输出字段见 indicator_required_fields。
+    """
     outer_list = List.empty_list(List.empty_list(types.unicode_type))
 
-    for value_dict in value_list:
+    for m in range(i_params_mtf.shape[0]):
+        i_params = i_params_mtf[m]
         inner_list = List.empty_list(types.unicode_type)
-        for i in range(mic.sma.value):
-            if f"sma_enable_{i}" in value_dict and value_dict[f"sma_enable_{i}"]:
-                for v in (f"sma_{i}",):
-                    inner_list.append(v)
-
-        for i in range(mic.ema.value):
-            if f"ema_enable_{i}" in value_dict and value_dict[f"ema_enable_{i}"]:
-                for v in (f"ema_{i}",):
-                    inner_list.append(v)
-
-        for i in range(mic.bbands.value):
-            if f"bbands_enable_{i}" in value_dict and value_dict[f"bbands_enable_{i}"]:
-                for v in (
-                    f"bbands_upper_{i}",
-                    f"bbands_middle_{i}",
-                    f"bbands_lower_{i}",
-                ):
-                    inner_list.append(v)
-
-        for i in range(mic.rsi.value):
-            if f"rsi_enable_{i}" in value_dict and value_dict[f"rsi_enable_{i}"]:
-                for v in (f"rsi_{i}",):
-                    inner_list.append(v)
-
-        for i in range(mic.atr.value):
-            if f"atr_enable_{i}" in value_dict and value_dict[f"atr_enable_{i}"]:
-                for v in (f"atr_{i}",):
-                    inner_list.append(v)
-
-        for i in range(mic.psar.value):
-            if f"psar_enable_{i}" in value_dict and value_dict[f"psar_enable_{i}"]:
-                for v in (
-                    f"psar_long_{i}",
-                    f"psar_short_{i}",
-                    f"psar_af_{i}",
-                    f"psar_reversal_{i}",
-                ):
-                    inner_list.append(v)
+        for k in range(len(indicator_slot_counts)):
+            for s in range(indicator_slot_counts[k]):
+                if not i_params[
+                    indicator_enable_cols[k] + s * indicator_param_strides[k]
+                ]:
+                    continue
+                o = indicator_slot_output_offsets[indicator_slot_offsets[k] + s]
+                for j in range(indicator_output_counts[k]):
+                    if indicator_required_fields[k, j]:
+                        inner_list.append(indicator_output_keys[o + j])
         outer_list.append(inner_list)
     return outer_list
 
@@ -138,6 +105,13 @@ def get_backtest_params(use_presets_backtest_params):
     params["slippage_atr"] = nb_float(0.0)
     params["slippage_pct"] = nb_float(0.0)
     params["position_size"] = nb_float(1.0)
+    # 提前终止规则, 0代表关闭
+    params["prune_max_drawdown"] = nb_float(0.0)  # 回撤超过该值时终止, 例如0.3代表30%
+    params["prune_min_equity"] = nb_float(0.0)  # 净值低于该值时终止
+    params["prune_min_trades"] = nb_float(
+        0.0
+    )  # 到 prune_min_trades_bar 时交易次数不足则终止
+    params["prune_min_trades_bar"] = nb_float(0.0)
     params["annualization_factor"] = nb_float(0.0)
 
     return params
@@ -14,7 +14,15 @@ from src.convert_params.nb_params_signature import (
     set_params_list_value_mtf_signature,
     get_params_dict_value_signature,
     set_params_dict_value_signature,
+    indicator_params_to_row_signature,
+    backtest_params_to_row_signature,
+    convert_indicator_params_list_to_matrix_signature,
+    convert_backtest_params_list_to_matrix_signature,
+    create_indicator_params_matrix_signature,
+    create_backtest_params_matrix_signature,
 )
+from src.indicators.indicator_layout import indicator_param_keys
+from src.backtest.backtest_enums import backtest_param_keys
 
 
 from src.utils.constants import numba_config
@@ -181,3 +189,89 @@ def set_params_dict_value(key: str, params_dict, arr: np.ndarray):
         assert params_count == len(arr), "更新数量应该和原始数量一致"
 
     params_dict[key] = arr
+
+
+@njit(indicator_params_to_row_signature, cache=enable_cache)
+def indicator_params_to_row(params_dict):
+    """
+    把指标参数字典按 IndicatorParamIndex 转成一行,
+    字典中不存在的键填 0, 也就是对应槽位不开启。
+    """
+    row = np.zeros(len(indicator_param_keys), dtype=nb_float)
+    for c in range(len(indicator_param_keys)):
+        key = indicator_param_keys[c]
+        if key in params_dict:
+            row[c] = params_dict[key]
+    return row
+
+
+@njit(backtest_params_to_row_signature, cache=enable_cache)
+def backtest_params_to_row(params_dict):
+    """
+    把回测参数字典按 BacktestParamIndex 转成一行,
+    字典中不存在的键填 NaN, 回测和绩效阶段会据此判断参数缺失。
+    """
+    row = np.full(len(backtest_param_keys), np.nan, dtype=nb_float)
+    for c in range(len(backtest_param_keys)):
+        key = backtest_param_keys[c]
+        if key in params_dict:
+            row[c] = params_dict[key]
+    return row
+
+
+@njit(convert_indicator_params_list_to_matrix_signature, cache=enable_cache)
+def convert_indicator_params_list_to_matrix(params_list):
+    """
+    List[List[Dict]] -> (params_count, mtf_count, IndicatorParamIndex) 矩阵
+    """
+    params_count = len(params_list)
+    mtf_count = len(params_list[0]) if params_count > 0 else 0
+
+    matrix = np.zeros(
+        (params_count, mtf_count, len(indicator_param_keys)), dtype=nb_float
+    )
+    for i in range(params_count):
+        assert len(params_list[i]) == mtf_count, "每个参数组合的mtf数量需要相等"
+        for m in range(mtf_count):
+            matrix[i, m] = indicator_params_to_row(params_list[i][m])
+    return matrix
+
+
+@njit(convert_backtest_params_list_to_matrix_signature, cache=enable_cache)
+def convert_backtest_params_list_to_matrix(params_list):
+    """
+    List[Dict] -> (params_count, BacktestParamIndex) 矩阵
+    """
+    params_count = len(params_list)
+    matrix = np.empty((params_count, len(backtest_param_keys)), dtype=nb_float)
+    for i in range(params_count):
+        matrix[i] = backtest_params_to_row(params_list[i])
+    return matrix
+
+
+@njit(create_indicator_params_matrix_signature, cache=enable_cache)
+def create_indicator_params_matrix(
+    params_count, mtf_count, use_presets_indicator_params
+):
+    """
+    创建 (params_count, mtf_count, IndicatorParamIndex) 的指标参数矩阵,
+    默认值与 get_indicator_params 一致。
+    """
+    row = indicator_params_to_row(get_indicator_params(use_presets_indicator_params))
+    matrix = np.empty((params_count, mtf_count, len(row)), dtype=nb_float)
+    matrix[:, :, :] = row
+    return matrix
+
+
+@njit(create_backtest_params_matrix_signature, cache=enable_cache)
+def create_backtest_params_matrix(params_count, use_presets_backtest_params):
+    """
+    创建 (params_count, BacktestParamIndex) 的回测参数矩阵,
+    默认值与 get_backtest_params 一致。
+    """
+    assert params_count >= 0, "参数组合数量必须大于等于0"
+
+    row = backtest_params_to_row(get_backtest_params(use_presets_backtest_params))
+    matrix = np.empty((params_count, len(row)), dtype=nb_float)
+    matrix[:, :] = row
+    return matrix
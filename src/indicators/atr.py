@@ -1,14 +1,15 @@
 import numpy as np
-from numba import njit
+from numba import njit, types
 from src.utils.constants import numba_config
 
 
-from src.indicators.rsi import calc_rma
+from src.indicators.rsi import calc_rma, rma_update
 
 
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(nb_float[:](nb_float[:], nb_float[:], nb_float[:]), cache=enable_cache)
@@ -59,3 +60,28 @@ def calc_atr(high, low, close, period):
     result[period:] = atr_values[period - 1 :]
 
     return result
+
+
+@njit(
+    types.UniTuple(nb_acc, 2)(
+        nb_acc, nb_acc, nb_float, nb_float, nb_float, nb_int, nb_int
+    ),
+    cache=enable_cache,
+)
+def atr_update(prev_atr, seed_sum, high, low, prev_close, bar_index, period):
+    """
+    calc_atr 的增量版本, 计算第 bar_index 根K线的 ATR, 返回 (atr, seed_sum)。
+    与 calc_atr 的结果完全一致。
+    """
+    if bar_index == 0:
+        return np.nan, seed_sum
+
+    tr = np.maximum(
+        high - low,
+        np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)),
+    )
+    # calc_atr 对 tr[1:] 做 RMA, 所以序列位置是 bar_index - 1
+    atr, seed_sum = rma_update(prev_atr, seed_sum, tr, bar_index - 1, period)
+    if bar_index < period:
+        return np.nan, seed_sum
+    return atr, seed_sum
@@ -1,12 +1,13 @@
 import numpy as np
-from numba import njit
+from numba import njit, types
 from src.utils.constants import numba_config
-from src.indicators.sma import calc_sma
+from src.indicators.sma import calc_sma, sma_update
 
 
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(nb_float[:](nb_float[:], nb_float[:]), cache=enable_cache)
@@ -28,13 +29,21 @@ def calc_variance(close, period, ddof):
     # 初始化输出
     variance = np.full(num_data, np.nan, dtype=nb_float)
 
-    # 计算累积和与累积平方和
-    cumsum = np.cumsum(close)
-    cumsum_sq = np.cumsum(close**2)
+    # 计算累积和与累积平方和, 按累加精度保存
+    cumsum = np.empty(num_data, dtype=nb_acc)
+    cumsum_sq = np.empty(num_data, dtype=nb_acc)
+    total = nb_acc(0.0)
+    total_sq = nb_acc(0.0)
+    for i in range(num_data):
+        x = nb_acc(close[i])
+        total += x
+        total_sq += x * x
+        cumsum[i] = total
+        cumsum_sq[i] = total_sq
 
     # 计算滚动窗口的 sum(x) 和 sum(x^2)
-    rolling_sum = np.empty(num_data, dtype=nb_float)
-    rolling_sum_sq = np.empty(num_data, dtype=nb_float)
+    rolling_sum = np.empty(num_data, dtype=nb_acc)
+    rolling_sum_sq = np.empty(num_data, dtype=nb_acc)
 
     # 前 period-1 个值为 NaN
     rolling_sum[: period - 1] = np.nan
@@ -69,6 +78,67 @@ def calc_stdev(close, period):
     return stdev_result
 
 
+@njit(nb_float[:, :](nb_float[:], nb_int), cache=enable_cache)
+def calc_bbands_mean_std(close, length):
+    """
+    布林带中与 std_mult 无关的部分, 返回 (2, K线数量): 中轨 (SMA) 和标准差。
+    同一个 period 的所有 std_mult 共用这一结果, 见 set_bbands_bands。
+    """
+    num_data = len(close)
+    mean_std = np.empty((2, num_data), dtype=nb_float)
+    if length <= 1 or num_data < length:
+        mean_std[:] = np.nan
+        return mean_std
+
+    mean_std[0] = calc_sma(close, length)
+    mean_std[1] = calc_stdev(close, length)
+    return mean_std
+
+
+@njit(cache=enable_cache)
+def set_bbands_bands(close, mid_band, std_dev, std, out, need_fields):
+    """
+    由中轨和标准差计算 std_mult 为 std 的布林带, 写入 out: (5, K线数量),
+    行顺序为 upper, middle, lower, bandwidth, percent。
+    need_fields[j] 为 False 的行不计算也不写入, bandwidth 和 percent 都不需要时跳过 non_zero_range。
+    """
+    num_data = len(close)
+
+    # 步骤 1: 计算上下轨
+    deviations = std * std_dev
+    upper_band = mid_band + deviations
+    lower_band = mid_band - deviations
+
+    if need_fields[0]:
+        out[0] = upper_band
+    if need_fields[1]:
+        out[1] = mid_band
+    if need_fields[2]:
+        out[2] = lower_band
+    if not (need_fields[3] or need_fields[4]):
+        return
+
+    # 步骤 2: 计算带宽和百分比
+    ulr = non_zero_range(upper_band, lower_band)
+
+    if need_fields[3]:
+        # 带宽计算：当 mid_band 为 0 时，结果应为 inf 或 nan，这里用 nan
+        bandwidth = np.full(num_data, np.nan, dtype=nb_float)
+        non_zero_mid_mask = mid_band != 0
+        bandwidth[non_zero_mid_mask] = (
+            100 * ulr[non_zero_mid_mask] / mid_band[non_zero_mid_mask]
+        )
+        out[3] = bandwidth
+
+    if need_fields[4]:
+        numerator_p = non_zero_range(close, lower_band)
+        out[4] = numerator_p / ulr  # 让 NumPy 自行处理除法和 NaN/inf 的传播
+
+
+# calc_bbands 输出全部5个字段
+bbands_all_fields = np.ones(5, dtype=np.bool_)
+
+
 @njit(nb_float[:, :](nb_float[:], nb_int, nb_float), cache=enable_cache)
 def calc_bbands(close, length, std):
     bbands_period = length
@@ -80,35 +150,51 @@ def calc_bbands(close, length, std):
         res_bbands[:] = np.nan
         return res_bbands
 
-    # 步骤 1: 计算中轨
-    mid_band = calc_sma(close, bbands_period)
+    # 中轨和标准差, 再按 std_mult 得到上下轨、带宽和百分比
+    mean_std = calc_bbands_mean_std(close, bbands_period)
+    set_bbands_bands(
+        close,
+        mean_std[0],
+        mean_std[1],
+        bbands_std_mult,
+        res_bbands.T,
+        bbands_all_fields,
+    )
+
+    return res_bbands
 
-    # 步骤 2: 计算标准差
-    std_dev = calc_stdev(close, bbands_period)
-    deviations = bbands_std_mult * std_dev
 
-    # 步骤 3: 计算上下轨
+@njit(
+    types.UniTuple(nb_float, 5)(nb_acc, nb_acc, nb_float, nb_int, nb_int, nb_float),
+    cache=enable_cache,
+)
+def bbands_update(window_sum, window_sq_sum, close, bar_index, period, std_mult):
+    """
+    calc_bbands 的增量版本, 返回 (upper, middle, lower, bandwidth, percent)。
+    window_sum 和 window_sq_sum 是以 bar_index 结尾的 period 根收盘价之和与平方和,
+    由调用方维护 (见 window_sum_step), 方差与 calc_variance 的计算方式相同。
+    non_zero_range 的 epsilon 只在当前K线的差值为0时加上。
+    """
+    if period <= 1 or bar_index < period - 1:
+        return np.nan, np.nan, np.nan, np.nan, np.nan
+
+    mid_band = sma_update(window_sum, bar_index, period)
+    variance = (window_sq_sum - (window_sum**2 / period)) / period
+    deviations = std_mult * np.sqrt(variance)
+
     upper_band = mid_band + deviations
     lower_band = mid_band - deviations
 
-    # 步骤 4: 计算带宽和百分比
-    ulr = non_zero_range(upper_band, lower_band)
+    epsilon = np.finfo(nb_float).eps
+    ulr = upper_band - lower_band
+    if ulr == 0:
+        ulr += epsilon
 
-    # 带宽计算：当 mid_band 为 0 时，结果应为 inf 或 nan，这里用 nan
-    bandwidth = np.full(num_data, np.nan, dtype=nb_float)
-    non_zero_mid_mask = mid_band != 0
-    bandwidth[non_zero_mid_mask] = (
-        100 * ulr[non_zero_mid_mask] / mid_band[non_zero_mid_mask]
-    )
+    bandwidth = 100 * ulr / mid_band if mid_band != 0 else np.nan
 
-    numerator_p = non_zero_range(close, lower_band)
-    percent = numerator_p / ulr  # 让 NumPy 自行处理除法和 NaN/inf 的传播
+    numerator_p = close - lower_band
+    if numerator_p == 0:
+        numerator_p += epsilon
+    percent = numerator_p / ulr
 
-    # 将结果整合到 NumPy 数组
-    res_bbands[:, 0] = upper_band
-    res_bbands[:, 1] = mid_band
-    res_bbands[:, 2] = lower_band
-    res_bbands[:, 3] = bandwidth
-    res_bbands[:, 4] = percent
-
-    return res_bbands
+    return upper_band, mid_band, lower_band, bandwidth, percent
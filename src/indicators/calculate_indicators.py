@@ -7,82 +7,53 @@ from src.utils.nb_check_keys import check_data_for_indicators
 from src.parallel_signature import indicators_signature
 
 
-from .sma import calc_sma
-from .ema import calc_ema
-from .bbands import calc_bbands
-from .rsi import calc_rsi
-from .atr import calc_atr
-from .psar import calc_psar
-
-from enum import IntEnum
+from .indicator_cache import calc_indicator_by_id
+from .indicator_layout import (
+    MaxIndicatorCount,
+    indicator_output_keys,
+    indicator_enable_cols,
+    indicator_param_strides,
+    indicator_slot_counts,
+    indicator_output_counts,
+    indicator_slot_offsets,
+    indicator_slot_output_offsets,
+    indicator_param_max,
+)
 
 
 enable_cache = numba_config["enable_cache"]
 nb_float = numba_config["nb"]["float"]
 
 
-class MaxIndicatorCount(IntEnum):
-    sma = 3
-    ema = 3
-    bbands = 1
-    rsi = 1
-    atr = 1
-    psar = 1
-
-
 mic = MaxIndicatorCount
 
 
 @njit(indicators_signature, cache=enable_cache)
 def calc_indicators(ohlcv, i_params, i_output):
+    """
+    i_params 是按 IndicatorParamIndex 排列的一行参数,
+    第 i 个槽位的列 = 第0个槽位的列 + i * 该指标的 stride。
+    按 (指标编号, 槽位) 遍历, 输出键按输出编号从 indicator_output_keys 中取,
+    计算见 calc_indicator_by_id。
+    """
     if not check_data_for_indicators(ohlcv):
         return
 
-    for i in range(mic.sma.value):
-        if f"sma_enable_{i}" in i_params and i_params[f"sma_enable_{i}"]:
-            i_output[f"sma_{i}"] = calc_sma(ohlcv["close"], i_params[f"sma_period_{i}"])
-
-    for i in range(mic.ema.value):
-        if f"ema_enable_{i}" in i_params and i_params[f"ema_enable_{i}"]:
-            i_output[f"ema_{i}"] = calc_ema(ohlcv["close"], i_params[f"ema_period_{i}"])
-
-    for i in range(mic.bbands.value):
-        if f"bbands_enable_{i}" in i_params and i_params[f"bbands_enable_{i}"]:
-            bbands = calc_bbands(
-                ohlcv["close"],
-                int(i_params[f"bbands_period_{i}"]),
-                i_params[f"bbands_std_mult_{i}"],
+    data_count = len(ohlcv["close"])
+    for k in range(len(indicator_slot_counts)):
+        stride = indicator_param_strides[k]
+        for s in range(indicator_slot_counts[k]):
+            col = indicator_enable_cols[k] + s * stride
+            if not i_params[col]:
+                continue
+
+            p = np.zeros(indicator_param_max, dtype=nb_float)
+            p[: stride - 1] = i_params[col + 1 : col + stride]
+            out = np.full(
+                (indicator_output_counts[k], data_count), np.nan, dtype=nb_float
             )
-            i_output[f"bbands_upper_{i}"] = bbands[:, 0]
-            i_output[f"bbands_middle_{i}"] = bbands[:, 1]
-            i_output[f"bbands_lower_{i}"] = bbands[:, 2]
-            i_output[f"bbands_bandwidth_{i}"] = bbands[:, 3]
-            i_output[f"bbands_percent_{i}"] = bbands[:, 4]
+            calc_indicator_by_id(k, ohlcv, p, out)
 
-    for i in range(mic.rsi.value):
-        if f"rsi_enable_{i}" in i_params and i_params[f"rsi_enable_{i}"]:
-            i_output[f"rsi_{i}"] = calc_rsi(ohlcv["close"], i_params[f"rsi_period_{i}"])
-
-    for i in range(mic.atr.value):
-        if f"atr_enable_{i}" in i_params and i_params[f"atr_enable_{i}"]:
-            i_output[f"atr_{i}"] = calc_atr(
-                ohlcv["high"],
-                ohlcv["low"],
-                ohlcv["close"],
-                i_params[f"atr_period_{i}"],
-            )
-
-    for i in range(mic.psar.value):
-        if f"psar_enable_{i}" in i_params and i_params[f"psar_enable_{i}"]:
-            psar = calc_psar(
-                ohlcv["high"],
-                ohlcv["low"],
-                ohlcv["close"],
-                i_params[f"psar_af0_{i}"],
-                i_params[f"psar_af_step_{i}"],
-                i_params[f"psar_max_af_{i}"],
-            )
-            i_output[f"psar_long_{i}"] = psar[:, 0]
-            i_output[f"psar_short_{i}"] = psar[:, 1]
-            i_output[f"psar_af_{i}"] = psar[:, 2]
-            i_output[f"psar_reversal_{i}"] = psar[:, 3]
+            o = indicator_slot_output_offsets[indicator_slot_offsets[k] + s]
+            for j in range(indicator_output_counts[k]):
+                i_output[indicator_output_keys[o + j]] = out[j]
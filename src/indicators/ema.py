@@ -1,33 +1,100 @@
 import numpy as np
-from numba import njit
+from numba import njit, types
 from src.utils.constants import numba_config
 
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(nb_float[:](nb_float[:], nb_int), cache=enable_cache)
 def calc_ema(close, period):
     # 如果周期大于等于输入数据长度，或者周期小于等于 1，直接返回空数组或 NaN 数组
     if period >= len(close) or period <= 1:
-        return np.full_like(close, np.nan, dtype=np.float64)
+        return np.full(len(close), np.nan, dtype=nb_float)
 
-    ema = np.full_like(close, np.nan, dtype=np.float64)
+    ema = np.full(len(close), np.nan, dtype=nb_float)
     alpha = 2.0 / (period + 1.0)
 
     # TA Lib 和 pandas-ta 默认行为：使用前 period 个数的 SMA 作为第一个 EMA 值
-    sma_period = close[:period]
-    if len(sma_period) < period:
-        # 如果数据不够 period 长度，返回全 NaN 数组
-        return np.full_like(close, np.nan, dtype=np.float64)
-
-    # 计算 SMA 作为 EMA 的初始值
-    initial_ema = np.sum(sma_period) / period
-    ema[period - 1] = initial_ema
+    # 递推值用累加精度的标量保存, 不从存储精度的 ema 数组读回
+    seed = nb_acc(0.0)
+    for i in range(period):
+        seed += close[i]
+    last_ema = seed / period
+    ema[period - 1] = last_ema
 
     # 循环计算后续的 EMA 值
     for i in range(period, len(close)):
-        ema[i] = alpha * close[i] + (1 - alpha) * ema[i - 1]
+        last_ema = alpha * close[i] + (1 - alpha) * last_ema
+        ema[i] = last_ema
 
     return ema
+
+
+# calc_ema_batch 每次处理的K线数量, 一段收盘价在所有周期之间复用时保持在缓存中
+EMA_BATCH_TILE = 4096
+
+
+@njit(nb_float[:, :](nb_float[:], nb_int[:]), cache=enable_cache)
+def calc_ema_batch(close, periods):
+    """
+    一次遍历 close 计算多个周期的 EMA, 返回 (len(periods), K线数量),
+    第 k 行与 calc_ema(close, periods[k]) 完全一致。
+    close 按 EMA_BATCH_TILE 分段, 每段依次推进所有周期的递推状态, 每行的写入保持连续。
+    """
+    num_data = len(close)
+    period_count = len(periods)
+    ema_result = np.empty((period_count, num_data), dtype=nb_float)
+
+    # 每个周期的上一个 EMA 值和前 period 根收盘价的累加和
+    last_ema = np.zeros(period_count, dtype=nb_acc)
+    seed_sum = np.zeros(period_count, dtype=nb_acc)
+    for tile_start in range(0, num_data, EMA_BATCH_TILE):
+        tile_stop = min(tile_start + EMA_BATCH_TILE, num_data)
+        for k in range(period_count):
+            period = periods[k]
+            row = ema_result[k]
+            if period >= num_data or period <= 1:
+                row[tile_start:tile_stop] = np.nan
+                continue
+
+            alpha = 2.0 / (period + 1.0)
+            ema = last_ema[k]
+            seed = seed_sum[k]
+            for i in range(tile_start, tile_stop):
+                if i < period:
+                    seed += close[i]
+                    if i < period - 1:
+                        row[i] = np.nan
+                        continue
+                    ema = seed / period
+                else:
+                    ema = alpha * close[i] + (1 - alpha) * ema
+                row[i] = ema
+            last_ema[k] = ema
+            seed_sum[k] = seed
+    return ema_result
+
+
+@njit(
+    types.UniTuple(nb_acc, 2)(nb_acc, nb_acc, nb_float, nb_int, nb_int),
+    cache=enable_cache,
+)
+def ema_update(prev_ema, seed_sum, close, bar_index, period):
+    """
+    calc_ema 的增量版本, 返回 (ema, seed_sum)。
+    前 period 根收盘价累加到 seed_sum, 第 period - 1 根K线用它的均值作为初始值,
+    之后按 alpha = 2 / (period + 1) 递推, 与 calc_ema 的结果完全一致。
+    """
+    if period <= 1:
+        return np.nan, seed_sum
+    if bar_index < period:
+        seed_sum += close
+        if bar_index < period - 1:
+            return np.nan, seed_sum
+        return seed_sum / period, seed_sum
+
+    alpha = 2.0 / (period + 1.0)
+    return alpha * close + (1 - alpha) * prev_ema, seed_sum
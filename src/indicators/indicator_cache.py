@@ -0,0 +1,379 @@
+import numpy as np
+from numba import njit, prange
+from numba.core import types
+from numba.np.unsafe.ndarray import to_fixed_tuple
+from numba.typed import Dict, List
+from src.utils.constants import numba_config
+
+from src.utils.nb_check_keys import check_data_for_indicators
+from src.parallel_schedule import schedule_bin_count
+
+
+from .sma import calc_sma, calc_sma_batch
+from .ema import calc_ema, calc_ema_batch
+from .bbands import calc_bbands, calc_bbands_mean_std, set_bbands_bands
+from .rsi import calc_rsi, calc_rsi_batch
+from .atr import calc_atr
+from .psar import calc_psar, set_psar_batch
+
+from .indicator_layout import (
+    iid,
+    indicator_output_keys,
+    indicator_enable_cols,
+    indicator_param_strides,
+    indicator_slot_counts,
+    indicator_output_counts,
+    indicator_slot_offsets,
+    indicator_slot_output_offsets,
+    indicator_slot_total,
+    indicator_param_max,
+)
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+
+# 唯一参数的字典键, 参数不足 indicator_param_max 个时用 0 补齐
+unique_key_type = types.UniTuple(nb_float, indicator_param_max)
+
+# psar 每个并发任务最多同步推进的唯一参数数量 (见 set_psar_batch, get_batch_width)
+PSAR_BATCH_WIDTH = 8
+# sma/ema/rsi 每个并发任务最多批量计算的唯一周期数量 (见 calc_close_batch_by_id)
+CLOSE_BATCH_WIDTH = 16
+
+
+"""
+跨参数组合的指标缓存。
+大量参数组合共享相同的指标参数(例如相同的 sma_period_0),
+在 prange 之前收集 (mtf, 指标, 参数) 的唯一组合, 每个唯一组合只计算一次,
+每个参数组合的 i_output 只保存指向缓存的只读视图。
+
+缓存按 block 组织, block = m * len(iid) + 指标编号,
+每个 block 是 (唯一参数数量, 指标输出数量, K线数量) 的三维数组。
+
+bbands 的中轨和标准差只与 period 有关, 每个 block 先按唯一 period 计算一次,
+不同 std_mult 的唯一参数只做逐元素的缩放 (见 calc_bbands_mean_std)。
+psar 的唯一参数多于线程数时, 每批不超过 PSAR_BATCH_WIDTH 个唯一参数作为一个任务,
+在同一次K线遍历中同步推进, 否则每个唯一参数单独作为一个任务。
+sma/ema/rsi 同理, 每批不超过 CLOSE_BATCH_WIDTH 个唯一周期, 分段读取的 close 在所有周期之间复用。
+批量计算与逐个计算的结果完全一致, 分批方式只影响速度。
+"""
+
+
+@njit(cache=enable_cache)
+def collect_indicator_cache_index(indicator_params_mtf):
+    """
+    indicator_params_mtf: (params_count, mtf_count, IndicatorParamIndex)
+    返回:
+      cache_index: (params_count, mtf_count, indicator_slot_total),
+                   每个槽位在对应 block 中的唯一编号, 未开启为 -1
+      unique_params: 每个 block 的唯一参数 (唯一参数数量, indicator_param_max)
+    """
+    params_count = indicator_params_mtf.shape[0]
+    mtf_count = indicator_params_mtf.shape[1]
+    kind_count = len(indicator_slot_counts)
+    block_count = mtf_count * kind_count
+
+    seen_list = List()
+    for _ in range(block_count):
+        seen_list.append(Dict.empty(key_type=unique_key_type, value_type=nb_int))
+
+    cache_index = np.full(
+        (params_count, mtf_count, indicator_slot_total), -1, dtype=nb_int
+    )
+
+    for i in range(params_count):
+        for m in range(mtf_count):
+            i_params = indicator_params_mtf[i, m]
+            for k in range(kind_count):
+                seen = seen_list[m * kind_count + k]
+                stride = indicator_param_strides[k]
+                for s in range(indicator_slot_counts[k]):
+                    col = indicator_enable_cols[k] + s * stride
+                    if not i_params[col]:
+                        continue
+
+                    p = np.zeros(indicator_param_max, dtype=nb_float)
+                    p[: stride - 1] = i_params[col + 1 : col + stride]
+                    key = to_fixed_tuple(p, indicator_param_max)
+
+                    if key not in seen:
+                        seen[key] = nb_int(len(seen))
+                    cache_index[i, m, indicator_slot_offsets[k] + s] = seen[key]
+
+    unique_params = List()
+    for b in range(block_count):
+        seen = seen_list[b]
+        p = np.zeros((len(seen), indicator_param_max), dtype=nb_float)
+        for key, u in seen.items():
+            for j in range(indicator_param_max):
+                p[u, j] = key[j]
+        unique_params.append(p)
+
+    return cache_index, unique_params
+
+
+@njit(cache=enable_cache)
+def calc_indicator_by_id(indicator_id, ohlcv, p, out):
+    """
+    按指标编号计算一个唯一参数组合, 结果写入 out: (指标输出数量, K线数量)
+    """
+    close = ohlcv["close"]
+
+    if indicator_id == iid.sma.value:
+        out[0] = calc_sma(close, p[0])
+
+    elif indicator_id == iid.ema.value:
+        out[0] = calc_ema(close, p[0])
+
+    elif indicator_id == iid.bbands.value:
+        bbands = calc_bbands(close, int(p[0]), p[1])
+        for j in range(bbands.shape[1]):
+            out[j] = bbands[:, j]
+
+    elif indicator_id == iid.rsi.value:
+        out[0] = calc_rsi(close, p[0])
+
+    elif indicator_id == iid.atr.value:
+        out[0] = calc_atr(ohlcv["high"], ohlcv["low"], close, p[0])
+
+    elif indicator_id == iid.psar.value:
+        psar = calc_psar(ohlcv["high"], ohlcv["low"], close, p[0], p[1], p[2])
+        # 数据少于2根时 calc_psar 返回空数组, 保持 NaN
+        if psar.shape[0] == out.shape[1]:
+            for j in range(psar.shape[1]):
+                out[j] = psar[:, j]
+
+
+@njit(cache=enable_cache)
+def collect_bbands_period_index(unique_params):
+    """
+    返回每个 block 的 (唯一 period, 每个唯一参数对应的唯一 period 编号),
+    不是 bbands 的 block 为空数组。
+    """
+    kind_count = len(indicator_slot_counts)
+    bbands_periods = List()
+    bbands_period_index = List()
+    for b in range(len(unique_params)):
+        p = unique_params[b]
+        unique_count = len(p) if b % kind_count == iid.bbands.value else 0
+        seen = Dict.empty(key_type=nb_int, value_type=nb_int)
+        period_index = np.empty(unique_count, dtype=nb_int)
+        for u in range(unique_count):
+            period = nb_int(p[u, 0])
+            if period not in seen:
+                seen[period] = nb_int(len(seen))
+            period_index[u] = seen[period]
+        periods = np.empty(len(seen), dtype=nb_int)
+        for period, j in seen.items():
+            periods[j] = period
+        bbands_periods.append(periods)
+        bbands_period_index.append(period_index)
+    return bbands_periods, bbands_period_index
+
+
+@njit(cache=enable_cache)
+def get_batch_width(unique_params, indicator_id, max_width):
+    """
+    indicator_id 每个任务批量计算的唯一参数数量。
+    批量计算只节省重复读取K线数据, 每个参数的递推仍然逐个串行执行,
+    所以只在所有周期的唯一参数多于线程数时才合并, 并保证任务数量不少于线程数。
+    """
+    kind_count = len(indicator_slot_counts)
+    unique_count = 0
+    for b in range(indicator_id, len(unique_params), kind_count):
+        unique_count += len(unique_params[b])
+    width = (unique_count + schedule_bin_count - 1) // schedule_bin_count
+    return max(1, min(width, max_width))
+
+
+@njit(cache=enable_cache)
+def get_indicator_batch_widths(unique_params):
+    """
+    返回每个指标编号的批量宽度, 不支持批量计算的指标为 1。
+    """
+    batch_widths = np.ones(len(indicator_slot_counts), dtype=nb_int)
+    batch_widths[iid.psar.value] = get_batch_width(
+        unique_params, iid.psar.value, PSAR_BATCH_WIDTH
+    )
+    for indicator_id in (iid.sma.value, iid.ema.value, iid.rsi.value):
+        batch_widths[indicator_id] = get_batch_width(
+            unique_params, indicator_id, CLOSE_BATCH_WIDTH
+        )
+    return batch_widths
+
+
+@njit(cache=enable_cache)
+def get_block_task_count(indicator_id, unique_count, batch_widths):
+    """
+    一个 block 在 calc_indicator_cache 主循环中的任务数量。
+    """
+    width = batch_widths[indicator_id]
+    return (unique_count + width - 1) // width
+
+
+@njit(cache=enable_cache)
+def calc_close_batch_by_id(indicator_id, close, periods, out):
+    """
+    批量计算只依赖 close 的单输出指标 (sma/ema/rsi),
+    periods 是这一批唯一参数的周期, 结果写入 out: (len(periods), 1, K线数量)
+    """
+    if indicator_id == iid.sma.value:
+        result = calc_sma_batch(close, periods)
+    elif indicator_id == iid.ema.value:
+        result = calc_ema_batch(close, periods)
+    else:
+        result = calc_rsi_batch(close, periods)
+    for j in range(len(periods)):
+        out[j, 0] = result[j]
+
+
+@njit(parallel=True, cache=enable_cache)
+def calc_indicator_cache(ohlcv_mtf, unique_params, need_fields):
+    """
+    并发计算所有唯一参数组合, 返回每个 block 的三维结果数组。
+    need_fields: (IndicatorId, 输出字段) 的布尔数组, 为 False 的输出字段不计算, 保持 NaN,
+    目前只有 bbands 会跳过。需要输出指标数组时传入 indicator_all_fields,
+    只算绩效时由信号用到的字段决定 (见 get_signal_need_fields)。
+    """
+    kind_count = len(indicator_slot_counts)
+    block_count = len(unique_params)
+
+    batch_widths = get_indicator_batch_widths(unique_params)
+
+    indicator_cache = List()
+    task_count = 0
+    for b in range(block_count):
+        m = b // kind_count
+        k = b % kind_count
+        data_count = 0
+        if check_data_for_indicators(ohlcv_mtf[m]):
+            data_count = len(ohlcv_mtf[m]["close"])
+        indicator_cache.append(
+            np.full(
+                (len(unique_params[b]), indicator_output_counts[k], data_count),
+                np.nan,
+                dtype=nb_float,
+            )
+        )
+        task_count += get_block_task_count(k, len(unique_params[b]), batch_widths)
+
+    # bbands 每个唯一 period 的中轨和标准差: (唯一 period 数量, 2, K线数量)
+    bbands_periods, bbands_period_index = collect_bbands_period_index(unique_params)
+    bbands_mean_std = List()
+    mean_std_count = 0
+    for b in range(block_count):
+        data_count = indicator_cache[b].shape[2]
+        bbands_mean_std.append(
+            np.empty((len(bbands_periods[b]), 2, data_count), dtype=nb_float)
+        )
+        mean_std_count += len(bbands_periods[b])
+
+    # 把 (block, 唯一编号) 展平, 方便 prange 均匀分配
+    task_block = np.empty(task_count + mean_std_count, dtype=nb_int)
+    task_unique = np.empty(task_count + mean_std_count, dtype=nb_int)
+    t = 0
+    for b in range(block_count):
+        for j in range(len(bbands_periods[b])):
+            task_block[t] = b
+            task_unique[t] = j
+            t += 1
+    for b in range(block_count):
+        # 批量计算的任务保存这一批唯一参数的起始编号
+        for u in range(0, len(unique_params[b]), batch_widths[b % kind_count]):
+            task_block[t] = b
+            task_unique[t] = u
+            t += 1
+
+    # 先计算 bbands 的中轨和标准差, 再计算所有唯一参数
+    for t in prange(mean_std_count):
+        b = task_block[t]
+        if indicator_cache[b].shape[2] == 0:
+            continue
+        ohlcv = ohlcv_mtf[b // kind_count]
+        bbands_mean_std[b][task_unique[t]] = calc_bbands_mean_std(
+            ohlcv["close"], bbands_periods[b][task_unique[t]]
+        )
+
+    for t in prange(mean_std_count, task_count + mean_std_count):
+        b = task_block[t]
+        k = b % kind_count
+        u = task_unique[t]
+        ohlcv = ohlcv_mtf[b // kind_count]
+        if not check_data_for_indicators(ohlcv):
+            continue
+        p = unique_params[b]
+        u_stop = min(u + batch_widths[k], len(p))
+        if k == iid.bbands.value:
+            mean_std = bbands_mean_std[b][bbands_period_index[b][u]]
+            set_bbands_bands(
+                ohlcv["close"],
+                mean_std[0],
+                mean_std[1],
+                p[u, 1],
+                indicator_cache[b][u],
+                need_fields[iid.bbands.value],
+            )
+        elif k == iid.psar.value:
+            set_psar_batch(
+                ohlcv["high"],
+                ohlcv["low"],
+                ohlcv["close"],
+                p[u:u_stop, 0],
+                p[u:u_stop, 1],
+                p[u:u_stop, 2],
+                indicator_cache[b][u:u_stop],
+            )
+        elif u_stop - u > 1:
+            calc_close_batch_by_id(
+                k,
+                ohlcv["close"],
+                p[u:u_stop, 0].astype(nb_int),
+                indicator_cache[b][u:u_stop],
+            )
+        else:
+            calc_indicator_by_id(k, ohlcv, p[u], indicator_cache[b][u])
+
+    return indicator_cache
+
+
+@njit(cache=enable_cache)
+def fill_indicator_output(ohlcv, m, cache_index_row, indicator_cache, i_output):
+    """
+    把第 m 个周期的缓存视图放入单个参数组合的 i_output, 键名与 calc_indicators 一致。
+    输出键按输出编号从 indicator_output_keys 中取, 不在运行时拼接。
+    """
+    if not check_data_for_indicators(ohlcv):
+        return
+
+    kind_count = len(indicator_slot_counts)
+    b0 = m * kind_count
+
+    for k in range(kind_count):
+        for s in range(indicator_slot_counts[k]):
+            slot = indicator_slot_offsets[k] + s
+            u = cache_index_row[slot]
+            if u < 0:
+                continue
+            out = indicator_cache[b0 + k][u]
+            o = indicator_slot_output_offsets[slot]
+            for j in range(indicator_output_counts[k]):
+                i_output[indicator_output_keys[o + j]] = out[j]
+
+
+@njit(cache=enable_cache)
+def get_indicator_output(
+    indicator_cache, cache_index_mtf, block_offset, m, indicator_id, slot, field
+):
+    """
+    批量信号按整数编号读取共享缓存, 与增量回测的 get_indicator_value 对应。
+    返回单个参数组合第 m 个周期某个指标槽位的输出视图, 字段顺序见 indicator_output_fields。
+    第 m 个周期在缓存中的周期编号为 block_offset + m, 单品种为 0。
+    槽位未开启时返回 NaN 数组, 比较结果都为 False。
+    """
+    b = (block_offset + m) * len(indicator_slot_counts) + indicator_id
+    u = cache_index_mtf[m, indicator_slot_offsets[indicator_id] + slot]
+    if u < 0:
+        return np.full(indicator_cache[b].shape[2], np.nan, dtype=nb_float)
+    return indicator_cache[b][u, field]
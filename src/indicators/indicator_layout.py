@@ -0,0 +1,170 @@
+import numpy as np
+from enum import IntEnum
+
+
+# 每个指标的槽位数量, 参数列、输出键和缓存布局都由这里和下面的字段表生成,
+# 增加槽位只需修改这里, 增加指标还需要在 calc_indicator_by_id 和 update_indicator_by_id 中实现计算
+class MaxIndicatorCount(IntEnum):
+    sma = 3
+    ema = 3
+    bbands = 1
+    rsi = 1
+    atr = 1
+    psar = 1
+
+
+mic = MaxIndicatorCount
+
+
+# 每个指标一个槽位需要的参数字段, 顺序即参数矩阵中的列顺序
+indicator_param_fields = {
+    "sma": ("enable", "period"),
+    "ema": ("enable", "period"),
+    "bbands": ("enable", "period", "std_mult"),
+    "rsi": ("enable", "period"),
+    "atr": ("enable", "period"),
+    "psar": ("enable", "af0", "af_step", "max_af"),
+}
+
+# 参数矩阵的列名, 与 f"{name}_{field}_{i}" 的字典键一一对应
+indicator_param_keys = tuple(
+    f"{name}_{field}_{i}"
+    for name, fields in indicator_param_fields.items()
+    for i in range(mic[name].value)
+    for field in fields
+)
+
+# 列索引在编译期就是常量, numba中需要用 .value 取值
+IndicatorParamIndex = IntEnum(
+    "IndicatorParamIndex", [(k, c) for c, k in enumerate(indicator_param_keys)]
+)
+
+# 同一指标相邻两个槽位之间的列距离
+# 例如 sma_period_{i} 的列 = ipi.sma_period_0.value + i * ips.sma.value
+IndicatorParamStride = IntEnum(
+    "IndicatorParamStride",
+    [(name, len(fields)) for name, fields in indicator_param_fields.items()],
+)
+
+ipi = IndicatorParamIndex
+ips = IndicatorParamStride
+
+
+# 指标编号, 与 indicator_param_fields 的顺序一致
+IndicatorId = IntEnum(
+    "IndicatorId", [(name, k) for k, name in enumerate(indicator_param_fields)]
+)
+
+iid = IndicatorId
+
+# 每个指标一个槽位的输出字段, 输出键见 get_indicator_output_key
+indicator_output_fields = {
+    "sma": ("",),
+    "ema": ("",),
+    "bbands": ("upper", "middle", "lower", "bandwidth", "percent"),
+    "rsi": ("",),
+    "atr": ("",),
+    "psar": ("long", "short", "af", "reversal"),
+}
+
+# 信号检查数据时要求存在的输出字段 (见 get_indicator_need_keys), 未列出的指标要求全部字段
+indicator_required_output_fields = {
+    "bbands": ("upper", "middle", "lower"),
+}
+
+# 每个指标一个槽位的默认参数, 与 indicator_param_fields 一一对应
+indicator_param_defaults = {
+    "sma": (0, 14),
+    "ema": (0, 14),
+    "bbands": (0, 14, 2.0),
+    "rsi": (0, 14),
+    "atr": (0, 14),
+    "psar": (0, 0.02, 0.02, 0.2),
+}
+
+
+def get_indicator_output_key(name, field, i):
+    """
+    输出字典的键, 例如 bbands_upper_0, 字段为空时为 sma_0。
+    """
+    return f"{name}_{field}_{i}" if field else f"{name}_{i}"
+
+
+# 所有输出键按 (指标, 槽位, 输出字段) 展平, 位置即输出编号。
+# numba 中只按输出编号取全局元组中的常量字符串, 不在运行时拼接键名
+indicator_output_keys = tuple(
+    get_indicator_output_key(name, field, i)
+    for name in indicator_param_fields
+    for i in range(mic[name].value)
+    for field in indicator_output_fields[name]
+)
+
+IndicatorOutputIndex = IntEnum(
+    "IndicatorOutputIndex", [(k, c) for c, k in enumerate(indicator_output_keys)]
+)
+
+ioi = IndicatorOutputIndex
+
+# 参数矩阵每一列的默认值, 按 IndicatorParamIndex 排列
+indicator_param_default_values = np.array(
+    [
+        indicator_param_defaults[name][f]
+        for name, fields in indicator_param_fields.items()
+        for i in range(mic[name].value)
+        for f in range(len(fields))
+    ],
+    dtype=np.float64,
+)
+
+# 以下常量数组按 IndicatorId 索引, numba 会把全局数组冻结为编译期常量
+indicator_enable_cols = np.array(
+    [ipi[f"{name}_enable_0"].value for name in indicator_param_fields],
+    dtype=np.int64,
+)
+indicator_param_strides = np.array(
+    [len(fields) for fields in indicator_param_fields.values()], dtype=np.int64
+)
+indicator_slot_counts = np.array(
+    [mic[name].value for name in indicator_param_fields], dtype=np.int64
+)
+indicator_output_counts = np.array(
+    [len(indicator_output_fields[name]) for name in indicator_param_fields],
+    dtype=np.int64,
+)
+# 所有指标槽位展平后, 每个指标第0个槽位的位置
+indicator_slot_offsets = np.concatenate(
+    (np.zeros(1, dtype=np.int64), np.cumsum(indicator_slot_counts)[:-1])
+)
+indicator_slot_total = int(np.sum(indicator_slot_counts))
+# 按展平后的槽位索引, 每个槽位第0个输出字段的输出编号
+indicator_slot_output_offsets = np.concatenate(
+    (
+        np.zeros(1, dtype=np.int64),
+        np.cumsum(np.repeat(indicator_output_counts, indicator_slot_counts))[:-1],
+    )
+)
+# 单个槽位最多需要的参数个数(不含 enable)
+indicator_param_max = int(np.max(indicator_param_strides)) - 1
+# 单个槽位最多的输出字段数量
+indicator_output_max = int(np.max(indicator_output_counts))
+# 按 (IndicatorId, 输出字段) 索引的布尔数组, 标记需要计算的输出字段, 这里是全部字段
+indicator_all_fields = np.ones(
+    (len(indicator_param_fields), indicator_output_max), dtype=np.bool_
+)
+
+
+def create_indicator_required_fields():
+    """
+    返回 (IndicatorId, 输出字段) 的布尔数组, 标记信号检查数据时要求存在的输出字段。
+    """
+    required = np.zeros_like(indicator_all_fields)
+    for name in indicator_param_fields:
+        fields = indicator_output_fields[name]
+        for j, field in enumerate(fields):
+            required[iid[name].value, j] = field in (
+                indicator_required_output_fields.get(name, fields)
+            )
+    return required
+
+
+indicator_required_fields = create_indicator_required_fields()
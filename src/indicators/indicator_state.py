@@ -0,0 +1,301 @@
+import numpy as np
+from numba import njit, prange
+from numba.typed import List
+from enum import IntEnum
+from src.utils.constants import numba_config
+
+
+from .sma import sma_update
+from .ema import ema_update
+from .bbands import bbands_update
+from .rsi import rsi_update
+from .atr import atr_update
+from .psar import psar_step
+
+from .indicator_layout import (
+    iid,
+    indicator_slot_counts,
+    indicator_slot_offsets,
+    indicator_output_counts,
+)
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+nb_bool = numba_config["nb"]["bool"]
+nb_acc = numba_config["nb"]["acc"]
+
+
+"""
+增量指标状态, 每追加一根K线, 每个唯一参数只做常数次计算。
+唯一参数和 indicator_cache 一样按 block = m * len(iid) + 指标编号 组织
+(见 collect_indicator_cache_index), 每个 block 保存:
+  indicator_state:  (唯一参数数量, indicator_state_width) 的标量状态
+  indicator_values: (唯一参数数量, 指标输出数量) 的最新一根K线的输出
+sma 和 bbands 的窗口和保存在每个唯一参数的 indicator_state 中, 每根K线加入最新的收盘价、
+移出窗口外的收盘价, 每 period 根K线从每个周期共享的价格环形缓冲区重新求和一次
+(与 rolling_sum_step 相同), 加减累积的舍入误差不会随实盘运行时间增长。
+环形缓冲区的容量覆盖所有参数组合中最长的窗口。
+环形缓冲区和 indicator_state 按累加器精度保存, 读出的价格转换成存储精度后再参与计算,
+与完整计算的指标使用相同精度的输入。
+"""
+
+
+# 价格环形缓冲区 (mtf_count, capacity, PriceRingIndex) 的列
+price_ring_keys = (
+    "time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+)
+
+PriceRingIndex = IntEnum(
+    "PriceRingIndex", [(k, c) for c, k in enumerate(price_ring_keys)]
+)
+
+pri = PriceRingIndex
+
+# 每个唯一参数的标量状态数量, 取所有指标中最大的 (psar 和 rsi 需要4个)
+indicator_state_width = 4
+
+
+@njit(cache=enable_cache)
+def get_price_ring_capacity(unique_params, mtf_count):
+    """
+    环形缓冲区需要保留最长窗口之前的一根K线, 用于移出窗口, 至少保留上一根K线。
+    """
+    kind_count = len(indicator_slot_counts)
+    capacity = 2
+    for m in range(mtf_count):
+        for k in (iid.sma.value, iid.bbands.value):
+            p = unique_params[m * kind_count + k]
+            for u in range(len(p)):
+                capacity = max(capacity, int(p[u, 0]) + 1)
+    return capacity
+
+
+@njit(cache=enable_cache)
+def init_indicator_state(unique_params):
+    """
+    返回每个 block 的 (indicator_state, indicator_values), 输出初始为 NaN。
+    """
+    kind_count = len(indicator_slot_counts)
+    indicator_state = List()
+    indicator_values = List()
+    for b in range(len(unique_params)):
+        unique_count = len(unique_params[b])
+        indicator_state.append(
+            np.zeros((unique_count, indicator_state_width), dtype=nb_acc)
+        )
+        indicator_values.append(
+            np.full(
+                (unique_count, indicator_output_counts[b % kind_count]),
+                np.nan,
+                dtype=nb_float,
+            )
+        )
+    return indicator_state, indicator_values
+
+
+@njit(cache=enable_cache)
+def push_price_ring(price_ring, bar_counts, m, tohlcv_row):
+    """
+    把第 m 个周期的一根K线写入环形缓冲区, 返回这根K线的索引。
+    """
+    capacity = price_ring.shape[1]
+    bar_index = bar_counts[m]
+    row = price_ring[m, bar_index % capacity]
+
+    for c in range(len(price_ring_keys)):
+        row[c] = tohlcv_row[c]
+
+    bar_counts[m] = bar_index + 1
+    return bar_index
+
+
+@njit(cache=enable_cache)
+def get_price_ring_value(price_ring, m, bar_index, col):
+    return price_ring[m, bar_index % price_ring.shape[1], col]
+
+
+@njit(cache=enable_cache)
+def window_sum_step(price_ring, m, bar_index, period, state):
+    """
+    rolling_sum_step 的环形缓冲区版本, 把 state 中以 bar_index - 1 结尾的收盘价窗口和
+    推进到以 bar_index 结尾。state: (窗口和, 窗口平方和, 窗口内 NaN 的数量)。
+    每 period 根K线从环形缓冲区重新求和一次, 舍入误差不会随追加的K线数量增长。
+    """
+    if period <= 1:
+        return nb_acc(np.nan), nb_acc(np.nan)
+
+    x = get_price_ring_value(price_ring, m, bar_index, pri.close.value)
+    if np.isnan(x):
+        state[2] += 1
+    else:
+        state[0] += x
+        state[1] += x * x
+
+    if bar_index >= period:
+        y = get_price_ring_value(price_ring, m, bar_index - period, pri.close.value)
+        if np.isnan(y):
+            state[2] -= 1
+        else:
+            state[0] -= y
+            state[1] -= y * y
+
+    if (bar_index + 1) % period == 0:
+        state[0] = 0.0
+        state[1] = 0.0
+        for j in range(bar_index + 1 - period, bar_index + 1):
+            y = get_price_ring_value(price_ring, m, j, pri.close.value)
+            if not np.isnan(y):
+                state[0] += y
+                state[1] += y * y
+
+    # 窗口内有 NaN 时与 calc_sma 一样输出 NaN
+    if state[2] > 0:
+        return nb_acc(np.nan), nb_acc(np.nan)
+    return state[0], state[1]
+
+
+@njit(cache=enable_cache)
+def update_indicator_by_id(indicator_id, price_ring, m, bar_index, p, state, values):
+    """
+    按指标编号把一个唯一参数推进到第 bar_index 根K线, 更新 state 并写入 values。
+    """
+    close = nb_float(get_price_ring_value(price_ring, m, bar_index, pri.close.value))
+    high = nb_float(get_price_ring_value(price_ring, m, bar_index, pri.high.value))
+    low = nb_float(get_price_ring_value(price_ring, m, bar_index, pri.low.value))
+    prev_close = nb_float(np.nan)
+    prev_high = nb_float(np.nan)
+    prev_low = nb_float(np.nan)
+    if bar_index > 0:
+        last = bar_index - 1
+        prev_close = nb_float(
+            get_price_ring_value(price_ring, m, last, pri.close.value)
+        )
+        prev_high = nb_float(get_price_ring_value(price_ring, m, last, pri.high.value))
+        prev_low = nb_float(get_price_ring_value(price_ring, m, last, pri.low.value))
+
+    if indicator_id == iid.sma.value:
+        period = int(p[0])
+        window_sum, _ = window_sum_step(price_ring, m, bar_index, period, state)
+        values[0] = sma_update(window_sum, bar_index, period)
+
+    elif indicator_id == iid.ema.value:
+        state[0], state[1] = ema_update(state[0], state[1], close, bar_index, int(p[0]))
+        values[0] = state[0]
+
+    elif indicator_id == iid.bbands.value:
+        period = int(p[0])
+        window_sum, window_sq_sum = window_sum_step(
+            price_ring, m, bar_index, period, state
+        )
+        bbands = bbands_update(
+            window_sum,
+            window_sq_sum,
+            close,
+            bar_index,
+            period,
+            p[1],
+        )
+        for j in range(len(bbands)):
+            values[j] = bbands[j]
+
+    elif indicator_id == iid.rsi.value:
+        values[0], state[0], state[1], state[2], state[3] = rsi_update(
+            state[0],
+            state[1],
+            state[2],
+            state[3],
+            close,
+            prev_close,
+            bar_index,
+            int(p[0]),
+        )
+
+    elif indicator_id == iid.atr.value:
+        state[0], state[1] = atr_update(
+            state[0], state[1], high, low, prev_close, bar_index, int(p[0])
+        )
+        values[0] = state[0]
+
+    elif indicator_id == iid.psar.value:
+        psar_state, psar = psar_step(
+            (
+                nb_float(state[0]),
+                nb_float(state[1]),
+                nb_float(state[2]),
+                nb_float(state[3]),
+            ),
+            high,
+            low,
+            prev_high,
+            prev_low,
+            prev_close,
+            bar_index,
+            p[0],
+            p[1],
+            p[2],
+        )
+        state[0], state[1], state[2], state[3] = psar_state
+        for j in range(len(psar)):
+            values[j] = psar[j]
+
+
+@njit(parallel=True, cache=enable_cache)
+def update_indicator_state(
+    price_ring, bar_counts, updated, unique_params, indicator_state, indicator_values
+):
+    """
+    并发推进 updated[m] 为 True 的周期的所有唯一参数, 这些周期的最新K线已经写入环形缓冲区。
+    """
+    kind_count = len(indicator_slot_counts)
+    block_count = len(unique_params)
+
+    task_count = 0
+    for b in range(block_count):
+        if updated[b // kind_count]:
+            task_count += len(unique_params[b])
+
+    task_block = np.empty(task_count, dtype=nb_int)
+    task_unique = np.empty(task_count, dtype=nb_int)
+    t = 0
+    for b in range(block_count):
+        if not updated[b // kind_count]:
+            continue
+        for u in range(len(unique_params[b])):
+            task_block[t] = b
+            task_unique[t] = u
+            t += 1
+
+    for t in prange(task_count):
+        b = task_block[t]
+        u = task_unique[t]
+        m = b // kind_count
+        update_indicator_by_id(
+            b % kind_count,
+            price_ring,
+            m,
+            bar_counts[m] - 1,
+            unique_params[b][u],
+            indicator_state[b][u],
+            indicator_values[b][u],
+        )
+
+
+@njit(cache=enable_cache)
+def get_indicator_value(
+    indicator_values, cache_index_mtf, m, indicator_id, slot, field
+):
+    """
+    单个参数组合第 m 个周期某个指标槽位的最新输出, 字段顺序见 indicator_output_fields。
+    cache_index_mtf 是该参数组合的 cache_index[i], 槽位未开启时返回 NaN。
+    """
+    u = cache_index_mtf[m, indicator_slot_offsets[indicator_id] + slot]
+    if u < 0:
+        return np.nan
+    return indicator_values[m * len(indicator_slot_counts) + indicator_id][u, field]
@@ -43,51 +43,27 @@ def psar_init(
     return (is_long_float, current_psar, current_ep, current_af)
 
 
-# --- PSAR 第一次迭代函数 (修正：移除 force_direction_int 参数) ---
-@njit(
-    nb.types.Tuple(
-        (
-            PsarState,
-            nb_float,
-            nb_float,
-            nb_float,
-        )
-    )(
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-    ),
-    cache=enable_cache,
-)
-def psar_first_iteration(
-    high_prev,
-    high_curr,
-    low_prev,
-    low_curr,
-    close_prev,
-    af0,
-    af_step,
-    max_af,
+# --- PSAR 标量状态机 ---
+# psar_first_iteration/psar_update 和 calc_psar_batch 共用, 状态只用标量传递,
+# 批量版本按结构数组保存状态时, 对参数组合的内层循环可以向量化
+@njit(cache=enable_cache, inline="always")
+def psar_first_advance(
+    high_prev, high_curr, low_prev, low_curr, close_prev, af0, af_step, max_af
 ):
     """
-    处理 PSAR 算法的第一次迭代（计算索引1的结果）。
-    返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal_val)
+    第一次迭代 (索引1) 的标量版本。
+    返回 (is_long, psar, ep, af, psar_long, psar_short, reversal)。
     """
-    # 修正：调用 psar_init 时，强制方向参数应为 0
-    initial_state = psar_init(
+    is_long_float, current_psar, current_ep, current_af = psar_init(
         high_prev, high_curr, low_prev, low_curr, close_prev, 0, af0
     )
-    is_long_float, current_psar, current_ep, current_af = initial_state
 
-    # 逻辑与旧代码保持一致，但参数直接来自标量
     if np.isnan(current_psar):
         return (
-            (is_long_float, current_psar, current_ep, current_af),
+            is_long_float,
+            current_psar,
+            current_ep,
+            current_af,
             np.nan,
             np.nan,
             0.0,
@@ -119,7 +95,7 @@ def psar_first_iteration(
             current_ep = low_curr
             current_af = min(max_af, current_af + af_step)
 
-    reversal_float = nb_float(reversal)
+    reversal_float = 1.0 if reversal else 0.0
     if reversal_float == 1.0:
         is_long_float = 1.0 if not (is_long_float == 1.0) else 0.0
         current_af = af0
@@ -135,38 +111,23 @@ def psar_first_iteration(
 
     psar_long_val = current_psar if is_long_float == 1.0 else np.nan
     psar_short_val = current_psar if is_long_float == 0.0 else np.nan
-    reversal_val = reversal_float
-
     return (
-        (is_long_float, current_psar, current_ep, current_af),
+        is_long_float,
+        current_psar,
+        current_ep,
+        current_af,
         psar_long_val,
         psar_short_val,
-        reversal_val,
+        reversal_float,
     )
 
 
-# --- PSAR 实时更新函数 (保持不变) ---
-@njit(
-    nb.types.Tuple(
-        (
-            PsarState,
-            nb_float,
-            nb_float,
-            nb_float,
-        )
-    )(
-        PsarState,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-        nb_float,
-    ),
-    cache=enable_cache,
-)
-def psar_update(
-    prev_state,
+@njit(cache=enable_cache, inline="always")
+def psar_advance(
+    prev_is_long,
+    prev_psar,
+    prev_ep,
+    prev_af,
     current_high,
     current_low,
     prev_high,
@@ -175,11 +136,9 @@ def psar_update(
     max_af,
 ):
     """
-    根据前一根K线后的PSAR状态和当前K线的数据，计算新的PSAR值并更新状态。
-    返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal)
+    索引2之后每根K线的标量版本。
+    返回 (is_long, psar, ep, af, psar_long, psar_short, reversal)。
     """
-    prev_is_long, prev_psar, prev_ep, prev_af = prev_state
-
     # 1. 计算下一根K线的原始 PSAR 候选值
     if prev_is_long == 1.0:
         next_psar_raw_candidate = prev_psar + prev_af * (prev_ep - prev_psar)
@@ -187,12 +146,10 @@ def psar_update(
         next_psar_raw_candidate = prev_psar - prev_af * (prev_psar - prev_ep)
 
     # 2. 判断是否发生反转
-    reversal_price = current_low if prev_is_long == 1.0 else current_high
-    reversal = nb_float(
-        reversal_price < next_psar_raw_candidate
-        if prev_is_long == 1.0
-        else reversal_price > next_psar_raw_candidate
-    )
+    if prev_is_long == 1.0:
+        reversal = 1.0 if current_low < next_psar_raw_candidate else 0.0
+    else:
+        reversal = 1.0 if current_high > next_psar_raw_candidate else 0.0
 
     # 3. 对 PSAR 进行穿透检查
     current_psar = (
@@ -227,13 +184,127 @@ def psar_update(
             new_ep = current_low
 
     # 6. 确定返回的 PSAR 值
-    psar_long_val = np.nan
-    psar_short_val = np.nan
-    if new_is_long == 1.0:
-        psar_long_val = current_psar
-    else:
-        psar_short_val = current_psar
+    psar_long_val = current_psar if new_is_long == 1.0 else np.nan
+    psar_short_val = current_psar if new_is_long != 1.0 else np.nan
+    return (
+        new_is_long,
+        current_psar,
+        new_ep,
+        new_af,
+        psar_long_val,
+        psar_short_val,
+        reversal,
+    )
 
+
+# --- PSAR 第一次迭代函数 (修正：移除 force_direction_int 参数) ---
+@njit(
+    nb.types.Tuple(
+        (
+            PsarState,
+            nb_float,
+            nb_float,
+            nb_float,
+        )
+    )(
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+    ),
+    cache=enable_cache,
+)
+def psar_first_iteration(
+    high_prev,
+    high_curr,
+    low_prev,
+    low_curr,
+    close_prev,
+    af0,
+    af_step,
+    max_af,
+):
+    """
+    处理 PSAR 算法的第一次迭代（计算索引1的结果）。
+    返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal_val)
+    """
+    (
+        is_long_float,
+        current_psar,
+        current_ep,
+        current_af,
+        psar_long_val,
+        psar_short_val,
+        reversal_val,
+    ) = psar_first_advance(
+        high_prev, high_curr, low_prev, low_curr, close_prev, af0, af_step, max_af
+    )
+    return (
+        (is_long_float, current_psar, current_ep, current_af),
+        psar_long_val,
+        psar_short_val,
+        reversal_val,
+    )
+
+
+# --- PSAR 实时更新函数 (保持不变) ---
+@njit(
+    nb.types.Tuple(
+        (
+            PsarState,
+            nb_float,
+            nb_float,
+            nb_float,
+        )
+    )(
+        PsarState,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+    ),
+    cache=enable_cache,
+)
+def psar_update(
+    prev_state,
+    current_high,
+    current_low,
+    prev_high,
+    prev_low,
+    af_step,
+    max_af,
+):
+    """
+    根据前一根K线后的PSAR状态和当前K线的数据，计算新的PSAR值并更新状态。
+    返回一个元组：(new_state_tuple, psar_long_val, psar_short_val, reversal)
+    """
+    prev_is_long, prev_psar, prev_ep, prev_af = prev_state
+    (
+        new_is_long,
+        current_psar,
+        new_ep,
+        new_af,
+        psar_long_val,
+        psar_short_val,
+        reversal,
+    ) = psar_advance(
+        prev_is_long,
+        prev_psar,
+        prev_ep,
+        prev_af,
+        current_high,
+        current_low,
+        prev_high,
+        prev_low,
+        af_step,
+        max_af,
+    )
     return (
         (new_is_long, current_psar, new_ep, new_af),
         psar_long_val,
@@ -316,3 +387,162 @@ def calc_psar(high, low, close, af0, af_step, max_af):
         psar_reversal_result[i] = reversal_val
 
     return psar_results
+
+
+# --- PSAR 批量计算函数 ---
+@njit(
+    nb.types.void(
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:, :, :],
+    ),
+    cache=enable_cache,
+)
+def set_psar_batch(high, low, close, af0, af_step, max_af, out):
+    """
+    同一组 high/low 上按相同的K线顺序同步推进 K 组 (af0, af_step, max_af),
+    结果写入 out: (K, 4, K线数量), out[k] 与 calc_psar 第 k 组参数的结果转置后完全一致,
+    数据少于2根时保持 NaN。
+    状态按结构数组保存 (每个字段一个长度为 K 的数组), 每根K线只读取一次 high/low,
+    对 K 的内层循环没有跨参数的依赖。
+    """
+    n = len(close)
+    param_count = len(af0)
+    out[:] = np.nan
+    if n < 2:
+        return
+
+    is_long = np.empty(param_count, dtype=nb_float)
+    current_psar = np.empty(param_count, dtype=nb_float)
+    current_ep = np.empty(param_count, dtype=nb_float)
+    current_af = np.empty(param_count, dtype=nb_float)
+
+    # 索引 0 和索引 1
+    for k in range(param_count):
+        out[k, 2, 0] = af0[k]
+        out[k, 3, 0] = 0.0
+        (
+            is_long[k],
+            current_psar[k],
+            current_ep[k],
+            current_af[k],
+            out[k, 0, 1],
+            out[k, 1, 1],
+            out[k, 3, 1],
+        ) = psar_first_advance(
+            high[0], high[1], low[0], low[1], close[0], af0[k], af_step[k], max_af[k]
+        )
+        out[k, 2, 1] = current_af[k]
+
+    # 初始 PSAR 是 close[0], 为 NaN 时 calc_psar 提前返回, 所有参数都一样
+    if np.isnan(close[0]):
+        return
+
+    for i in range(2, n):
+        high_curr = high[i]
+        low_curr = low[i]
+        high_prev = high[i - 1]
+        low_prev = low[i - 1]
+        for k in range(param_count):
+            (
+                is_long[k],
+                current_psar[k],
+                current_ep[k],
+                current_af[k],
+                out[k, 0, i],
+                out[k, 1, i],
+                out[k, 3, i],
+            ) = psar_advance(
+                is_long[k],
+                current_psar[k],
+                current_ep[k],
+                current_af[k],
+                high_curr,
+                low_curr,
+                high_prev,
+                low_prev,
+                af_step[k],
+                max_af[k],
+            )
+            out[k, 2, i] = current_af[k]
+
+
+@njit(
+    nb_float[:, :, :](
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+        nb_float[:],
+    ),
+    cache=enable_cache,
+)
+def calc_psar_batch(high, low, close, af0, af_step, max_af):
+    """
+    返回 (K, 4, K线数量) 的批量 PSAR, 见 set_psar_batch。
+    """
+    out = np.empty((len(af0), 4, len(close)), dtype=nb_float)
+    set_psar_batch(high, low, close, af0, af_step, max_af, out)
+    return out
+
+
+# --- PSAR 增量计算函数 ---
+@njit(
+    nb.types.Tuple(
+        (
+            PsarState,
+            nb.types.UniTuple(nb_float, 4),
+        )
+    )(
+        PsarState,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_float,
+        nb_int,
+        nb_float,
+        nb_float,
+        nb_float,
+    ),
+    cache=enable_cache,
+)
+def psar_step(
+    prev_state,
+    high_curr,
+    low_curr,
+    high_prev,
+    low_prev,
+    close_prev,
+    bar_index,
+    af0,
+    af_step,
+    max_af,
+):
+    """
+    calc_psar 的增量版本, 计算第 bar_index 根K线。
+    返回 (new_state_tuple, (psar_long, psar_short, psar_af, psar_reversal)),
+    与 calc_psar 第 bar_index 行的结果完全一致。
+    """
+    if bar_index == 0:
+        return prev_state, (np.nan, np.nan, af0, 0.0)
+
+    if bar_index == 1:
+        state, psar_long_val, psar_short_val, reversal_val = psar_first_iteration(
+            high_prev, high_curr, low_prev, low_curr, close_prev, af0, af_step, max_af
+        )
+        return state, (psar_long_val, psar_short_val, state[3], reversal_val)
+
+    # 初始状态无效时 calc_psar 提前返回, 之后全部为 NaN
+    if np.isnan(prev_state[1]):
+        return prev_state, (np.nan, np.nan, np.nan, np.nan)
+
+    state, psar_long_val, psar_short_val, reversal_val = psar_update(
+        prev_state, high_curr, low_curr, high_prev, low_prev, af_step, max_af
+    )
+    return state, (psar_long_val, psar_short_val, state[3], reversal_val)
@@ -1,10 +1,11 @@
 import numpy as np
-from numba import njit, float64
+from numba import njit, types
 from src.utils.constants import numba_config
 
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 @njit(nb_float[:](nb_float[:], nb_int), cache=enable_cache)
@@ -19,57 +20,162 @@ def calc_rma(series, length):
         return result
 
     # 计算前 length 个数据的平均值作为第一个 RMA 值
-    first_rma = np.sum(series[:length]) / length
-    result[length - 1] = first_rma
+    # 递推值用累加精度的标量保存, 不从存储精度的 result 数组读回
+    seed_sum = nb_acc(0.0)
+    for i in range(length):
+        seed_sum += series[i]
+    last_rma = seed_sum / length
+    result[length - 1] = last_rma
 
     alpha = 1.0 / length
 
     # 循环从第一个有效值之后开始
     for i in range(length, n):
-        result[i] = (series[i] * alpha) + (result[i - 1] * (1 - alpha))
+        last_rma = (series[i] * alpha) + (last_rma * (1 - alpha))
+        result[i] = last_rma
 
     return result
 
 
+@njit(cache=enable_cache, inline="always")
+def rma_step(prev_rma, seed_sum, value, index, length):
+    """
+    calc_rma 的单步递推, index 是 value 在序列中的位置, 返回 (rma, seed_sum)。
+    前 length 个值按顺序累加, 第 length - 1 个位置用均值作为初始值。
+    """
+    if index < length:
+        seed_sum += value
+        if index < length - 1:
+            return np.nan, seed_sum
+        return seed_sum / length, seed_sum
+
+    alpha = 1.0 / length
+    return (value * alpha) + (prev_rma * (1 - alpha)), seed_sum
+
+
+@njit(cache=enable_cache, inline="always")
+def rsi_step(avg_up, seed_up, avg_down, seed_down, diff, bar_index, length):
+    """
+    第 bar_index (>= 1) 根K线的 RSI 单步递推, diff 是与上一根收盘价的差,
+    返回 (rsi, avg_up, seed_up, avg_down, seed_down)。
+    diff 为 NaN 时上涨和下跌都按0处理, 与 np.where 的比较结果一致。
+    """
+    up = diff if diff > 0 else 0.0
+    down = np.abs(diff) if diff < 0 else 0.0
+
+    # 对 diffs[1:] 做 RMA, 所以序列位置是 bar_index - 1
+    avg_up, seed_up = rma_step(avg_up, seed_up, up, bar_index - 1, length)
+    avg_down, seed_down = rma_step(avg_down, seed_down, down, bar_index - 1, length)
+
+    if bar_index < length:
+        return np.nan, avg_up, seed_up, avg_down, seed_down
+
+    # 计算相对强弱（RS），手动处理除零
+    rs = avg_up / avg_down if avg_down != 0 else np.nan
+    return 100.0 - (100.0 / (1.0 + rs)), avg_up, seed_up, avg_down, seed_down
+
+
 @njit(nb_float[:](nb_float[:], nb_int), cache=enable_cache)
 def calc_rsi(close, length=14):
     """
     计算相对强弱指数（RSI），其逻辑与TA-Lib更接近。
+    上涨和下跌的 RMA 在同一次循环中用标量状态递推, 只分配输出数组,
+    前 length 根K线为 NaN, 与先求 diffs 再分别做 calc_rma 的结果完全一致。
     """
     n = close.size
-    if n < length:
-        return np.full(n, np.nan, dtype=nb_float)
+    result = np.full(n, np.nan, dtype=nb_float)
+    if n < length or length < 1:
+        return result
 
-    # 手动计算价格变化，避免使用 np.diff
-    diffs = np.full(n, np.nan, dtype=float64)
+    avg_up = nb_acc(0.0)
+    seed_up = nb_acc(0.0)
+    avg_down = nb_acc(0.0)
+    seed_down = nb_acc(0.0)
     for i in range(1, n):
-        diffs[i] = close[i] - close[i - 1]
+        result[i], avg_up, seed_up, avg_down, seed_down = rsi_step(
+            avg_up, seed_up, avg_down, seed_down, close[i] - close[i - 1], i, length
+        )
 
-    # 分离上涨和下跌部分
-    ups = np.where(diffs > 0, diffs, 0.0)
-    downs = np.where(diffs < 0, np.abs(diffs), 0.0)
+    return result
 
-    # 调整ups和downs数组的起始点，使其与TA-Lib的逻辑匹配
-    # diffs的第一个元素是NaN，因此ups和downs的第一个元素也应被忽略
-    ups_adjusted = ups[1:]
-    downs_adjusted = downs[1:]
 
-    # 计算上涨和下跌的平均值（使用 RMA）
-    # nb_rma_optimized函数将处理其自身的NaN
-    avg_ups = calc_rma(ups_adjusted, length)
-    avg_downs = calc_rma(downs_adjusted, length)
+# calc_rsi_batch 每次处理的K线数量, 一段收盘价在所有周期之间复用时保持在缓存中
+RSI_BATCH_TILE = 4096
 
-    # 计算相对强弱（RS），手动处理除零
-    rs = np.full(n - 1, np.nan, dtype=nb_float)
-    for i in range(n - 1):
-        if avg_downs[i] != 0:
-            rs[i] = avg_ups[i] / avg_downs[i]
 
-    # 计算 RSI
-    rsi_result = 100.0 - (100.0 / (1.0 + rs))
+@njit(nb_float[:, :](nb_float[:], nb_int[:]), cache=enable_cache)
+def calc_rsi_batch(close, lengths):
+    """
+    一次遍历 close 计算多个周期的 RSI, 返回 (len(lengths), K线数量),
+    第 k 行与 calc_rsi(close, lengths[k]) 完全一致。
+    close 按 RSI_BATCH_TILE 分段, 每段依次推进所有周期的递推状态, 每行的写入保持连续。
+    """
+    n = close.size
+    length_count = len(lengths)
+    result = np.empty((length_count, n), dtype=nb_float)
+
+    # 每个周期的 (avg_up, seed_up, avg_down, seed_down)
+    state = np.zeros((length_count, 4), dtype=nb_acc)
+    for tile_start in range(0, n, RSI_BATCH_TILE):
+        tile_stop = min(tile_start + RSI_BATCH_TILE, n)
+        for k in range(length_count):
+            length = lengths[k]
+            row = result[k]
+            if n < length or length < 1:
+                row[tile_start:tile_stop] = np.nan
+                continue
+
+            avg_up = state[k, 0]
+            seed_up = state[k, 1]
+            avg_down = state[k, 2]
+            seed_down = state[k, 3]
+            for i in range(tile_start, tile_stop):
+                if i == 0:
+                    row[i] = np.nan
+                    continue
+                row[i], avg_up, seed_up, avg_down, seed_down = rsi_step(
+                    avg_up,
+                    seed_up,
+                    avg_down,
+                    seed_down,
+                    close[i] - close[i - 1],
+                    i,
+                    length,
+                )
+            state[k, 0] = avg_up
+            state[k, 1] = seed_up
+            state[k, 2] = avg_down
+            state[k, 3] = seed_down
+    return result
 
-    # 在RSI结果前填充length个NaN，以匹配TA-Lib的输出
-    result = np.full(n, np.nan, dtype=nb_float)
-    result[length:] = rsi_result[length - 1 :]
 
-    return result
+@njit(
+    types.UniTuple(nb_acc, 2)(nb_acc, nb_acc, nb_float, nb_int, nb_int),
+    cache=enable_cache,
+)
+def rma_update(prev_rma, seed_sum, value, index, length):
+    """
+    calc_rma 的增量版本, index 是 value 在序列中的位置, 返回 (rma, seed_sum)。
+    """
+    return rma_step(prev_rma, seed_sum, value, index, length)
+
+
+@njit(
+    types.UniTuple(nb_acc, 5)(
+        nb_acc, nb_acc, nb_acc, nb_acc, nb_float, nb_float, nb_int, nb_int
+    ),
+    cache=enable_cache,
+)
+def rsi_update(
+    avg_up, seed_up, avg_down, seed_down, close, prev_close, bar_index, length
+):
+    """
+    calc_rsi 的增量版本, 计算第 bar_index 根K线的 RSI。
+    返回 (rsi, avg_up, seed_up, avg_down, seed_down), 与 calc_rsi 的结果完全一致。
+    """
+    if bar_index == 0 or length < 1:
+        return np.nan, avg_up, seed_up, avg_down, seed_down
+
+    return rsi_step(
+        avg_up, seed_up, avg_down, seed_down, close - prev_close, bar_index, length
+    )
@@ -6,6 +6,37 @@ from src.utils.constants import numba_config
 enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
+
+
+@njit(cache=enable_cache, inline="always")
+def rolling_sum_step(close, i, period, window_sum, nan_count):
+    """
+    把以 i - 1 结尾的窗口和推进到以 i 结尾, 返回 (window_sum, nan_count)。
+    window_sum 只累加非 NaN 的收盘价, nan_count 是窗口内 NaN 的数量, 大于0时 SMA 为 NaN,
+    与逐个窗口直接求和时 NaN 只影响包含它的窗口一致。
+    每 period 根K线对窗口重新求和一次, 加减累积的舍入误差不会随数据长度增长, 总工作量仍是 O(n)。
+    """
+    x = close[i]
+    if np.isnan(x):
+        nan_count += 1
+    else:
+        window_sum += x
+
+    if i >= period:
+        y = close[i - period]
+        if np.isnan(y):
+            nan_count -= 1
+        else:
+            window_sum -= y
+
+    if (i + 1) % period == 0:
+        window_sum = 0.0
+        for j in range(i + 1 - period, i + 1):
+            if not np.isnan(close[j]):
+                window_sum += close[j]
+
+    return window_sum, nan_count
 
 
 @njit(nb_float[:](nb_float[:], nb_int), cache=enable_cache)
@@ -14,16 +45,69 @@ def calc_sma(close, period):
     if period <= 1 or num_data < period:
         return np.full((num_data,), np.nan, dtype=nb_float)
 
-    # 使用 np.ones() 创建一个权重数组
-    weights = np.ones(period, dtype=nb_float) / period
+    # 滚动窗口和, 每根K线只加入最新的收盘价、移出窗口外的收盘价, 与 period 无关
+    sma_result = np.empty(num_data, dtype=nb_float)
+    sma_result[: period - 1] = np.nan
+
+    window_sum = 0.0
+    nan_count = 0
+    for i in range(num_data):
+        window_sum, nan_count = rolling_sum_step(
+            close, i, period, window_sum, nan_count
+        )
+        if i >= period - 1:
+            sma_result[i] = window_sum / period if nan_count == 0 else np.nan
+    return sma_result
+
+
+# calc_sma_batch 每次处理的K线数量, 一段收盘价在所有周期之间复用时保持在缓存中
+SMA_BATCH_TILE = 4096
+
+
+@njit(nb_float[:, :](nb_float[:], nb_int[:]), cache=enable_cache)
+def calc_sma_batch(close, periods):
+    """
+    一次遍历 close 计算多个周期的 SMA, 返回 (len(periods), K线数量),
+    第 k 行与 calc_sma(close, periods[k]) 相同。
+    close 按 SMA_BATCH_TILE 分段, 每段依次推进所有周期的滚动窗口和, 每行的写入保持连续。
+    """
+    num_data = len(close)
+    period_count = len(periods)
+    sma_result = np.empty((period_count, num_data), dtype=nb_float)
+
+    window_sum = np.zeros(period_count, dtype=nb_acc)
+    nan_count = np.zeros(period_count, dtype=nb_int)
+    for tile_start in range(0, num_data, SMA_BATCH_TILE):
+        tile_stop = min(tile_start + SMA_BATCH_TILE, num_data)
+        for k in range(period_count):
+            period = periods[k]
+            row = sma_result[k]
+            if period <= 1 or num_data < period:
+                row[tile_start:tile_stop] = np.nan
+                continue
+
+            _window_sum = window_sum[k]
+            _nan_count = nan_count[k]
+            for i in range(tile_start, tile_stop):
+                _window_sum, _nan_count = rolling_sum_step(
+                    close, i, period, _window_sum, _nan_count
+                )
+                if i >= period - 1 and _nan_count == 0:
+                    row[i] = _window_sum / period
+                else:
+                    row[i] = np.nan
+            window_sum[k] = _window_sum
+            nan_count[k] = _nan_count
+    return sma_result
 
-    # 使用 np.convolve 进行卷积计算
-    # 'valid' 模式只返回完全重叠的部分，长度为 len(close) - period + 1
-    # 结果数组的长度为 100 - 14 + 1 = 87
-    sma_result = np.convolve(close, weights, mode="valid")
 
-    # 在前面填充 NaN
-    # 填充 period - 1 个 NaN，长度为 13
-    # 13 + 87 = 100，长度匹配！
-    nan_prefix = np.full((period - 1,), np.nan, dtype=nb_float)
-    return np.concatenate((nan_prefix, sma_result))
+@njit(nb_acc(nb_acc, nb_int, nb_int), cache=enable_cache)
+def sma_update(window_sum, bar_index, period):
+    """
+    calc_sma 的增量版本, 计算第 bar_index 根K线的 SMA。
+    window_sum 是以 bar_index 结尾的 period 根收盘价之和, 由调用方维护 (见 window_sum_step),
+    与 calc_sma 一样定期重新求和, 只有浮点误差级别的差异。
+    """
+    if period <= 1 or bar_index < period - 1:
+        return np.nan
+    return window_sum / period
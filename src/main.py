@@ -24,6 +24,9 @@ def main(
         True, "--cache/--no-cache", help="启用或禁用Numba缓存"
     ),
     enable64: bool = typer.Option(True, "--64bit/--32bit", help="启用或禁用64位浮点数"),
+    enable_mixed: bool = typer.Option(
+        False, "--mixed/--no-mixed", help="32位时用64位累加器 (混合精度)"
+    ),
     show_timing: bool = typer.Option(
         True, "--timing/--no-timing", help="启用或禁用运行时间打印。"
     ),
@@ -72,6 +75,7 @@ def main(
     runner = BacktestRunner(
         enable_cache=enable_cache,
         enable64=enable64,
+        enable_mixed=enable_mixed,
         enable_warmup=enable_warmup,
         show_timing=show_timing,
     )
@@ -88,5 +92,41 @@ def main(
     return result
 
 
+@app.command("shard-worker | sw")
+def shard_worker(
+    host: str = typer.Option(
+        "127.0.0.1", help="监听地址, 供远程调用时需要同时设置 token"
+    ),
+    port: int = typer.Option(8765, help="监听端口"),
+    token: str = typer.Option(
+        "", envvar="SHARD_TOKEN", help="调用方需要在请求头中带上的共享 token"
+    ),
+    enable_cache: bool = typer.Option(
+        True, "--cache/--no-cache", help="启用或禁用Numba缓存"
+    ),
+    enable64: bool = typer.Option(True, "--64bit/--32bit", help="启用或禁用64位浮点数"),
+    enable_mixed: bool = typer.Option(
+        False, "--mixed/--no-mixed", help="32位时用64位累加器 (混合精度)"
+    ),
+):
+    """
+    启动 HTTP shard worker, 供 run_parallel_sharded 的 hosts 参数远程调用。
+    """
+    from src.utils.constants import numba_config, set_numba_dtypes
+
+    set_numba_dtypes(
+        numba_config,
+        enable_cache=enable_cache,
+        enable64=enable64,
+        enable_mixed=enable_mixed,
+    )
+
+    from src.parallel_shard import create_shard_server
+
+    server = create_shard_server(host, port, token)
+    print(f"shard worker 监听 {host}:{port}")
+    server.serve_forever()
+
+
 if __name__ == "__main__":
     app()
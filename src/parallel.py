@@ -7,13 +7,61 @@ from numba.typed import Dict, List
 from src.utils.constants import numba_config
 
 
-from src.indicators.calculate_indicators import calc_indicators
-from src.signals.calculate_signal import calc_signal
-from src.backtest.calculate_backtest import calc_backtest
-from src.backtest.calculate_performance import calc_performance
-
-
-from src.parallel_signature import parallel_signature
+from src.indicators.indicator_cache import (
+    collect_indicator_cache_index,
+    calc_indicator_cache,
+    fill_indicator_output,
+)
+from src.indicators.indicator_layout import (
+    iid,
+    indicator_all_fields,
+    indicator_slot_counts,
+)
+from src.signals.calculate_signal import calc_signal, get_signal_need_fields
+from src.backtest.calculate_backtest import (
+    calc_backtest_arena,
+    set_backtest_output_views,
+)
+from src.backtest.calculate_performance import (
+    calc_performance,
+    convert_performance_to_row,
+    set_pruned_performance,
+)
+from src.backtest.calculate_backtest_performance import (
+    calc_backtest_performance,
+    calc_backtest_performance_range,
+)
+from src.backtest.atr_cache import (
+    collect_atr_cache_index,
+    calc_atr_cache,
+    get_atr_row,
+)
+from src.backtest.backtest_enums import backtest_output_keys, performance_keys
+from src.backtest.prune_utils import disable_prune_params
+from src.utils.nb_check_keys import check_ohlcv_mtf
+from src.parallel_schedule import (
+    get_parallel_schedule,
+    estimate_combo_costs,
+    get_cost_bins,
+    schedule_bin_count,
+)
+
+
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+
+from src.parallel_signature import (
+    parallel_signature,
+    parallel_matrix_signature,
+    parallel_performance_signature,
+    parallel_arena_signature,
+    parallel_symbols_signature,
+    parallel_ranges_signature,
+    parallel_range_equity_signature,
+    parallel_walk_forward_signature,
+)
 
 
 enable_cache = numba_config["enable_cache"]
@@ -22,6 +70,7 @@ enable_cache = numba_config["enable_cache"]
 nb_int = numba_config["nb"]["int"]
 nb_float = numba_config["nb"]["float"]
 nb_bool = numba_config["nb"]["bool"]
+nb_acc = numba_config["nb"]["acc"]
 
 
 # print("parallel_entry cache", enable_cache)
@@ -42,7 +91,7 @@ def init_output_all(params_count, mtf_count, enable_fill):
         Dict.empty(key_type=types.unicode_type, value_type=nb_float[:])
     )
     performance_output = List.empty_list(
-        Dict.empty(key_type=types.unicode_type, value_type=nb_float)
+        Dict.empty(key_type=types.unicode_type, value_type=nb_acc)
     )
 
     if enable_fill:
@@ -63,7 +112,7 @@ def init_output_all(params_count, mtf_count, enable_fill):
                 Dict.empty(key_type=types.unicode_type, value_type=nb_float[:])
             )
             performance_output.append(
-                Dict.empty(key_type=types.unicode_type, value_type=nb_float)
+                Dict.empty(key_type=types.unicode_type, value_type=nb_acc)
             )
     return (
         indicators_output_mtf,
@@ -98,8 +147,94 @@ def clear_list_element_at_index(
     )
 
 
-@njit(parallel_signature, parallel=True, cache=enable_cache)
-def run_parallel(
+@njit(cache=enable_cache)
+def init_backtest_arena(ohlcv_mtf, params_count):
+    """
+    一次性分配所有参数组合的回测输出缓冲区 (params_count, BacktestOutputIndex, bars)。
+    数据不完整时K线数量为0, 回测会在数据检查时跳过。
+    """
+    data_count = len(ohlcv_mtf[0]["close"]) if check_ohlcv_mtf(ohlcv_mtf) else 0
+    return np.empty(
+        (params_count, len(backtest_output_keys), data_count), dtype=nb_float
+    )
+
+
+# calc_indicator_cache 和 calc_atr_cache 是并发函数, 用 inline 展开到调用它的并发入口中
+@njit(cache=enable_cache, inline="always")
+def prepare_shared_caches(
+    ohlcv_mtf_list, indicator_params_mtf, backtest_params, need_fields, atr_need_all
+):
+    """
+    prange 之前所有参数组合共享的只读缓存, 各并发入口共用。
+    ohlcv_mtf_list 是每个品种实际使用的数据, 单品种入口传入只有一个元素的 List。
+    各品种的指标缓存合并成一次 calc_indicator_cache,
+    第 s 个品种第 m 个周期在缓存中的周期编号为 s * mtf_count + m。
+    need_fields 见 calc_indicator_cache, atr_need_all 见 collect_atr_cache_index。
+    返回 (cache_index, indicator_cache, atr_index, atr_cache_list),
+    atr_cache_list 每个品种一份, 主周期的 atr block 是 s * mtf_count * len(iid) + iid.atr。
+    """
+    symbol_count = len(ohlcv_mtf_list)
+    mtf_count = indicator_params_mtf.shape[1]
+
+    cache_index, unique_params = collect_indicator_cache_index(indicator_params_mtf)
+
+    flat_ohlcv_mtf = List()
+    flat_unique_params = List()
+    for s in range(symbol_count):
+        for m in range(mtf_count):
+            flat_ohlcv_mtf.append(ohlcv_mtf_list[s][m])
+        for b in range(len(unique_params)):
+            flat_unique_params.append(unique_params[b])
+
+    indicator_cache = calc_indicator_cache(
+        flat_ohlcv_mtf, flat_unique_params, need_fields
+    )
+
+    atr_index, atr_periods = collect_atr_cache_index(backtest_params, atr_need_all)
+    atr_cache_list = List()
+    for s in range(symbol_count):
+        atr_block = s * mtf_count * len(indicator_slot_counts) + iid.atr.value
+        atr_cache_list.append(
+            calc_atr_cache(
+                ohlcv_mtf_list[s],
+                atr_periods,
+                flat_unique_params[atr_block],
+                indicator_cache[atr_block],
+            )
+        )
+
+    return cache_index, indicator_cache, atr_index, atr_cache_list
+
+
+@njit(cache=enable_cache)
+def build_combo_signals(
+    ohlcv_mtf,
+    data_mapping,
+    b_params,
+    cache_index_mtf,
+    indicator_cache,
+    block_offset,
+):
+    """
+    单个参数组合的信号, 指标来自 prepare_shared_caches 的共享缓存。
+    第 m 个周期在缓存中的周期编号为 block_offset + m, 单品种为 0。
+    信号按整数编号直接读取缓存, 不再为每个参数组合创建字符串键的 i_output_mtf。
+    """
+    s_output = Dict.empty(key_type=types.unicode_type, value_type=nb_bool[:])
+    calc_signal(
+        ohlcv_mtf,
+        data_mapping,
+        cache_index_mtf,
+        indicator_cache,
+        nb_int(block_offset),
+        s_output,
+        b_params,
+    )
+    return s_output
+
+
+@njit(parallel_matrix_signature, parallel=True, cache=enable_cache)
+def run_parallel_matrix(
     ohlcv_mtf,
     ohlcv_smoothed_mtf,
     data_mapping,
@@ -108,15 +243,27 @@ def run_parallel(
     is_only_performance,
 ):
     """
-    并发200配置和4万数据,如果加上njit,缓存,parallel,这个是0.1391 秒,0.1346 秒,0.1246 秒
-    并发1  配置和4万数据,如果加上njit,缓存,parallel,这个是0.0499 秒,0.0488 秒,0.0462 秒
+    参数矩阵版本的并发入口。
+    indicator_params_mtf: (params_count, mtf_count, IndicatorParamIndex)
+    backtest_params: (params_count, BacktestParamIndex)
+    列索引在编译期确定, prange 内部只按整数索引读取参数, 不再哈希字符串键。
+    指标在 prange 之前按唯一参数去重计算一次, 各参数组合共享只读结果。
+    需要完整输出时, 回测输出预先分配成一块连续的缓冲区, b_output 中都是它的视图。
+    prange 按估算成本把参数组合分到每个线程的桶里 (见 get_parallel_schedule),
+    输出仍然按原始顺序存放。
     """
-    assert len(indicator_params_mtf) == len(backtest_params), "参数组合数量需要相等"
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
 
     _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
 
     mtf_count = len(ohlcv_mtf)
-    params_count = len(indicator_params_mtf)
+    params_count = indicator_params_mtf.shape[0]
+
+    assert params_count == 0 or indicator_params_mtf.shape[1] == mtf_count, (
+        "指标参数的mtf数量需要等于数据的mtf数量"
+    )
 
     (
         indicators_output_mtf,
@@ -125,38 +272,86 @@ def run_parallel(
         performance_output,
     ) = init_output_all(params_count, mtf_count, True)
 
-    for i in prange(params_count):
-        _i = nb_int(i)
-
-        i_params_mtf = indicator_params_mtf[_i]
-        b_params = backtest_params[_i]
-
-        i_output_mtf = indicators_output_mtf[_i]
-        s_output = signals_output[_i]
-        b_output = backtest_output[_i]
-        p_output = performance_output[_i]
-
-        for m in range(mtf_count):
-            _ohlcv = _ohlcv_mtf[m]
-            _i_params = i_params_mtf[m]
-            _i_output = i_output_mtf[m]
-            calc_indicators(_ohlcv, _i_params, _i_output)
-
-        calc_signal(
-            _ohlcv_mtf, data_mapping, i_params_mtf, i_output_mtf, s_output, b_params
-        )
+    # 回测输出包含 atr_sl_arr 等数组, 所有参数组合都需要 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        indicator_all_fields,
+        True,
+    )
+    atr_cache = atr_cache_list[0]
 
-        calc_backtest(_ohlcv_mtf, b_params, s_output, b_output)
+    # 只算绩效时每个参数组合的回测输出会立即释放, 不需要整块缓冲区
+    # prange 内部直接对数组切片得到的视图不持有引用, 放进 List 里才能在返回后继续存活
+    backtest_arena_list = List()
+    backtest_arena_list.append(
+        init_backtest_arena(_ohlcv_mtf, 0 if is_only_performance else params_count)
+    )
 
-        calc_performance(_ohlcv_mtf, b_params, b_output, p_output)
+    schedule_order, bin_offsets = get_parallel_schedule(
+        _ohlcv_mtf, indicator_params_mtf, backtest_params
+    )
+    for b in prange(len(bin_offsets) - 1):
+        for j in range(bin_offsets[b], bin_offsets[b + 1]):
+            _i = nb_int(schedule_order[j])
+
+            b_params = backtest_params[_i]
+
+            i_output_mtf = indicators_output_mtf[_i]
+            s_output = signals_output[_i]
+            b_output = backtest_output[_i]
+            p_output = performance_output[_i]
+
+            # 指标输出只用于返回, 信号直接读取缓存
+            if not is_only_performance:
+                for m in range(mtf_count):
+                    fill_indicator_output(
+                        _ohlcv_mtf[m],
+                        m,
+                        cache_index[_i, m],
+                        indicator_cache,
+                        i_output_mtf[m],
+                    )
+
+            calc_signal(
+                _ohlcv_mtf,
+                data_mapping,
+                cache_index[_i],
+                indicator_cache,
+                0,
+                s_output,
+                b_params,
+            )
 
-        if is_only_performance:
-            clear_list_element_at_index(
-                _i,
-                indicators_output_mtf,
-                signals_output,
-                backtest_output,
+            if is_only_performance:
+                b_arena = np.empty(backtest_arena_list[0].shape[1:], dtype=nb_float)
+            else:
+                b_arena = backtest_arena_list[0][_i]
+            status = calc_backtest_arena(
+                _ohlcv_mtf,
+                b_params,
+                s_output,
+                b_arena,
+                get_atr_row(atr_cache, atr_index, _i),
             )
+            if status >= 0:
+                set_backtest_output_views(b_arena, b_output)
+
+            if status > 0:
+                set_pruned_performance(p_output, status)
+            else:
+                calc_performance(_ohlcv_mtf, b_params, b_output, p_output)
+
+            if is_only_performance:
+                clear_list_element_at_index(
+                    _i,
+                    indicators_output_mtf,
+                    signals_output,
+                    backtest_output,
+                )
     if is_only_performance:
         (
             indicators_output_mtf,
@@ -171,3 +366,590 @@ def run_parallel(
         backtest_output,
         performance_output,
     )
+
+
+@njit(parallel_performance_signature, parallel=True, cache=enable_cache)
+def run_parallel_performance(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+):
+    """
+    参数优化专用的并发入口, 只返回 (params_count, PerformanceIndex) 的绩效矩阵。
+    指标来自共享缓存, 回测和绩效在同一次K线遍历中完成, 每个参数组合只保留标量状态,
+    不再分配逐K线的回测数组, 也不需要 clear_list_element_at_index 和二次 init_output_all。
+    指标缓存只计算信号用到的输出字段 (见 get_signal_need_fields)。
+    无法计算的参数组合整行为 NaN。
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+
+    _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
+
+    mtf_count = len(ohlcv_mtf)
+    params_count = indicator_params_mtf.shape[0]
+
+    assert params_count == 0 or indicator_params_mtf.shape[1] == mtf_count, (
+        "指标参数的mtf数量需要等于数据的mtf数量"
+    )
+
+    performance = np.full((params_count, len(performance_keys)), np.nan, dtype=nb_acc)
+
+    # 只算绩效, 没有开启 ATR 离场和 ATR 滑点的参数组合跳过 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        False,
+    )
+    atr_cache = atr_cache_list[0]
+
+    schedule_order, bin_offsets = get_parallel_schedule(
+        _ohlcv_mtf, indicator_params_mtf, backtest_params
+    )
+    for b in prange(len(bin_offsets) - 1):
+        for j in range(bin_offsets[b], bin_offsets[b + 1]):
+            _i = nb_int(schedule_order[j])
+
+            b_params = backtest_params[_i]
+
+            s_output = build_combo_signals(
+                _ohlcv_mtf,
+                data_mapping,
+                b_params,
+                cache_index[_i],
+                indicator_cache,
+                0,
+            )
+
+            calc_backtest_performance(
+                _ohlcv_mtf,
+                b_params,
+                s_output,
+                performance[_i],
+                get_atr_row(atr_cache, atr_index, _i),
+            )
+
+    return performance
+
+
+@njit(parallel_arena_signature, parallel=True, cache=enable_cache)
+def run_parallel_arena(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+):
+    """
+    回测输出缓冲区版本的并发入口。
+    返回 (backtest_arena, performance):
+      backtest_arena: (params_count, BacktestOutputIndex, bars), 在 prange 之前一次性分配,
+                      每个参数组合写入自己的切片, 无法回测的参数组合为 NaN
+      performance: (params_count, PerformanceIndex)
+    每个字段在K线维度上连续, 可以零拷贝交给 polars/Arrow。
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+
+    _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
+
+    mtf_count = len(ohlcv_mtf)
+    params_count = indicator_params_mtf.shape[0]
+
+    assert params_count == 0 or indicator_params_mtf.shape[1] == mtf_count, (
+        "指标参数的mtf数量需要等于数据的mtf数量"
+    )
+
+    backtest_arena = init_backtest_arena(_ohlcv_mtf, params_count)
+    performance = np.full((params_count, len(performance_keys)), np.nan, dtype=nb_acc)
+
+    # 回测输出包含 atr_sl_arr 等数组, 所有参数组合都需要 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        True,
+    )
+    atr_cache = atr_cache_list[0]
+
+    schedule_order, bin_offsets = get_parallel_schedule(
+        _ohlcv_mtf, indicator_params_mtf, backtest_params
+    )
+    for b in prange(len(bin_offsets) - 1):
+        for j in range(bin_offsets[b], bin_offsets[b + 1]):
+            _i = nb_int(schedule_order[j])
+
+            b_params = backtest_params[_i]
+            b_arena = backtest_arena[_i]
+
+            s_output = build_combo_signals(
+                _ohlcv_mtf,
+                data_mapping,
+                b_params,
+                cache_index[_i],
+                indicator_cache,
+                0,
+            )
+
+            status = calc_backtest_arena(
+                _ohlcv_mtf,
+                b_params,
+                s_output,
+                b_arena,
+                get_atr_row(atr_cache, atr_index, _i),
+            )
+            if status < 0:
+                b_arena[:] = np.nan
+                continue
+
+            p_output = Dict.empty(key_type=types.unicode_type, value_type=nb_acc)
+            if status > 0:
+                set_pruned_performance(p_output, status)
+            else:
+                b_output = Dict.empty(
+                    key_type=types.unicode_type, value_type=nb_float[:]
+                )
+                set_backtest_output_views(b_arena, b_output)
+                calc_performance(_ohlcv_mtf, b_params, b_output, p_output)
+            convert_performance_to_row(p_output, performance[_i])
+
+    return backtest_arena, performance
+
+
+@njit(parallel_symbols_signature, parallel=True, cache=enable_cache)
+def run_parallel_symbols(
+    ohlcv_mtf_list,
+    ohlcv_smoothed_mtf_list,
+    data_mapping_list,
+    indicator_params_mtf,
+    backtest_params,
+):
+    """
+    多品种只算绩效的并发入口, 所有品种共用同一组参数。
+    (品种, 参数组合) 展平成一个迭代空间, 只启动一次 prange, 代替每个品种一次的小规模并发。
+    各品种的指标缓存也合并成一次 calc_indicator_cache:
+    第 s 个品种第 m 个周期在缓存中的周期编号为 s * mtf_count + m。
+    返回 (symbol_count, params_count, PerformanceIndex), 无法计算的为 NaN。
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    symbol_count = len(ohlcv_mtf_list)
+    assert len(data_mapping_list) == symbol_count, "每个品种需要一个 data_mapping"
+    assert (
+        len(ohlcv_smoothed_mtf_list) == 0
+        or len(ohlcv_smoothed_mtf_list) == symbol_count
+    ), "ohlcv_smoothed_mtf_list 需要为空, 或者每个品种一个"
+
+    params_count = indicator_params_mtf.shape[0]
+    mtf_count = indicator_params_mtf.shape[1]
+
+    performance = np.full(
+        (symbol_count, params_count, len(performance_keys)), np.nan, dtype=nb_acc
+    )
+
+    # 每个品种实际使用的数据
+    _ohlcv_mtf_list = List()
+    costs = np.ones(symbol_count * params_count, dtype=nb_float)
+    for s in range(symbol_count):
+        _ohlcv_mtf = ohlcv_mtf_list[s]
+        if len(ohlcv_smoothed_mtf_list) > 0 and len(ohlcv_smoothed_mtf_list[s]) > 0:
+            _ohlcv_mtf = ohlcv_smoothed_mtf_list[s]
+        assert len(_ohlcv_mtf) == mtf_count, (
+            "每个品种的mtf数量需要等于指标参数的mtf数量"
+        )
+        _ohlcv_mtf_list.append(_ohlcv_mtf)
+
+        if check_ohlcv_mtf(_ohlcv_mtf):
+            costs[s * params_count : (s + 1) * params_count] = estimate_combo_costs(
+                _ohlcv_mtf, indicator_params_mtf, backtest_params
+            )
+
+    # 只算绩效, 没有开启 ATR 离场和 ATR 滑点的参数组合跳过 ATR
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        False,
+    )
+
+    schedule_order, bin_offsets = get_cost_bins(costs, schedule_bin_count)
+    for b in prange(len(bin_offsets) - 1):
+        for j in range(bin_offsets[b], bin_offsets[b + 1]):
+            t = schedule_order[j]
+            s = t // params_count
+            _i = nb_int(t % params_count)
+
+            _ohlcv_mtf = _ohlcv_mtf_list[s]
+            b_params = backtest_params[_i]
+
+            s_output = build_combo_signals(
+                _ohlcv_mtf,
+                data_mapping_list[s],
+                b_params,
+                cache_index[_i],
+                indicator_cache,
+                s * mtf_count,
+            )
+
+            calc_backtest_performance(
+                _ohlcv_mtf,
+                b_params,
+                s_output,
+                performance[s, _i],
+                get_atr_row(atr_cache_list[s], atr_index, _i),
+            )
+
+    return performance
+
+
+# 区间回测的 prange 放在 inline 函数中, 展开到调用它的并发入口后仍然是并发循环
+@njit(cache=enable_cache, inline="always")
+def set_ranges_performance(
+    _ohlcv_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    bar_ranges,
+    cache_index,
+    indicator_cache,
+    atr_index,
+    atr_cache,
+    performance,
+):
+    """
+    每个参数组合在每个 [bar_start, bar_stop) 区间上只算绩效, 写入 performance[r, i]。
+    信号在完整序列上计算一次, 各区间只切片回测。
+    """
+    schedule_order, bin_offsets = get_parallel_schedule(
+        _ohlcv_mtf, indicator_params_mtf, backtest_params
+    )
+    for b in prange(len(bin_offsets) - 1):
+        for j in range(bin_offsets[b], bin_offsets[b + 1]):
+            _i = nb_int(schedule_order[j])
+
+            b_params = backtest_params[_i]
+
+            s_output = build_combo_signals(
+                _ohlcv_mtf,
+                data_mapping,
+                b_params,
+                cache_index[_i],
+                indicator_cache,
+                0,
+            )
+
+            equity_out = np.empty(0, dtype=nb_float)
+            atr_arr = get_atr_row(atr_cache, atr_index, _i)
+            for r in range(bar_ranges.shape[0]):
+                calc_backtest_performance_range(
+                    _ohlcv_mtf,
+                    b_params,
+                    s_output,
+                    performance[r, _i],
+                    bar_ranges[r, 0],
+                    bar_ranges[r, 1],
+                    equity_out,
+                    atr_arr,
+                )
+
+
+@njit(cache=enable_cache, inline="always")
+def set_range_equity(
+    _ohlcv_mtf,
+    data_mapping,
+    backtest_params,
+    combo_index,
+    bar_ranges,
+    cache_index,
+    indicator_cache,
+    atr_index,
+    atr_cache,
+    performance,
+    equity,
+):
+    """
+    第 r 个区间回测第 combo_index[r] 个参数组合, 为 -1 时跳过,
+    绩效写入 performance[r], 净值写入 equity[r]。
+    这里需要完整的区间净值, 提前终止规则关闭 (见 disable_prune_params),
+    否则被终止的区间后半段净值为 NaN, 终止前的亏损会在拼接时丢失。
+    """
+    for r in prange(bar_ranges.shape[0]):
+        _i = combo_index[r]
+        if _i < 0:
+            continue
+
+        b_params = disable_prune_params(backtest_params[_i])
+
+        s_output = build_combo_signals(
+            _ohlcv_mtf,
+            data_mapping,
+            b_params,
+            cache_index[_i],
+            indicator_cache,
+            0,
+        )
+
+        calc_backtest_performance_range(
+            _ohlcv_mtf,
+            b_params,
+            s_output,
+            performance[r],
+            bar_ranges[r, 0],
+            bar_ranges[r, 1],
+            equity[r],
+            get_atr_row(atr_cache, atr_index, _i),
+        )
+
+
+@njit(parallel_ranges_signature, parallel=True, cache=enable_cache)
+def run_parallel_ranges(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    bar_ranges,
+):
+    """
+    walk-forward 样本内优化的并发入口: 每个参数组合在每个 [bar_start, bar_stop) 区间上只算绩效。
+    指标缓存和信号都在完整序列上计算一次, 各区间只切片回测, 所有区间在同一次 prange 中完成。
+    返回 (ranges_count, params_count, PerformanceIndex), 无法计算的为 NaN。
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+
+    _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
+
+    mtf_count = len(ohlcv_mtf)
+    params_count = indicator_params_mtf.shape[0]
+    ranges_count = bar_ranges.shape[0]
+
+    assert params_count == 0 or indicator_params_mtf.shape[1] == mtf_count, (
+        "指标参数的mtf数量需要等于数据的mtf数量"
+    )
+
+    performance = np.full(
+        (ranges_count, params_count, len(performance_keys)), np.nan, dtype=nb_acc
+    )
+
+    # 只算绩效, 没有开启 ATR 离场和 ATR 滑点的参数组合跳过 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        False,
+    )
+
+    set_ranges_performance(
+        _ohlcv_mtf,
+        data_mapping,
+        indicator_params_mtf,
+        backtest_params,
+        bar_ranges,
+        cache_index,
+        indicator_cache,
+        atr_index,
+        atr_cache_list[0],
+        performance,
+    )
+
+    return performance
+
+
+@njit(parallel_range_equity_signature, parallel=True, cache=enable_cache)
+def run_parallel_range_equity(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    bar_ranges,
+):
+    """
+    walk-forward 样本外评估的并发入口: 第 r 个参数组合只回测第 r 个区间,
+    提前终止规则关闭 (见 set_range_equity)。
+    返回 (performance, equity):
+      performance: (ranges_count, PerformanceIndex)
+      equity: (ranges_count, bars), 区间外为 NaN
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    assert indicator_params_mtf.shape[0] == bar_ranges.shape[0], (
+        "每个区间需要一个参数组合"
+    )
+
+    _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
+
+    ranges_count = bar_ranges.shape[0]
+    data_count = len(ohlcv_mtf[0]["close"]) if check_ohlcv_mtf(ohlcv_mtf) else 0
+
+    performance = np.full((ranges_count, len(performance_keys)), np.nan, dtype=nb_acc)
+    equity = np.full((ranges_count, data_count), np.nan, dtype=nb_float)
+
+    # 只算绩效, 没有开启 ATR 离场和 ATR 滑点的参数组合跳过 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        False,
+    )
+
+    set_range_equity(
+        _ohlcv_mtf,
+        data_mapping,
+        backtest_params,
+        np.arange(ranges_count).astype(nb_int),
+        bar_ranges,
+        cache_index,
+        indicator_cache,
+        atr_index,
+        atr_cache_list[0],
+        performance,
+        equity,
+    )
+
+    return performance, equity
+
+
+@njit(parallel_walk_forward_signature, parallel=True, cache=enable_cache)
+def run_parallel_walk_forward(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_ranges,
+    oos_ranges,
+    metric_col,
+    metric_sign,
+):
+    """
+    walk-forward 的并发入口, 指标缓存只计算一次, 样本内优化和样本外回测共用。
+    第 w 个样本内窗口按 performance[:, metric_col] * metric_sign 选出最大的参数组合
+    (NaN 视为最差, 全部为 NaN 时为 -1), 再用它回测第 w 个样本外窗口。
+    返回 (is_performance, best_index, oos_performance, oos_equity):
+      is_performance: (windows_count, params_count, PerformanceIndex)
+      best_index: (windows_count,)
+      oos_performance: (windows_count, PerformanceIndex)
+      oos_equity: (windows_count, bars), 样本外窗口以外为 NaN
+    """
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    assert is_ranges.shape[0] == oos_ranges.shape[0], "每个样本内窗口需要一个样本外窗口"
+
+    _ohlcv_mtf = ohlcv_mtf if len(ohlcv_smoothed_mtf) == 0 else ohlcv_smoothed_mtf
+
+    mtf_count = len(ohlcv_mtf)
+    params_count = indicator_params_mtf.shape[0]
+    windows_count = is_ranges.shape[0]
+    data_count = len(ohlcv_mtf[0]["close"]) if check_ohlcv_mtf(ohlcv_mtf) else 0
+
+    assert params_count == 0 or indicator_params_mtf.shape[1] == mtf_count, (
+        "指标参数的mtf数量需要等于数据的mtf数量"
+    )
+
+    is_performance = np.full(
+        (windows_count, params_count, len(performance_keys)), np.nan, dtype=nb_acc
+    )
+    oos_performance = np.full(
+        (windows_count, len(performance_keys)), np.nan, dtype=nb_acc
+    )
+    oos_equity = np.full((windows_count, data_count), np.nan, dtype=nb_float)
+
+    # 只算绩效, 没有开启 ATR 离场和 ATR 滑点的参数组合跳过 ATR
+    _ohlcv_mtf_list = List()
+    _ohlcv_mtf_list.append(_ohlcv_mtf)
+    cache_index, indicator_cache, atr_index, atr_cache_list = prepare_shared_caches(
+        _ohlcv_mtf_list,
+        indicator_params_mtf,
+        backtest_params,
+        get_signal_need_fields(backtest_params),
+        False,
+    )
+
+    set_ranges_performance(
+        _ohlcv_mtf,
+        data_mapping,
+        indicator_params_mtf,
+        backtest_params,
+        is_ranges,
+        cache_index,
+        indicator_cache,
+        atr_index,
+        atr_cache_list[0],
+        is_performance,
+    )
+
+    # 相同分数取编号最小的参数组合, 与 np.argmax 一致
+    best_index = np.full(windows_count, -1, dtype=nb_int)
+    for w in range(windows_count):
+        best_score = -np.inf
+        for i in range(params_count):
+            score = is_performance[w, i, metric_col] * metric_sign
+            if score > best_score:
+                best_score = score
+                best_index[w] = i
+
+    set_range_equity(
+        _ohlcv_mtf,
+        data_mapping,
+        backtest_params,
+        best_index,
+        oos_ranges,
+        cache_index,
+        indicator_cache,
+        atr_index,
+        atr_cache_list[0],
+        oos_performance,
+        oos_equity,
+    )
+
+    return is_performance, best_index, oos_performance, oos_equity
+
+
+@njit(parallel_signature, cache=enable_cache)
+def run_parallel(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance,
+):
+    """
+    并发200配置和4万数据,如果加上njit,缓存,parallel,这个是0.1391 秒,0.1346 秒,0.1246 秒
+    并发1  配置和4万数据,如果加上njit,缓存,parallel,这个是0.0499 秒,0.0488 秒,0.0462 秒
+    字典形式的参数在进入 prange 之前一次性转换成参数矩阵, 然后交给 run_parallel_matrix
+    """
+    assert len(indicator_params_mtf) == len(backtest_params), "参数组合数量需要相等"
+
+    return run_parallel_matrix(
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        data_mapping,
+        convert_indicator_params_list_to_matrix(indicator_params_mtf),
+        convert_backtest_params_list_to_matrix(backtest_params),
+        is_only_performance,
+    )
@@ -0,0 +1,234 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import polars as pl
+
+from src.utils.constants import numba_config
+
+
+from src.parallel_chunked import iter_parallel_chunks
+from src.backtest.backtest_enums import performance_keys
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+from src.convert_params.param_key_utils import get_length_from_list_or_dict
+
+
+np_acc = numba_config["np"]["acc"]
+
+
+"""
+分块扫描的断点续跑。
+每块绩效完成后立即写入 checkpoint_dir/<指纹>/chunk_<start>_<stop>.npy,
+再把已完成的参数行号区间写入同一目录的 manifest.json, 两者都先写临时文件再替换,
+进程在任何时刻中断都不会留下写了一半的文件。
+指纹由原始数据、平滑数据、参数矩阵、绩效字段、精度设置和 is_only_performance 计算,
+数据、参数或设置变化后自动换一个目录重新计算。
+"""
+
+
+MANIFEST_NAME = "manifest.json"
+FINGERPRINT_DIR_LENGTH = 16
+
+
+def update_array_hash(h, name, array):
+    array = np.ascontiguousarray(array)
+    h.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+    h.update(array.tobytes())
+
+
+def get_sweep_fingerprint(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance=True,
+):
+    """
+    返回一次参数扫描的 sha256 指纹, 输入和设置完全相同的扫描得到相同的指纹。
+    data_mapping 由 ohlcv_mtf 决定, 不单独计算。
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(performance_keys).encode())
+    h.update(
+        json.dumps(
+            {
+                "enable64": bool(numba_config["enable64"]),
+                "enable_mixed": bool(numba_config["enable_mixed"]),
+                "is_only_performance": bool(is_only_performance),
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    for name, data_mtf in (("ohlcv", ohlcv_mtf), ("smoothed", ohlcv_smoothed_mtf)):
+        for m in range(get_length_from_list_or_dict(data_mtf)):
+            for k in sorted(data_mtf[m].keys()):
+                update_array_hash(h, f"{name}_{m}_{k}", data_mtf[m][k])
+    update_array_hash(h, "indicator_params_mtf", indicator_params_mtf)
+    update_array_hash(h, "backtest_params", backtest_params)
+    return h.hexdigest()
+
+
+def write_atomic(path, write):
+    """
+    write(f) 先写入同目录的临时文件, 完成后用 os.replace 原子替换 path。
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def get_chunk_name(start, stop):
+    return f"chunk_{start}_{stop}.npy"
+
+
+def load_checkpoint(checkpoint_path, fingerprint, params_count):
+    """
+    读取 manifest 中已完成的块, 返回按 start 排序的 [(start, stop, 绩效矩阵)]。
+    指纹不一致、文件缺失、形状或 dtype 不对的块视为未完成。
+    """
+    manifest_path = os.path.join(checkpoint_path, MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        return []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if (
+        manifest.get("fingerprint") != fingerprint
+        or manifest.get("params_count") != params_count
+        or manifest.get("performance_keys") != list(performance_keys)
+    ):
+        return []
+
+    chunks = []
+    for start, stop in manifest.get("chunks", []):
+        path = os.path.join(checkpoint_path, get_chunk_name(start, stop))
+        if not (0 <= start < stop <= params_count) or not os.path.isfile(path):
+            continue
+        performance = np.load(path, allow_pickle=False)
+        if (
+            performance.shape != (stop - start, len(performance_keys))
+            or performance.dtype != np_acc
+        ):
+            continue
+        chunks.append((start, stop, performance))
+    chunks.sort(key=lambda c: c[0])
+
+    # 区间重叠时只保留先出现的块
+    result = []
+    for chunk in chunks:
+        if not result or chunk[0] >= result[-1][1]:
+            result.append(chunk)
+    return result
+
+
+def save_manifest(checkpoint_path, fingerprint, params_count, chunks):
+    manifest = {
+        "fingerprint": fingerprint,
+        "params_count": params_count,
+        "performance_keys": list(performance_keys),
+        "chunks": sorted([start, stop] for start, stop, _ in chunks),
+    }
+    write_atomic(
+        os.path.join(checkpoint_path, MANIFEST_NAME),
+        lambda f: f.write(json.dumps(manifest, indent=2).encode()),
+    )
+
+
+def get_missing_ranges(chunks, params_count):
+    """
+    返回 [0, params_count) 中没有被已完成的块覆盖的 [(start, stop)]。
+    """
+    missing = []
+    cursor = 0
+    for start, stop, _ in chunks:
+        if start > cursor:
+            missing.append((cursor, start))
+        cursor = max(cursor, stop)
+    if cursor < params_count:
+        missing.append((cursor, params_count))
+    return missing
+
+
+def run_parallel_checkpointed(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance=True,
+    chunk_size=0,
+    memory_budget_mb=0,
+    checkpoint_dir="./checkpoint",
+):
+    """
+    与 run_parallel_chunked 相同, 但每块完成后立即保存到 checkpoint_dir,
+    重新运行相同的扫描时跳过已完成的参数行号区间, 只计算剩下的部分。
+    分块大小只影响新计算的块, 已完成的块不受之后修改 chunk_size 的影响。
+    """
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    params_count = backtest_params.shape[0]
+
+    fingerprint = get_sweep_fingerprint(
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        indicator_params_mtf,
+        backtest_params,
+        is_only_performance,
+    )
+    checkpoint_path = os.path.join(checkpoint_dir, fingerprint[:FINGERPRINT_DIR_LENGTH])
+    os.makedirs(checkpoint_path, exist_ok=True)
+
+    chunks = load_checkpoint(checkpoint_path, fingerprint, params_count)
+    for missing_start, missing_stop in get_missing_ranges(chunks, params_count):
+        for start, stop, performance in iter_parallel_chunks(
+            ohlcv_mtf,
+            ohlcv_smoothed_mtf,
+            data_mapping,
+            indicator_params_mtf[missing_start:missing_stop],
+            backtest_params[missing_start:missing_stop],
+            is_only_performance,
+            chunk_size,
+            memory_budget_mb,
+        ):
+            start += missing_start
+            stop += missing_start
+            performance = np.ascontiguousarray(performance, dtype=np_acc)
+            # 先写块再写 manifest, manifest 中的块一定完整
+            write_atomic(
+                os.path.join(checkpoint_path, get_chunk_name(start, stop)),
+                lambda f: np.save(f, performance, allow_pickle=False),
+            )
+            chunks.append((start, stop, performance))
+            save_manifest(checkpoint_path, fingerprint, params_count, chunks)
+
+    chunks.sort(key=lambda c: c[0])
+    if len(chunks) == 0:
+        params_index = np.zeros(0, dtype=np.int64)
+        performance = np.zeros((0, len(performance_keys)), dtype=np_acc)
+    else:
+        params_index = np.concatenate(
+            [np.arange(start, stop, dtype=np.int64) for start, stop, _ in chunks]
+        )
+        performance = np.concatenate([p for _, _, p in chunks])
+
+    return pl.DataFrame(
+        {
+            "params_index": params_index,
+            **{k: performance[:, c] for c, k in enumerate(performance_keys)},
+        }
+    )
@@ -0,0 +1,164 @@
+import numpy as np
+import polars as pl
+
+from src.utils.constants import numba_config
+
+
+from src.parallel import run_parallel_matrix, run_parallel_performance
+from src.backtest.backtest_enums import (
+    performance_keys,
+    backtest_output_keys,
+    signal_output_keys,
+)
+from src.backtest.calculate_performance import convert_performance_to_matrix
+from src.indicators.indicator_layout import (
+    indicator_slot_counts,
+    indicator_output_counts,
+)
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+from src.convert_params.param_key_utils import get_length_from_list_or_dict
+
+
+enable_cache = numba_config["enable_cache"]
+nb_float = numba_config["nb"]["float"]
+np_float = numba_config["np"]["float"]
+np_acc = numba_config["np"]["acc"]
+
+
+def estimate_combo_bytes(ohlcv_mtf, is_only_performance):
+    """
+    估算单个参数组合占用的内存上限(字节)。
+    指标缓存按所有参数组合都不重复估算, 只算绩效时回测和信号数组会被立即释放。
+    """
+    itemsize = np.dtype(np_float).itemsize
+    indicator_count = int(np.sum(indicator_slot_counts * indicator_output_counts))
+
+    combo_bytes = len(performance_keys) * np.dtype(np_acc).itemsize
+    for m in range(get_length_from_list_or_dict(ohlcv_mtf)):
+        combo_bytes += len(ohlcv_mtf[m]["close"]) * indicator_count * itemsize
+
+    if not is_only_performance:
+        data_count = len(ohlcv_mtf[0]["close"])
+        combo_bytes += data_count * len(backtest_output_keys) * itemsize
+        combo_bytes += data_count * len(signal_output_keys)
+    return combo_bytes
+
+
+def get_chunk_size(ohlcv_mtf, is_only_performance, chunk_size=0, memory_budget_mb=0):
+    """
+    chunk_size 优先, 否则按 memory_budget_mb 估算每块的参数组合数量, 至少为1。
+    两者都为0时返回0, 代表不分块。
+    """
+    assert chunk_size >= 0 and memory_budget_mb >= 0, "分块参数不能为负数"
+    if chunk_size > 0:
+        return int(chunk_size)
+    if memory_budget_mb > 0:
+        combo_bytes = estimate_combo_bytes(ohlcv_mtf, is_only_performance)
+        return max(1, int(memory_budget_mb * 1024 * 1024 // combo_bytes))
+    return 0
+
+
+def iter_parallel_chunks(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance,
+    chunk_size=0,
+    memory_budget_mb=0,
+):
+    """
+    按块调用 run_parallel_matrix, 每块完成后立即 yield (start, stop, 绩效矩阵)。
+    只算绩效时改用 run_parallel_performance, 不分配逐K线的回测数组。
+    字典形式的参数会先一次性转换成参数矩阵, 然后按行切片。
+    """
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    params_count = backtest_params.shape[0]
+
+    chunk_size = get_chunk_size(
+        ohlcv_mtf, is_only_performance, chunk_size, memory_budget_mb
+    )
+    if chunk_size == 0:
+        chunk_size = max(params_count, 1)
+
+    for start in range(0, params_count, chunk_size):
+        stop = min(start + chunk_size, params_count)
+        _indicator_params_mtf = np.ascontiguousarray(indicator_params_mtf[start:stop])
+        _backtest_params = np.ascontiguousarray(backtest_params[start:stop])
+
+        if is_only_performance:
+            performance = run_parallel_performance(
+                ohlcv_mtf,
+                ohlcv_smoothed_mtf,
+                data_mapping,
+                _indicator_params_mtf,
+                _backtest_params,
+            )
+        else:
+            result = run_parallel_matrix(
+                ohlcv_mtf,
+                ohlcv_smoothed_mtf,
+                data_mapping,
+                _indicator_params_mtf,
+                _backtest_params,
+                is_only_performance,
+            )
+            performance = convert_performance_to_matrix(result[3])
+        yield start, stop, performance
+
+
+def run_parallel_chunked(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance=True,
+    chunk_size=0,
+    memory_budget_mb=0,
+):
+    """
+    分块扫描所有参数组合, 把每块的绩效拼接成一张表。
+    返回 polars DataFrame, params_index 列是参数组合在原参数矩阵中的行号。
+    """
+    params_index_list = []
+    performance_list = []
+    for start, stop, performance in iter_parallel_chunks(
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        data_mapping,
+        indicator_params_mtf,
+        backtest_params,
+        is_only_performance,
+        chunk_size,
+        memory_budget_mb,
+    ):
+        params_index_list.append(np.arange(start, stop, dtype=np.int64))
+        performance_list.append(performance)
+
+    if len(performance_list) == 0:
+        params_index = np.zeros(0, dtype=np.int64)
+        performance = np.zeros((0, len(performance_keys)), dtype=np_acc)
+    else:
+        params_index = np.concatenate(params_index_list)
+        performance = np.concatenate(performance_list)
+
+    return pl.DataFrame(
+        {
+            "params_index": params_index,
+            **{k: performance[:, c] for c, k in enumerate(performance_keys)},
+        }
+    )
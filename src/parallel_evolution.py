@@ -0,0 +1,173 @@
+import numpy as np
+import polars as pl
+
+from src.parallel import run_parallel_performance
+from src.parallel_top_k import minimize_performance_keys
+from src.backtest.backtest_enums import pfi, performance_keys
+from src.convert_params.param_grid import get_spec_values, create_sobol_unit_points
+from src.indicators.indicator_layout import ipi
+
+
+"""
+遗传算法参数优化。
+个体用每个优化维度的取值下标表示, 交叉和变异都在下标上进行, 所以参数始终落在
+define_signal_*_params 的 [min, max, step] 网格上。
+每一代只调用一次 run_parallel_performance, 已经评估过的个体从缓存中读取, 不会重复回测。
+"""
+
+
+def get_dim_column_name(mtf_idx, key):
+    return f"{key}_mtf{mtf_idx}"
+
+
+def create_params_from_points(indicator_params_mtf, backtest_params, dims, points):
+    """
+    以参数矩阵的第0行为模板, 按 points (points_count, dims_count) 写入优化维度,
+    返回新的 (indicator_params_mtf, backtest_params) 参数矩阵。
+    """
+    count = len(points)
+    _indicator_params_mtf = np.repeat(indicator_params_mtf[:1], count, axis=0)
+    _backtest_params = np.repeat(backtest_params[:1], count, axis=0)
+    for d, (mtf_idx, key, _) in enumerate(dims):
+        _indicator_params_mtf[:, mtf_idx, ipi[key].value] = points[:, d]
+    return _indicator_params_mtf, _backtest_params
+
+
+class EvolutionCache:
+    """
+    已评估个体的缓存, 键为个体在网格中的展平下标。
+    """
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.index_map = {}
+        self.genes_list = []
+        self.performance_list = []
+        self.generation_list = []
+
+    def get_flat_index(self, genes):
+        return np.ravel_multi_index(tuple(genes.T), self.shape)
+
+    def get_missing(self, genes):
+        """
+        返回还没有评估过的个体(去重), 保持第一次出现的顺序。
+        """
+        flat_index = self.get_flat_index(genes)
+        _, first = np.unique(flat_index, return_index=True)
+        first = np.sort(first)
+        return genes[[i for i in first if flat_index[i] not in self.index_map]]
+
+    def add(self, genes, performance, generation):
+        for flat, g, p in zip(self.get_flat_index(genes), genes, performance):
+            self.index_map[int(flat)] = len(self.genes_list)
+            self.genes_list.append(g)
+            self.performance_list.append(p)
+            self.generation_list.append(generation)
+
+    def get_performance(self, genes):
+        rows = [self.index_map[int(i)] for i in self.get_flat_index(genes)]
+        return np.array([self.performance_list[r] for r in rows])
+
+    def __len__(self):
+        return len(self.genes_list)
+
+
+def run_parallel_evolution(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    dims,
+    metric="sharpe_ratio",
+    population_size=64,
+    generations=20,
+    elite_count=4,
+    tournament_size=3,
+    mutation_rate=0.2,
+    seed=0,
+):
+    """
+    遗传算法搜索 dims 中的优化维度, dims 来自 collect_optim_dims。
+    indicator_params_mtf 和 backtest_params 是参数矩阵, 第0行作为其他参数的模板。
+    初始种群用 Sobol 序列铺开, 之后每一代:
+      精英直接保留, 其余个体由锦标赛选择父母, 均匀交叉, 再按 mutation_rate 对每个维度
+      做高斯步长的下标变异, 下标截断在取值范围内。
+    NaN 绩效(包括提前终止的参数组合)视为最差。
+
+    返回 polars DataFrame, 每行一个评估过的个体, 按 metric 从好到坏排列:
+      generation 为第一次评估的代数, 维度列名见 get_dim_column_name, 其余为绩效指标。
+    表的行数就是实际回测次数, 可以用 create_params_from_points 重建最优参数。
+    """
+    assert metric in performance_keys, f"未知的绩效指标 {metric}"
+    assert len(dims) > 0, "至少需要一个优化维度"
+    assert population_size > 0 and 0 <= elite_count < population_size
+
+    rng = np.random.default_rng(seed)
+    sign = -1.0 if metric in minimize_performance_keys else 1.0
+
+    values_list = [get_spec_values(spec) for _, _, spec in dims]
+    shape = np.array([len(v) for v in values_list], dtype=np.int64)
+    cache = EvolutionCache(shape)
+
+    def get_points(genes):
+        points = np.empty(genes.shape, dtype=indicator_params_mtf.dtype)
+        for d, values in enumerate(values_list):
+            points[:, d] = values[genes[:, d]]
+        return points
+
+    def evaluate(genes, generation):
+        missing = cache.get_missing(genes)
+        if len(missing) > 0:
+            performance = run_parallel_performance(
+                ohlcv_mtf,
+                ohlcv_smoothed_mtf,
+                data_mapping,
+                *create_params_from_points(
+                    indicator_params_mtf, backtest_params, dims, get_points(missing)
+                ),
+            )
+            cache.add(missing, performance, generation)
+        score = cache.get_performance(genes)[:, pfi[metric].value] * sign
+        return np.where(np.isnan(score), -np.inf, score)
+
+    unit_points = create_sobol_unit_points(0, population_size, len(dims))
+    genes = np.minimum((unit_points * shape).astype(np.int64), shape - 1)
+    score = evaluate(genes, 0)
+
+    sigma = np.maximum(1.0, shape * 0.1)
+    for generation in range(1, generations):
+        order = np.argsort(-score, kind="stable")
+        elites = genes[order[:elite_count]]
+
+        child_count = population_size - elite_count
+        contenders = rng.integers(0, population_size, (2, child_count, tournament_size))
+        winners = np.take_along_axis(
+            contenders, np.argmax(score[contenders], axis=2)[..., None], axis=2
+        )[..., 0]
+        parent_a, parent_b = genes[winners[0]], genes[winners[1]]
+
+        children = np.where(rng.random(parent_a.shape) < 0.5, parent_a, parent_b)
+        mutate = rng.random(children.shape) < mutation_rate
+        step = np.rint(rng.normal(0.0, sigma, children.shape)).astype(np.int64)
+        children = np.clip(children + mutate * step, 0, shape - 1)
+
+        genes = np.concatenate((elites, children))
+        score = evaluate(genes, generation)
+
+    all_genes = np.array(cache.genes_list, dtype=np.int64)
+    performance = np.array(cache.performance_list)
+    points = get_points(all_genes)
+    score = performance[:, pfi[metric].value] * sign
+    order = np.argsort(-np.where(np.isnan(score), -np.inf, score), kind="stable")
+
+    return pl.DataFrame(
+        {
+            "generation": np.array(cache.generation_list, dtype=np.int64)[order],
+            **{
+                get_dim_column_name(mtf_idx, key): points[order, d]
+                for d, (mtf_idx, key, _) in enumerate(dims)
+            },
+            **{k: performance[order, c] for c, k in enumerate(performance_keys)},
+        }
+    )
@@ -0,0 +1,218 @@
+import numpy as np
+import polars as pl
+from numba import njit, prange
+
+from src.utils.constants import numba_config
+
+from src.indicators.indicator_cache import collect_indicator_cache_index
+from src.indicators.indicator_state import (
+    pri,
+    price_ring_keys,
+    get_price_ring_capacity,
+    init_indicator_state,
+    push_price_ring,
+    update_indicator_state,
+)
+from src.signals.calculate_signal import calc_signal_bar
+from src.backtest.backtest_enums import performance_keys
+from src.backtest.backtest_state import (
+    init_backtest_state,
+    update_backtest_state,
+    set_backtest_state_performance,
+)
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+nb_bool = numba_config["nb"]["bool"]
+nb_acc = numba_config["nb"]["acc"]
+np_int = numba_config["np"]["int"]
+np_float = numba_config["np"]["float"]
+np_acc = numba_config["np"]["acc"]
+
+
+"""
+增量回测: 实盘监控中每来一根新的主周期K线, 只把所有参数组合的状态推进一步,
+不再对整段历史重新计算指标、信号、回测和绩效。
+指标状态按唯一参数保存 (见 indicator_state), 回测状态和绩效累加器每个参数组合一行
+(见 backtest_state), 每根K线的工作量与历史长度无关。
+"""
+
+
+@njit(parallel=True, cache=enable_cache)
+def append_live_bars(
+    price_ring,
+    bar_counts,
+    unique_params,
+    cache_index,
+    indicator_state,
+    indicator_values,
+    backtest_params,
+    backtest_state,
+    rows,
+):
+    """
+    按顺序追加 rows: (bars, mtf_count, 6) 的 tohlcv, 每行是同一时刻每个周期的最新K线。
+    主周期的每一行都是新K线; 高周期的K线时间比上一次追加的更晚时才视为新K线,
+    否则忽略 (高周期K线只追加一次, 与 data_mapping 的映射一致), 时间为 NaN 表示还没有K线。
+    """
+    mtf_count = price_ring.shape[0]
+    params_count = backtest_params.shape[0]
+    capacity = price_ring.shape[1]
+    updated = np.zeros(mtf_count, dtype=nb_bool)
+
+    for r in range(rows.shape[0]):
+        for m in range(mtf_count):
+            time = rows[r, m, pri.time.value]
+            last_time = price_ring[m, (bar_counts[m] - 1) % capacity, pri.time.value]
+            if m == 0:
+                assert bar_counts[0] == 0 or time > last_time, "主周期K线的时间需要递增"
+            updated[m] = not np.isnan(time) and (bar_counts[m] == 0 or time > last_time)
+            if updated[m]:
+                push_price_ring(price_ring, bar_counts, m, rows[r, m])
+
+        update_indicator_state(
+            price_ring,
+            bar_counts,
+            updated,
+            unique_params,
+            indicator_state,
+            indicator_values,
+        )
+
+        bar_index = bar_counts[0] - 1
+        bar = price_ring[0, bar_index % capacity]
+        last_bar = price_ring[0, (bar_index - 1) % capacity]
+        for i in prange(params_count):
+            b_params = backtest_params[i]
+            signals = calc_signal_bar(bar, cache_index[i], indicator_values, b_params)
+            update_backtest_state(
+                backtest_state[i], b_params, signals, bar_index, bar, last_bar
+            )
+
+
+@njit(parallel=True, cache=enable_cache)
+def calc_live_performance(backtest_state, backtest_params, bar_count):
+    """
+    返回 (params_count, PerformanceIndex) 的当前绩效, 与对已追加的全部K线做完整回测相同。
+    """
+    params_count = backtest_params.shape[0]
+    performance = np.full((params_count, len(performance_keys)), np.nan, dtype=nb_acc)
+    for i in prange(params_count):
+        set_backtest_state_performance(
+            backtest_state[i], backtest_params[i], bar_count, performance[i]
+        )
+    return performance
+
+
+class LiveBacktest:
+    """
+    多参数组合的增量回测。
+    先用 append_history 追加历史K线 (与逐根追加相同, 只是一次调用完成),
+    之后每根新K线调用 append_bar, 随时用 get_performance 读取绩效。
+
+    与完整回测的差异:
+      sma 和 bbands 的窗口和增量维护并定期重新求和 (见 window_sum_step),
+      与 calc_sma 只有浮点误差级别的差异, 误差不随实盘运行时间增长;
+      ema/rsi/atr/psar 和回测状态逐根递推, 与完整回测完全一致;
+      不支持 smooth_mode, 追加的K线不会被 skip 跳过。
+    """
+
+    def __init__(self, indicator_params_mtf, backtest_params):
+        if not isinstance(indicator_params_mtf, np.ndarray):
+            indicator_params_mtf = convert_indicator_params_list_to_matrix(
+                indicator_params_mtf
+            )
+        if not isinstance(backtest_params, np.ndarray):
+            backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+        assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+            "参数组合数量需要相等"
+        )
+
+        self.indicator_params_mtf = indicator_params_mtf
+        self.backtest_params = backtest_params
+        self.mtf_count = indicator_params_mtf.shape[1]
+
+        self.cache_index, self.unique_params = collect_indicator_cache_index(
+            indicator_params_mtf
+        )
+        self.indicator_state, self.indicator_values = init_indicator_state(
+            self.unique_params
+        )
+        capacity = get_price_ring_capacity(self.unique_params, self.mtf_count)
+        # 环形缓冲区按累加器精度保存, 窗口和直接从中读取, 追加的K线仍先按存储精度取整
+        self.price_ring = np.full(
+            (self.mtf_count, capacity, len(price_ring_keys)), np.nan, dtype=np_acc
+        )
+        self.bar_counts = np.zeros(self.mtf_count, dtype=np_int)
+        self.backtest_state = init_backtest_state(backtest_params.shape[0])
+
+    @property
+    def bar_count(self):
+        return int(self.bar_counts[0])
+
+    def append_rows(self, rows):
+        """
+        rows: (bars, mtf_count, 6), 规则见 append_live_bars。
+        """
+        rows = np.ascontiguousarray(rows, dtype=np_float)
+        assert rows.shape[1:] == (self.mtf_count, 6), (
+            f"rows 需要是 (bars, {self.mtf_count}, 6) 的数组"
+        )
+        append_live_bars(
+            self.price_ring,
+            self.bar_counts,
+            self.unique_params,
+            self.cache_index,
+            self.indicator_state,
+            self.indicator_values,
+            self.backtest_params,
+            self.backtest_state,
+            rows,
+        )
+
+    def append_bar(self, tohlcv_mtf):
+        """
+        追加一根主周期K线, tohlcv_mtf 是每个周期最新一根K线的 tohlcv, 形状 (mtf_count, 6)。
+        只有一个周期时也可以直接传入长度为6的一维数组。
+        """
+        rows = np.asarray(tohlcv_mtf, dtype=np_float)
+        self.append_rows(rows.reshape(1, self.mtf_count, -1))
+
+    def append_history(self, ohlcv_mtf_np_list):
+        """
+        追加 init_params 使用的原始多周期数据, 高周期K线按时间映射到每根主周期K线,
+        与 get_data_mapping_mtf 一致。
+        """
+        assert len(ohlcv_mtf_np_list) == self.mtf_count, "每个周期需要一组数据"
+        base = np.asarray(ohlcv_mtf_np_list[0], dtype=np_float)
+        rows = np.full((len(base), self.mtf_count, 6), np.nan, dtype=np_float)
+        rows[:, 0] = base[:, :6]
+        for m in range(1, self.mtf_count):
+            data = np.asarray(ohlcv_mtf_np_list[m], dtype=np_float)
+            mapping = np.searchsorted(data[:, 0], base[:, 0], side="right") - 1
+            valid = mapping >= 0
+            rows[valid, m] = data[mapping[valid], :6]
+        self.append_rows(rows)
+
+    def get_performance(self):
+        """
+        返回 (params_count, PerformanceIndex) 的当前绩效。
+        """
+        return calc_live_performance(
+            self.backtest_state, self.backtest_params, self.bar_count
+        )
+
+    def get_performance_table(self):
+        performance = self.get_performance()
+        return pl.DataFrame(
+            {
+                "params_index": np.arange(len(performance), dtype=np.int64),
+                **{k: performance[:, c] for c, k in enumerate(performance_keys)},
+            }
+        )
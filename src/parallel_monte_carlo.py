@@ -0,0 +1,212 @@
+import numpy as np
+import polars as pl
+from numba import njit, prange
+from enum import IntEnum
+
+from src.utils.constants import numba_config
+
+from src.backtest.backtest_enums import bpi
+from src.backtest.calculate_performance import calc_trade_profits
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+nb_acc = numba_config["nb"]["acc"]
+np_int = numba_config["np"]["int"]
+np_float = numba_config["np"]["float"]
+
+
+"""
+交易重采样的蒙特卡洛稳健性检验。
+把每个参数组合的逐笔交易收益 (calc_performance 中的 profits) 重采样上千次,
+得到最终净值、最大回撤和夏普比率的分布分位数。
+bootstrap 有放回抽样同样数量的交易, shuffle 只打乱交易顺序 (最终净值和夏普不变, 只有回撤变化)。
+并发按 (参数组合 × 重采样) 展开, 每个任务用独立的 splitmix64 随机数流, 结果与线程数无关。
+"""
+
+
+class MonteCarloMode(IntEnum):
+    bootstrap = 0
+    shuffle = 1
+
+
+monte_carlo_keys = ("final_equity", "max_drawdown", "sharpe_ratio")
+
+MonteCarloIndex = IntEnum(
+    "MonteCarloIndex", [(k, c) for c, k in enumerate(monte_carlo_keys)]
+)
+
+mci = MonteCarloIndex
+
+
+@njit(cache=enable_cache)
+def collect_trade_returns(backtest_output):
+    """
+    把每个参数组合的逐笔交易收益拼接成一维数组,
+    返回 (trade_returns, trade_offsets, bar_counts), 第 i 个参数组合的交易为
+    trade_returns[trade_offsets[i]:trade_offsets[i + 1]], bar_counts 是回测的K线数量。
+    """
+    params_count = len(backtest_output)
+    trade_offsets = np.zeros(params_count + 1, dtype=nb_int)
+    bar_counts = np.zeros(params_count, dtype=nb_int)
+    profits_list = []
+    for i in range(params_count):
+        b_output = backtest_output[i]
+        profits = calc_trade_profits(
+            b_output["position"], b_output["entry_price"], b_output["exit_price"]
+        )
+        profits_list.append(profits)
+        trade_offsets[i + 1] = trade_offsets[i] + len(profits)
+        bar_counts[i] = len(b_output["position"])
+
+    trade_returns = np.empty(trade_offsets[-1], dtype=nb_acc)
+    for i in range(params_count):
+        trade_returns[trade_offsets[i] : trade_offsets[i + 1]] = profits_list[i]
+    return trade_returns, trade_offsets, bar_counts
+
+
+@njit(cache=enable_cache, inline="always")
+def splitmix64_next(state):
+    """
+    返回 (新状态, 64位随机数)。
+    """
+    state = state + np.uint64(0x9E3779B97F4A7C15)
+    z = state
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return state, z ^ (z >> np.uint64(31))
+
+
+@njit(parallel=True, cache=enable_cache)
+def run_monte_carlo_kernel(
+    trade_returns,
+    trade_offsets,
+    init_money,
+    sharpe_scale,
+    resample_count,
+    mode,
+    seed,
+):
+    """
+    返回 (params_count, resample_count, MonteCarloIndex) 的重采样结果。
+    每次重采样按顺序复利这些交易收益:
+      final_equity: 最终净值, 从 init_money[i] 开始
+      max_drawdown: 与回测一样是 (历史最高净值 - 净值) / 历史最高净值 的最大值
+      sharpe_ratio: 交易收益的均值 / 标准差 * sharpe_scale[i]
+    没有交易的参数组合保持 NaN。
+    """
+    params_count = len(trade_offsets) - 1
+    result = np.full(
+        (params_count, resample_count, len(monte_carlo_keys)), np.nan, dtype=nb_acc
+    )
+    seed_state = np.uint64(seed) * np.uint64(0xD1B54A32D192ED03)
+
+    for t in prange(params_count * resample_count):
+        i = t // resample_count
+        start = trade_offsets[i]
+        trade_count = trade_offsets[i + 1] - start
+        if trade_count == 0:
+            continue
+
+        state = seed_state + np.uint64(t)
+        state, _ = splitmix64_next(state)
+
+        order = np.empty(0, dtype=nb_int)
+        if mode == MonteCarloMode.shuffle.value:
+            order = np.arange(trade_count)
+
+        equity = init_money[i]
+        max_equity = equity
+        max_drawdown = 0.0
+        mean = 0.0
+        m2 = 0.0
+        for j in range(trade_count):
+            if mode == MonteCarloMode.shuffle.value:
+                # Fisher-Yates, 第 j 步从剩下的交易中随机选一笔
+                state, z = splitmix64_next(state)
+                k = j + nb_int(z % np.uint64(trade_count - j))
+                order[j], order[k] = order[k], order[j]
+                k = order[j]
+            else:
+                state, z = splitmix64_next(state)
+                k = nb_int(z % np.uint64(trade_count))
+
+            r = trade_returns[start + k]
+            equity = equity * (1.0 + r)
+            max_equity = max(max_equity, equity)
+            if max_equity > 0:
+                max_drawdown = max(max_drawdown, (max_equity - equity) / max_equity)
+
+            delta = r - mean
+            mean += delta / (j + 1)
+            m2 += delta * (r - mean)
+
+        std = np.sqrt(m2 / trade_count)
+        row = result[i, t % resample_count]
+        row[mci.final_equity.value] = equity
+        row[mci.max_drawdown.value] = max_drawdown
+        row[mci.sharpe_ratio.value] = mean / std * sharpe_scale[i] if std > 0 else 0.0
+
+    return result
+
+
+def get_monte_carlo_column_name(key, q):
+    return f"{key}_q{q * 100:g}"
+
+
+def run_monte_carlo(
+    backtest_params,
+    backtest_output,
+    resample_count=1000,
+    mode="bootstrap",
+    quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+    seed=0,
+    params_index=None,
+):
+    """
+    对 run_parallel_matrix 的回测输出 (result_tuple[2]) 做交易重采样,
+    backtest_params 是对应的回测参数矩阵, 行与 backtest_output 一一对应。
+    夏普比率按每年的平均交易次数年化: sqrt(交易次数 * annualization_factor / K线数量)。
+
+    返回 polars DataFrame: params_index, trade_count, 以及每个 MonteCarloIndex 字段的
+    各个分位数列, 列名例如 final_equity_q5、max_drawdown_q95。
+    params_index 默认是行号, top-k 之后可以传入原参数矩阵中的行号。
+    """
+    assert resample_count > 0, "重采样次数需要大于0"
+    assert mode in MonteCarloMode.__members__, f"未知的重采样模式 {mode}"
+
+    trade_returns, trade_offsets, bar_counts = collect_trade_returns(backtest_output)
+    trade_counts = np.diff(trade_offsets)
+    params_count = len(trade_counts)
+    if params_index is None:
+        params_index = np.arange(params_count, dtype=np.int64)
+    assert len(params_index) == params_count, "params_index 数量需要等于参数组合数量"
+
+    annualization_factor = backtest_params[:, bpi.annualization_factor.value]
+    sharpe_scale = np.sqrt(
+        trade_counts * annualization_factor / np.maximum(bar_counts, 1)
+    ).astype(np_float)
+
+    result = run_monte_carlo_kernel(
+        trade_returns,
+        trade_offsets,
+        np.ascontiguousarray(backtest_params[:, bpi.init_money.value], dtype=np_float),
+        sharpe_scale,
+        resample_count,
+        MonteCarloMode[mode].value,
+        seed,
+    )
+
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    # (quantile_count, params_count, MonteCarloIndex), 没有交易的参数组合为 NaN
+    result_quantiles = np.quantile(result, quantiles, axis=1)
+
+    columns = {
+        "params_index": np.asarray(params_index, dtype=np.int64),
+        "trade_count": trade_counts.astype(np.int64),
+    }
+    for c, key in enumerate(monte_carlo_keys):
+        for j, q in enumerate(quantiles):
+            columns[get_monte_carlo_column_name(key, q)] = result_quantiles[j, :, c]
+    return pl.DataFrame(columns)
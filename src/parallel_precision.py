@@ -0,0 +1,113 @@
+import numpy as np
+import polars as pl
+
+from src.parallel_shard import LocalShardWorker
+
+
+"""
+混合精度的验证报告。
+混合精度 (set_numba_dtypes 的 enable_mixed) 用 float32 保存 OHLCV、指标输出和逐K线回测数组,
+滚动和、递推状态、净值和绩效用 float64 累加, 内存带宽减半而绩效不失真。
+报告在两个 spawn 子进程中分别以混合精度和全 64 位计算同一组参数的绩效,
+两个子进程使用同一份原始数据, 差异只来自精度策略。
+价格按 float32 取整后, 处于临界值的比较 (例如均线交叉) 可能翻转, 交易本身发生变化,
+所以报告同时给出每个字段超出容差的参数组合数量。
+"""
+
+
+precision_report_keys = (
+    "metric",
+    "max_abs_diff",
+    "max_rel_diff",
+    "mean_abs_diff",
+    "exceed_count",
+    "nan_mismatch",
+)
+
+
+def run_precision_performance(
+    ohlcv_mtf_np_list,
+    indicator_params_mtf,
+    backtest_params,
+    enable64,
+    enable_mixed,
+    smooth_mode="",
+):
+    """
+    在指定精度的子进程中只计算绩效, 返回 float64 的 (params_count, PerformanceIndex) 绩效矩阵。
+    """
+    worker = LocalShardWorker(
+        ohlcv_mtf_np_list, smooth_mode, enable64=enable64, enable_mixed=enable_mixed
+    )
+    try:
+        _, performance = worker.run(0, indicator_params_mtf, backtest_params)
+    finally:
+        worker.close()
+    return np.asarray(performance, dtype=np.float64)
+
+
+def compare_performance(performance, baseline, rtol=1e-4, atol=1e-8):
+    """
+    逐个绩效字段比较 performance 与 baseline, 返回与 precision_report_keys 对应的列。
+    两边都是 NaN 或相同的无穷大视为一致, 只有一边是 NaN 计入 nan_mismatch,
+    相对误差以 baseline 的绝对值为分母, 超出 atol + rtol * |baseline| 的计入 exceed_count。
+    """
+    from src.backtest.backtest_enums import performance_keys
+
+    assert performance.shape == baseline.shape, "绩效矩阵的形状需要相同"
+
+    columns = {k: [] for k in precision_report_keys}
+    for c, key in enumerate(performance_keys):
+        a = performance[:, c]
+        b = baseline[:, c]
+        a_nan = np.isnan(a)
+        b_nan = np.isnan(b)
+        with np.errstate(invalid="ignore"):
+            diff = np.where(a == b, 0.0, np.abs(a - b))
+        valid = ~(a_nan | b_nan)
+        diff = diff[valid]
+        scale = np.abs(b[valid])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel = np.where(diff == 0, 0.0, diff / scale)
+
+        columns["metric"].append(key)
+        columns["max_abs_diff"].append(float(np.max(diff)) if len(diff) else 0.0)
+        columns["max_rel_diff"].append(float(np.max(rel)) if len(rel) else 0.0)
+        columns["mean_abs_diff"].append(float(np.mean(diff)) if len(diff) else 0.0)
+        columns["exceed_count"].append(int(np.sum(~(diff <= atol + rtol * scale))))
+        columns["nan_mismatch"].append(int(np.sum(a_nan != b_nan)))
+    return pl.DataFrame(columns)
+
+
+def run_precision_report(
+    ohlcv_mtf_np_list,
+    indicator_params_mtf,
+    backtest_params,
+    smooth_mode="",
+    rtol=1e-4,
+    atol=1e-8,
+):
+    """
+    以混合精度和全 64 位分别计算绩效并比较, 返回 (report, performance_mixed, performance_64)。
+    report 是 polars DataFrame, 每个绩效字段一行, 列见 precision_report_keys。
+    ohlcv_mtf_np_list 是 init_params 使用的原始数据, 参数矩阵与 run_parallel_performance 相同,
+    两个子进程各自把它们转换成自己的精度。
+    """
+    performance_64 = run_precision_performance(
+        ohlcv_mtf_np_list,
+        indicator_params_mtf,
+        backtest_params,
+        True,
+        False,
+        smooth_mode,
+    )
+    performance_mixed = run_precision_performance(
+        ohlcv_mtf_np_list,
+        indicator_params_mtf,
+        backtest_params,
+        False,
+        True,
+        smooth_mode,
+    )
+    report = compare_performance(performance_mixed, performance_64, rtol, atol)
+    return report, performance_mixed, performance_64
@@ -0,0 +1,137 @@
+import numpy as np
+from numba import njit, config
+
+from src.utils.constants import numba_config
+
+from src.backtest.backtest_enums import bpi
+from src.backtest.atr_cache import is_backtest_atr_needed
+from src.indicators.indicator_layout import (
+    indicator_enable_cols,
+    indicator_param_strides,
+    indicator_slot_counts,
+    indicator_output_counts,
+)
+
+
+enable_cache = numba_config["enable_cache"]
+nb_int = numba_config["nb"]["int"]
+nb_float = numba_config["nb"]["float"]
+
+
+"""
+按估算成本给 prange 分配参数组合。
+prange 按迭代次数静态均分, 开启 PSAR 离场、多个周期指标或 bbands 的参数组合
+比只用 sma 的参数组合慢很多, 线程之间会互相等待。
+这里先按开启的标志估算每个参数组合的成本, 再用 LPT(最长处理时间优先) 分到
+和线程数相同的桶里, prange 遍历桶, 结果仍然按原始 params_index 写回。
+"""
+
+# get_num_threads 在 njit 中无法缓存, 桶的数量在导入时按最大线程数确定
+schedule_bin_count = config.NUMBA_NUM_THREADS
+
+# 成本单位: 单根K线的基础回测(仓位、资金、净值)为 1
+# 每根K线读取一个指标输出列的成本
+indicator_output_cost = 0.25
+# 每个离场开关开启后每根K线增加的成本, 顺序与 exit_enable_cols 一致
+exit_enable_cols = np.array(
+    [
+        bpi.pct_sl_enable.value,
+        bpi.pct_tp_enable.value,
+        bpi.pct_tsl_enable.value,
+        bpi.atr_sl_enable.value,
+        bpi.atr_tp_enable.value,
+        bpi.atr_tsl_enable.value,
+        bpi.psar_enable.value,
+    ],
+    dtype=np.int64,
+)
+exit_enable_costs = np.array([0.25, 0.25, 0.5, 0.25, 0.25, 0.5, 2.0])
+
+
+@njit(cache=enable_cache)
+def estimate_combo_costs(ohlcv_mtf, indicator_params_mtf, backtest_params):
+    """
+    按开启的指标和离场标志估算每个参数组合的相对成本, 返回 (params_count,)。
+    指标和回测的 ATR 都已经在 prange 之前的共享缓存中计算,
+    这里只统计信号读取指标输出、逐K线回测和读取共享 ATR 的成本。
+    """
+    params_count = indicator_params_mtf.shape[0]
+    mtf_count = indicator_params_mtf.shape[1]
+    kind_count = len(indicator_slot_counts)
+    data_count = len(ohlcv_mtf[0]["close"])
+
+    costs = np.zeros(params_count, dtype=nb_float)
+    for i in range(params_count):
+        # 基础回测
+        cost = 1.0 * data_count
+
+        b_params = backtest_params[i]
+        # 开启 ATR 离场或 ATR 滑点时逐K线读取共享的 ATR
+        if is_backtest_atr_needed(b_params):
+            cost += indicator_output_cost * data_count
+
+        for c in range(len(exit_enable_cols)):
+            if b_params[exit_enable_cols[c]] > 0:
+                cost += exit_enable_costs[c] * data_count
+
+        for m in range(mtf_count):
+            i_params = indicator_params_mtf[i, m]
+            output_count = 0
+            for k in range(kind_count):
+                stride = indicator_param_strides[k]
+                for s in range(indicator_slot_counts[k]):
+                    if i_params[indicator_enable_cols[k] + s * stride]:
+                        output_count += indicator_output_counts[k]
+            # 高周期的指标需要映射回 ohlcv_mtf[0], 按主周期的K线数量计算
+            cost += indicator_output_cost * output_count * data_count
+
+        costs[i] = cost
+    return costs
+
+
+@njit(cache=enable_cache)
+def get_cost_bins(costs, bin_count):
+    """
+    LPT 分桶: 按成本从大到小依次放进当前总成本最小的桶。
+    返回 (schedule_order, bin_offsets):
+      第 b 个桶的参数组合为 schedule_order[bin_offsets[b]:bin_offsets[b + 1]],
+      桶内按成本从大到小排列。
+    """
+    params_count = len(costs)
+    bin_count = max(1, min(bin_count, params_count))
+
+    sorted_index = np.argsort(-costs, kind="mergesort")
+    loads = np.zeros(bin_count, dtype=nb_float)
+    combo_bin = np.empty(params_count, dtype=nb_int)
+    bin_sizes = np.zeros(bin_count, dtype=nb_int)
+    for i in sorted_index:
+        b = np.argmin(loads)
+        loads[b] += costs[i]
+        combo_bin[i] = b
+        bin_sizes[b] += 1
+
+    bin_offsets = np.zeros(bin_count + 1, dtype=nb_int)
+    bin_offsets[1:] = np.cumsum(bin_sizes)
+
+    schedule_order = np.empty(params_count, dtype=nb_int)
+    fill = bin_offsets[:-1].copy()
+    for i in sorted_index:
+        b = combo_bin[i]
+        schedule_order[fill[b]] = i
+        fill[b] += 1
+    return schedule_order, bin_offsets
+
+
+@njit(cache=enable_cache)
+def get_parallel_schedule(ohlcv_mtf, indicator_params_mtf, backtest_params):
+    """
+    给 prange 使用的调度: 每个线程一个桶 (按 NUMBA_NUM_THREADS)。
+    数据不完整时无法估算成本, 所有参数组合按相同成本轮流分桶。
+    """
+    params_count = indicator_params_mtf.shape[0]
+    bin_count = schedule_bin_count
+    if params_count == 0 or len(ohlcv_mtf) == 0 or "close" not in ohlcv_mtf[0]:
+        costs = np.ones(params_count, dtype=nb_float)
+    else:
+        costs = estimate_combo_costs(ohlcv_mtf, indicator_params_mtf, backtest_params)
+    return get_cost_bins(costs, bin_count)
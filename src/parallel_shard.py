@@ -0,0 +1,406 @@
+import io
+import os
+import hmac
+import ipaddress
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import httpx
+import numpy as np
+import polars as pl
+
+from src.utils.constants import numba_config, set_numba_dtypes
+
+
+"""
+把参数空间切成分片, 分发给多个长期运行的 worker 进程, 最后合并成一张绩效表。
+worker 可以是本机的子进程, 也可以是其他机器上通过 HTTP 访问的 shard worker。
+每个 worker 只在初始化时接收一次原始数据, 之后每个分片只传参数矩阵和绩效矩阵,
+numba 的编译结果在 worker 进程内保持热状态。
+
+子进程用 spawn 启动, 导入本模块时 numba_config 还没有设置,
+所以依赖 numba 的模块都在 init_shard_worker 设置 numba_config 之后再导入。
+"""
+
+
+# worker 进程内的状态, 由 init_shard_worker 填充
+_worker_state = {}
+
+
+def init_shard_worker(
+    enable_cache,
+    enable64,
+    ohlcv_mtf_np_list,
+    smooth_mode="",
+    num_threads=0,
+    enable_mixed=False,
+):
+    """
+    在 worker 进程内设置 numba 配置, 把原始数据转换成 (ohlcv_mtf, ohlcv_smoothed_mtf, data_mapping)。
+    enable_mixed 为 True 且 enable64 为 False 时 worker 使用混合精度。
+    num_threads 大于0时限制 worker 的 numba 线程数, 避免多个进程抢占同一批核心。
+    """
+    # spawn 会重新导入调用方的主模块, 主模块顶层设置的精度与 worker 不同时,
+    # 已经导入的模块仍是旧精度, 之后的编译会失败
+    assert "enable64" not in numba_config or (
+        numba_config["enable64"] == enable64
+        and numba_config["enable_mixed"] == (enable_mixed and not enable64)
+    ), (
+        "worker 的主模块已经以其他精度设置了 numba_config, 请把主模块的代码放在 if __name__ == '__main__': 之下"
+    )
+    set_numba_dtypes(
+        numba_config,
+        enable_cache=enable_cache,
+        enable64=enable64,
+        enable_mixed=enable_mixed,
+    )
+
+    import numba
+    from src.convert_params.param_initializer import init_data_mtf
+    from src.parallel import run_parallel_performance
+
+    if num_threads > 0:
+        numba.set_num_threads(min(num_threads, numba.config.NUMBA_NUM_THREADS))
+
+    # 原始数据同样转换成 worker 的浮点精度
+    np_float = numba_config["np"]["float"]
+    ohlcv_mtf_np_list = [
+        np.ascontiguousarray(v, dtype=np_float) for v in ohlcv_mtf_np_list
+    ]
+    _worker_state["data_tuple"] = init_data_mtf(ohlcv_mtf_np_list, smooth_mode)
+    _worker_state["run_parallel_performance"] = run_parallel_performance
+
+
+def run_shard(start, indicator_params_mtf, backtest_params):
+    """
+    在 worker 进程内计算一个分片, 返回 (start, 绩效矩阵)。
+    参数矩阵转换成 worker 的浮点精度, worker 的精度可以与调用方不同。
+    """
+    assert "data_tuple" in _worker_state, "worker 还没有初始化"
+    np_float = numba_config["np"]["float"]
+    performance = _worker_state["run_parallel_performance"](
+        *_worker_state["data_tuple"],
+        np.ascontiguousarray(indicator_params_mtf, dtype=np_float),
+        np.ascontiguousarray(backtest_params, dtype=np_float),
+    )
+    return start, performance
+
+
+# ------------------ HTTP 协议 ------------------
+# 请求和响应都是 np.savez 格式, 读取时不允许 pickle
+# POST /init: ohlcv_{m} 为每个周期的原始数据, smooth_mode 为字符串标量
+# POST /run: start, indicator_params_mtf, backtest_params, 返回 start, performance
+# 服务端设置了 token 时, 每个请求都需要在 SHARD_TOKEN_HEADER 中带上相同的 token
+# /init 会替换 worker 的数据, 影响所有调用方, 所以监听非回环地址时必须设置 token
+
+SHARD_TOKEN_HEADER = "X-Shard-Token"
+
+
+def dump_npz(**arrays):
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def load_npz(content):
+    with np.load(io.BytesIO(content), allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+
+def dump_init_payload(ohlcv_mtf_np_list, smooth_mode):
+    return dump_npz(
+        smooth_mode=np.array(smooth_mode),
+        **{f"ohlcv_{m}": np.asarray(v) for m, v in enumerate(ohlcv_mtf_np_list)},
+    )
+
+
+def load_init_payload(content):
+    data = load_npz(content)
+    ohlcv_mtf_np_list = []
+    while f"ohlcv_{len(ohlcv_mtf_np_list)}" in data:
+        ohlcv_mtf_np_list.append(data[f"ohlcv_{len(ohlcv_mtf_np_list)}"])
+    return ohlcv_mtf_np_list, str(data["smooth_mode"])
+
+
+class ShardRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        token = self.headers.get(SHARD_TOKEN_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.server.token.encode()):
+            self.send_error(403)
+            return
+        try:
+            content_length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            content_length = -1
+        if content_length < 0:
+            self.send_error(400, "Missing or invalid Content-Length")
+            return
+        content = self.rfile.read(content_length)
+        try:
+            if self.path == "/init":
+                ohlcv_mtf_np_list, smooth_mode = load_init_payload(content)
+                init_shard_worker(
+                    numba_config["enable_cache"],
+                    numba_config["enable64"],
+                    ohlcv_mtf_np_list,
+                    smooth_mode,
+                    enable_mixed=numba_config["enable_mixed"],
+                )
+                body = b""
+            elif self.path == "/run":
+                data = load_npz(content)
+                start, performance = run_shard(
+                    int(data["start"]),
+                    data["indicator_params_mtf"],
+                    data["backtest_params"],
+                )
+                body = dump_npz(start=np.array(start), performance=performance)
+            else:
+                self.send_error(404)
+                return
+        except Exception as e:
+            self.send_error(500, f"{type(e).__name__}: {e}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback_host(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def create_shard_server(host="127.0.0.1", port=8765, token=""):
+    """
+    创建 HTTP shard worker, 调用 serve_forever 开始处理请求。
+    numba_config 需要在调用之前设置好。请求依次处理, 每个分片内部由 numba 并发。
+    默认只监听本机, 供远程调用时需要显式传入 host 和 token。
+    """
+    assert token or is_loopback_host(host), f"监听非回环地址 {host} 时需要设置 token"
+    server = HTTPServer((host, port), ShardRequestHandler)
+    server.token = token
+    return server
+
+
+# ------------------ 分片调度 ------------------
+
+
+class LocalShardWorker:
+    """
+    本机的长期运行 worker, 每个 worker 是一个单独的子进程。
+    enable64 和 enable_mixed 为 None 时使用当前进程的 numba_config。
+    """
+
+    def __init__(
+        self,
+        ohlcv_mtf_np_list,
+        smooth_mode="",
+        num_threads=0,
+        enable64=None,
+        enable_mixed=None,
+    ):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_shard_worker,
+            initargs=(
+                numba_config["enable_cache"],
+                numba_config["enable64"] if enable64 is None else enable64,
+                ohlcv_mtf_np_list,
+                smooth_mode,
+                num_threads,
+                numba_config["enable_mixed"] if enable_mixed is None else enable_mixed,
+            ),
+        )
+
+    def run(self, start, indicator_params_mtf, backtest_params):
+        return self.executor.submit(
+            run_shard, start, indicator_params_mtf, backtest_params
+        ).result()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class HttpShardWorker:
+    """
+    通过 HTTP 访问的 shard worker, url 例如 http://10.0.0.2:8765
+    token 需要与服务端 create_shard_server 的 token 相同。
+    """
+
+    def __init__(self, url, ohlcv_mtf_np_list, smooth_mode="", timeout=None, token=""):
+        self.client = httpx.Client(
+            base_url=url, timeout=timeout, headers={SHARD_TOKEN_HEADER: token}
+        )
+        response = self.client.post(
+            "/init", content=dump_init_payload(ohlcv_mtf_np_list, smooth_mode)
+        )
+        response.raise_for_status()
+
+    def run(self, start, indicator_params_mtf, backtest_params):
+        response = self.client.post(
+            "/run",
+            content=dump_npz(
+                start=np.array(start),
+                indicator_params_mtf=indicator_params_mtf,
+                backtest_params=backtest_params,
+            ),
+        )
+        response.raise_for_status()
+        data = load_npz(response.content)
+        return int(data["start"]), data["performance"]
+
+    def close(self):
+        self.client.close()
+
+
+def create_shard_workers(
+    ohlcv_mtf_np_list, smooth_mode="", workers=0, hosts=(), timeout=None, token=""
+):
+    """
+    workers 个本机子进程加上 hosts 中的每个 HTTP worker。
+    两者都为空时按 CPU 数量创建本机子进程, 每个子进程分到相同数量的 numba 线程。
+    """
+    if workers <= 0 and len(hosts) == 0:
+        workers = os.cpu_count() or 1
+    num_threads = max(1, (os.cpu_count() or 1) // workers) if workers > 0 else 0
+
+    shard_workers = []
+    try:
+        for _ in range(workers):
+            shard_workers.append(
+                LocalShardWorker(ohlcv_mtf_np_list, smooth_mode, num_threads)
+            )
+        for url in hosts:
+            shard_workers.append(
+                HttpShardWorker(url, ohlcv_mtf_np_list, smooth_mode, timeout, token)
+            )
+    except Exception:
+        # 某个 worker 创建失败时关闭已经启动的 worker, 避免子进程泄漏
+        for worker in shard_workers:
+            worker.close()
+        raise
+    return shard_workers
+
+
+def run_shards(shard_workers, indicator_params_mtf, backtest_params, shard_size=0):
+    """
+    每个 worker 一个调度线程, 从同一个队列中领取分片, 快的 worker 自然会领取更多分片。
+    返回按原始顺序合并的 (params_count, PerformanceIndex) 绩效矩阵。
+    """
+    from src.backtest.backtest_enums import performance_keys
+
+    assert len(shard_workers) > 0, "至少需要一个 worker"
+    assert indicator_params_mtf.shape[0] == backtest_params.shape[0], (
+        "参数组合数量需要相等"
+    )
+    params_count = backtest_params.shape[0]
+    if shard_size <= 0:
+        # 每个 worker 大约分到4个分片, 兼顾调度开销和负载均衡
+        shard_size = max(1, -(-params_count // (len(shard_workers) * 4)))
+
+    shard_queue = queue.Queue()
+    for start in range(0, params_count, shard_size):
+        shard_queue.put((start, min(start + shard_size, params_count)))
+
+    performance = np.full(
+        (params_count, len(performance_keys)),
+        np.nan,
+        dtype=numba_config["np"]["acc"],
+    )
+    errors = []
+
+    def dispatch(worker):
+        while not errors:
+            try:
+                start, stop = shard_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                _start, _performance = worker.run(
+                    start,
+                    np.ascontiguousarray(indicator_params_mtf[start:stop]),
+                    np.ascontiguousarray(backtest_params[start:stop]),
+                )
+                performance[_start : _start + len(_performance)] = _performance
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=dispatch, args=(w,)) for w in shard_workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return performance
+
+
+def run_parallel_sharded(
+    ohlcv_mtf_np_list,
+    indicator_params_mtf,
+    backtest_params,
+    smooth_mode="",
+    shard_size=0,
+    workers=0,
+    hosts=(),
+    timeout=None,
+    token="",
+    shard_workers=None,
+):
+    """
+    把参数空间分片, 分发给本机子进程和远程 HTTP worker, 只计算绩效。
+    ohlcv_mtf_np_list 是 init_params 使用的原始数据, worker 自己转换成 numba 容器。
+    传入 create_shard_workers 创建的 shard_workers 时直接复用, 忽略 workers/hosts 等参数,
+    worker 的生命周期由调用方管理; 否则每次调用临时创建并在结束后关闭。
+    返回 polars DataFrame, params_index 列是参数组合在原参数矩阵中的行号, 与 run_parallel_chunked 相同。
+    """
+    from src.backtest.backtest_enums import performance_keys
+    from src.convert_params.param_template_manager import (
+        convert_indicator_params_list_to_matrix,
+        convert_backtest_params_list_to_matrix,
+    )
+
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+
+    if shard_workers is not None:
+        performance = run_shards(
+            shard_workers, indicator_params_mtf, backtest_params, shard_size
+        )
+    else:
+        shard_workers = create_shard_workers(
+            ohlcv_mtf_np_list, smooth_mode, workers, hosts, timeout, token
+        )
+        try:
+            performance = run_shards(
+                shard_workers, indicator_params_mtf, backtest_params, shard_size
+            )
+        finally:
+            for worker in shard_workers:
+                worker.close()
+
+    return pl.DataFrame(
+        {
+            "params_index": np.arange(backtest_params.shape[0], dtype=np.int64),
+            **{k: performance[:, c] for c, k in enumerate(performance_keys)},
+        }
+    )
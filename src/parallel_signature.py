@@ -10,6 +10,7 @@ from src.utils.constants import numba_config
 nb_int = numba_config["nb"]["int"]  # e.g., types.int64
 nb_float = numba_config["nb"]["float"]  # e.g., types.float64
 nb_bool = numba_config["nb"]["bool"]  # e.g., types.boolean
+nb_acc = numba_config["nb"]["acc"]  # 累加器精度, 绩效使用
 
 # 定义 numpy 数组类型
 ohlcv_np_type = types.DictType(unicode_type, nb_float[:])
@@ -22,13 +23,23 @@ param_dict_type = types.DictType(unicode_type, nb_float)
 params_list_type = types.ListType(param_dict_type)
 params_list_mtf_type = types.ListType(types.ListType(param_dict_type))
 
+# 定义参数矩阵类型: 按列索引存放参数, 列索引见 IndicatorParamIndex/BacktestParamIndex
+param_row_type = nb_float[:]
+params_matrix_type = nb_float[:, :]
+params_matrix_mtf_type = nb_float[:, :, :]
+
 # 定义 mapping 字典类型
 mapping_dict_type = types.DictType(unicode_type, nb_int[:])
 
 indicators_output_type = types.DictType(unicode_type, nb_float[:])
 signal_output_type = types.DictType(unicode_type, nb_bool[:])
 backtest_output_type = types.DictType(unicode_type, nb_float[:])
-performance_output_type = types.DictType(unicode_type, nb_float)
+performance_output_type = types.DictType(unicode_type, nb_acc)
+
+# 绩效行和绩效矩阵 (列索引见 PerformanceIndex), 按累加器精度保存
+performance_row_type = nb_acc[:]
+performance_matrix_type = nb_acc[:, :]
+performance_cube_type = nb_acc[:, :, :]
 
 # 定义返回类型的子项
 indicators_list_type = types.ListType(indicators_output_type)
@@ -62,37 +73,155 @@ parallel_return_signature = types.Tuple(
 # 正确构建函数签名
 parallel_signature = parallel_return_signature(*input_signature)
 
-indicators_signature = types.void(
-    ohlcv_np_type, param_dict_type, indicators_output_type
+# 参数矩阵版本的输入签名
+input_matrix_signature = (
+    data_mtf_type,  # ohlcv_mtf
+    data_mtf_type,  # ohlcv_smoothed_mtf
+    mapping_dict_type,  # data_mapping
+    params_matrix_mtf_type,  # indicator_params_mtf (params, mtf, IndicatorParamIndex)
+    params_matrix_type,  # backtest_params (params, BacktestParamIndex)
+    nb_bool,  # is_only_performance
 )
 
+parallel_matrix_signature = parallel_return_signature(*input_matrix_signature)
+
+indicators_signature = types.void(ohlcv_np_type, param_row_type, indicators_output_type)
+
+# 跨参数组合共享的指标缓存, 每个 block 一个 (唯一参数数量, 指标输出数量, K线数量) 的数组
+indicator_cache_type = types.ListType(nb_float[:, :, ::1])
+
 signal_signature = types.void(
     data_mtf_type,  # ohlcv_mtf
     mapping_dict_type,  # data_mapping
-    params_list_type,  # i_params_mtf
-    indicators_list_type,  # i_output_mtf
+    nb_int[:, :],  # cache_index_mtf (mtf, indicator_slot_total)
+    indicator_cache_type,  # indicator_cache
+    nb_int,  # block_offset
     signal_output_type,  # s_output
-    param_dict_type,  # b_params
+    param_row_type,  # b_params
 )
 
 signal_child_signature = types.void(
     data_mtf_type,  # ohlcv_mtf
     mapping_dict_type,  # data_mapping
-    params_list_type,  # i_params_mtf
-    indicators_list_type,  # i_output_mtf
+    nb_int[:, :],  # cache_index_mtf (mtf, indicator_slot_total)
+    indicator_cache_type,  # indicator_cache
+    nb_int,  # block_offset
     signal_output_type,  # s_output
 )
 
-backtest_signature = types.void(
+# 返回回测状态: -1 检查失败, 0 完整回测, 大于0 为提前终止的K线索引
+backtest_signature = nb_int(
     data_mtf_type,  # ohlcv_mtf
-    param_dict_type,  # b_params
+    param_row_type,  # b_params
     signal_output_type,  # s_output
     backtest_output_type,  # b_output
 )
 
 performance_signature = types.void(
     data_mtf_type,  # ohlcv_mtf
-    param_dict_type,
+    param_row_type,
     backtest_output_type,
     performance_output_type,
 )
+
+# 只计算绩效的融合回测, 绩效写入参数行 (列索引见 PerformanceIndex)
+backtest_performance_signature = types.void(
+    data_mtf_type,  # ohlcv_mtf
+    param_row_type,  # b_params
+    signal_output_type,  # s_output
+    performance_row_type,  # p_row
+    nb_float[:],  # atr_arr
+)
+
+# 只回测 [bar_start, bar_stop) 区间的融合回测, 可选写出逐K线净值
+backtest_performance_range_signature = types.void(
+    data_mtf_type,  # ohlcv_mtf
+    param_row_type,  # b_params
+    signal_output_type,  # s_output
+    performance_row_type,  # p_row
+    nb_int,  # bar_start
+    nb_int,  # bar_stop
+    nb_float[:],  # equity_out
+    nb_float[:],  # atr_arr
+)
+
+# 只计算绩效的并发入口, 返回 (params, PerformanceIndex) 的绩效矩阵
+parallel_performance_signature = performance_matrix_type(*input_matrix_signature[:-1])
+
+# 回测输出缓冲区: 单个参数组合 (BacktestOutputIndex, bars), 全部参数组合再加一维 params
+backtest_arena_row_type = nb_float[:, :]
+backtest_arena_type = nb_float[:, :, :]
+
+# 返回回测状态, 与 backtest_signature 相同
+backtest_arena_signature = nb_int(
+    data_mtf_type,  # ohlcv_mtf
+    param_row_type,  # b_params
+    signal_output_type,  # s_output
+    backtest_arena_row_type,  # b_arena
+    nb_float[:],  # atr_arr
+)
+
+# 返回回测输出缓冲区和 (params, PerformanceIndex) 的绩效矩阵
+parallel_arena_signature = types.Tuple((backtest_arena_type, performance_matrix_type))(
+    *input_matrix_signature[:-1]
+)
+
+# 多品种: 每个品种一组 ohlcv_mtf 和 data_mapping, 所有品种共用同一组参数
+data_mtf_list_type = types.ListType(data_mtf_type)
+mapping_list_type = types.ListType(mapping_dict_type)
+
+# 返回 (symbols, params, PerformanceIndex) 的绩效数组
+parallel_symbols_signature = performance_cube_type(
+    data_mtf_list_type,  # ohlcv_mtf_list
+    data_mtf_list_type,  # ohlcv_smoothed_mtf_list
+    mapping_list_type,  # data_mapping_list
+    params_matrix_mtf_type,  # indicator_params_mtf
+    params_matrix_type,  # backtest_params
+)
+
+# walk-forward: bar_ranges 为 (ranges, 2) 的 [bar_start, bar_stop) 区间
+bar_ranges_type = nb_int[:, :]
+
+# 返回 (ranges, params, PerformanceIndex) 的绩效数组
+parallel_ranges_signature = performance_cube_type(
+    *input_matrix_signature[:-1], bar_ranges_type
+)
+
+# 第 r 个参数组合只回测第 r 个区间, 返回 (ranges, PerformanceIndex) 的绩效和 (ranges, bars) 的净值
+parallel_range_equity_signature = types.Tuple(
+    (performance_matrix_type, params_matrix_type)
+)(*input_matrix_signature[:-1], bar_ranges_type)
+
+# walk-forward: 返回 (windows, params, PerformanceIndex) 的样本内绩效、(windows,) 的最优参数编号、
+# (windows, PerformanceIndex) 的样本外绩效和 (windows, bars) 的样本外净值
+parallel_walk_forward_signature = types.Tuple(
+    (performance_cube_type, nb_int[:], performance_matrix_type, params_matrix_type)
+)(
+    *input_matrix_signature[:-1],
+    bar_ranges_type,  # is_ranges
+    bar_ranges_type,  # oos_ranges
+    nb_int,  # metric_col
+    nb_float,  # metric_sign
+)
+
+# 增量回测: 每个 block 一个 (唯一参数数量, 指标输出数量) 的最新指标输出
+indicator_values_type = types.ListType(nb_float[:, ::1])
+
+# 价格环形缓冲区的一行 (列索引见 PriceRingIndex), 按累加器精度保存
+price_ring_row_type = nb_acc[:]
+
+# 单根K线的信号 (enter_long, exit_long, enter_short, exit_short)
+signal_bar_type = types.UniTuple(nb_bool, 4)
+
+signal_bar_child_signature = signal_bar_type(
+    price_ring_row_type,  # 主周期最新K线
+    nb_int[:, :],  # cache_index_mtf (mtf, indicator_slot_total)
+    indicator_values_type,  # indicator_values
+)
+
+signal_bar_signature = signal_bar_type(
+    price_ring_row_type,  # 主周期最新K线
+    nb_int[:, :],  # cache_index_mtf (mtf, indicator_slot_total)
+    indicator_values_type,  # indicator_values
+    param_row_type,  # b_params
+)
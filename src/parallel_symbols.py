@@ -0,0 +1,79 @@
+import numpy as np
+import polars as pl
+from numba.typed import List
+
+from src.utils.constants import numba_config
+
+
+from src.parallel import run_parallel_symbols
+from src.backtest.backtest_enums import performance_keys
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+
+
+np_acc = numba_config["np"]["acc"]
+
+
+def convert_symbols_to_typed_list(symbol_data_list):
+    """
+    把每个品种的 ohlcv_mtf 或 data_mapping 放进 numba 的 typed List。
+    """
+    typed_list = List()
+    for data in symbol_data_list:
+        typed_list.append(data)
+    return typed_list
+
+
+def run_parallel_symbols_table(
+    symbol_list,
+    ohlcv_mtf_list,
+    ohlcv_smoothed_mtf_list,
+    data_mapping_list,
+    indicator_params_mtf,
+    backtest_params,
+):
+    """
+    多品种参数扫描, 所有品种共用同一组参数, 只启动一次 run_parallel_symbols。
+    ohlcv_mtf_list, ohlcv_smoothed_mtf_list, data_mapping_list 按 symbol_list 的顺序,
+    分别是每个品种 init_params 返回的前三项。
+    返回 polars DataFrame, 每行一个 (symbol, params_index)。
+    """
+    symbol_count = len(symbol_list)
+    assert len(ohlcv_mtf_list) == symbol_count, "每个品种需要一个 ohlcv_mtf"
+    assert len(ohlcv_smoothed_mtf_list) == symbol_count, (
+        "每个品种需要一个 ohlcv_smoothed_mtf, 可以为空"
+    )
+    assert len(data_mapping_list) == symbol_count, "每个品种需要一个 data_mapping"
+
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+    params_count = backtest_params.shape[0]
+
+    if symbol_count == 0:
+        performance = np.zeros((0, params_count, len(performance_keys)), np_acc)
+    else:
+        # 没有平滑数据的品种直接传入 init_params 返回的空 ohlcv_smoothed_mtf
+        performance = run_parallel_symbols(
+            convert_symbols_to_typed_list(ohlcv_mtf_list),
+            convert_symbols_to_typed_list(ohlcv_smoothed_mtf_list),
+            convert_symbols_to_typed_list(data_mapping_list),
+            indicator_params_mtf,
+            backtest_params,
+        )
+
+    performance = performance.reshape(symbol_count * params_count, -1)
+    return pl.DataFrame(
+        {
+            "symbol": [symbol for symbol in symbol_list for _ in range(params_count)],
+            "params_index": np.tile(
+                np.arange(params_count, dtype=np.int64), symbol_count
+            ),
+            **{k: performance[:, c] for c, k in enumerate(performance_keys)},
+        }
+    )
@@ -0,0 +1,131 @@
+import heapq
+import numpy as np
+import polars as pl
+
+from src.parallel import run_parallel_matrix
+from src.parallel_chunked import iter_parallel_chunks
+from src.backtest.backtest_enums import pfi, performance_keys
+from src.backtest.calculate_performance import convert_performance_to_matrix
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+
+
+# 越小越好的绩效指标, 其余指标越大越好
+minimize_performance_keys = ("max_drawdown", "longest_no_position")
+
+
+class TopKHeap:
+    """
+    按单个绩效指标保留最好的 k 个参数组合, 可以逐块更新。
+    堆中存放 (得分, -params_index), 得分相同时保留 params_index 更小的参数组合。
+    """
+
+    def __init__(self, metric: str, k: int):
+        assert metric in performance_keys, f"未知的绩效指标 {metric}"
+        assert k > 0, f"k需要大于0, 实际为{k}"
+        self.metric = metric
+        self.k = k
+        self.sign = -1.0 if metric in minimize_performance_keys else 1.0
+        self.heap = []
+
+    def push_chunk(self, start: int, performance: np.ndarray):
+        """
+        performance: (chunk_size, PerformanceIndex), 第 0 行对应 params_index=start。
+        NaN 视为无效结果, 不参与排名。
+        """
+        score = performance[:, pfi[self.metric].value] * self.sign
+        valid = np.flatnonzero(~np.isnan(score))
+        # 每块先取出前 k 个候选, 堆操作次数不超过 k
+        valid = valid[np.argsort(-score[valid], kind="stable")[: self.k]]
+
+        for i in valid:
+            item = (float(score[i]), -(start + int(i)))
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, item)
+            elif item > self.heap[0]:
+                heapq.heapreplace(self.heap, item)
+
+    def get_index(self) -> np.ndarray:
+        """
+        返回按名次排列的 params_index, 第一个最好。
+        """
+        return np.array(
+            [-i for _, i in sorted(self.heap, reverse=True)], dtype=np.int64
+        )
+
+
+def run_parallel_top_k(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    is_only_performance=True,
+    k=10,
+    metrics=("sharpe_ratio",),
+    chunk_size=0,
+    memory_budget_mb=0,
+):
+    """
+    先用只算绩效的方式分块扫描所有参数组合, 按每个指标保留 top-k,
+    再只对入选的参数组合重新运行一次完整回测, 得到指标、信号和回测的逐K线输出。
+    is_only_performance 只为了和 init_params 返回的参数元组对齐, 第一遍总是只算绩效。
+
+    返回 (top_k_index, params_tuple, result_tuple, top_k_table):
+      top_k_index: {指标: 按名次排列的 params_index}
+      params_tuple: 只包含入选参数组合的参数元组, 可以直接交给 process_data_output
+      result_tuple: run_parallel_matrix 对入选参数组合的完整输出
+      top_k_table: 入选参数组合的绩效表, params_index 是在原参数中的行号
+    入选顺序为第一个指标的名次, 然后依次补充其他指标新入选的参数组合。
+    """
+    assert len(metrics) > 0, "至少需要一个绩效指标"
+
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+
+    heaps = [TopKHeap(metric, k) for metric in metrics]
+    for start, _, performance in iter_parallel_chunks(
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        data_mapping,
+        indicator_params_mtf,
+        backtest_params,
+        True,
+        chunk_size,
+        memory_budget_mb,
+    ):
+        for heap in heaps:
+            heap.push_chunk(start, performance)
+
+    top_k_index = {heap.metric: heap.get_index() for heap in heaps}
+
+    winner_index = []
+    for index in top_k_index.values():
+        winner_index.extend(i for i in index.tolist() if i not in winner_index)
+    winner_index = np.array(winner_index, dtype=np.int64)
+
+    params_tuple = (
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        data_mapping,
+        np.ascontiguousarray(indicator_params_mtf[winner_index]),
+        np.ascontiguousarray(backtest_params[winner_index]),
+        False,
+    )
+    result_tuple = run_parallel_matrix(*params_tuple)
+
+    performance = convert_performance_to_matrix(result_tuple[3])
+    top_k_table = pl.DataFrame(
+        {
+            "params_index": winner_index,
+            **{key: performance[:, c] for c, key in enumerate(performance_keys)},
+        }
+    )
+
+    return top_k_index, params_tuple, result_tuple, top_k_table
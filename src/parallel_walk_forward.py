@@ -0,0 +1,137 @@
+import numpy as np
+import polars as pl
+
+from src.utils.constants import numba_config
+from src.parallel import run_parallel_walk_forward
+from src.parallel_top_k import minimize_performance_keys
+from src.backtest.backtest_enums import bpi, pfi, performance_keys
+from src.convert_params.param_template_manager import (
+    convert_indicator_params_list_to_matrix,
+    convert_backtest_params_list_to_matrix,
+)
+
+
+"""
+walk-forward 分析: 在每个样本内窗口上优化参数, 再用最优参数回测紧随其后的样本外窗口,
+把所有样本外窗口的净值首尾相接成一条曲线。
+指标和信号都是因果的, 所以在完整序列上只计算一次, 每个窗口只是按K线区间回测。
+样本内和样本外窗口都在一次 run_parallel_walk_forward 中完成, 共用同一份指标缓存。
+"""
+
+
+np_int = numba_config["np"]["int"]
+np_float = numba_config["np"]["float"]
+np_acc = numba_config["np"]["acc"]
+
+
+def create_walk_forward_ranges(data_count, window, oos, step=0):
+    """
+    返回 (is_ranges, oos_ranges), 都是 (windows_count, 2) 的 [bar_start, bar_stop)。
+    第 w 个样本内窗口为 [w * step, w * step + window), 样本外窗口紧随其后, 长度为 oos,
+    最后一个样本外窗口截断到数据末尾。step 为0时等于 oos, 样本外窗口正好首尾相接。
+    """
+    step = oos if step <= 0 else step
+    assert window > 0 and oos > 0, f"窗口长度需要大于0, 实际为{window} {oos}"
+    assert step >= oos, f"step需要大于等于oos, 否则样本外窗口会重叠, 实际为{step} {oos}"
+
+    starts = np.arange(0, max(data_count - window, 0), step, dtype=np_int)
+    is_ranges = np.stack((starts, starts + window), axis=1).astype(np_int)
+    oos_ranges = np.stack(
+        (starts + window, np.minimum(starts + window + oos, data_count)), axis=1
+    ).astype(np_int)
+    return is_ranges, oos_ranges
+
+
+def stitch_walk_forward_equity(equity, oos_ranges, init_money):
+    """
+    equity: (windows_count, data_count), 每个样本外窗口都从 init_money 开始回测。
+    按收益率把每个窗口接在上一个窗口的期末净值之后, 没有结果(全部为 NaN)的窗口保持空仓。
+    窗口中间出现的 NaN (例如回测被提前终止) 沿用之前最后一个有限净值,
+    不丢弃之前已经发生的盈亏。
+    返回 (data_count,), 样本外窗口以外为 NaN。
+    """
+    stitched = np.full(equity.shape[1], np.nan, dtype=np_float)
+    last_equity = init_money
+    for w, (start, stop) in enumerate(oos_ranges):
+        segment = equity[w, start:stop]
+        valid = ~np.isnan(segment)
+        if not valid.any():
+            stitched[start:stop] = last_equity
+            continue
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(segment)), 0))
+        segment = np.where(valid[last_valid], segment[last_valid], init_money)
+        stitched[start:stop] = segment / init_money * last_equity
+        last_equity = stitched[stop - 1]
+    return stitched
+
+
+def run_walk_forward(
+    ohlcv_mtf,
+    ohlcv_smoothed_mtf,
+    data_mapping,
+    indicator_params_mtf,
+    backtest_params,
+    window,
+    oos,
+    step=0,
+    metric="sharpe_ratio",
+):
+    """
+    在每个样本内窗口上按 metric 选出最优参数组合 (NaN 视为最差),
+    再用它回测对应的样本外窗口, 样本外回测不使用提前终止规则。
+    窗口划分见 create_walk_forward_ranges。
+    所有参数组合需要使用相同的 init_money, 拼接净值时以第一个参数组合为准。
+
+    返回 (windows_table, stitched_equity):
+      windows_table: polars DataFrame, 每行一个窗口, 包含样本内外区间、选中的 params_index
+        (样本内全部为 NaN 时为 -1)、样本内的 metric, 以及样本外的绩效指标。
+      stitched_equity: (data_count,) 拼接后的样本外净值, 见 stitch_walk_forward_equity。
+    """
+    assert metric in performance_keys, f"未知的绩效指标 {metric}"
+
+    if not isinstance(indicator_params_mtf, np.ndarray):
+        indicator_params_mtf = convert_indicator_params_list_to_matrix(
+            indicator_params_mtf
+        )
+    if not isinstance(backtest_params, np.ndarray):
+        backtest_params = convert_backtest_params_list_to_matrix(backtest_params)
+    assert backtest_params.shape[0] > 0, "至少需要一个参数组合"
+
+    data_count = len(ohlcv_mtf[0]["close"])
+    is_ranges, oos_ranges = create_walk_forward_ranges(data_count, window, oos, step)
+    windows_count = len(is_ranges)
+
+    sign = -1.0 if metric in minimize_performance_keys else 1.0
+    is_performance, best_index, oos_performance, equity = run_parallel_walk_forward(
+        ohlcv_mtf,
+        ohlcv_smoothed_mtf,
+        data_mapping,
+        indicator_params_mtf,
+        backtest_params,
+        is_ranges,
+        oos_ranges,
+        pfi[metric].value,
+        sign,
+    )
+    best_index = best_index.astype(np.int64)
+    valid = np.flatnonzero(best_index >= 0)
+
+    init_money = backtest_params[0, bpi.init_money.value]
+    stitched_equity = stitch_walk_forward_equity(equity, oos_ranges, init_money)
+
+    is_metric = np.full(windows_count, np.nan, dtype=np_acc)
+    is_metric[valid] = is_performance[valid, best_index[valid], pfi[metric].value]
+
+    windows_table = pl.DataFrame(
+        {
+            "window": np.arange(windows_count, dtype=np.int64),
+            "is_start": is_ranges[:, 0],
+            "is_stop": is_ranges[:, 1],
+            "oos_start": oos_ranges[:, 0],
+            "oos_stop": oos_ranges[:, 1],
+            "params_index": best_index,
+            f"is_{metric}": is_metric,
+            **{k: oos_performance[:, c] for c, k in enumerate(performance_keys)},
+        }
+    )
+    return windows_table, stitched_equity
@@ -12,7 +12,12 @@ class BacktestRunner(
     DataLoader, ParamsInitializer, Engine, OutputProcessor, DataArchiver
 ):
     def __init__(
-        self, enable_cache: bool, enable64: bool, enable_warmup: bool, show_timing: bool
+        self,
+        enable_cache: bool,
+        enable64: bool,
+        enable_warmup: bool,
+        show_timing: bool,
+        enable_mixed: bool = False,
     ):
         """
         初始化回测运行器，设置参数并执行初始配置。
@@ -21,13 +26,16 @@ class BacktestRunner(
             enable_cache (bool): 是否启用 Numba 缓存。
             enable64 (bool): 是否启用 64 位浮点数。
             enable_warmup (bool): 是否启用预运行。
+            enable_mixed (bool): 32 位时是否用 64 位累加器 (混合精度)。
         """
         self.enable_cache = enable_cache
         self.enable64 = enable64
+        self.enable_mixed = enable_mixed
         self.enable_warmup = enable_warmup
         self.show_timing = show_timing
         # run 参数
         self.symbol = None
+        self.symbol_list = None
         self.period_list = None
         self.data_count_list = None
         self.params_count = None
@@ -37,16 +45,36 @@ class BacktestRunner(
         self.is_only_performance = None
         self.use_presets_indicator_params = None
         self.use_presets_backtest_params = None
+        self.use_params_matrix = None
+        self.param_mode = None
+        self.grid_stride = None
+        self.chunk_size = None
+        self.memory_budget_mb = None
+        self.checkpoint_dir = None
+        self.top_k = None
+        self.top_k_metrics = None
+        self.monte_carlo_count = None
+        self.monte_carlo_mode = None
+        self.walk_forward_window = None
+        self.walk_forward_oos = None
+        self.walk_forward_step = None
+        self.walk_forward_metric = None
         # run 参数
         self.data_path = None
         self.data_suffix = None
         self.params_suffix = None
         # 运行过程变量
         self.tohlcv_np_list = None
+        self.symbol_tohlcv_np_list = None
+        self.symbol_data_tuple = None
         self.params_tuple = None
         self.result_tuple = None
         self.result_converted = None
         self.data_list = None
+        self.performance_table = None
+        self.top_k_index = None
+        self.monte_carlo_table = None
+        self.walk_forward_equity = None
 
         with time_it(self.show_timing, "导入numba模块时间"):
             self._setup_numba_config()
@@ -59,7 +87,10 @@ class BacktestRunner(
         from src.utils.constants import numba_config, set_numba_dtypes
 
         set_numba_dtypes(
-            numba_config, enable64=self.enable64, enable_cache=self.enable_cache
+            numba_config,
+            enable64=self.enable64,
+            enable_cache=self.enable_cache,
+            enable_mixed=self.enable_mixed,
         )
         self.enable_cache = numba_config["enable_cache"]
 
@@ -68,18 +99,34 @@ class BacktestRunner(
         导入与并行计算相关的模块。
         """
         import numpy as np
+        import polars as pl
         from src.utils.mock_data import get_mock_data
-        from src.convert_params.param_initializer import init_params
-        from src.parallel import run_parallel
+        from src.convert_params.param_initializer import init_params, init_data_mtf
+        from src.parallel import run_parallel, run_parallel_matrix
+        from src.parallel_chunked import run_parallel_chunked
+        from src.parallel_checkpoint import run_parallel_checkpointed
+        from src.parallel_top_k import run_parallel_top_k
+        from src.parallel_symbols import run_parallel_symbols_table
+        from src.parallel_walk_forward import run_walk_forward
+        from src.parallel_monte_carlo import run_monte_carlo
         from src.convert_output.process_data import process_data_output
         from src.convert_output.archive_manager import archive_data
         from src.convert_output.server_upload import get_token, get_local_dir
         from src.signals.calculate_signal import SignalId, signal_dict
 
         self.np = np
+        self.pl = pl
         self.get_mock_data = get_mock_data
         self.init_params = init_params
+        self.init_data_mtf = init_data_mtf
         self.run_parallel = run_parallel
+        self.run_parallel_matrix = run_parallel_matrix
+        self.run_parallel_chunked = run_parallel_chunked
+        self.run_parallel_checkpointed = run_parallel_checkpointed
+        self.run_parallel_top_k = run_parallel_top_k
+        self.run_parallel_symbols_table = run_parallel_symbols_table
+        self.run_walk_forward = run_walk_forward
+        self.run_monte_carlo = run_monte_carlo
         self.process_data_output = process_data_output
         self.archive_data = archive_data
         self.get_token = get_token
@@ -91,6 +138,9 @@ class BacktestRunner(
         self,
         #
         symbol: str = "mock",
+        symbol_list: list[
+            str
+        ] = [],  # 非空时所有品种共用同一组参数, 一次并发扫描, 只输出绩效表
         period_list: list[str] = ["15m", "1h"],
         data_count_list: list[int] = [10000, 5000],
         params_count: int = 1,
@@ -100,6 +150,20 @@ class BacktestRunner(
         is_only_performance: bool | str = "",  # 如果是str则视为auto模式
         use_presets_indicator_params: bool = False,
         use_presets_backtest_params: bool = True,
+        use_params_matrix: bool = False,
+        param_mode: str = "",  # "grid" 按优化规格枚举参数, params_count 为上限; "sobol"/"lhs" 采样 params_count 个参数组合
+        grid_stride: int = 0,
+        chunk_size: int = 0,  # 大于0时按固定数量分块扫描参数
+        memory_budget_mb: float = 0,  # 大于0时按内存预算估算分块数量
+        checkpoint_dir: str = "",  # 非空时分块扫描的每块绩效保存到该目录, 重新运行时跳过已完成的块
+        top_k: int = 0,  # 大于0时只保留每个指标最好的top_k个参数组合, 并输出它们的完整结果
+        top_k_metrics: list[str] = ["sharpe_ratio"],
+        monte_carlo_count: int = 0,  # 大于0时对 top_k 入选的参数组合做交易重采样, 每个参数组合的重采样次数
+        monte_carlo_mode: str = "bootstrap",  # "bootstrap" 有放回抽样, "shuffle" 打乱交易顺序
+        walk_forward_window: int = 0,  # 大于0时做 walk-forward 分析, 样本内窗口的K线数量
+        walk_forward_oos: int = 0,  # 样本外窗口的K线数量, 为0时等于 walk_forward_window
+        walk_forward_step: int = 0,  # 窗口滚动的K线数量, 为0时等于样本外窗口长度
+        walk_forward_metric: str = "sharpe_ratio",
         #
         data_path="./data",
         data_suffix=".csv",
@@ -110,6 +174,7 @@ class BacktestRunner(
         """
         # 将所有参数设置到实例属性中，供其他私有方法使用
         self.symbol = symbol
+        self.symbol_list = symbol_list
         self.period_list = period_list
         self.data_count_list = data_count_list
         self.params_count = params_count
@@ -119,10 +184,25 @@ class BacktestRunner(
         self.is_only_performance = is_only_performance
         self.use_presets_indicator_params = use_presets_indicator_params
         self.use_presets_backtest_params = use_presets_backtest_params
+        self.use_params_matrix = use_params_matrix
+        self.param_mode = param_mode
+        self.grid_stride = grid_stride
+        self.chunk_size = chunk_size
+        self.memory_budget_mb = memory_budget_mb
+        self.checkpoint_dir = checkpoint_dir
+        self.top_k = top_k
+        self.top_k_metrics = top_k_metrics
+        self.monte_carlo_count = monte_carlo_count
+        self.monte_carlo_mode = monte_carlo_mode
+        self.walk_forward_window = walk_forward_window
+        self.walk_forward_oos = walk_forward_oos
+        self.walk_forward_step = walk_forward_step
+        self.walk_forward_metric = walk_forward_metric
         #
         self.data_path = data_path
         self.data_suffix = data_suffix
         self.params_suffix = params_suffix
+        self._check_run_options()
 
         # 循环执行回测，第一次为预热
         for i in range(2):
@@ -136,21 +216,39 @@ class BacktestRunner(
                 if i == 0:
                     self.params_count = 1
                     self.symbol = "mock"
+                    self.symbol_list = []
                     self.period_list = ["15m", "1h"]
                     self.data_count_list = [100, 50]
                     self.select_id = "signal_3_id"
                     self.convert_num = 0
                     self.smooth_mode = ""
                     self.is_only_performance = False
+                    self.param_mode = ""
+                    self.grid_stride = 0
+                    self.chunk_size = 0
+                    self.memory_budget_mb = 0
+                    self.checkpoint_dir = ""
+                    self.top_k = 0
+                    self.monte_carlo_count = 0
+                    self.walk_forward_window = 0
                 else:
                     self.params_count = params_count
                     self.symbol = symbol
+                    self.symbol_list = symbol_list
                     self.period_list = period_list
                     self.data_count_list = data_count_list
                     self.select_id = select_id
                     self.convert_num = convert_num
                     self.smooth_mode = smooth_mode
                     self.is_only_performance = is_only_performance
+                    self.param_mode = param_mode
+                    self.grid_stride = grid_stride
+                    self.chunk_size = chunk_size
+                    self.memory_budget_mb = memory_budget_mb
+                    self.checkpoint_dir = checkpoint_dir
+                    self.top_k = top_k
+                    self.monte_carlo_count = monte_carlo_count
+                    self.walk_forward_window = walk_forward_window
 
                 with time_it(self.show_timing and i > 0, "数据导入"):
                     self._load_data()
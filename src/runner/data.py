@@ -1,6 +1,15 @@
+import zlib
+
 from src.utils.common import time_it, assert_attr_is_not_none
 
 
+def get_symbol_seed(symbol):
+    """
+    每个品种的模拟数据种子, 由品种名决定, 与品种在 symbol_list 中的顺序无关。
+    """
+    return zlib.crc32(symbol.encode())
+
+
 class DataLoader:
     def _load_data(self):
         """
@@ -20,3 +29,14 @@ class DataLoader:
             self.get_mock_data(data_count=d, period=p)
             for d, p in zip(self.data_count_list, self.period_list)
         ]
+
+        # 多品种模式: 每个品种按各自的种子生成多周期数据, 第一个品种的数据用于创建参数
+        self.symbol_tohlcv_np_list = [
+            [
+                self.get_mock_data(data_count=d, period=p, seed=get_symbol_seed(symbol))
+                for d, p in zip(self.data_count_list, self.period_list)
+            ]
+            for symbol in self.symbol_list
+        ]
+        if self.symbol_tohlcv_np_list:
+            self.tohlcv_np_list = self.symbol_tohlcv_np_list[0]
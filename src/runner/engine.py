@@ -2,11 +2,109 @@ from src.utils.common import time_it, assert_attr_is_not_none
 
 
 class Engine:
+    def _check_run_options(self):
+        """
+        多品种、walk-forward、top-k 和断点续跑是互斥的运行模式, 同时设置时直接报错,
+        避免其中一个选项被静默忽略 (例如 top-k 扫描不会保存断点)。
+        """
+        modes = {
+            "symbol_list": self.symbol_list,
+            "walk_forward_window": self.walk_forward_window,
+            "top_k": self.top_k,
+            "checkpoint_dir": self.checkpoint_dir,
+        }
+        enabled = [k for k, v in modes.items() if v]
+        assert len(enabled) <= 1, f"{', '.join(enabled)} 不能同时使用"
+        assert not self.monte_carlo_count or self.top_k, (
+            "monte_carlo_count 只对 top_k 入选的参数组合生效, 需要同时设置 top_k"
+        )
+        assert not (self.chunk_size or self.memory_budget_mb) or not (
+            self.symbol_list or self.walk_forward_window
+        ), (
+            "chunk_size 和 memory_budget_mb 不能与 symbol_list 或 walk_forward_window 同时使用"
+        )
+
     def _run_parallel_backtest(self):
         """
         执行并行回测并返回结果。
         """
 
-        assert_attr_is_not_none(self, "params_tuple")
+        assert_attr_is_not_none(
+            self,
+            "params_tuple",
+            "use_params_matrix",
+            "chunk_size",
+            "memory_budget_mb",
+            "checkpoint_dir",
+            "top_k",
+            "top_k_metrics",
+            "monte_carlo_count",
+            "walk_forward_window",
+        )
+        self._check_run_options()
 
-        self.result_tuple = self.run_parallel(*self.params_tuple)
+        self.performance_table = None
+        self.walk_forward_equity = None
+        self.monte_carlo_table = None
+        if self.symbol_list:
+            # 多品种只保留以 symbol 区分的绩效表
+            self.result_tuple = None
+            self.performance_table = self.run_parallel_symbols_table(
+                self.symbol_list,
+                *self.symbol_data_tuple,
+                *self.params_tuple[3:5],
+            )
+        elif self.walk_forward_window:
+            # walk-forward 只保留每个窗口的绩效表和拼接后的样本外净值
+            self.result_tuple = None
+            self.performance_table, self.walk_forward_equity = self.run_walk_forward(
+                *self.params_tuple[:5],
+                window=self.walk_forward_window,
+                oos=self.walk_forward_oos or self.walk_forward_window,
+                step=self.walk_forward_step,
+                metric=self.walk_forward_metric,
+            )
+        elif self.top_k:
+            # 只保留入选参数组合的参数和完整输出, 后续转换输出只处理它们
+            (
+                self.top_k_index,
+                self.params_tuple,
+                self.result_tuple,
+                self.performance_table,
+            ) = self.run_parallel_top_k(
+                *self.params_tuple,
+                k=self.top_k,
+                metrics=self.top_k_metrics,
+                chunk_size=self.chunk_size,
+                memory_budget_mb=self.memory_budget_mb,
+            )
+            if self.monte_carlo_count:
+                # 入选参数组合的逐笔交易重采样, 行与 performance_table 一一对应
+                self.monte_carlo_table = self.run_monte_carlo(
+                    self.params_tuple[4],
+                    self.result_tuple[2],
+                    resample_count=self.monte_carlo_count,
+                    mode=self.monte_carlo_mode,
+                    params_index=self.performance_table["params_index"].to_numpy(),
+                )
+        elif self.checkpoint_dir:
+            # 断点续跑同样只保留绩效表, 已完成的块从 checkpoint_dir 读取
+            self.result_tuple = None
+            self.performance_table = self.run_parallel_checkpointed(
+                *self.params_tuple,
+                chunk_size=self.chunk_size,
+                memory_budget_mb=self.memory_budget_mb,
+                checkpoint_dir=self.checkpoint_dir,
+            )
+        elif self.chunk_size or self.memory_budget_mb:
+            # 分块扫描只保留绩效表, 不保留逐K线的输出
+            self.result_tuple = None
+            self.performance_table = self.run_parallel_chunked(
+                *self.params_tuple,
+                chunk_size=self.chunk_size,
+                memory_budget_mb=self.memory_budget_mb,
+            )
+        elif self.use_params_matrix:
+            self.result_tuple = self.run_parallel_matrix(*self.params_tuple)
+        else:
+            self.result_tuple = self.run_parallel(*self.params_tuple)
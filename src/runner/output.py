@@ -9,17 +9,50 @@ class OutputProcessor:
         assert_attr_is_not_none(
             self,
             "params_tuple",
-            "result_tuple",
             "data_suffix",
             "params_suffix",
             "convert_num",
         )
 
-        # 转换数据
-        self.result_converted, self.data_list = self.process_data_output(
-            params=self.params_tuple,
-            data_list=self.result_tuple,
-            convert_num=self.convert_num,
-            data_suffix=self.data_suffix,
-            params_suffix=self.params_suffix,
-        )
+        if self.result_tuple is not None:
+            # 转换数据
+            self.result_converted, self.data_list = self.process_data_output(
+                params=self.params_tuple,
+                data_list=self.result_tuple,
+                convert_num=self.convert_num,
+                data_suffix=self.data_suffix,
+                params_suffix=self.params_suffix,
+            )
+        else:
+            # 分块扫描的结果只有一张绩效表
+            self.result_converted, self.data_list = {}, []
+
+        if self.performance_table is not None:
+            self.result_converted["performance_table"] = self.performance_table
+            self.data_list.append(
+                {
+                    "name": f"performance_table{self.data_suffix}",
+                    "data": self.performance_table,
+                }
+            )
+
+        if self.walk_forward_equity is not None:
+            walk_forward_equity = self.pl.DataFrame(
+                {"walk_forward_equity": self.walk_forward_equity}
+            )
+            self.result_converted["walk_forward_equity"] = walk_forward_equity
+            self.data_list.append(
+                {
+                    "name": f"walk_forward_equity{self.data_suffix}",
+                    "data": walk_forward_equity,
+                }
+            )
+
+        if self.monte_carlo_table is not None:
+            self.result_converted["monte_carlo_table"] = self.monte_carlo_table
+            self.data_list.append(
+                {
+                    "name": f"monte_carlo_table{self.data_suffix}",
+                    "data": self.monte_carlo_table,
+                }
+            )
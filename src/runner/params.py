@@ -17,6 +17,9 @@ class ParamsInitializer:
             "smooth_mode",
             "use_presets_indicator_params",
             "use_presets_backtest_params",
+            "use_params_matrix",
+            "param_mode",
+            "grid_stride",
         )
 
         signal_select_id = self.SignalId[self.select_id].value
@@ -40,4 +43,18 @@ class ParamsInitializer:
             is_only_performance=self.is_only_performance,
             use_presets_indicator_params=self.use_presets_indicator_params,
             use_presets_backtest_params=self.use_presets_backtest_params,
+            use_params_matrix=self.use_params_matrix,
+            param_mode=self.param_mode,
+            grid_stride=self.grid_stride,
         )
+        # 网格模式下实际的参数组合数量由网格决定
+        self.params_count = len(self.params_tuple[4])
+
+        # 多品种模式只需要每个品种的数据, 参数共用 params_tuple 中的一份
+        self.symbol_data_tuple = None
+        if self.symbol_list:
+            data_tuple_list = [
+                self.init_data_mtf(tohlcv_np_list, self.smooth_mode)
+                for tohlcv_np_list in self.symbol_tohlcv_np_list
+            ]
+            self.symbol_data_tuple = tuple(zip(*data_tuple_list))
@@ -6,15 +6,26 @@ from numba.typed import Dict, List
 from enum import IntEnum, auto
 
 
-from parallel_signature import signal_signature
+from parallel_signature import signal_signature, signal_bar_signature
 
 
-from .signal_0 import calc_signal_0, define_signal_0_params
-from .signal_1 import calc_signal_1, define_signal_1_params
-from .signal_2 import calc_signal_2, define_signal_2_params
-from .signal_3 import calc_signal_3, define_signal_3_params
+from .signal_0 import calc_signal_0, calc_signal_0_bar, define_signal_0_params
+from .signal_1 import calc_signal_1, calc_signal_1_bar, define_signal_1_params
+from .signal_2 import calc_signal_2, calc_signal_2_bar, define_signal_2_params
+from .signal_3 import (
+    calc_signal_3,
+    calc_signal_3_bar,
+    define_signal_3_params,
+    signal_3_output_fields,
+)
 
 from src.utils.constants import numba_config
+from src.backtest.backtest_enums import bpi
+from src.indicators.indicator_layout import (
+    iid,
+    indicator_output_fields,
+    indicator_all_fields,
+)
 from src.convert_params.param_key_utils import (
     get_length_from_list_or_dict,
     create_list_unicode_empty,
@@ -53,45 +64,119 @@ signal_dict = {
     },
     si.signal_3_id.value: {
         "indicator_params": define_signal_3_params,
+        "output_fields": signal_3_output_fields,
     },
 }
 
 
+def create_signal_need_fields():
+    """
+    返回 (信号数量, IndicatorId, 输出字段) 的布尔数组, 标记每个信号用到的指标输出字段。
+    信号在 signal_dict 的 output_fields 中没有列出的指标视为需要全部字段。
+    """
+    need_fields = np.zeros((len(si), *indicator_all_fields.shape), dtype=np.bool_)
+    for s in si:
+        need_fields[s.value] = indicator_all_fields
+        for name, fields in signal_dict[s.value].get("output_fields", {}).items():
+            k = iid[name].value
+            need_fields[s.value, k] = False
+            for field in fields:
+                need_fields[s.value, k, indicator_output_fields[name].index(field)] = (
+                    True
+                )
+    return need_fields
+
+
+# numba 会把全局数组冻结为编译期常量
+signal_need_fields = create_signal_need_fields()
+
+
+@njit(cache=enable_cache)
+def get_signal_need_fields(backtest_params):
+    """
+    所有参数组合选择的信号用到的指标输出字段的并集, 交给 calc_indicator_cache。
+    只在不输出指标数组的只算绩效入口使用。
+    """
+    need_fields = np.zeros(signal_need_fields.shape[1:], dtype=np.bool_)
+    selected = np.zeros(len(signal_need_fields), dtype=np.bool_)
+    for i in range(backtest_params.shape[0]):
+        signal_select = nb_int(backtest_params[i, bpi.signal_select.value])
+        if 0 <= signal_select < len(selected):
+            selected[signal_select] = True
+    for s in range(len(selected)):
+        if selected[s]:
+            need_fields |= signal_need_fields[s]
+    return need_fields
+
+
 @njit(signal_signature, cache=enable_cache)
 def calc_signal(
-    ohlcv_mtf, data_mapping, i_params_mtf, i_output_mtf, s_output, b_params
+    ohlcv_mtf,
+    data_mapping,
+    cache_index_mtf,
+    indicator_cache,
+    block_offset,
+    s_output,
+    b_params,
 ):
-    signal_select = b_params["signal_select"]
+    """
+    指标按 (指标编号, 槽位, 输出字段) 的整数编号从共享缓存读取 (见 get_indicator_output),
+    不经过字符串键的 i_output。
+    cache_index_mtf 是该参数组合的 cache_index[i], 第 m 个周期在缓存中的周期编号为 block_offset + m。
+    """
+    signal_select = b_params[bpi.signal_select.value]
 
     if signal_select == si.signal_0_id.value:
         calc_signal_0(
             ohlcv_mtf,
             data_mapping,
-            i_params_mtf,
-            i_output_mtf,
+            cache_index_mtf,
+            indicator_cache,
+            block_offset,
             s_output,
         )
     elif signal_select == si.signal_1_id.value:
         calc_signal_1(
             ohlcv_mtf,
             data_mapping,
-            i_params_mtf,
-            i_output_mtf,
+            cache_index_mtf,
+            indicator_cache,
+            block_offset,
             s_output,
         )
     elif signal_select == si.signal_2_id.value:
         calc_signal_2(
             ohlcv_mtf,
             data_mapping,
-            i_params_mtf,
-            i_output_mtf,
+            cache_index_mtf,
+            indicator_cache,
+            block_offset,
             s_output,
         )
     elif signal_select == si.signal_3_id.value:
         calc_signal_3(
             ohlcv_mtf,
             data_mapping,
-            i_params_mtf,
-            i_output_mtf,
+            cache_index_mtf,
+            indicator_cache,
+            block_offset,
             s_output,
         )
+
+
+@njit(signal_bar_signature, cache=enable_cache)
+def calc_signal_bar(bar, cache_index_mtf, indicator_values, b_params):
+    """
+    calc_signal 的单根K线版本, 用于增量回测。
+    bar 是主周期最新K线, 指标输出来自 indicator_state 的增量状态。
+    实盘追加的K线不会被 data_mapping 的 skip 跳过, 这里不处理 skip。
+    """
+    signal_select = b_params[bpi.signal_select.value]
+
+    if signal_select == si.signal_1_id.value:
+        return calc_signal_1_bar(bar, cache_index_mtf, indicator_values)
+    elif signal_select == si.signal_2_id.value:
+        return calc_signal_2_bar(bar, cache_index_mtf, indicator_values)
+    elif signal_select == si.signal_3_id.value:
+        return calc_signal_3_bar(bar, cache_index_mtf, indicator_values)
+    return calc_signal_0_bar(bar, cache_index_mtf, indicator_values)
@@ -1,11 +1,10 @@
 import numpy as np
 from numba import njit, types
 from numba.typed import List
-from src.convert_params.param_template import get_indicator_need_keys
 from src.signals.tool import populate_indicator_dicts
 from src.utils.nb_check_keys import check_data_for_signal
 from src.indicators.calculate_indicators import MaxIndicatorCount as mic
-from parallel_signature import signal_child_signature
+from parallel_signature import signal_child_signature, signal_bar_child_signature
 
 from src.utils.constants import numba_config
 
@@ -24,14 +23,18 @@ define_signal_0_params = [
 def calc_signal_0(
     ohlcv_mtf,
     data_mapping,
-    i_params_mtf,
-    i_output_mtf,
+    cache_index_mtf,
+    indicator_cache,
+    block_offset,
     s_output,
 ):
-    if not check_data_for_signal(
-        ohlcv_mtf,
-        get_indicator_need_keys(i_params_mtf),
-        i_output_mtf,
-        data_mapping,
-    ):
+    if not check_data_for_signal(ohlcv_mtf, cache_index_mtf, data_mapping):
         return
+
+
+@njit(signal_bar_child_signature, cache=enable_cache)
+def calc_signal_0_bar(bar, cache_index_mtf, indicator_values):
+    """
+    calc_signal_0 的单根K线版本, 不产生任何信号。
+    """
+    return False, False, False, False
@@ -1,11 +1,13 @@
 import numpy as np
 from numba import njit, types
 from numba.typed import List
-from src.convert_params.param_template import get_indicator_need_keys
 from src.signals.tool import populate_indicator_dicts
 from src.utils.nb_check_keys import check_data_for_signal
 from src.indicators.calculate_indicators import MaxIndicatorCount as mic
-from parallel_signature import signal_child_signature
+from src.indicators.indicator_layout import iid
+from src.indicators.indicator_state import get_indicator_value
+from src.indicators.indicator_cache import get_indicator_output
+from parallel_signature import signal_child_signature, signal_bar_child_signature
 
 from src.utils.constants import numba_config
 
@@ -37,25 +39,23 @@ define_signal_1_params = [
 def calc_signal_1(
     ohlcv_mtf,
     data_mapping,
-    i_params_mtf,
-    i_output_mtf,
+    cache_index_mtf,
+    indicator_cache,
+    block_offset,
     s_output,
 ):
-    if not check_data_for_signal(
-        ohlcv_mtf,
-        get_indicator_need_keys(i_params_mtf),
-        i_output_mtf,
-        data_mapping,
-    ):
+    if not check_data_for_signal(ohlcv_mtf, cache_index_mtf, data_mapping):
         return
 
     ohlcv_a = ohlcv_mtf[0]
     close = ohlcv_a["close"]
 
-    i_output_a = i_output_mtf[0]
-
-    sma_0 = i_output_a["sma_0"]
-    sma_1 = i_output_a["sma_1"]
+    sma_0 = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 0, iid.sma.value, 0, 0
+    )
+    sma_1 = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 0, iid.sma.value, 1, 0
+    )
 
     s_output["enter_long"] = sma_0 > sma_1
     s_output["exit_long"] = sma_0 < sma_1
@@ -65,3 +65,18 @@ def calc_signal_1(
     skip = data_mapping["skip"]
     s_output["enter_long"][skip == 0] = False
     s_output["enter_short"][skip == 0] = False
+
+
+@njit(signal_bar_child_signature, cache=enable_cache)
+def calc_signal_1_bar(bar, cache_index_mtf, indicator_values):
+    """
+    calc_signal_1 的单根K线版本, 用于增量回测。
+    """
+    sma_0 = get_indicator_value(
+        indicator_values, cache_index_mtf, 0, iid.sma.value, 0, 0
+    )
+    sma_1 = get_indicator_value(
+        indicator_values, cache_index_mtf, 0, iid.sma.value, 1, 0
+    )
+
+    return sma_0 > sma_1, sma_0 < sma_1, sma_0 > sma_1, sma_0 < sma_1
@@ -2,11 +2,13 @@ import numpy as np
 from numba import njit, types, literal_unroll
 from numba.typed import List, Dict
 from numba.core.types import unicode_type
-from src.convert_params.param_template import get_indicator_need_keys
 from src.signals.tool import populate_indicator_dicts
 from src.utils.nb_check_keys import check_data_for_signal
 from src.indicators.calculate_indicators import MaxIndicatorCount as mic
-from parallel_signature import signal_child_signature
+from src.indicators.indicator_layout import iid
+from src.indicators.indicator_state import pri, get_indicator_value
+from src.indicators.indicator_cache import get_indicator_output
+from parallel_signature import signal_child_signature, signal_bar_child_signature
 
 from src.utils.constants import numba_config
 
@@ -42,36 +44,45 @@ define_signal_3_params = [
 ]
 
 
+# calc_signal_3 用到的指标输出字段, 未列出的指标视为需要全部字段
+# 只算绩效时 bbands 的 bandwidth 和 percent 不计算 (见 get_signal_need_fields)
+signal_3_output_fields = {"bbands": ("upper", "middle", "lower")}
+
+
 @njit(signal_child_signature, cache=enable_cache)
 def calc_signal_3(
     ohlcv_mtf,
     data_mapping,
-    i_params_mtf,
-    i_output_mtf,
+    cache_index_mtf,
+    indicator_cache,
+    block_offset,
     s_output,
 ):
-    if not check_data_for_signal(
-        ohlcv_mtf,
-        get_indicator_need_keys(i_params_mtf),
-        i_output_mtf,
-        data_mapping,
-    ):
+    if not check_data_for_signal(ohlcv_mtf, cache_index_mtf, data_mapping):
         return
 
     ohlcv_a = ohlcv_mtf[0]
     close = ohlcv_a["close"]
 
-    i_output_a = i_output_mtf[0]
-    i_output_b = i_output_mtf[1]
-
-    bbands_upper = i_output_a["bbands_upper_0"]
-    bbands_middle = i_output_a["bbands_middle_0"]
-    bbands_lower = i_output_a["bbands_lower_0"]
+    # bbands 的输出字段顺序见 indicator_output_fields
+    bbands_upper = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 0, iid.bbands.value, 0, 0
+    )
+    bbands_middle = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 0, iid.bbands.value, 0, 1
+    )
+    bbands_lower = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 0, iid.bbands.value, 0, 2
+    )
 
     mtf_b = data_mapping["mtf_1"]
 
-    sma_0 = i_output_b["sma_0"][mtf_b]
-    sma_1 = i_output_b["sma_1"][mtf_b]
+    sma_0 = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 1, iid.sma.value, 0, 0
+    )[mtf_b]
+    sma_1 = get_indicator_output(
+        indicator_cache, cache_index_mtf, block_offset, 1, iid.sma.value, 1, 0
+    )[mtf_b]
 
     s_output["enter_long"] = (close < bbands_lower) & (sma_0 > bbands_middle)
     s_output["exit_long"] = close > bbands_middle
@@ -81,3 +92,34 @@ def calc_signal_3(
     skip = data_mapping["skip"]
     s_output["enter_long"][skip == 0] = False
     s_output["enter_short"][skip == 0] = False
+
+
+@njit(signal_bar_child_signature, cache=enable_cache)
+def calc_signal_3_bar(bar, cache_index_mtf, indicator_values):
+    """
+    calc_signal_3 的单根K线版本, 用于增量回测。
+    高周期的指标取最新一根已追加的高周期K线的输出, 与 data_mapping 的映射一致。
+    """
+    close = bar[pri.close.value]
+
+    # bbands 的输出字段顺序见 indicator_output_fields
+    bbands_upper = get_indicator_value(
+        indicator_values, cache_index_mtf, 0, iid.bbands.value, 0, 0
+    )
+    bbands_middle = get_indicator_value(
+        indicator_values, cache_index_mtf, 0, iid.bbands.value, 0, 1
+    )
+    bbands_lower = get_indicator_value(
+        indicator_values, cache_index_mtf, 0, iid.bbands.value, 0, 2
+    )
+
+    sma_0 = get_indicator_value(
+        indicator_values, cache_index_mtf, 1, iid.sma.value, 0, 0
+    )
+
+    return (
+        close < bbands_lower and sma_0 > bbands_middle,
+        close > bbands_middle,
+        close > bbands_upper and sma_0 < bbands_middle,
+        close < bbands_middle,
+    )
@@ -1,3 +1,6 @@
+import os
+from pathlib import Path
+
 import numpy as np
 import numba as nb
 
@@ -8,25 +11,63 @@ import numba as nb
 numba_config = {}
 
 
-def get_numba_dtypes(enable64: bool):
+def get_numba_dtypes(enable64: bool, enable_mixed: bool = False):
+    """
+    float 是 OHLCV、指标输出和逐K线回测数组的存储精度,
+    acc 是累加器精度 (滚动和、递推状态、净值和绩效)。
+    enable_mixed 只在 32 位时生效: 存储用 float32, 累加器用 float64。
+    """
     np_int_type = np.int64 if enable64 else np.int32
     np_float_type = np.float64 if enable64 else np.float32
+    np_acc_type = np.float64 if enable64 or enable_mixed else np.float32
     np_bool_type = np.bool_
     nb_int_type = nb.int64 if enable64 else nb.int32
     nb_float_type = nb.float64 if enable64 else nb.float32
+    nb_acc_type = nb.float64 if enable64 or enable_mixed else nb.float32
     nb_bool_type = nb.boolean
     dtype_dict = {
-        "np": {"int": np_int_type, "float": np_float_type, "bool": np_bool_type},
-        "nb": {"int": nb_int_type, "float": nb_float_type, "bool": nb_bool_type},
+        "np": {
+            "int": np_int_type,
+            "float": np_float_type,
+            "acc": np_acc_type,
+            "bool": np_bool_type,
+        },
+        "nb": {
+            "int": nb_int_type,
+            "float": nb_float_type,
+            "acc": nb_acc_type,
+            "bool": nb_bool_type,
+        },
     }
     return dtype_dict
 
 
-def set_numba_dtypes(numba_config, enable_cache: bool, enable64: bool):
+def get_numba_cache_dir(enable_mixed: bool):
+    """
+    混合精度与 32 位的函数参数类型相同, 只有累加器精度不同,
+    numba 缓存按参数类型区分, 所以混合精度的编译缓存单独存放,
+    默认放在项目根目录的 __pycache__ 下 (clean_cache.py 会一起清理)。
+    """
+    cache_dir = os.environ.get("NUMBA_CACHE_DIR", "")
+    if not enable_mixed:
+        return cache_dir
+    if cache_dir:
+        return os.path.join(cache_dir, "mixed")
+    return str(Path(__file__).resolve().parents[2] / "__pycache__" / "numba_mixed")
+
+
+def set_numba_dtypes(
+    numba_config, enable_cache: bool, enable64: bool, enable_mixed: bool = False
+):
+    enable_mixed = enable_mixed and not enable64
     numba_config["enable_cache"] = enable_cache
     numba_config["enable64"] = enable64
+    numba_config["enable_mixed"] = enable_mixed
 
-    dtype_dict = get_numba_dtypes(enable64)
+    dtype_dict = get_numba_dtypes(enable64, enable_mixed)
     for k, v in dtype_dict.items():
         numba_config[k] = v
+
+    # 需要在导入使用 numba_config 的模块之前设置, njit 装饰时确定缓存位置
+    nb.config.CACHE_DIR = get_numba_cache_dir(enable_mixed)
     return numba_config
@@ -8,18 +8,19 @@ from src.utils.constants import numba_config
 np_float = numba_config["np"]["float"]
 
 
-def get_mock_data(data_count, period="15m"):
+def get_mock_data(data_count, period="15m", seed=42):
     """
     生成模拟市场数据（OHLCV），使用几何布朗运动和动态成交量。
 
     参数:
         data_count (int): 要生成的K线数量。
         period (str): K线的周期，例如 "3m", "5m", "15m", "1h", "4h", "1d" 等。
+        seed (int): 随机种子, 相同的种子生成相同的数据。
 
     返回:
         np.ndarray: 一个二维NumPy数组，包含 timestamp, o, h, l, c, v。
     """
-    np.random.seed(42)
+    np.random.seed(seed)
 
     # 将周期字符串映射到秒数
     period_to_seconds = {
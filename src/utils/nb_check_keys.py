@@ -26,6 +26,18 @@ def check_keys(keys, dict_):
     return True
 
 
+@njit(cache=enable_cache)
+def check_cols(cols, row):
+    """
+    按列索引检查参数行, NaN 视为参数缺失。
+    """
+    for c in cols:
+        if np.isnan(row[c]):
+            return False
+
+    return True
+
+
 @njit(cache=enable_cache)
 def check_mapping(data_mapping, ohlcv_mtf):
     for i in range(1, len(ohlcv_mtf)):
@@ -72,18 +84,14 @@ def check_data_for_indicators(ohlcv):
 
 
 @njit(cache=enable_cache)
-def check_data_for_signal(ohlcv_mtf, need_keys, i_output_mtf, data_mapping):
+def check_data_for_signal(ohlcv_mtf, cache_index_mtf, data_mapping):
+    # 开启的指标槽位都已经在共享缓存中 (见 calc_indicator_cache), 只检查周期数量
     if not check_ohlcv_mtf(ohlcv_mtf):
         return False
 
-    if not len(need_keys) == len(ohlcv_mtf) == len(i_output_mtf):
+    if len(cache_index_mtf) != len(ohlcv_mtf):
         return False
 
-    for i in range(len(ohlcv_mtf)):
-        exist_key = check_keys(need_keys[i], i_output_mtf[i])
-        if not exist_key:
-            return False
-
     exist_mapping = check_mapping(data_mapping, ohlcv_mtf)
     if not exist_mapping:
         return False
@@ -93,7 +101,7 @@ def check_data_for_signal(ohlcv_mtf, need_keys, i_output_mtf, data_mapping):
 
 @njit(cache=enable_cache)
 def check_data_for_backtest(
-    ohlcv_mtf, s_output_need_keys, b_params_need_keys, s_output, b_params
+    ohlcv_mtf, s_output_need_keys, b_params_need_cols, s_output, b_params
 ):
     if not check_ohlcv_mtf(ohlcv_mtf):
         return False
@@ -102,7 +110,7 @@ def check_data_for_backtest(
     if not check_keys(s_output_need_keys, s_output):
         return False
 
-    if not check_keys(b_params_need_keys, b_params):
+    if not check_cols(b_params_need_cols, b_params):
         return False
 
     return True
@@ -111,7 +119,7 @@ def check_data_for_backtest(
 @njit(cache=enable_cache)
 def check_data_for_performance(
     ohlcv_mtf,
-    b_params_need_keys,
+    b_params_need_cols,
     b_output_need_keys,
     b_params,
     b_output,
@@ -119,7 +127,7 @@ def check_data_for_performance(
     if not check_ohlcv_mtf(ohlcv_mtf):
         return False
 
-    if not check_keys(b_params_need_keys, b_params):
+    if not check_cols(b_params_need_cols, b_params):
         return False
 
     if not check_keys(b_output_need_keys, b_output):